@@ -6,65 +6,97 @@ The agent is named "Ticket_Assignment" and uses DiscoveryEngineSearchTool + BigQ
 """
 
 import os
-from dotenv import load_dotenv
-from google.adk.agents import LlmAgent
-from google.adk.tools.bigquery import BigQueryToolset
-from google.adk.tools.bigquery.config import BigQueryToolConfig
-from google.adk.tools.discovery_engine_search_tool import DiscoveryEngineSearchTool
+from typing import TYPE_CHECKING
 
+from bom_core import config
+from bom_core.registry import get_or_create, load_env
 
-load_dotenv()
+if TYPE_CHECKING:
+    from google.adk.agents import LlmAgent
 
-PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-DATASET_ID = os.getenv("BQ_DATASET_ID", "bom_demo")
-BQ_LOCATION = os.getenv("BQ_LOCATION", "us-central1")
-RAG_DATA_STORE_ID = os.getenv("RAG_DATA_STORE_ID")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-
-PROMPT = f"""
-You are a BOM data analyst answering questions about `{PROJECT_ID}.{DATASET_ID}`.
+PROMPT = """
+You are a BOM data analyst answering questions about `{project_id}.{dataset_id}`.
 
 **MANDATORY PROCESS:**
-1. ALWAYS search Discovery Engine FIRST to understand column meanings, terminology mappings, and data types
-2. THEN use BigQuery INFORMATION_SCHEMA if you need to verify columns exist
+1. ALWAYS search the schema documentation FIRST (Discovery Engine or search_schema_docs) to understand column meanings, terminology mappings, and data types
+2. THEN verify columns and exact stored values with describe_schema / resolve_terms (in-process catalog;
+   do not query INFORMATION_SCHEMA or sample SELECT DISTINCT values)
 3. THEN build and execute SQL queries
 4. Return concise answers with a 'SQL used:' section showing the final query
+5. Large results come back as a result_cursor summary (full row count, column stats, a preview); page through
+   them with fetch_result_page or export them with export_result. If a result is still cut off at 100 rows
+   (result_is_likely_truncated), call open_result_cursor with the same SQL
 
 Tables: item_master, bom_details
 """
 
 
-def get_agent() -> LlmAgent:
-    if not PROJECT_ID:
+def get_agent() -> "LlmAgent":
+    load_env()
+    project_id = config.project_id()
+    if not project_id:
         raise ValueError("GCP_PROJECT_ID is required")
 
+    # Heavy imports (ADK, pandas, DuckDB, BigQuery) are paid on first build only
+    from google.adk.agents import LlmAgent
+    from google.adk.tools.bigquery.config import BigQueryToolConfig
+    from google.adk.tools.discovery_engine_search_tool import DiscoveryEngineSearchTool
+
+    from bom_core.catalog import SCHEMA_CATALOG_TOOLS
+    from bom_core.cursors import RESULT_CURSOR_TOOLS, make_cursor_callback
+    from bom_core.local_sql import make_sql_toolset, uses_warehouse
+    from bom_core.query_cache import get_query_cache, make_cache_callbacks
+    from bom_core.query_guard import get_query_guard, make_guard_callback
+    from bom_core.retrieval import search_schema_docs, use_local_rag
+    from bom_core.tracing import instrument
+
     # BigQuery tool configuration (explicit for readability)
     bq_cfg = BigQueryToolConfig(
-        compute_project_id=PROJECT_ID,
-        location=BQ_LOCATION,
+        compute_project_id=project_id,
+        location=config.bq_location(),
         max_query_result_rows=100,
+        maximum_bytes_billed=config.max_bytes_billed(),
     )
-    bq_tools = BigQueryToolset(bigquery_tool_config=bq_cfg)
+    # BQ_BACKEND=local|hybrid serves execute_sql from the embedded DuckDB mirror
+    bq_tools = make_sql_toolset(bq_cfg)
 
     # Assemble tools list clearly
-    tools = [bq_tools]
-    if RAG_DATA_STORE_ID:
+    rag_data_store_id = os.getenv("RAG_DATA_STORE_ID")
+    tools = [*SCHEMA_CATALOG_TOOLS, bq_tools, *RESULT_CURSOR_TOOLS]
+    if use_local_rag():
+        # RAG_BACKEND=local: in-process BM25/vector index, no network hop
+        tools.append(search_schema_docs)
+    elif rag_data_store_id:
         rag_tool = DiscoveryEngineSearchTool(
-            data_store_id=RAG_DATA_STORE_ID,
+            data_store_id=rag_data_store_id,
             max_results=3,
         )
         tools.append(rag_tool)
 
+    # Repeat execute_sql calls are answered from the shared result cache
+    cache_before, cache_after = make_cache_callbacks(get_query_cache())
+    # Dry-run cost gate: over-budget statements are narrowed or rejected before they run
+    guard_before = make_guard_callback(get_query_guard(), should_check=uses_warehouse)
+    # Large results are spilled to a local cursor; the model sees its summary and a preview
+    cursor_after = make_cursor_callback()
+
     agent = LlmAgent(
         name="bom_data_agent",
         model="gemini-2.5-flash",
-        instruction=PROMPT,
+        instruction=PROMPT.format(project_id=project_id, dataset_id=config.dataset_id()),
         tools=tools,
+        before_tool_callback=[cache_before, guard_before],
+        after_tool_callback=[cache_after, cursor_after],
     )
-    return agent
+    # BOM_TRACE_DIR=<dir> records agent/LLM/tool spans (JSONL + OTLP/JSON)
+    return instrument(agent)
 
 
-root_agent = get_agent()
+def __getattr__(name: str):
+    # ADK Web looks up root_agent; build it on first access, once per process
+    if name == "root_agent":
+        return get_or_create(f"{__name__}.root_agent", get_agent)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
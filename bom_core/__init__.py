@@ -0,0 +1,7 @@
+"""
+Shared in-process BOM engines and ADK tools used by the demo agents.
+
+The agent packages (bom_simple_agentic_demo, bom_agentic_demo_with_rag,
+bom_multi_agents_demo) import from here so that every demo answers the same
+structural questions the same way before falling back to BigQuery.
+"""
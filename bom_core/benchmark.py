@@ -0,0 +1,470 @@
+"""
+Benchmark harness for the documented query patterns and the loaders.
+
+Times, against the local DuckDB backend (no BigQuery project needed):
+
+  - every validated pattern in query_patterns_documentation.md
+    (WHERE_USED_001 and Patterns 2-12), with parameters bound to items
+    that exercise the interesting paths: the most widely used component
+    for where-used and the deepest finished good for explosions
+  - the in-process BomGraph explosion / where-used for the same items,
+    and the exposure and configurator engines built over it
+  - the supplier summaries: full build, a one-supplier incremental
+    refresh and the summary-backed Pattern 7
+  - the chunked CSV -> Parquet loader (load_tables into a LocalSink) and
+    the delta loader (initial load plus a no-op re-run into SQLite)
+  - writing the binary snapshot, and a worker's start from it (graph
+    and frames) against parsing the CSVs and building the graph
+  - cold start of each agent package in a fresh interpreter: importing
+    the module and building root_agent on first access, checked against
+    a startup budget (``--import_budget_ms`` / ``--build_budget_ms``)
+
+Each case runs ``repeat`` times after one warm-up and reports p50/min/max
+milliseconds and the row count. Results are written as JSON; with
+``--baseline`` the run is compared against an earlier report and every
+case whose p50 grew by more than ``--threshold`` is listed as a
+regression (exit status 1); a cold start over budget also exits 1.
+
+    python -m bom_core.benchmark --items 50000 --out bench.json
+    python -m bom_core.benchmark --items 50000 --baseline bench.json
+    python -m bom_core.benchmark --data_dir /tmp/bom_large --repeat 3
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import duckdb
+import numpy as np
+import pandas as pd
+
+from . import config
+from .dataset import load_dataset
+from .delta import DeltaState, SqliteTarget, load_delta
+from .configurator import ConfigurationEngine
+from .effectivity import EffectivityIndex, day_to_iso
+from .exposure import ExposureIndex
+from .graph import NO_DATE, BomGraph
+from .loading import LocalSink, default_sources, load_tables
+from .local_sql import LocalWarehouse
+from .pattern_router import get_pattern_router
+from .query_runner import MAX_RESULT_ROWS, render_sql
+from .snapshot import BomSnapshot, write_snapshot
+from .summaries import PATTERN_SUMMARY_SQL, SUMMARY_VIEWS, compute_view, replace_partitions
+from .synthetic import GeneratorConfig, generate_dataset, write_dataset
+
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.2  # 20% slower p50 than the baseline counts as a regression
+MIN_REGRESSION_MS = 1.0  # ignore jitter on cases that take about a millisecond
+SEARCH_TERMS = ["electronics", "batteries"]
+MIN_COST = 1000
+AGENT_MODULES = ("bom_simple_agentic_demo.agent", "bom_agentic_demo_with_rag.agent", "bom_multi_agents_demo.agent")
+IMPORT_BUDGET_MS = 100.0  # importing an agent module must not build anything
+BUILD_BUDGET_MS = 4000.0  # first root_agent access: ADK, pandas, DuckDB and BigQuery imports included
+
+_COLD_START_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+imported = time.perf_counter()
+module.root_agent
+built = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "build_ms": (built - imported) * 1000}))
+"""
+
+
+@dataclass
+class CaseResult:
+    name: str
+    group: str
+    timings_ms: List[float] = field(default_factory=list)
+    rows: int = 0
+    error: Optional[str] = None
+    budget_ms: Optional[float] = None
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget_ms is not None and bool(self.timings_ms) and self.p50_ms > self.budget_ms
+
+    @property
+    def p50_ms(self) -> float:
+        return statistics.median(self.timings_ms) if self.timings_ms else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {"name": self.name, "group": self.group, "rows": self.rows,
+               "p50_ms": round(self.p50_ms, 3),
+               "min_ms": round(min(self.timings_ms), 3) if self.timings_ms else 0.0,
+               "max_ms": round(max(self.timings_ms), 3) if self.timings_ms else 0.0,
+               "runs": len(self.timings_ms)}
+        if self.budget_ms is not None:
+            out.update(budget_ms=self.budget_ms, over_budget=self.over_budget)
+        if self.error:
+            out["error"] = self.error
+        return out
+
+
+def time_case(name: str, group: str, fn: Callable[[], int], repeat: int = DEFAULT_REPEAT,
+              warmup: int = 1) -> CaseResult:
+    """Run ``fn`` (returning a row count) warmup + repeat times; errors end the case."""
+    result = CaseResult(name, group)
+    for i in range(warmup + repeat):
+        start = time.perf_counter()
+        try:
+            result.rows = int(fn())
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+            break
+        if i >= warmup:
+            result.timings_ms.append((time.perf_counter() - start) * 1000)
+    return result
+
+
+def pick_parameters(frames: Dict[str, pd.DataFrame], candidates: int = 50) -> Dict[str, Any]:
+    """Bind the pattern parameters to the items with the widest fan-in and deepest structure.
+
+    The top item is the finished good (or unused parent) with the most
+    descendants among the ``candidates`` with the most direct lines.
+    """
+    bom, items = frames["bom_details"], frames["item_master"]
+    active = bom[bom["is_active"].fillna(False).astype(bool)]
+    component = active["component_item_number"].value_counts().idxmax()
+    lines = active["parent_item_number"].value_counts()
+    finished = set(items.loc[items["item_type"] == "FINISHED_GOOD", "item_number"])
+    tops = [i for i in lines.index if i in finished] \
+        or [i for i in lines.index if i not in set(active["component_item_number"])] or list(lines.index)
+    graph = BomGraph(bom)
+    top = max(tops[:candidates], key=lambda item: (len(graph.descendants(item)), item))
+    return {
+        "component_id": str(component),
+        "parent_id": str(top),
+        "top_item": str(top),
+        "terms_lower": SEARCH_TERMS,
+        "min_cost": MIN_COST,
+    }
+
+
+def bench_patterns(warehouse: LocalWarehouse, params: Dict[str, Any], repeat: int,
+                   max_rows: int = MAX_RESULT_ROWS) -> List[CaseResult]:
+    results = []
+    for pattern in get_pattern_router().patterns:
+        sql = render_sql(pattern.sql)
+        bound = {name: params[name] for name in pattern.parameters}
+
+        def run(sql=sql, bound=bound) -> int:
+            out = warehouse.execute(sql, bound, max_rows)
+            if out["status"] != "SUCCESS":
+                raise RuntimeError(out.get("error_details"))
+            return len(out["rows"])
+
+        results.append(time_case(pattern.pattern_id, "pattern", run, repeat))
+    return results
+
+
+def bench_graph(frames: Dict[str, pd.DataFrame], params: Dict[str, Any], repeat: int) -> List[CaseResult]:
+    holder: Dict[str, BomGraph] = {}
+
+    def build() -> int:
+        holder["graph"] = BomGraph(frames["bom_details"])
+        return holder["graph"].num_edges
+
+    results = [time_case("graph_build", "graph", build, repeat)]
+    graph = holder.get("graph")
+    if graph is not None:
+        results += [
+            time_case("graph_explode", "graph", lambda: len(graph.explode(params["top_item"])[0]), repeat),
+            time_case("graph_where_used", "graph", lambda: len(graph.where_used(params["component_id"])), repeat),
+            time_case("graph_find_cycles", "graph", lambda: len(graph.find_cycles()), repeat),
+        ]
+        index = EffectivityIndex(graph)
+        # As-of dates at the 30th/70th percentile of effective dates: both sides have structure to compare
+        starts = np.sort(index.start[index.start != NO_DATE])
+        if len(starts):
+            first, last = (day_to_iso(int(starts[int(q * (len(starts) - 1))])) for q in (0.3, 0.7))
+            results += [
+                time_case("asof_index_build", "effectivity",
+                          lambda: int(EffectivityIndex(graph).in_effect(first).sum()), repeat),
+                time_case("asof_explode", "effectivity", lambda: len(index.explode(params["top_item"], first)[0]), repeat),
+                time_case("asof_where_used", "effectivity",
+                          lambda: len(index.where_used(params["component_id"], last)), repeat),
+                time_case("asof_diff", "effectivity", lambda: len(index.diff(params["top_item"], first, last)), repeat),
+            ]
+        indexes: Dict[str, ExposureIndex] = {}
+
+        def build_exposure() -> int:
+            indexes["index"] = ExposureIndex(graph, frames["item_master"])
+            return len(indexes["index"].closure)
+
+        results.append(time_case("exposure_index_build", "exposure", build_exposure, repeat))
+        exposure = indexes.get("index")
+        if exposure is not None:
+            results += [
+                time_case("exposure_top_level", "exposure",
+                          lambda: len(exposure.exposed_assemblies(["obsolete", "non_compliant"])), repeat),
+                time_case("exposure_audit_all", "exposure",
+                          lambda: len(exposure.audit(top_level_only=False)), repeat),
+            ]
+        engines: Dict[str, ConfigurationEngine] = {}
+
+        def build_configurator() -> int:
+            # Cold: phantom collapse, cycle cut and the memoized counts under the top item
+            engines["engine"] = ConfigurationEngine(graph, frames["bom_details"], frames["item_master"])
+            engines["engine"].count_configurations(params["top_item"])
+            return len(engines["engine"].collapsed["edge"])
+
+        results.append(time_case("configurator_build", "configurator", build_configurator, repeat))
+        engine = engines.get("engine")
+        if engine is not None:
+            results += [
+                time_case("configurator_options", "configurator",
+                          lambda: len(engine.options(params["top_item"])), repeat),
+                time_case("configurator_enumerate_100", "configurator",
+                          lambda: len(list(engine.configurations(params["top_item"], limit=100))), repeat),
+            ]
+    return results
+
+
+def bench_summaries(warehouse: LocalWarehouse, repeat: int) -> List[CaseResult]:
+    """Summary views on the mirror; compare summary_pattern_7 with the PATTERN_7 case."""
+    tables: Dict[str, Any] = {}
+
+    def build() -> int:
+        tables.update({view.name: compute_view(warehouse, view) for view in SUMMARY_VIEWS})
+        return sum(t.num_rows for t in tables.values())
+
+    results = [time_case("summary_build_all", "summary", build, repeat)]
+    if len(tables) != len(SUMMARY_VIEWS):
+        return results
+    consolidation = tables["supplier_consolidation_summary"]
+    busiest = {consolidation.sort_by([("unique_components", "descending")])["supplier_code"][0].as_py()}
+
+    def refresh_one() -> int:
+        return sum(replace_partitions(tables[view.name], compute_view(warehouse, view, busiest), busiest, view).num_rows
+                   for view in SUMMARY_VIEWS)
+
+    for name, table in tables.items():
+        warehouse.add_table(name, table)
+    sql = render_sql(PATTERN_SUMMARY_SQL["PATTERN_7"])
+
+    def pattern_7() -> int:
+        out = warehouse.execute(sql)
+        if out["status"] != "SUCCESS":
+            raise RuntimeError(out.get("error_details"))
+        return len(out["rows"])
+
+    results.append(time_case("summary_refresh_one_supplier", "summary", refresh_one, repeat))
+    results.append(time_case("summary_pattern_7", "summary", pattern_7, repeat))
+    return results
+
+
+def bench_loaders(data_dir: str, repeat: int, work_dir: str) -> List[CaseResult]:
+    sources = default_sources(data_dir)
+
+    def bulk() -> int:
+        out_dir = tempfile.mkdtemp(dir=work_dir)
+        try:
+            return sum(r.loaded_rows for r in load_tables(sources, LocalSink(out_dir), work_dir=work_dir))
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def delta_initial() -> int:
+        state_dir = tempfile.mkdtemp(dir=work_dir)
+        target = SqliteTarget()
+        try:
+            return sum(load_delta(name, path, target, DeltaState(state_dir))["inserted"]
+                       for name, path in sources.items())
+        finally:
+            target.conn.close()
+            shutil.rmtree(state_dir, ignore_errors=True)
+
+    # The no-op re-run is timed against a state and target that are already current
+    noop_state, noop_target = DeltaState(tempfile.mkdtemp(dir=work_dir)), SqliteTarget()
+    for name, path in sources.items():
+        load_delta(name, path, noop_target, noop_state)
+
+    def delta_noop() -> int:
+        return sum(load_delta(name, path, noop_target, noop_state)["unchanged"] for name, path in sources.items())
+
+    # What a worker pays to get the data: CSV parse + graph build versus mapping the snapshot
+    frames = load_dataset(data_dir)
+    snapshot_file = os.path.join(work_dir, "bom_snapshot")
+
+    def csv_start() -> int:
+        return BomGraph(load_dataset(data_dir)["bom_details"]).num_edges
+
+    try:
+        return [
+            time_case("load_tables_parquet", "loader", bulk, repeat),
+            time_case("load_delta_initial", "loader", delta_initial, repeat),
+            time_case("load_delta_noop", "loader", delta_noop, repeat),
+            time_case("snapshot_write", "snapshot", lambda: write_snapshot(frames, snapshot_file)["bytes"], repeat),
+            time_case("csv_load_and_graph", "snapshot", csv_start, repeat),
+            time_case("snapshot_open_graph", "snapshot",
+                      lambda: BomSnapshot(snapshot_file).graph().num_edges, repeat),
+            time_case("snapshot_frames", "snapshot",
+                      lambda: sum(len(f) for f in BomSnapshot(snapshot_file).frames().values()), repeat),
+        ]
+    finally:
+        noop_target.conn.close()
+
+
+def measure_cold_start(module: str) -> Dict[str, float]:
+    """Import ``module`` and touch its root_agent in a fresh interpreter."""
+    env = dict(os.environ)
+    env.setdefault("GCP_PROJECT_ID", "benchmark")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [config.REPO_ROOT, env.get("PYTHONPATH")]))
+    proc = subprocess.run([sys.executable, "-W", "ignore", "-c", _COLD_START_PROBE, module],
+                          capture_output=True, text=True, env=env, cwd=config.REPO_ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "probe failed")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def bench_startup(repeat: int, import_budget_ms: float = IMPORT_BUDGET_MS,
+                  build_budget_ms: float = BUILD_BUDGET_MS) -> List[CaseResult]:
+    """Cold start per agent package; every run is a new process, so there is no warm-up."""
+    results = []
+    for module in AGENT_MODULES:
+        package = module.split(".")[0]
+        imported = CaseResult(f"startup_import_{package}", "startup", budget_ms=import_budget_ms)
+        built = CaseResult(f"startup_build_{package}", "startup", budget_ms=build_budget_ms)
+        for _ in range(repeat):
+            try:
+                timing = measure_cold_start(module)
+            except Exception as e:
+                imported.error = built.error = f"{type(e).__name__}: {e}"
+                break
+            imported.timings_ms.append(timing["import_ms"])
+            built.timings_ms.append(timing["build_ms"])
+        results += [imported, built]
+    return results
+
+
+def compare(results: List[Dict[str, Any]], baseline: Dict[str, Any],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """Cases whose p50 exceeds the baseline p50 by more than ``threshold``."""
+    before = {r["name"]: r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = before.get(r["name"])
+        if not old or old.get("error") or r.get("error") or not old["p50_ms"]:
+            continue
+        change = r["p50_ms"] / old["p50_ms"] - 1.0
+        if change > threshold and r["p50_ms"] - old["p50_ms"] >= MIN_REGRESSION_MS:
+            regressions.append({"name": r["name"], "baseline_p50_ms": old["p50_ms"],
+                                "p50_ms": r["p50_ms"], "change": round(change, 3)})
+    return regressions
+
+
+def run_benchmark(
+    data_dir: str,
+    repeat: int = DEFAULT_REPEAT,
+    include_loaders: bool = True,
+    generator: Optional[GeneratorConfig] = None,
+    include_startup: bool = True,
+    import_budget_ms: float = IMPORT_BUDGET_MS,
+    build_budget_ms: float = BUILD_BUDGET_MS,
+) -> Dict[str, Any]:
+    """Benchmark the dataset in ``data_dir``; returns the JSON report."""
+    frames = load_dataset(data_dir)
+    params = pick_parameters(frames)
+    started = time.perf_counter()
+    warehouse = LocalWarehouse(frames)
+    results = [CaseResult("local_warehouse_build", "setup", [(time.perf_counter() - started) * 1000],
+                          sum(warehouse.row_counts.values()))]
+    results += bench_patterns(warehouse, params, repeat)
+    results += bench_graph(frames, params, repeat)
+    results += bench_summaries(warehouse, repeat)
+    if include_loaders:
+        work_dir = tempfile.mkdtemp(prefix="bom_bench_")
+        try:
+            results += bench_loaders(data_dir, repeat, work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    if include_startup:
+        results += bench_startup(repeat, import_budget_ms, build_budget_ms)
+    return {
+        "meta": {
+            "timestamp": pd.Timestamp.now(tz="UTC").isoformat(),
+            "data_dir": os.path.abspath(data_dir),
+            "row_counts": {name: len(df) for name, df in frames.items()},
+            "generator": asdict(generator) if generator else None,
+            "parameters": params,
+            "repeat": repeat,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "duckdb": duckdb.__version__,
+            "platform": platform.platform(),
+        },
+        "results": [r.to_dict() for r in results],
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    counts = ", ".join(f"{n}={c:,}" for n, c in report["meta"]["row_counts"].items())
+    lines = [f"Dataset: {counts}", f"{'case':<32} {'p50 ms':>10} {'min ms':>10} {'max ms':>10} {'rows':>8}"]
+    for r in report["results"]:
+        if r.get("error"):
+            lines.append(f"{r['name']:<32} ERROR {r['error']}")
+        else:
+            lines.append(f"{r['name']:<32} {r['p50_ms']:>10.1f} {r['min_ms']:>10.1f} {r['max_ms']:>10.1f} {r['rows']:>8}")
+    for reg in report.get("regressions", []):
+        lines.append(f"⚠️  {reg['name']}: {reg['baseline_p50_ms']:.1f} → {reg['p50_ms']:.1f} ms (+{reg['change']:.0%})")
+    for r in report["results"]:
+        if r.get("over_budget"):
+            lines.append(f"⚠️  {r['name']}: {r['p50_ms']:.1f} ms is over the {r['budget_ms']:.0f} ms startup budget")
+    return "\n".join(lines)
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    defaults = GeneratorConfig()
+    parser = argparse.ArgumentParser(description="Benchmark the BOM query patterns and loaders locally")
+    parser.add_argument("--data_dir", help="Benchmark an existing dataset instead of generating one")
+    parser.add_argument("--out", default="benchmark_results.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--skip_loaders", action="store_true")
+    parser.add_argument("--skip_startup", action="store_true", help="Don't measure agent cold start")
+    parser.add_argument("--import_budget_ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--build_budget_ms", type=float, default=BUILD_BUDGET_MS)
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name}", type=type(value), default=value)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    generated_dir, cfg = None, None
+    data_dir = args.data_dir
+    if not data_dir:
+        cfg = GeneratorConfig(**{k: getattr(args, k) for k in asdict(GeneratorConfig())})
+        generated_dir = data_dir = tempfile.mkdtemp(prefix="bom_synthetic_")
+        write_dataset(generate_dataset(cfg), data_dir, cfg)
+    try:
+        report = run_benchmark(data_dir, args.repeat, not args.skip_loaders, cfg, not args.skip_startup,
+                               args.import_budget_ms, args.build_budget_ms)
+    finally:
+        if generated_dir:
+            shutil.rmtree(generated_dir, ignore_errors=True)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(report["results"], json.load(f), args.threshold)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(format_report(report))
+    print(f"Report written to {args.out}")
+    if report.get("regressions") or any(r.get("over_budget") for r in report["results"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,328 @@
+"""
+In-process schema catalog for column resolution.
+
+Holds what the agents used to rediscover with INFORMATION_SCHEMA and
+SELECT DISTINCT probes on every question:
+
+  - columns and BigQuery types, partitioning, clustering and natural keys
+    (create_bom_schema.sql)
+  - column descriptions (field_mapping_documentation.md)
+  - per-column row/null/distinct counts, min/max for numbers and dates,
+    and value dictionaries for low-cardinality columns (item_type,
+    category, status, supply_type, approval_status, compliance_status, ...)
+
+The catalog is written by the loaders next to the dataset version
+(data/.schema_catalog.json) and rebuilt from the CSV extracts whenever the
+stored version no longer matches, so resolving terms to columns and values
+costs no warehouse round-trip.
+"""
+
+import json
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from . import config
+from .pattern_router import tokenize
+from .query_cache import dataset_version
+from .schema import TableSchema, load_schema
+
+DOCS_FILE = "field_mapping_documentation.md"
+LOW_CARDINALITY_MAX = 32  # columns with at most this many distinct values get a value dictionary
+MAX_MATCHES = 10
+
+_DOC_TABLE = re.compile(r"^##\s+Table\s+\d+:\s*(\w+)", re.IGNORECASE)
+_DOC_ROW = re.compile(r"^\|\s*(\w+)\s*\|\s*[A-Z0-9_]+\s*\|\s*(.+?)\s*\|\s*$")
+
+
+@dataclass
+class ColumnInfo:
+    name: str
+    type: str
+    description: str = ""
+    null_count: int = 0
+    distinct_count: int = 0
+    min: Optional[str] = None
+    max: Optional[str] = None
+    values: Optional[Dict[str, int]] = None  # value -> rows, only for low-cardinality columns
+
+
+@dataclass
+class TableInfo:
+    name: str
+    row_count: int
+    partition_by: Optional[str]
+    cluster_by: List[str]
+    natural_key: List[str]
+    columns: Dict[str, ColumnInfo] = field(default_factory=dict)
+
+
+def parse_column_docs(md_text: str) -> Dict[str, Dict[str, str]]:
+    """{table: {column: description}} from the field mapping tables."""
+    docs: Dict[str, Dict[str, str]] = {}
+    table = None
+    for line in md_text.splitlines():
+        heading = _DOC_TABLE.match(line)
+        if heading:
+            table = heading.group(1)
+            docs[table] = {}
+        elif line.startswith("## "):
+            table = None
+        elif table:
+            row = _DOC_ROW.match(line)
+            if row and row.group(1) != "Column":
+                docs[table][row.group(1)] = row.group(2)
+    return docs
+
+
+def _profile_column(series: pd.Series, info: ColumnInfo, row_count: int) -> None:
+    present = series.dropna()
+    info.null_count = int(row_count - len(present))
+    info.distinct_count = int(present.nunique())
+    if info.type in ("STRING", "BOOL"):
+        if info.distinct_count <= LOW_CARDINALITY_MAX and info.distinct_count < max(row_count, 2):
+            counts = present.astype(str).value_counts()
+            info.values = {str(v): int(n) for v, n in counts.items()}
+    elif len(present):
+        low, high = present.min(), present.max()
+        if info.type == "DATE":
+            info.min, info.max = str(pd.Timestamp(low).date()), str(pd.Timestamp(high).date())
+        else:
+            info.min, info.max = str(low), str(high)
+
+
+class SchemaCatalog:
+    """Tables, columns, profiles and value dictionaries for one dataset version."""
+
+    def __init__(self, tables: Dict[str, TableInfo], version: str = ""):
+        self.tables = tables
+        self.version = version
+
+    @classmethod
+    def build(
+        cls,
+        frames: Dict[str, pd.DataFrame],
+        schema: Optional[Dict[str, TableSchema]] = None,
+        column_docs: Optional[Dict[str, Dict[str, str]]] = None,
+        version: str = "",
+    ) -> "SchemaCatalog":
+        schema = schema or load_schema()
+        column_docs = column_docs if column_docs is not None else _load_column_docs()
+        tables = {}
+        for name, table in schema.items():
+            df = frames.get(name)
+            row_count = 0 if df is None else len(df)
+            info = TableInfo(
+                name=name,
+                row_count=row_count,
+                partition_by=table.partition_by,
+                cluster_by=list(table.cluster_by),
+                natural_key=list(table.natural_key),
+            )
+            for column, bq_type in table.columns:
+                col = ColumnInfo(column, bq_type, column_docs.get(name, {}).get(column, ""))
+                if df is not None and column in df.columns:
+                    _profile_column(df[column], col, row_count)
+                info.columns[column] = col
+            tables[name] = info
+        return cls(tables, version)
+
+    # -- persistence ---------------------------------------------------
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": self.version, "tables": {n: asdict(t) for n, t in self.tables.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SchemaCatalog":
+        tables = {}
+        for name, t in data["tables"].items():
+            columns = {c: ColumnInfo(**info) for c, info in t.pop("columns").items()}
+            tables[name] = TableInfo(columns=columns, **t)
+        return cls(tables, data.get("version", ""))
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SchemaCatalog":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    # -- lookups -------------------------------------------------------
+    def describe(self, table: Optional[str] = None) -> Dict[str, Any]:
+        """JSON-ready view of one table (or all) for tools and prompts."""
+        names = [table] if table else list(self.tables)
+        out = {}
+        for name in names:
+            if name not in self.tables:
+                raise KeyError(f"Unknown table {name!r}; tables: {', '.join(self.tables)}")
+            out[name] = asdict(self.tables[name])
+        return out
+
+    def summary(self) -> str:
+        """Compact text listing of the catalog for injection into instructions."""
+        lines = []
+        for t in self.tables.values():
+            layout = [f"{t.row_count} rows", f"key {', '.join(t.natural_key)}"]
+            if t.partition_by:
+                layout.append(f"partitioned by {t.partition_by}")
+            if t.cluster_by:
+                layout.append(f"clustered by {', '.join(t.cluster_by)}")
+            lines.append(f"{t.name} ({'; '.join(layout)})")
+            for c in t.columns.values():
+                detail = ""
+                if c.values:
+                    detail = " = " + " | ".join(c.values)
+                elif c.min is not None:
+                    detail = f" [{c.min} .. {c.max}]"
+                lines.append(f"  - {c.name} {c.type}{detail}")
+        return "\n".join(lines)
+
+    def resolve(self, terms: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """Map free-text terms to catalog columns and dictionary values.
+
+        Value matches compare the term, upper-cased with spaces as
+        underscores, against dictionary values ('raw material' ->
+        item_type = RAW_MATERIAL). Column matches score the share of the
+        term's tokens found in the column name (1.0) or description (0.5).
+        """
+        column_matches, value_matches = [], []
+        for term in terms:
+            normalized = re.sub(r"[\s\-]+", "_", term.strip()).upper()
+            term_tokens = set(tokenize(term))
+            for t in self.tables.values():
+                for c in t.columns.values():
+                    qualified = f"{t.name}.{c.name}"
+                    for value, rows in (c.values or {}).items():
+                        upper = value.upper()
+                        if upper == normalized or (len(normalized) > 2 and normalized in upper.split("_")) \
+                                or (len(upper) > 2 and upper in normalized.split("_")):
+                            value_matches.append({
+                                "term": term, "column": qualified, "value": value, "rows": rows,
+                                "score": 1.0 if upper == normalized else 0.8,
+                            })
+                    if not term_tokens:
+                        continue
+                    name_hits = term_tokens & set(tokenize(c.name.replace("_", " ")))
+                    desc_hits = term_tokens & set(tokenize(c.description))
+                    score = max(len(name_hits), 0.5 * len(desc_hits)) / len(term_tokens)
+                    if score >= 0.5:
+                        column_matches.append({"term": term, "column": qualified, "type": c.type,
+                                               "score": round(score, 2)})
+        column_matches.sort(key=lambda m: -m["score"])
+        value_matches.sort(key=lambda m: (-m["score"], -m["rows"]))
+        return {"columns": column_matches[:MAX_MATCHES], "values": value_matches[:MAX_MATCHES]}
+
+
+def _load_column_docs() -> Dict[str, Dict[str, str]]:
+    path = config.data_path(DOCS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_column_docs(f.read())
+
+
+def catalog_path() -> str:
+    return os.getenv("BOM_SCHEMA_CATALOG_FILE", config.data_path(".schema_catalog.json"))
+
+
+def refresh_schema_catalog(
+    data_dir: Optional[str] = None,
+    version: Optional[str] = None,
+    frames: Optional[Dict[str, pd.DataFrame]] = None,
+) -> SchemaCatalog:
+    """Build the catalog from the CSV extracts (or ``frames``) and persist it (run by the loaders)."""
+    from .dataset import load_dataset
+
+    frames = frames if frames is not None else load_dataset(data_dir)
+    catalog = SchemaCatalog.build(frames, version=dataset_version() if version is None else version)
+    catalog.save(catalog_path())
+    return catalog
+
+
+@lru_cache(maxsize=1)
+def _catalog_for(data_dir: str, version: str) -> SchemaCatalog:
+    path = catalog_path()
+    if os.path.exists(path):
+        catalog = SchemaCatalog.load(path)
+        if catalog.version == version:
+            return catalog
+    from .tools import get_dataset
+
+    catalog = SchemaCatalog.build(get_dataset(), version=version)
+    try:
+        catalog.save(path)
+    except OSError:
+        pass  # read-only data dir: keep the in-memory copy
+    return catalog
+
+
+def get_schema_catalog() -> SchemaCatalog:
+    """Process-wide catalog for the current dataset version."""
+    return _catalog_for(config.data_dir(), dataset_version())
+
+
+# -------------------------------------------------------------------
+# ADK integration
+# -------------------------------------------------------------------
+def describe_schema(table: str = "") -> dict:
+    """Columns, types, descriptions, partitioning/clustering and known values of the BOM tables.
+
+    Answers from the in-process schema catalog; use instead of querying
+    INFORMATION_SCHEMA or sampling SELECT DISTINCT values.
+
+    Args:
+        table: 'item_master' or 'bom_details'; empty for both.
+
+    Returns:
+        dict with status and tables ({name: {row_count, partition_by,
+        cluster_by, natural_key, columns: {name: {type, description,
+        distinct_count, min, max, values}}}}).
+    """
+    try:
+        return {"status": "SUCCESS", "tables": get_schema_catalog().describe(table or None)}
+    except KeyError as e:
+        return {"status": "ERROR", "error_details": str(e)}
+
+
+def resolve_terms(terms: List[str]) -> dict:
+    """Map the user's terms to candidate columns and exact stored values.
+
+    E.g. 'raw material' -> item_master.item_type = 'RAW_MATERIAL',
+    'dual source' -> bom_details.sourcing_type = 'DUAL_SOURCE',
+    'lead time' -> item_master.lead_time_days, bom_details.lead_time_days.
+
+    Args:
+        terms: Key terms from the question, e.g. ['obsolete', 'supplier'].
+
+    Returns:
+        dict with status, columns ([{term, column, type, score}]) and
+        values ([{term, column, value, rows, score}]).
+    """
+    return {"status": "SUCCESS", **get_schema_catalog().resolve(terms)}
+
+
+SCHEMA_CATALOG_TOOLS = [describe_schema, resolve_terms]
+
+
+def make_catalog_callback(state_key: str = "schema_catalog"):
+    """before_agent_callback that puts the catalog summary into session state.
+
+    Instructions reference it as ``{schema_catalog?}``; the text is only
+    rewritten when the dataset version changes.
+    """
+
+    def before_agent(callback_context):
+        catalog = get_schema_catalog()
+        if callback_context.state.get(f"{state_key}_version") != catalog.version or state_key not in callback_context.state:
+            callback_context.state[state_key] = catalog.summary()
+            callback_context.state[f"{state_key}_version"] = catalog.version
+        return None
+
+    return before_agent
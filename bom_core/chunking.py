@@ -0,0 +1,217 @@
+"""
+Markdown chunking for the schema and query-pattern documentation.
+
+Shared by data/index_schema_to_vertex.py (Vertex AI Search upload) and the
+local retrieval index so both backends search identical chunks.
+
+The chunker follows the heading hierarchy of the docs: every level-2
+section (``## Table 1: item_master``, ``## Query ID: WHERE_USED_001``,
+``## Pattern 4: Cost Rollup Analysis``, ``## Relationships``, ...) becomes
+its own chunk together with its ``###`` subsections. Headings inside
+fenced code blocks are ignored. Sections over the size budget are split at
+subsection, paragraph or table-row boundaries (never inside a SQL fence,
+table headers repeated), each part keeping the section heading.
+
+Every chunk carries ``struct_data``: title, section path, kind, pattern_id,
+tables touched, keywords and SQL parameters.
+"""
+
+import math
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_MAX_CHARS = 4000
+MAX_SLUG_CHARS = 24
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_TABLE_HEADING = re.compile(r"^Table(?:\s*\d+)?\s*:\s*(\w+)", re.IGNORECASE)
+_QUERY_ID = re.compile(r"^Query\s+ID\s*:\s*(\S+)", re.IGNORECASE)
+_PATTERN = re.compile(r"^Pattern\s+(\d+)\s*:", re.IGNORECASE)
+_SQL_TABLE = re.compile(r"\b(?:FROM|JOIN)\s+`?(?:[\w{}-]+\.)*(\w+)`?", re.IGNORECASE)
+_KNOWN_TABLES = ("item_master", "bom_details")
+
+
+def _slug(text: str) -> str:
+    # Vertex AI Search document ids are capped at 63 characters including the file prefix
+    slug = re.sub(r"_+", "_", re.sub(r"[^a-zA-Z0-9_]", "_", text)).strip("_")
+    return slug[:MAX_SLUG_CHARS].rstrip("_")
+
+
+def _split_sections(md_text: str) -> List[Tuple[int, str, List[str]]]:
+    """(level, heading, body lines) per heading; level 0 for text before any heading."""
+    sections: List[Tuple[int, str, List[str]]] = [(0, "", [])]
+    in_fence = False
+    for line in md_text.splitlines():
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        m = None if in_fence else _HEADING.match(line)
+        if m:
+            sections.append((len(m.group(1)), m.group(2).strip(), [line]))
+        else:
+            sections[-1][2].append(line)
+    return sections
+
+
+def _blocks(lines: List[str]) -> List[List[str]]:
+    """Group lines into paragraphs; fences and tables stay single blocks."""
+    blocks: List[List[str]] = []
+    current: List[str] = []
+    in_fence = False
+    for line in lines:
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        if not in_fence and not line.strip() and current:
+            blocks.append(current)
+            current = []
+            continue
+        current.append(line)
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def _split_table(block: List[str], max_chars: int) -> List[List[str]]:
+    """Split a markdown table into evenly sized row groups, repeating the header."""
+    header, rows = block[:2], block[2:]
+    n_pieces = math.ceil(len("\n".join(block)) / max(max_chars, 1))
+    target = len("\n".join(block)) / n_pieces
+    pieces, current = [], list(header)
+    for row in rows:
+        if len("\n".join(current + [row])) > target and len(current) > len(header):
+            pieces.append(current)
+            current = list(header)
+        current.append(row)
+    pieces.append(current)
+    return pieces
+
+
+def _pack(heading: str, blocks: List[List[str]], max_chars: int) -> List[str]:
+    """Greedily pack blocks into parts under max_chars, each starting with the heading."""
+    expanded: List[List[str]] = []
+    for block in blocks:
+        text = "\n".join(block)
+        is_table = len(block) > 2 and all(line.lstrip().startswith("|") for line in block)
+        if len(text) > max_chars and is_table:
+            expanded.extend(_split_table(block, max_chars - len(heading) - 2))
+        else:
+            expanded.append(block)
+    parts: List[str] = []
+    current: List[str] = []
+    for block in expanded:
+        text = "\n".join(block)
+        candidate = "\n\n".join(current + [text])
+        if current and len(candidate) > max_chars:
+            parts.append("\n\n".join(current))
+            current = [heading] if not text.startswith(heading) else []
+        current.append(text)
+    if current:
+        parts.append("\n\n".join(current))
+    return parts
+
+
+def _metadata(title: str, path: List[str], content: str) -> Dict:
+    struct: Dict = {"title": title, "section_path": path, "kind": "section"}
+    m_table = _TABLE_HEADING.match(title)
+    m_query = _QUERY_ID.match(title)
+    m_pattern = _PATTERN.match(title)
+    if m_table:
+        struct["kind"] = "table"
+    elif m_query:
+        struct["kind"] = "query_pattern"
+        struct["pattern_id"] = m_query.group(1)
+        subtitle = re.search(r"^###\s+(.+)$", content, re.MULTILINE)
+        if subtitle:
+            struct["title"] = f"{m_query.group(1)}: {subtitle.group(1).strip()}"
+    elif m_pattern:
+        struct["kind"] = "query_pattern"
+        struct["pattern_id"] = f"PATTERN_{m_pattern.group(1)}"
+
+    tables = set(t for t in _SQL_TABLE.findall(content) if t in _KNOWN_TABLES)
+    if m_table:
+        tables.add(m_table.group(1))
+    tables.update(t for t in _KNOWN_TABLES if re.search(rf"\b{t}\b", content) and struct["kind"] != "query_pattern")
+    struct["tables"] = sorted(tables)
+
+    keywords = re.search(r"\*\*Keywords\*\*\s*:\s*(.+)", content)
+    struct["keywords"] = [k.strip() for k in keywords.group(1).split(",") if k.strip()] if keywords else []
+    struct["parameters"] = sorted(set(re.findall(r"@(\w+)", content)))
+    return struct
+
+
+def _chunk_id(title: str, struct: Dict) -> str:
+    m_table = _TABLE_HEADING.match(title)
+    if m_table:
+        return m_table.group(1)
+    if struct.get("pattern_id"):
+        return _slug(struct["pattern_id"])
+    return _slug(title) or "preamble"
+
+
+def chunk_markdown(md_text: str, max_chars: int = DEFAULT_MAX_CHARS) -> List[Dict]:
+    """Chunk a markdown doc into one chunk per level-2 section (see module docstring).
+
+    Returns [{"id", "title", "content", "struct_data"}]. Sections longer than
+    ``max_chars`` are split into ``<id>_partN`` chunks.
+    """
+    doc_title: Optional[str] = None
+    units: List[Tuple[str, List[str], List[str]]] = []  # (title, path, lines)
+    for level, heading, lines in _split_sections(md_text):
+        if level == 1:
+            doc_title = heading
+            body = [line for line in lines[1:] if line.strip()]
+            if body:
+                units.append((heading, [heading], lines))
+        elif level == 2:
+            units.append((heading, [p for p in (doc_title, heading) if p], lines))
+        elif level == 0:
+            if any(line.strip() for line in lines):
+                units.append(("Preamble", ["Preamble"], lines))
+        elif units:
+            # ### and deeper stay inside their enclosing section
+            units[-1][2].extend(lines)
+        else:
+            units.append((heading, [heading], lines))
+
+    chunks: List[Dict] = []
+    seen: Dict[str, int] = {}
+    for title, path, lines in units:
+        content = "\n".join(lines).strip()
+        if not content:
+            continue
+        struct = _metadata(title, path, content)
+        title = struct["title"]
+        base_id = _chunk_id(title, struct)
+        if base_id in seen:
+            seen[base_id] += 1
+            base_id = f"{base_id}_{seen[base_id]}"
+        else:
+            seen[base_id] = 1
+        heading_line = lines[0] if _HEADING.match(lines[0]) else ""
+        parts = [content] if len(content) <= max_chars else _pack(heading_line, _blocks(lines), max_chars)
+        for n, part in enumerate(parts, start=1):
+            part_struct = dict(struct)
+            chunk_id = base_id
+            if len(parts) > 1:
+                chunk_id = f"{base_id}_part{n}"
+                part_struct["part"] = n
+                part_struct["parts"] = len(parts)
+            chunks.append({"id": chunk_id, "title": title, "content": part.strip(), "struct_data": part_struct})
+    return chunks
+
+
+def chunk_files(paths: List[str], max_chars: int = DEFAULT_MAX_CHARS) -> List[Dict]:
+    """Chunk several markdown files, prefixing ids with the file name."""
+    all_chunks: List[Dict] = []
+    for file_path in paths:
+        with open(file_path, "r", encoding="utf-8") as f:
+            chunks = chunk_markdown(f.read(), max_chars=max_chars)
+        # Prefix chunk IDs with filename to avoid collisions
+        file_prefix = os.path.basename(file_path).replace(".", "_")
+        for chunk in chunks:
+            chunk["id"] = f"{file_prefix}_{chunk['id']}"
+            chunk["source"] = os.path.basename(file_path)
+            chunk["struct_data"]["source"] = chunk["source"]
+        all_chunks.extend(chunks)
+    return all_chunks
@@ -0,0 +1,272 @@
+"""
+Shared GCP clients for the loaders, the Vertex AI Search indexer and the agents.
+
+Every entry point used to construct its own clients: csv_loader.py and
+db_loader.py a ``bigquery.Client`` each, index_schema_to_vertex.py a new
+``DocumentServiceClient`` per upsert and a ``DataStoreServiceClient`` per
+ensure_data_store call. Each new client meant a fresh auth lookup, TLS
+handshake and token fetch. ``ClientFactory`` instead keeps, per process:
+
+  - one set of Application Default Credentials (one token refresh cycle)
+  - one authorized HTTP session for BigQuery whose connection pool holds
+    ``pool_size`` keep-alive connections (TCP keep-alive after
+    ``keepalive_seconds`` idle)
+  - one gRPC channel per Discovery Engine endpoint with gRPC keep-alive
+    pings, shared by the document and data store service clients
+  - one client per (kind, project, location)
+
+``metrics()`` reports how often clients, channels and HTTP connections
+were created versus reused. Tests pass ``builders`` (or call ``override``)
+to hand out fakes without touching GCP.
+
+    GCP_HTTP_POOL_SIZE=16 GCP_KEEPALIVE_SECONDS=60 python data/csv_loader.py
+"""
+
+import os
+import socket
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import config
+from .registry import get_or_create, reset
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_KEEPALIVE_SECONDS = 30
+CLOUD_PLATFORM_SCOPE = "https://www.googleapis.com/auth/cloud-platform"
+_REGISTRY_KEY = "bom_core.clients.factory"
+
+
+@dataclass
+class PoolConfig:
+    pool_size: int = DEFAULT_POOL_SIZE
+    keepalive_seconds: int = DEFAULT_KEEPALIVE_SECONDS
+
+    @classmethod
+    def from_env(cls) -> "PoolConfig":
+        return cls(
+            pool_size=int(os.getenv("GCP_HTTP_POOL_SIZE", DEFAULT_POOL_SIZE)),
+            keepalive_seconds=int(os.getenv("GCP_KEEPALIVE_SECONDS", DEFAULT_KEEPALIVE_SECONDS)),
+        )
+
+
+def discovery_engine_endpoint(location: str) -> str:
+    return "discoveryengine.googleapis.com" if location == "global" else f"{location}-discoveryengine.googleapis.com"
+
+
+def _keepalive_socket_options(keepalive_seconds: int) -> list:
+    from urllib3.connection import HTTPConnection
+
+    options = list(HTTPConnection.default_socket_options) + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    # Linux/macOS knobs; elsewhere the OS default idle time applies
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, keepalive_seconds))
+    if hasattr(socket, "TCP_KEEPINTVL"):
+        options.append((socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, keepalive_seconds // 3)))
+    return options
+
+
+class ClientFactory:
+    """Builds GCP clients once and hands out the same instances afterwards.
+
+    ``builders`` maps a client kind ('bigquery', 'document_service',
+    'data_store_service') to a callable taking the same keyword arguments
+    as the default builder (project/location) and returning the client.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[PoolConfig] = None,
+        credentials: Any = None,
+        builders: Optional[Dict[str, Callable[..., Any]]] = None,
+    ):
+        self.pool = pool or PoolConfig.from_env()
+        self._credentials = credentials
+        self._project: Optional[str] = None
+        self._builders: Dict[str, Callable[..., Any]] = {
+            "bigquery": self._build_bigquery,
+            "document_service": self._build_document_service,
+            "data_store_service": self._build_data_store_service,
+        }
+        self._builders.update(builders or {})
+        self._lock = threading.RLock()
+        self._clients: Dict[Tuple, Any] = {}
+        self._channels: Dict[str, Any] = {}
+        self._sessions: list = []
+        self._counts: Counter = Counter()
+
+    def override(self, kind: str, builder: Callable[..., Any]) -> None:
+        """Replace the builder for ``kind`` (e.g. with a fake) and drop cached clients of that kind."""
+        with self._lock:
+            self._builders[kind] = builder
+            for key in [k for k in self._clients if k[0] == kind]:
+                del self._clients[key]
+
+    # -- shared plumbing -----------------------------------------------
+    def credentials(self) -> Tuple[Any, Optional[str]]:
+        """Application Default Credentials, resolved once per factory."""
+        with self._lock:
+            if self._credentials is None:
+                import google.auth
+
+                self._credentials, self._project = google.auth.default(scopes=[CLOUD_PLATFORM_SCOPE])
+                self._counts["credentials_loaded"] += 1
+            return self._credentials, self._project
+
+    def http_session(self):
+        """Authorized requests session with a keep-alive connection pool of ``pool_size``."""
+        from google.auth.transport.requests import AuthorizedSession
+        from requests.adapters import HTTPAdapter
+
+        socket_options = _keepalive_socket_options(self.pool.keepalive_seconds)
+
+        class _KeepAliveAdapter(HTTPAdapter):
+            def init_poolmanager(self, *args, **kwargs):
+                kwargs["socket_options"] = socket_options
+                super().init_poolmanager(*args, **kwargs)
+
+        credentials, _ = self.credentials()
+        session = AuthorizedSession(credentials)
+        adapter = _KeepAliveAdapter(pool_connections=self.pool.pool_size, pool_maxsize=self.pool.pool_size)
+        session.mount("https://", adapter)
+        with self._lock:
+            self._sessions.append(adapter)
+        return session
+
+    def grpc_channel(self, endpoint: str):
+        """One secure channel per endpoint, with keep-alive pings, shared by every service client."""
+        with self._lock:
+            channel = self._channels.get(endpoint)
+            if channel is not None:
+                self._counts["channels_reused"] += 1
+                return channel
+            from google.api_core import grpc_helpers
+
+            credentials, _ = self.credentials()
+            keepalive_ms = self.pool.keepalive_seconds * 1000
+            channel = grpc_helpers.create_channel(
+                endpoint,
+                credentials=credentials,
+                scopes=[CLOUD_PLATFORM_SCOPE],
+                options=[
+                    ("grpc.keepalive_time_ms", keepalive_ms),
+                    ("grpc.keepalive_timeout_ms", min(keepalive_ms, 20_000)),
+                    ("grpc.keepalive_permit_without_calls", 1),
+                    ("grpc.max_send_message_length", -1),
+                    ("grpc.max_receive_message_length", -1),
+                ],
+            )
+            self._channels[endpoint] = channel
+            self._counts["channels_created"] += 1
+            return channel
+
+    # -- default builders ----------------------------------------------
+    def _build_bigquery(self, project: Optional[str] = None, location: Optional[str] = None):
+        from google.cloud import bigquery
+
+        credentials, _ = self.credentials()
+        return bigquery.Client(project=project, location=location, credentials=credentials, _http=self.http_session())
+
+    def _build_document_service(self, location: str = "global"):
+        from google.cloud import discoveryengine_v1beta as discoveryengine
+
+        endpoint = discovery_engine_endpoint(location)
+        transport_cls = discoveryengine.DocumentServiceClient.get_transport_class("grpc")
+        return discoveryengine.DocumentServiceClient(
+            transport=transport_cls(host=endpoint, channel=self.grpc_channel(endpoint))
+        )
+
+    def _build_data_store_service(self, location: str = "global"):
+        from google.cloud import discoveryengine_v1beta as discoveryengine
+
+        endpoint = discovery_engine_endpoint(location)
+        transport_cls = discoveryengine.DataStoreServiceClient.get_transport_class("grpc")
+        return discoveryengine.DataStoreServiceClient(
+            transport=transport_cls(host=endpoint, channel=self.grpc_channel(endpoint))
+        )
+
+    # -- public accessors ----------------------------------------------
+    def get(self, kind: str, **kwargs) -> Any:
+        key = (kind, *sorted(kwargs.items()))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._counts[f"{kind}_reused"] += 1
+                return client
+            if kind not in self._builders:
+                raise KeyError(f"Unknown client kind {kind!r}; kinds: {', '.join(self._builders)}")
+            client = self._builders[kind](**kwargs)
+            self._clients[key] = client
+            self._counts[f"{kind}_created"] += 1
+            return client
+
+    def bigquery(self, project: Optional[str] = None, location: Optional[str] = None):
+        """BigQuery client for GCP_PROJECT_ID / BQ_LOCATION unless given."""
+        project = project or config.project_id()
+        if not project:
+            raise ValueError("Missing env: GCP_PROJECT_ID")
+        return self.get("bigquery", project=project, location=location or config.bq_location())
+
+    def document_service(self, location: str = "global"):
+        return self.get("document_service", location=location)
+
+    def data_store_service(self, location: str = "global"):
+        return self.get("data_store_service", location=location)
+
+    # -- observability -------------------------------------------------
+    def metrics(self) -> Dict[str, Any]:
+        """Client/channel creation vs reuse, plus HTTP connections opened vs requests sent."""
+        with self._lock:
+            counts = dict(self._counts)
+            adapters = list(self._sessions)
+        opened = requests_sent = 0
+        for adapter in adapters:
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    requests_sent += pool.num_requests
+        counts["http_connections_opened"] = opened
+        counts["http_requests"] = requests_sent
+        counts["http_connection_reuse_ratio"] = round(1.0 - opened / requests_sent, 3) if requests_sent else 0.0
+        counts["pool_size"] = self.pool.pool_size
+        counts["keepalive_seconds"] = self.pool.keepalive_seconds
+        return counts
+
+    def summary(self) -> str:
+        """One-line form of metrics() for the loader/indexer output."""
+        m = self.metrics()
+        created = sum(v for k, v in m.items() if k.endswith("_created") and not k.startswith("channels"))
+        reused = sum(v for k, v in m.items() if k.endswith("_reused") and not k.startswith("channels"))
+        parts = [f"clients {created} created / {reused} reused"]
+        if m.get("channels_created"):
+            parts.append(f"gRPC channels {m['channels_created']} created / {m.get('channels_reused', 0)} reused")
+        if m["http_requests"]:
+            parts.append(f"{m['http_requests']} HTTP requests over {m['http_connections_opened']} connections")
+        return "; ".join(parts)
+
+    def close(self) -> None:
+        with self._lock:
+            for client in self._clients.values():
+                close = getattr(client, "close", None)
+                if callable(close):
+                    close()
+            for channel in self._channels.values():
+                channel.close()
+            self._clients.clear()
+            self._channels.clear()
+            self._sessions.clear()
+
+
+def get_client_factory() -> ClientFactory:
+    """Process-wide factory (per process: forked workers build their own)."""
+    return get_or_create(_REGISTRY_KEY, ClientFactory)
+
+
+def set_client_factory(factory: Optional[ClientFactory]) -> None:
+    """Install a factory (e.g. one built with fake ``builders``); None restores the default."""
+    reset(_REGISTRY_KEY)
+    if factory is not None:
+        get_or_create(_REGISTRY_KEY, lambda: factory)
@@ -0,0 +1,42 @@
+"""
+Environment-derived settings for bom_core.
+
+Values are read on every call (not at import) so that agents which call
+load_dotenv() after importing bom_core still see their .env settings.
+"""
+
+import os
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DATA_DIR = os.path.join(REPO_ROOT, "data")
+
+ITEM_MASTER_CSV = "item_master.csv"
+BOM_DETAILS_CSV = "bom_details.csv"
+SCHEMA_SQL = "create_bom_schema.sql"
+DEFAULT_MAX_BYTES_BILLED = 100_000_000  # 100MB safe limit
+
+
+def data_dir() -> str:
+    """Directory holding the BOM CSV extracts and schema SQL."""
+    return os.getenv("BOM_DATA_DIR", DEFAULT_DATA_DIR)
+
+
+def data_path(file_name: str) -> str:
+    return os.path.join(data_dir(), file_name)
+
+
+def project_id() -> str:
+    return os.getenv("GCP_PROJECT_ID")
+
+
+def dataset_id() -> str:
+    return os.getenv("BQ_DATASET_ID", "bom_demo")
+
+
+def bq_location() -> str:
+    return os.getenv("BQ_LOCATION", "us-central1")
+
+
+def max_bytes_billed() -> int:
+    """Per-query bytes-billed budget (MAX_BYTES_BILLED)."""
+    return int(os.getenv("MAX_BYTES_BILLED", DEFAULT_MAX_BYTES_BILLED))
@@ -0,0 +1,392 @@
+"""
+Phantom collapse and optional-configuration enumeration over a BomGraph.
+
+Patterns 11 and 12 only list phantom and optional lines one level down.
+``ConfigurationEngine`` answers the configurator questions behind them
+without SQL:
+
+  - Phantom-flattened BOMs are precomputed for every parent when the
+    engine is built. A line with ``is_phantom`` is blown through: its
+    component is replaced by that component's own lines, with the
+    quantities multiplied, until no phantom with children is left. The
+    expansion is vectorized over all parents at once, one pass per
+    phantom level.
+  - Every optional line (``is_optional``) is an independent include /
+    exclude choice, per occurrence in the structure. The lines below an
+    excluded option are excluded with it. So the number of configurations
+    of an item is the product over its lines of count(component), plus
+    one for each optional line.
+  - Counts and cost / lead-time bounds are memoized per item, bottom-up
+    over the item's sub-structure, so they never enumerate anything.
+    ``configurations`` is a generator over the Cartesian product of the
+    lines' choices. Sub-assemblies with few configurations keep their
+    list in a memo; larger ones are regenerated lazily.
+
+A configuration's cost follows CostRollup: leaves cost unit_cost, and an
+assembly sums ``quantity × (1 + scrap_factor) / yield_factor`` × the
+component's cost over its included lines. Its lead time is the critical
+path: the item's own lead_time_days, plus the longest chain of line lead
+times (bom_details.lead_time_days, else the component's) below it.
+Phantom lines add no lead time of their own, because phantoms are never
+built or stocked.
+"""
+
+import heapq
+import itertools
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .graph import MAX_LEVELS, BomCycleError, BomGraph
+from .rollup import effective_quantity
+
+MEMO_CONFIGURATIONS = 256  # sub-assemblies with at most this many configurations keep them in memory
+MAX_RANKED = 1_000_000  # order_by enumerates (streaming) at most this many configurations
+
+# (selected option paths as tuples of edge ids, cost, lead time)
+Configuration = Tuple[Tuple[Tuple[int, ...], ...], float, float]
+
+
+@dataclass(frozen=True)
+class ItemStats:
+    """Memoized configuration space of one item's sub-structure."""
+    configurations: int  # exact, may exceed 2**63
+    min_cost: float
+    max_cost: float
+    min_lead: float  # critical path below the item (its own lead time excluded)
+    max_lead: float
+
+
+def _flags(values: pd.Series) -> np.ndarray:
+    return values.astype("boolean").fillna(False).to_numpy(dtype=bool)
+
+
+def _numbers(values: pd.Series) -> np.ndarray:
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+class ConfigurationEngine:
+    """Phantom-flattened BOMs and memoized option configurations of the active structure."""
+
+    def __init__(
+        self,
+        graph: BomGraph,
+        bom_details: pd.DataFrame,
+        item_master: pd.DataFrame,
+        edge_mask: Optional[np.ndarray] = None,
+    ):
+        self.graph = graph
+        self.edge_mask = graph.edge_filter() if edge_mask is None else edge_mask
+        self.eff_qty = effective_quantity(
+            graph.quantity,
+            graph.edge_column(bom_details["scrap_factor"]),
+            graph.edge_column(bom_details["yield_factor"]),
+        )
+        self.is_optional = graph.edge_column(_flags(bom_details["is_optional"]))
+        self.is_phantom = graph.edge_column(_flags(bom_details["is_phantom"]))
+
+        items = item_master.drop_duplicates("item_number").set_index("item_number").reindex(graph.items)
+        self.unit_cost = np.nan_to_num(_numbers(items["unit_cost"]))
+        self.item_lead = np.nan_to_num(_numbers(items["lead_time_days"]))
+        self.description = items["item_description"].astype(object).to_numpy()
+        self.item_type = items["item_type"].astype(object).to_numpy()
+        line_lead = graph.edge_column(_numbers(bom_details["lead_time_days"]))
+        line_lead = np.where(np.isnan(line_lead), self.item_lead[graph.child], line_lead)
+        self.line_lead = np.where(self.is_phantom, 0.0, line_lead)
+
+        self._collapse()
+        self.cut_edges = self._cut_cycles()
+        self.structure = self.edge_mask.copy()
+        self.structure[self.cut_edges] = False
+        self._lock = threading.Lock()
+        self._stats: Dict[int, ItemStats] = {}
+        self._memo: Dict[int, List[Configuration]] = {}
+
+    # ------------------------------------------------------------------
+    # Phantom collapse (Pattern 11)
+    # ------------------------------------------------------------------
+    def _collapse(self) -> None:
+        """Blow every phantom line of every parent through, all parents at once."""
+        g = self.graph
+        edges = np.flatnonzero(self.edge_mask)  # still sorted by parent
+        offsets = np.zeros(g.num_items + 1, dtype=np.int64)
+        np.cumsum(np.bincount(g.parent[edges], minlength=g.num_items), out=offsets[1:])
+        has_lines = np.diff(offsets) > 0
+
+        rows = {
+            "parent": g.parent[edges].astype(np.int64),
+            "edge": edges,
+            "quantity": g.quantity[edges],
+            "optional": self.is_optional[edges],
+            "via": np.full(len(edges), -1, dtype=np.int64),
+            "depth": np.zeros(len(edges), dtype=np.int64),
+        }
+        done = []
+        for _ in range(MAX_LEVELS):
+            child = g.child[rows["edge"]]
+            expand = self.is_phantom[rows["edge"]] & has_lines[child]
+            done.append({k: v[~expand] for k, v in rows.items()})
+            if not expand.any():
+                rows = None
+                break
+            sel = {k: v[expand] for k, v in rows.items()}
+            phantom = child[expand]
+            counts = offsets[phantom + 1] - offsets[phantom]
+            # Positions (into ``edges``) of every line of every expanded phantom
+            starts = np.repeat(offsets[phantom] - np.cumsum(counts) + counts, counts)
+            inner = edges[starts + np.arange(counts.sum())]
+            rows = {
+                "parent": np.repeat(sel["parent"], counts),
+                "edge": inner,
+                "quantity": np.repeat(sel["quantity"], counts) * g.quantity[inner],
+                "optional": np.repeat(sel["optional"], counts) | self.is_optional[inner],
+                "via": np.repeat(np.where(sel["via"] < 0, phantom, sel["via"]), counts),
+                "depth": np.repeat(sel["depth"], counts) + 1,
+            }
+        if rows is not None:
+            done.append(rows)  # phantom loops deeper than MAX_LEVELS stay unexpanded
+
+        merged = {k: np.concatenate([d[k] for d in done]) for k in done[0]}
+        order = np.lexsort((g.sequence[merged["edge"]], merged["parent"]))
+        self.collapsed = {k: v[order] for k, v in merged.items()}
+        self.collapsed_offsets = np.zeros(g.num_items + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.collapsed["parent"], minlength=g.num_items), out=self.collapsed_offsets[1:])
+
+    def collapsed_bom(self, item_number: str) -> List[Dict]:
+        """Direct components of ``item_number`` with its phantom lines blown through."""
+        g = self.graph
+        item = g.item_id(item_number)
+        lo, hi = self.collapsed_offsets[item], self.collapsed_offsets[item + 1]
+        rows = []
+        for i in range(lo, hi):
+            e = int(self.collapsed["edge"][i])
+            child, via = int(g.child[e]), int(self.collapsed["via"][i])
+            rows.append({
+                "component_item_number": str(g.items[child]),
+                "item_description": self.description[child],
+                "item_type": self.item_type[child],
+                "quantity": float(self.collapsed["quantity"][i]),
+                "is_optional": bool(self.collapsed["optional"][i]),
+                "via_phantom": str(g.items[via]) if via >= 0 else None,
+                "phantom_levels": int(self.collapsed["depth"][i]),
+                "bom_id": str(g.bom_ids[g.bom_code[e]]),
+            })
+        return rows
+
+    def phantom_stats(self) -> Dict[str, int]:
+        return {
+            "phantom_lines": int((self.is_phantom & self.edge_mask).sum()),
+            "collapsed_lines": int(len(self.collapsed["edge"])),
+            "parents_with_phantoms": int(len(np.unique(self.graph.parent[self.is_phantom & self.edge_mask]))),
+        }
+
+    # ------------------------------------------------------------------
+    # Memoized counts and bounds (Pattern 12)
+    # ------------------------------------------------------------------
+    def _cut_cycles(self) -> np.ndarray:
+        """Lines that close a cycle; configurations treat them like explode treats re-entered components.
+
+        Each cyclic component is walked depth-first from its lowest item id,
+        and the lines back to an item still on the walk are cut, so the
+        remaining structure is acyclic.
+        """
+        g = self.graph
+        try:
+            g.topological_order(self.edge_mask)
+            return np.array([], dtype=np.int64)
+        except BomCycleError:
+            cycles = g.find_cycles(self.edge_mask)
+        cut: List[int] = []
+        for members in cycles:
+            ids = {g.item_id(m) for m in members}
+            root = min(ids)
+            on_path, done = {root}, {root}
+            work = [(root, iter(self._lines_in(root, ids)))]
+            while work:
+                node, lines = work[-1]
+                for e in lines:
+                    child = int(g.child[e])
+                    if child in on_path:
+                        cut.append(int(e))
+                    elif child not in done:
+                        on_path.add(child)
+                        done.add(child)
+                        work.append((child, iter(self._lines_in(child, ids))))
+                        break
+                else:
+                    work.pop()
+                    on_path.discard(node)
+        return np.asarray(sorted(cut), dtype=np.int64)
+
+    def _lines_in(self, item: int, members) -> List[int]:
+        return [int(e) for e in self.graph.child_edges(item, self.edge_mask) if int(self.graph.child[e]) in members]
+
+    def _lines(self, item: int) -> np.ndarray:
+        return self.graph.child_edges(item, self.structure)
+
+    def stats(self, item: int) -> ItemStats:
+        """ItemStats of item id ``item``, computed with its whole sub-structure on first use."""
+        cached = self._stats.get(item)
+        if cached is not None:
+            return cached
+        g = self.graph
+        with self._lock:
+            nodes = np.union1d(g._reach(item, self.structure, downward=True), [item])
+            todo = [n for n in nodes if int(n) not in self._stats]
+            for node in g.topological_order(self.structure, todo)[::-1]:
+                self._stats[int(node)] = self._combine(int(node))
+        return self._stats[item]
+
+    def _combine(self, item: int) -> ItemStats:
+        lines = self._lines(item)
+        if not len(lines):
+            cost = float(self.unit_cost[item])
+            return ItemStats(1, cost, cost, 0.0, 0.0)
+        count, min_cost, max_cost, min_lead, max_lead = 1, 0.0, 0.0, 0.0, 0.0
+        for e in lines:
+            child = self._stats[int(self.graph.child[e])]
+            qty, lead = float(self.eff_qty[e]), float(self.line_lead[e])
+            if self.is_optional[e]:
+                count *= child.configurations + 1
+                min_cost += min(0.0, qty * child.min_cost)
+                max_cost += max(0.0, qty * child.max_cost)
+            else:
+                count *= child.configurations
+                min_cost += qty * child.min_cost
+                max_cost += qty * child.max_cost
+                min_lead = max(min_lead, lead + child.min_lead)
+            max_lead = max(max_lead, lead + child.max_lead)
+        return ItemStats(count, min_cost, max_cost, min_lead, max_lead)
+
+    def count_configurations(self, item_number: str) -> int:
+        return self.stats(self.graph.item_id(item_number)).configurations
+
+    def _scope(self, item: int) -> np.ndarray:
+        """Item flags: ``item`` and everything below it."""
+        scope = np.zeros(self.graph.num_items, dtype=bool)
+        scope[self.graph._reach(item, self.structure, downward=True)] = True
+        scope[item] = True
+        return scope
+
+    def summary(self, item_number: str) -> Dict:
+        """Configuration count plus cost and lead-time range of ``item_number``, without enumerating."""
+        g = self.graph
+        item = g.item_id(item_number)
+        s = self.stats(item)
+        own = float(self.item_lead[item])
+        out = {
+            "item_number": item_number,
+            "item_description": self.description[item],
+            "configurations": s.configurations,
+            "min_cost": s.min_cost,
+            "max_cost": s.max_cost,
+            "min_lead_time_days": own + s.min_lead,
+            "max_lead_time_days": own + s.max_lead,
+        }
+        cut = self.cut_edges[self._scope(item)[g.parent[self.cut_edges]]]
+        if len(cut):
+            out["cycle_lines_cut"] = [f"{g.items[g.parent[e]]} > {g.items[g.child[e]]}" for e in cut]
+        return out
+
+    def options(self, item_number: str) -> List[Dict]:
+        """Optional lines anywhere below ``item_number`` (each distinct line once)."""
+        g = self.graph
+        top = g.item_id(item_number)
+        self.stats(top)
+        rows = []
+        for e in np.flatnonzero(self.structure & self.is_optional & self._scope(top)[g.parent]):
+            child = int(g.child[e])
+            s = self._stats[child]
+            qty = float(self.eff_qty[e])
+            rows.append({
+                "parent_item_number": str(g.items[g.parent[e]]),
+                "component_item_number": str(g.items[child]),
+                "item_description": self.description[child],
+                "quantity": float(g.quantity[e]),
+                "min_added_cost": qty * s.min_cost,
+                "max_added_cost": qty * s.max_cost,
+                "lead_time_days": float(self.line_lead[e]) + s.max_lead,
+                "configurations_when_included": s.configurations,
+                "bom_id": str(g.bom_ids[g.bom_code[e]]),
+            })
+        return rows
+
+    # ------------------------------------------------------------------
+    # Lazy enumeration
+    # ------------------------------------------------------------------
+    def _configurations(self, item: int) -> Iterator[Configuration]:
+        memo = self._memo.get(item)
+        if memo is not None:
+            return iter(memo)
+        generated = self._generate(item)
+        if self._stats[item].configurations <= MEMO_CONFIGURATIONS:
+            memo = list(generated)
+            self._memo[item] = memo
+            return iter(memo)
+        return generated
+
+    def _generate(self, item: int) -> Iterator[Configuration]:
+        lines = self._lines(item)
+        if not len(lines):
+            yield (), float(self.unit_cost[item]), 0.0
+            return
+        yield from self._product(lines, 0)
+
+    def _choices(self, e: int) -> Iterator[Configuration]:
+        """Every choice for line ``e``: excluded (optional lines only), or each configuration of its component."""
+        if self.is_optional[e]:
+            yield (), 0.0, -1.0  # lead -1: the line does not count towards the critical path
+        qty, lead = float(self.eff_qty[e]), float(self.line_lead[e])
+        for selected, cost, child_lead in self._configurations(int(self.graph.child[e])):
+            paths = tuple((e,) + path for path in selected)
+            if self.is_optional[e]:
+                paths = ((e,),) + paths
+            yield paths, qty * cost, lead + child_lead
+
+    def _product(self, lines: np.ndarray, i: int) -> Iterator[Configuration]:
+        """Cartesian product of the choices of ``lines[i:]``, generated lazily."""
+        if i == len(lines) - 1:
+            for selected, cost, lead in self._choices(int(lines[i])):
+                yield selected, cost, max(lead, 0.0)
+            return
+        for selected, cost, lead in self._choices(int(lines[i])):
+            for rest, rest_cost, rest_lead in self._product(lines, i + 1):
+                yield selected + rest, cost + rest_cost, max(lead, rest_lead)
+
+    def configurations(self, item_number: str, limit: Optional[int] = None,
+                       order_by: Optional[str] = None) -> Iterator[Dict]:
+        """Configuration rows of ``item_number``; the base configuration (no options) comes first.
+
+        ``order_by`` ('cost' or 'lead_time') streams the whole space through a
+        bounded heap and yields the ``limit`` lowest; it is refused above
+        MAX_RANKED configurations.
+        """
+        item = self.graph.item_id(item_number)
+        total = self.stats(item).configurations
+        own = float(self.item_lead[item])
+        configs = self._configurations(item)
+        if order_by is not None:
+            keys = {"cost": lambda c: (c[1], c[2]), "lead_time": lambda c: (c[2], c[1])}
+            if order_by not in keys:
+                raise ValueError(f"order_by must be 'cost' or 'lead_time', not {order_by!r}")
+            if total > MAX_RANKED:
+                raise ValueError(f"{item_number} has {total:,} configurations; ranking is limited to "
+                                 f"{MAX_RANKED:,}. Use configuration_options / the cost and lead-time bounds instead")
+            configs = iter(heapq.nsmallest(limit or total, configs, key=keys[order_by]))
+        elif limit is not None:
+            configs = itertools.islice(configs, limit)
+        for n, (selected, cost, lead) in enumerate(configs, start=1):
+            yield {
+                "configuration": n,
+                "option_count": len(selected),
+                "selected_options": ", ".join(self._path(item, path) for path in selected),
+                "rolled_cost": cost,
+                "lead_time_days": own + lead,
+            }
+
+    def _path(self, top: int, edges: Tuple[int, ...]) -> str:
+        items = [top] + [int(self.graph.child[e]) for e in edges]
+        return " > ".join(str(self.graph.items[i]) for i in items)
@@ -0,0 +1,493 @@
+"""
+Result cursors: full query results spilled to local Arrow files, served page by page.
+
+execute_sql and the BOM graph tools cap their rows at 100 so a result fits
+in the model's context, and a multi-level explosion or a wide supplier
+report was simply cut off. A cursor instead streams every row (DuckDB's
+Arrow reader locally, the job's Arrow pages from BigQuery) into an Arrow
+IPC file under BOM_RESULT_SPILL_DIR and keeps, per column, running stats
+that are updated batch by batch. Agents get a compact summary:
+
+    {"cursor_id": "cur_3f2a...", "row_count": 2358, "page_size": 50, "pages": 48,
+     "columns": [{"name": "level", "type": "int64", "min": 1, "max": 7, ...}, ...],
+     "preview": [... first PREVIEW_ROWS rows ...]}
+
+and fetch the rest with ``fetch_result_page`` or write it out with
+``export_result`` (CSV or Parquet). Pages are read from the memory-mapped
+file, so serving page 40 does not re-run the query or touch page 1-39.
+
+Cursors live for BOM_RESULT_CURSOR_TTL_SECONDS (default 1 hour); at most
+MAX_CURSORS are kept and the oldest are dropped with their files.
+
+    LlmAgent(..., tools=[..., *RESULT_CURSOR_TOOLS],
+             after_tool_callback=[cache_after, make_cursor_callback()])
+"""
+
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .query_runner import _json_value
+from .registry import get_or_create
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+PREVIEW_ROWS = 10
+TOP_VALUES = 5
+MAX_TRACKED_DISTINCT = 1000
+MAX_CURSORS = 32
+DEFAULT_TTL_SECONDS = 3600
+STREAM_BATCH_ROWS = 10_000
+EXPORT_FORMATS = ("csv", "parquet")
+_REGISTRY_KEY = "bom_core.cursors.store"
+
+
+def spill_dir() -> str:
+    return os.getenv("BOM_RESULT_SPILL_DIR") or os.path.join(tempfile.gettempdir(), "bom_results")
+
+
+def cursor_ttl_seconds() -> float:
+    return float(os.getenv("BOM_RESULT_CURSOR_TTL_SECONDS", DEFAULT_TTL_SECONDS))
+
+
+# -------------------------------------------------------------------
+# Per-column running stats
+# -------------------------------------------------------------------
+@dataclass
+class ColumnStats:
+    """Stats for one result column, updated one record batch at a time.
+
+    Numeric and temporal columns keep min/max (and mean for numbers);
+    string and boolean columns keep value counts until more than
+    MAX_TRACKED_DISTINCT distinct values have been seen.
+    """
+
+    name: str
+    type: pa.DataType
+    nulls: int = 0
+    min: Any = None
+    max: Any = None
+    total: float = 0.0
+    counted: int = 0
+    values: Optional[Counter] = None
+
+    def __post_init__(self):
+        if pa.types.is_string(self.type) or pa.types.is_large_string(self.type) or pa.types.is_boolean(self.type):
+            self.values = Counter()
+
+    @property
+    def numeric(self) -> bool:
+        return pa.types.is_integer(self.type) or pa.types.is_floating(self.type) or pa.types.is_decimal(self.type)
+
+    @property
+    def ordered(self) -> bool:
+        return self.numeric or pa.types.is_temporal(self.type)
+
+    def update(self, array: pa.Array) -> None:
+        self.nulls += array.null_count
+        if len(array) == array.null_count:
+            return
+        if self.ordered:
+            bounds = pc.min_max(array)
+            low, high = bounds["min"].as_py(), bounds["max"].as_py()
+            self.min = low if self.min is None else min(self.min, low)
+            self.max = high if self.max is None else max(self.max, high)
+        if self.numeric:
+            self.total += float(pc.sum(array).as_py())
+            self.counted += len(array) - array.null_count
+        if self.values is not None:
+            for entry in pc.value_counts(array.drop_null()).to_pylist():
+                self.values[entry["values"]] += entry["counts"]
+            if len(self.values) > MAX_TRACKED_DISTINCT:
+                self.values = None  # high-cardinality: stop counting
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"name": self.name, "type": str(self.type), "nulls": self.nulls}
+        if self.min is not None:
+            out.update(min=_json_value(self.min), max=_json_value(self.max))
+        if self.numeric and self.counted:
+            out["mean"] = round(self.total / self.counted, 4)
+        if self.values is not None:
+            out["distinct"] = len(self.values)
+            out["top_values"] = [[_json_value(v), n] for v, n in self.values.most_common(TOP_VALUES)]
+        elif pa.types.is_string(self.type) or pa.types.is_large_string(self.type) or pa.types.is_boolean(self.type):
+            out["distinct"] = f">{MAX_TRACKED_DISTINCT}"
+        return out
+
+
+# -------------------------------------------------------------------
+# Cursors
+# -------------------------------------------------------------------
+@dataclass
+class ResultCursor:
+    cursor_id: str
+    path: str
+    sql: Optional[str] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+    source: str = "query"
+    columns: List[ColumnStats] = field(default_factory=list)
+    row_count: int = 0
+    batch_starts: List[int] = field(default_factory=list)  # first row number of each spilled batch
+    preview: List[Dict[str, Any]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+
+    def pages(self, page_size: int = DEFAULT_PAGE_SIZE) -> int:
+        return -(-self.row_count // page_size)
+
+    def summary(self, page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+        out = {
+            "cursor_id": self.cursor_id,
+            "row_count": self.row_count,
+            "page_size": page_size,
+            "pages": self.pages(page_size),
+            "columns": [c.to_dict() for c in self.columns],
+            "preview": self.preview,
+        }
+        if self.sql:
+            out["sql"] = self.sql
+        return out
+
+
+def _rows(table_or_batch) -> List[Dict[str, Any]]:
+    return [{k: _json_value(v) for k, v in row.items()} for row in table_or_batch.to_pylist()]
+
+
+class CursorStore:
+    """Spills results to ``directory`` and serves pages, stats and exports from there."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        max_cursors: int = MAX_CURSORS,
+        ttl_seconds: Optional[float] = None,
+        preview_rows: int = PREVIEW_ROWS,
+    ):
+        self.directory = directory or spill_dir()
+        self.max_cursors = max_cursors
+        self.ttl_seconds = cursor_ttl_seconds() if ttl_seconds is None else ttl_seconds
+        self.preview_rows = preview_rows
+        self._lock = threading.Lock()
+        self._cursors: "OrderedDict[str, ResultCursor]" = OrderedDict()
+        self._by_query: Dict[str, str] = {}
+
+    # -- opening -------------------------------------------------------
+    def open_batches(
+        self,
+        batches: Iterable[pa.RecordBatch],
+        sql: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None,
+        source: str = "query",
+    ) -> ResultCursor:
+        """Spill every batch to a new Arrow file, collecting stats as they pass."""
+        os.makedirs(self.directory, exist_ok=True)
+        cursor_id = f"cur_{uuid.uuid4().hex[:12]}"
+        cursor = ResultCursor(cursor_id, os.path.join(self.directory, f"{cursor_id}.arrow"),
+                              sql=sql, params=dict(params or {}), source=source)
+        writer = None
+
+        def start(schema: pa.Schema):
+            cursor.columns = [ColumnStats(f.name, f.type) for f in schema]
+            return pa.ipc.new_file(cursor.path, schema)
+
+        try:
+            # A RecordBatchReader knows its schema even when the result is empty
+            if isinstance(getattr(batches, "schema", None), pa.Schema):
+                writer = start(batches.schema)
+            for batch in batches:
+                if writer is None:
+                    writer = start(batch.schema)
+                if not batch.num_rows:
+                    continue
+                writer.write_batch(batch)
+                cursor.batch_starts.append(cursor.row_count)
+                cursor.row_count += batch.num_rows
+                for stats, column in zip(cursor.columns, batch.columns):
+                    stats.update(column)
+                if len(cursor.preview) < self.preview_rows:
+                    cursor.preview += _rows(batch.slice(0, self.preview_rows - len(cursor.preview)))
+        except BaseException:
+            if writer is not None:
+                writer.close()
+            _remove(cursor.path)
+            raise
+        (writer or start(pa.schema([]))).close()
+        self._register(cursor)
+        return cursor
+
+    def open_rows(self, rows: List[Dict[str, Any]], source: str = "rows") -> ResultCursor:
+        """Cursor over rows already in memory (e.g. a BOM graph explosion)."""
+        table = pa.Table.from_pylist(rows)
+        return self.open_batches(table.to_batches(max_chunksize=STREAM_BATCH_ROWS), source=source)
+
+    def open_query(self, sql: str, params: Optional[Dict[str, Any]] = None) -> ResultCursor:
+        """Stream a statement's full result into a cursor (reused while the same query's cursor is live).
+
+        Only read-only SELECT/WITH queries run: BigQuery statements pass the
+        same guard as execute_sql first (statement type and bytes billed), and
+        the mirror refuses anything else. A rejection raises ValueError with
+        the reason.
+        """
+        from .local_sql import local_stream
+        from .query_runner import stream_sql
+        from .query_cache import canonicalize_sql, dataset_version
+
+        key = f"{dataset_version()}|{canonicalize_sql(sql)}|{json.dumps(params or {}, sort_keys=True, default=str)}"
+        with self._lock:
+            self._evict()
+            existing = self._by_query.get(key)
+            if existing in self._cursors:
+                self._cursors.move_to_end(existing)
+                return self._cursors[existing]
+        reader = local_stream(sql, params, STREAM_BATCH_ROWS)
+        if reader is None:
+            from .query_guard import guard_statement
+
+            sql, rejected = guard_statement(sql, params)
+            if rejected is not None:
+                raise ValueError(rejected["error_details"])
+            reader = stream_sql(sql, params, STREAM_BATCH_ROWS)
+        cursor = self.open_batches(reader, sql=sql, params=params)
+        with self._lock:
+            self._by_query[key] = cursor.cursor_id
+        return cursor
+
+    def _register(self, cursor: ResultCursor) -> None:
+        with self._lock:
+            self._cursors[cursor.cursor_id] = cursor
+            self._evict()
+
+    def _evict(self) -> None:
+        now = time.time()
+        for cursor_id, cursor in list(self._cursors.items()):
+            if now - cursor.created_at > self.ttl_seconds or len(self._cursors) > self.max_cursors:
+                self._drop(cursor_id)
+
+    def _drop(self, cursor_id: str) -> None:
+        cursor = self._cursors.pop(cursor_id, None)
+        if cursor is not None:
+            _remove(cursor.path)
+            for key in [k for k, v in self._by_query.items() if v == cursor_id]:
+                del self._by_query[key]
+
+    # -- reading -------------------------------------------------------
+    def get(self, cursor_id: str) -> ResultCursor:
+        with self._lock:
+            self._evict()
+            if cursor_id not in self._cursors:
+                raise KeyError(f"Unknown or expired result cursor {cursor_id!r}; re-run the query to open a new one")
+            self._cursors.move_to_end(cursor_id)
+            return self._cursors[cursor_id]
+
+    def read_rows(self, cursor_id: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Rows ``offset``..``offset + limit``, reading only the spilled batches that hold them."""
+        cursor = self.get(cursor_id)
+        end = min(offset + limit, cursor.row_count)
+        if offset >= end:
+            return []
+        with pa.memory_map(cursor.path) as source:
+            reader = pa.ipc.open_file(source)
+            first = _batch_index(cursor.batch_starts, offset)
+            last = _batch_index(cursor.batch_starts, end - 1)
+            chunk = pa.Table.from_batches([reader.get_batch(i) for i in range(first, last + 1)])
+            return _rows(chunk.slice(offset - cursor.batch_starts[first], end - offset))
+
+    def read_table(self, cursor_id: str) -> pa.Table:
+        """Every row of a cursor as one Arrow table, backed by the memory-mapped spill file."""
+        cursor = self.get(cursor_id)
+        with pa.memory_map(cursor.path) as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def page(self, cursor_id: str, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+        """1-based page of a cursor's rows."""
+        page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        cursor = self.get(cursor_id)
+        pages = cursor.pages(page_size)
+        if page < 1 or (page > pages and cursor.row_count):
+            raise ValueError(f"page must be between 1 and {pages}")
+        rows = self.read_rows(cursor_id, (page - 1) * page_size, page_size)
+        return {"cursor_id": cursor_id, "page": page, "pages": pages, "page_size": page_size,
+                "row_count": cursor.row_count, "rows": rows, "has_more": page < pages}
+
+    def export(self, cursor_id: str, file_format: str = "csv", path: Optional[str] = None) -> Dict[str, Any]:
+        """Write every row of a cursor to CSV or Parquet; streams batch by batch from the spill file."""
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(f"file_format must be one of {', '.join(EXPORT_FORMATS)}")
+        cursor = self.get(cursor_id)
+        path = path or os.path.join(self.directory, f"{cursor_id}.{file_format}")
+        with pa.memory_map(cursor.path) as source:
+            reader = pa.ipc.open_file(source)
+            if file_format == "csv":
+                import pyarrow.csv as pa_csv
+
+                writer = pa_csv.CSVWriter(path, reader.schema)
+            else:
+                import pyarrow.parquet as pq
+
+                writer = pq.ParquetWriter(path, reader.schema)
+            with writer:
+                for i in range(reader.num_record_batches):
+                    writer.write_batch(reader.get_batch(i))
+        return {"cursor_id": cursor_id, "path": path, "file_format": file_format,
+                "row_count": cursor.row_count, "bytes": os.path.getsize(path)}
+
+    def close(self, cursor_id: Optional[str] = None) -> None:
+        """Drop one cursor (or all) and delete the spill files."""
+        with self._lock:
+            for key in [cursor_id] if cursor_id else list(self._cursors):
+                self._drop(key)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"cursors": len(self._cursors), "rows": sum(c.row_count for c in self._cursors.values()),
+                    "spill_bytes": sum(os.path.getsize(c.path) for c in self._cursors.values()
+                                       if os.path.exists(c.path))}
+
+
+def _batch_index(starts: List[int], row: int) -> int:
+    return bisect.bisect_right(starts, row) - 1
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def get_cursor_store() -> CursorStore:
+    """Process-wide store spilling to BOM_RESULT_SPILL_DIR."""
+    return get_or_create(_REGISTRY_KEY, CursorStore)
+
+
+# -------------------------------------------------------------------
+# Compacting tool results
+# -------------------------------------------------------------------
+def compact_result(
+    result: dict,
+    sql: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    preview_rows: int = PREVIEW_ROWS,
+    store: Optional[CursorStore] = None,
+) -> dict:
+    """Replace a large execute_sql-shaped result's rows with a cursor summary and a preview.
+
+    Results with at most ``preview_rows`` rows, errors and results that
+    already carry a cursor's preview come back unchanged. A truncated result
+    with its ``sql`` is re-run through a cursor so the summary covers every
+    row; without ``sql`` the rows at hand are spilled as they are.
+    """
+    rows = result.get("rows") if isinstance(result, dict) else None
+    if not isinstance(rows, list) or result.get("status") != "SUCCESS":
+        return result
+    summary = result.get("result_cursor")
+    if summary is None:
+        if len(rows) <= preview_rows and not result.get("result_is_likely_truncated"):
+            return result
+        store = store or get_cursor_store()
+        try:
+            if sql and result.get("result_is_likely_truncated"):
+                cursor = store.open_query(sql, params)
+            else:
+                cursor = store.open_rows(rows)
+        except Exception:
+            return result  # the capped rows are still a usable answer
+        summary = cursor.summary()
+    compacted = {k: v for k, v in result.items() if k not in ("rows", "result_is_likely_truncated")}
+    compacted.update(row_count=summary["row_count"], rows=rows[:preview_rows], result_cursor=summary)
+    return compacted
+
+
+def make_cursor_callback(
+    preview_rows: int = PREVIEW_ROWS,
+    state_key: str = "result_cursor",
+    store: Optional[CursorStore] = None,
+):
+    """after_tool_callback that hands the model a cursor summary instead of a large result.
+
+    The summary is also written to ``state[state_key]`` so later agents can
+    reference the full result without it passing through their prompts.
+    """
+    skip = {fn.__name__ for fn in RESULT_CURSOR_TOOLS}
+
+    def after_tool(tool, args, tool_context, tool_response):
+        if tool.name in skip or not isinstance(tool_response, dict):
+            return None
+        sql = args.get("query") if tool.name == "execute_sql" else None
+        compacted = compact_result(tool_response, sql, None, preview_rows, store)
+        if compacted is tool_response:
+            return None
+        tool_context.state[state_key] = compacted["result_cursor"]
+        return compacted
+
+    return after_tool
+
+
+# -------------------------------------------------------------------
+# ADK tools
+# -------------------------------------------------------------------
+def open_result_cursor(query: str, params: Optional[Dict[str, Any]] = None) -> dict:
+    """Run a read-only SQL statement without the 100-row cap and return a result cursor.
+
+    Use when a result is large or was truncated: every row is stored locally
+    and you get a summary (row_count, per-column stats, a preview) plus a
+    cursor_id to page through or export. Same SQL dialect as execute_sql.
+
+    Args:
+        query: The BigQuery SQL statement.
+        params: Optional named query parameter values for @name placeholders.
+
+    Returns:
+        dict with status and result_cursor (cursor_id, row_count, pages,
+        page_size, columns, preview).
+    """
+    try:
+        cursor = get_cursor_store().open_query(query, params)
+    except Exception as e:
+        return {"status": "ERROR", "error_details": str(e)}
+    return {"status": "SUCCESS", "result_cursor": cursor.summary()}
+
+
+def fetch_result_page(cursor_id: str, page: int = 1, page_size: int = DEFAULT_PAGE_SIZE) -> dict:
+    """Fetch one page of rows from a result cursor.
+
+    Args:
+        cursor_id: The cursor_id from a result_cursor summary.
+        page: 1-based page number.
+        page_size: Rows per page (at most 500).
+
+    Returns:
+        dict with status, rows, page, pages, row_count and has_more.
+    """
+    try:
+        return {"status": "SUCCESS", **get_cursor_store().page(cursor_id, page, page_size)}
+    except (KeyError, ValueError) as e:
+        return {"status": "ERROR", "error_details": str(e).strip("'\"")}
+
+
+def export_result(cursor_id: str, file_format: str = "csv") -> dict:
+    """Write every row of a result cursor to a local CSV or Parquet file.
+
+    Args:
+        cursor_id: The cursor_id from a result_cursor summary.
+        file_format: 'csv' or 'parquet'.
+
+    Returns:
+        dict with status, path, row_count and bytes.
+    """
+    try:
+        return {"status": "SUCCESS", **get_cursor_store().export(cursor_id, file_format)}
+    except (KeyError, ValueError, OSError) as e:
+        return {"status": "ERROR", "error_details": str(e).strip("'\"")}
+
+
+RESULT_CURSOR_TOOLS = [open_result_cursor, fetch_result_page, export_result]
@@ -0,0 +1,67 @@
+"""
+Typed loading of the BOM CSV extracts into pandas.
+
+Column dtypes follow the BigQuery types in create_bom_schema.sql so that
+in-process engines see the same values the warehouse does.
+"""
+
+import os
+from typing import Dict, Optional
+
+import pandas as pd
+
+from . import config
+from .schema import TableSchema, get_table
+
+_CSV_FILES = {
+    "item_master": config.ITEM_MASTER_CSV,
+    "bom_details": config.BOM_DETAILS_CSV,
+}
+
+
+def coerce_to_schema(df: pd.DataFrame, table: TableSchema) -> pd.DataFrame:
+    """Cast a raw frame to the pandas dtypes matching the BigQuery schema."""
+    out = df.copy()
+    for column, bq_type in table.columns:
+        if column not in out.columns:
+            continue
+        if bq_type == "STRING":
+            out[column] = out[column].astype("string")
+        elif bq_type == "INT64":
+            out[column] = pd.to_numeric(out[column], errors="coerce").astype("Int64")
+        elif bq_type in ("NUMERIC", "FLOAT64"):
+            out[column] = pd.to_numeric(out[column], errors="coerce").astype("float64")
+        elif bq_type == "BOOL":
+            out[column] = (
+                out[column].astype("string").str.strip().str.lower()
+                .map({"true": True, "false": False, "1": True, "0": False})
+                .astype("boolean")
+            )
+        elif bq_type == "DATE":
+            out[column] = pd.to_datetime(out[column], errors="coerce").astype("datetime64[s]")
+    return out
+
+
+def load_table(name: str, csv_path: Optional[str] = None) -> pd.DataFrame:
+    """Load one BOM table from its CSV extract with schema-typed columns."""
+    table = get_table(name)
+    path = csv_path or config.data_path(_CSV_FILES[name])
+    raw = pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""])
+    return coerce_to_schema(raw, table)
+
+
+def load_item_master(csv_path: Optional[str] = None) -> pd.DataFrame:
+    return load_table("item_master", csv_path)
+
+
+def load_bom_details(csv_path: Optional[str] = None) -> pd.DataFrame:
+    return load_table("bom_details", csv_path)
+
+
+def load_dataset(data_dir: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """Load both tables; data_dir overrides BOM_DATA_DIR."""
+    frames = {}
+    for name, file_name in _CSV_FILES.items():
+        path = os.path.join(data_dir, file_name) if data_dir else None
+        frames[name] = load_table(name, path)
+    return frames
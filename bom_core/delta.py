@@ -0,0 +1,452 @@
+"""
+Incremental (delta) loading of the BOM extracts.
+
+Instead of truncating and reloading, each extract is compared with a stored
+snapshot of the previous load: one 64-bit hash per row, keyed on the table's
+natural key (schema.NATURAL_KEYS), plus a watermark on last_modified_date.
+
+  insert   key not in the snapshot
+  update   key present, row hash changed
+  delete   key in the snapshot but missing from a full extract
+
+Only those rows are applied, through a staging table:
+
+  BigQueryTarget  load changed rows into <table>__delta_stage, one MERGE
+  SqliteTarget    local stand-in (UPSERT + DELETE from a staging table)
+
+The snapshot is written only after the target applied the delta, so a
+failed run is simply retried against the previous state. A full reload
+replaces the target wholesale, so it resets the snapshot to the extract it
+loaded (record_full_load); dropping the tables clears it (DeltaState.clear).
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from google.cloud import bigquery
+
+from . import config
+from .dataset import coerce_to_schema
+from .loading import CsvValidationError, arrow_schema, iter_csv_chunks, to_record_batch, validate_chunk
+from .schema import TableSchema, get_table
+
+WATERMARK_COLUMN = "last_modified_date"
+CHANGE_COLUMN = "_change"
+_KEY_SEP = "\x1f"
+
+
+def delta_state_dir() -> str:
+    return os.getenv("BOM_DELTA_STATE_DIR", config.data_path(".delta_state"))
+
+
+# -------------------------------------------------------------------
+# Row keys and hashes
+# -------------------------------------------------------------------
+def row_keys(df: pd.DataFrame, table: TableSchema) -> pd.Series:
+    """Natural key of every row as one string (parts joined by \\x1f)."""
+    key = list(table.natural_key)
+    if not key:
+        raise ValueError(f"{table.name} has no natural key; delta loading needs one")
+    parts = [df[c].astype("string").fillna("") for c in key]
+    return parts[0].str.cat(parts[1:], sep=_KEY_SEP) if len(parts) > 1 else parts[0]
+
+
+def row_hashes(df: pd.DataFrame, table: TableSchema) -> np.ndarray:
+    """uint64 hash of each schema-typed row (all columns, fixed order)."""
+    return pd.util.hash_pandas_object(df[table.column_names], index=False).to_numpy(dtype=np.uint64)
+
+
+def split_keys(keys: List[str], table: TableSchema) -> pd.DataFrame:
+    """Inverse of row_keys: typed key columns for the given key strings."""
+    key = list(table.natural_key)
+    parts = pd.Series(keys, dtype="string").str.split(_KEY_SEP, expand=True, regex=False)
+    frame = pd.DataFrame({c: parts[i] if i in parts else pd.Series(dtype="string") for i, c in enumerate(key)})
+    return coerce_to_schema(frame, TableSchema(table.name, tuple((c, table.column_type(c)) for c in key)))
+
+
+# -------------------------------------------------------------------
+# Snapshot state
+# -------------------------------------------------------------------
+@dataclass
+class Snapshot:
+    hashes: Dict[str, int] = field(default_factory=dict)
+    watermark: Optional[str] = None
+    loaded_at: Optional[float] = None
+
+
+class DeltaState:
+    """Per-table snapshots: <dir>/<table>.hashes.parquet + <table>.json."""
+
+    def __init__(self, state_dir: Optional[str] = None):
+        self.state_dir = state_dir or delta_state_dir()
+
+    def _paths(self, table_name: str):
+        base = os.path.join(self.state_dir, table_name)
+        return f"{base}.hashes.parquet", f"{base}.json"
+
+    def load(self, table_name: str) -> Snapshot:
+        hashes_path, meta_path = self._paths(table_name)
+        if not os.path.exists(meta_path):
+            return Snapshot()
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        data = pq.read_table(hashes_path)
+        hashes = dict(zip(data.column("key").to_pylist(), data.column("hash").to_pylist()))
+        return Snapshot(hashes=hashes, watermark=meta.get("watermark"), loaded_at=meta.get("loaded_at"))
+
+    def save(self, table_name: str, snapshot: Snapshot) -> None:
+        os.makedirs(self.state_dir, exist_ok=True)
+        hashes_path, meta_path = self._paths(table_name)
+        data = pa.table({
+            "key": pa.array(list(snapshot.hashes.keys()), pa.string()),
+            "hash": pa.array(list(snapshot.hashes.values()), pa.uint64()),
+        })
+        pq.write_table(data, f"{hashes_path}.tmp")
+        os.replace(f"{hashes_path}.tmp", hashes_path)
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"watermark": snapshot.watermark, "loaded_at": snapshot.loaded_at,
+                       "rows": len(snapshot.hashes)}, f)
+        os.replace(f"{meta_path}.tmp", meta_path)
+
+    def clear(self, table_names: Optional[Iterable[str]] = None) -> None:
+        """Forget the snapshots (all tables by default): the next delta run is an initial load."""
+        if table_names is None:
+            table_names = [f[: -len(".json")] for f in os.listdir(self.state_dir) if f.endswith(".json")] \
+                if os.path.isdir(self.state_dir) else []
+        for name in table_names:
+            for path in self._paths(name):
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+# -------------------------------------------------------------------
+# Change detection
+# -------------------------------------------------------------------
+@dataclass
+class DeltaSet:
+    table: str
+    upserts: pd.DataFrame
+    deletes: pd.DataFrame
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    late_updates: int = 0  # changed rows whose last_modified_date did not pass the watermark
+    snapshot: Snapshot = field(default_factory=Snapshot)
+
+    @property
+    def deleted(self) -> int:
+        return len(self.deletes)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.upserts.empty and self.deletes.empty
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "deleted": self.deleted,
+            "unchanged": self.unchanged,
+            "late_updates": self.late_updates,
+        }
+
+
+def _advance_watermark(watermark: Optional[str], modified: pd.Series) -> Optional[str]:
+    chunk_max = modified.max()
+    if pd.notna(chunk_max) and (watermark is None or chunk_max > pd.Timestamp(watermark)):
+        return chunk_max.date().isoformat()
+    return watermark
+
+
+def extract_snapshot(chunks: Iterable[pd.DataFrame], table: TableSchema) -> Snapshot:
+    """Snapshot of a complete extract: what the target holds right after a full load of it."""
+    hashes: Dict[str, int] = {}
+    watermark = None
+    for typed in chunks:
+        hashes.update(zip(row_keys(typed, table).tolist(), row_hashes(typed, table).tolist()))
+        if WATERMARK_COLUMN in table.column_names:
+            watermark = _advance_watermark(watermark, typed[WATERMARK_COLUMN])
+    return Snapshot(hashes=hashes, watermark=watermark, loaded_at=time.time())
+
+
+def compute_delta(
+    chunks: Iterable[pd.DataFrame],
+    table: TableSchema,
+    previous: Snapshot,
+    full_extract: bool = True,
+) -> DeltaSet:
+    """Compare schema-typed extract chunks with the previous snapshot.
+
+    With ``full_extract=False`` (an extract of only recently modified rows)
+    missing keys are kept rather than treated as deletes.
+    """
+    prev_keys = pd.Index(list(previous.hashes.keys()), dtype="object")
+    prev_hashes = np.fromiter(previous.hashes.values(), dtype=np.uint64, count=len(previous.hashes))
+    new_hashes: Dict[str, int] = {} if full_extract else dict(previous.hashes)
+    seen = set()
+    upserts: List[pd.DataFrame] = []
+    inserted = updated = unchanged = late = 0
+    watermark = previous.watermark
+    has_watermark = WATERMARK_COLUMN in table.column_names
+
+    for typed in chunks:
+        keys = row_keys(typed, table)
+        hashes = row_hashes(typed, table)
+        dup = keys.duplicated() | keys.isin(seen)
+        if dup.any():
+            raise ValueError(f"{table.name}: duplicate natural key {keys[dup].iloc[0]!r} in extract")
+        seen.update(keys.tolist())
+
+        pos = prev_keys.get_indexer(keys.to_numpy(dtype=object))
+        is_new = pos < 0
+        is_changed = np.zeros(len(keys), dtype=bool)
+        known = ~is_new
+        is_changed[known] = prev_hashes[pos[known]] != hashes[known]
+        inserted += int(is_new.sum())
+        updated += int(is_changed.sum())
+        unchanged += int(len(typed) - is_new.sum() - is_changed.sum())
+
+        if has_watermark:
+            modified = typed[WATERMARK_COLUMN]
+            if previous.watermark and is_changed.any():
+                late += int((modified[is_changed] <= pd.Timestamp(previous.watermark)).sum())
+            watermark = _advance_watermark(watermark, modified)
+
+        mask = is_new | is_changed
+        if mask.any():
+            upserts.append(typed[mask])
+        new_hashes.update(zip(keys.tolist(), hashes.tolist()))
+
+    deleted_keys = sorted(set(previous.hashes) - seen) if full_extract else []
+    upsert_frame = pd.concat(upserts, ignore_index=True) if upserts else pd.DataFrame(
+        {c: pd.Series(dtype="object") for c in table.column_names}
+    )
+    return DeltaSet(
+        table=table.name,
+        upserts=coerce_to_schema(upsert_frame, table),
+        deletes=split_keys(deleted_keys, table),
+        inserted=inserted,
+        updated=updated,
+        unchanged=unchanged,
+        late_updates=late,
+        snapshot=Snapshot(hashes=new_hashes, watermark=watermark, loaded_at=time.time()),
+    )
+
+
+def typed_csv_chunks(
+    csv_path: str, table: TableSchema, chunk_rows: int, on_error: str = "raise"
+) -> Iterable[pd.DataFrame]:
+    """Validated, schema-typed chunks of a CSV extract (raises on bad rows, or drops them with "skip")."""
+    offset = 0
+    for raw in iter_csv_chunks(csv_path, chunk_rows):
+        raw = raw.reset_index(drop=True)
+        typed, bad, errors = validate_chunk(raw, table, offset)
+        if errors and on_error != "skip":
+            raise CsvValidationError(table.name, errors)
+        offset += len(raw)
+        yield typed[~bad] if errors else typed
+
+
+# -------------------------------------------------------------------
+# Targets
+# -------------------------------------------------------------------
+def merge_sql(table: TableSchema, target_id: str, stage_id: str) -> str:
+    """MERGE applying a staging table of upserts and delete markers."""
+    key = table.natural_key
+    on = " AND ".join(f"T.{c} = S.{c}" for c in key)
+    update = ",\n    ".join(f"{c} = S.{c}" for c in table.column_names if c not in key)
+    cols = ", ".join(table.column_names)
+    values = ", ".join(f"S.{c}" for c in table.column_names)
+    return (
+        f"MERGE `{target_id}` T\n"
+        f"USING `{stage_id}` S\n"
+        f"ON {on}\n"
+        f"WHEN MATCHED AND S.{CHANGE_COLUMN} = 'delete' THEN DELETE\n"
+        f"WHEN MATCHED THEN UPDATE SET\n    {update}\n"
+        f"WHEN NOT MATCHED AND S.{CHANGE_COLUMN} = 'upsert' THEN\n"
+        f"  INSERT ({cols}) VALUES ({values})"
+    )
+
+
+def stage_frame(delta: DeltaSet, table: TableSchema) -> pd.DataFrame:
+    """Upsert rows plus key-only delete markers, tagged in the _change column."""
+    upserts = delta.upserts.assign(**{CHANGE_COLUMN: "upsert"})
+    deletes = delta.deletes.reindex(columns=table.column_names).assign(**{CHANGE_COLUMN: "delete"})
+    frame = pd.concat([upserts, deletes], ignore_index=True)
+    frame = coerce_to_schema(frame, table)
+    frame[CHANGE_COLUMN] = frame[CHANGE_COLUMN].astype("string")
+    return frame
+
+
+class BigQueryTarget:
+    """Applies a DeltaSet to BigQuery with a staging table and one MERGE."""
+
+    def __init__(self, client, project: str, dataset: str, location: Optional[str] = None):
+        self.client = client
+        self.project = project
+        self.dataset = dataset
+        self.location = location or config.bq_location()
+
+    def table_id(self, table_name: str) -> str:
+        return f"{self.project}.{self.dataset}.{table_name}"
+
+    def apply(self, delta: DeltaSet) -> Dict[str, int]:
+        if delta.is_empty:
+            return delta.summary()
+        table = get_table(delta.table)
+        stage_id = self.table_id(f"{delta.table}__delta_stage")
+        schema = arrow_schema(table).append(pa.field(CHANGE_COLUMN, pa.string()))
+        with tempfile.TemporaryDirectory(prefix="bom_delta_") as tmp:
+            path = os.path.join(tmp, "stage.parquet")
+            pq.write_table(pa.Table.from_batches([to_record_batch(stage_frame(delta, table), schema)]), path)
+            job_config = bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.PARQUET,
+                write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+                create_disposition=bigquery.CreateDisposition.CREATE_IF_NEEDED,
+            )
+            with open(path, "rb") as f:
+                self.client.load_table_from_file(f, stage_id, job_config=job_config, location=self.location).result()
+        try:
+            job = self.client.query(merge_sql(table, self.table_id(delta.table), stage_id), location=self.location)
+            job.result()
+        finally:
+            self.client.delete_table(stage_id, not_found_ok=True)
+        summary = delta.summary()
+        summary["dml_affected_rows"] = job.num_dml_affected_rows
+        return summary
+
+    def read_frames(self, table_names: Iterable[str]) -> Dict[str, pd.DataFrame]:
+        """Schema-typed copies of the merged tables (table reads, no query bytes billed)."""
+        return {
+            name: coerce_to_schema(self.client.list_rows(self.table_id(name)).to_dataframe(), get_table(name))
+            for name in table_names
+        }
+
+
+_SQLITE_TYPES = {"STRING": "TEXT", "INT64": "INTEGER", "NUMERIC": "REAL", "FLOAT64": "REAL",
+                 "BOOL": "INTEGER", "DATE": "TEXT"}
+
+
+def _sqlite_value(value):
+    if value is None or value is pd.NA or (isinstance(value, float) and np.isnan(value)) or value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.date().isoformat()
+    if isinstance(value, (np.bool_, bool)):
+        return int(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def sqlite_rows(df: pd.DataFrame, columns: List[str]) -> List[tuple]:
+    return [tuple(_sqlite_value(v) for v in row) for row in df[columns].itertuples(index=False, name=None)]
+
+
+class SqliteTarget:
+    """Local stand-in for the warehouse: same tables, UPSERT + DELETE from staging."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+
+    def ensure_table(self, table: TableSchema) -> None:
+        cols = ", ".join(f"{c} {_SQLITE_TYPES[t]}" for c, t in table.columns)
+        key = ", ".join(table.natural_key)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table.name} ({cols})")
+        self.conn.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {table.name}_natural_key ON {table.name} ({key})")
+
+    def apply(self, delta: DeltaSet) -> Dict[str, int]:
+        table = get_table(delta.table)
+        self.ensure_table(table)
+        names = table.column_names
+        key = list(table.natural_key)
+        stage, doomed = f"_stage_{table.name}", f"_delete_{table.name}"
+        update = ", ".join(f"{c} = excluded.{c}" for c in names if c not in key)
+        with self.conn:
+            self.conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {stage} AS SELECT * FROM {table.name} WHERE 0")
+            self.conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {doomed} AS SELECT {', '.join(key)} FROM {table.name} WHERE 0")
+            self.conn.execute(f"DELETE FROM {stage}")
+            self.conn.execute(f"DELETE FROM {doomed}")
+            self.conn.executemany(
+                f"INSERT INTO {stage} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+                sqlite_rows(delta.upserts, names),
+            )
+            self.conn.executemany(
+                f"INSERT INTO {doomed} VALUES ({', '.join('?' * len(key))})", sqlite_rows(delta.deletes, key)
+            )
+            # WHERE true disambiguates the ON CONFLICT clause from a join constraint
+            self.conn.execute(
+                f"INSERT INTO {table.name} SELECT * FROM {stage} WHERE true "
+                f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {update}"
+            )
+            self.conn.execute(
+                f"DELETE FROM {table.name} WHERE ({', '.join(key)}) IN (SELECT {', '.join(key)} FROM {doomed})"
+            )
+        return delta.summary()
+
+    def read(self, table_name: str) -> pd.DataFrame:
+        return pd.read_sql_query(f"SELECT * FROM {table_name}", self.conn)
+
+    def read_frames(self, table_names: Iterable[str]) -> Dict[str, pd.DataFrame]:
+        """Schema-typed copies of the merged tables, in natural-key order."""
+        frames = {}
+        for name in table_names:
+            table = get_table(name)
+            raw = pd.read_sql_query(f"SELECT * FROM {name} ORDER BY {', '.join(table.natural_key)}", self.conn)
+            frames[name] = coerce_to_schema(raw, table)
+        return frames
+
+
+# -------------------------------------------------------------------
+# Pipeline
+# -------------------------------------------------------------------
+def load_delta(
+    table_name: str,
+    csv_path: str,
+    target,
+    state: Optional[DeltaState] = None,
+    chunk_rows: int = 100_000,
+    full_extract: bool = True,
+    on_applied: Optional[Callable[[DeltaSet], None]] = None,
+) -> Dict[str, int]:
+    """Compute and apply one table's delta, then advance its snapshot.
+
+    ``on_applied`` receives the applied DeltaSet (e.g. for summaries.refresh_summaries).
+    """
+    state = state or DeltaState()
+    table = get_table(table_name)
+    delta = compute_delta(typed_csv_chunks(csv_path, table, chunk_rows), table, state.load(table_name), full_extract)
+    summary = target.apply(delta)
+    if on_applied is not None:
+        on_applied(delta)
+    state.save(table_name, delta.snapshot)
+    summary["watermark"] = delta.snapshot.watermark
+    return summary
+
+
+def record_full_load(
+    table_name: str,
+    csv_path: str,
+    state: Optional[DeltaState] = None,
+    chunk_rows: int = 100_000,
+    on_error: str = "raise",
+) -> Snapshot:
+    """Reset a table's snapshot to the extract a full load just wrote to the delta target.
+
+    ``on_error`` must match the load's, so rows it skipped are not recorded.
+    """
+    state = state or DeltaState()
+    table = get_table(table_name)
+    snapshot = extract_snapshot(typed_csv_chunks(csv_path, table, chunk_rows, on_error), table)
+    state.save(table_name, snapshot)
+    return snapshot
@@ -0,0 +1,211 @@
+"""
+Effectivity-date index: point-in-time BOM structure without date predicates in SQL.
+
+Every documented pattern filters ``is_active = TRUE``, which only says
+what is current. "What did ITEM-057 look like on 2025-06-01" needed a
+full partition scan plus an LLM-written predicate over effective_date and
+expiration_date. ``EffectivityIndex`` keeps the line intervals of a
+BomGraph as two sorted arrays (starts and ends, each with the edge order
+that sorts it), so:
+
+  - the lines in effect on a day are two binary searches plus one masked
+    write per edge, cached per day as an ``edge_mask`` for the graph's
+    existing explode / where_used traversals
+  - the lines that took effect or expired in a window are two contiguous
+    slices of those arrays, which also lets ``diff`` answer "no change"
+    without exploding anything
+
+A line is in effect on day ``d`` when ``effective_date <= d`` and
+``expiration_date`` is NULL or ``>= d``, the same inclusive bounds as the
+date range filter in query_patterns_documentation.md. A NULL
+effective_date means the line has always applied. ``is_active`` is the
+line's current status flag; as-of queries ignore it unless
+``active_only`` is set.
+"""
+
+import datetime
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .graph import MAX_LEVELS, NO_DATE, BomGraph
+
+OPEN_END = np.iinfo(np.int64).max  # NULL expiration_date: still in effect
+MASK_CACHE_SIZE = 32
+
+DateLike = Union[str, datetime.date, np.datetime64]
+
+
+def to_day(value: DateLike) -> int:
+    """Day number (days since 1970-01-01, as in BomGraph.effective) of an ISO date."""
+    try:
+        return int(np.datetime64(value, "D").astype(np.int64))
+    except ValueError:
+        raise ValueError(f"Invalid date {value!r}; use YYYY-MM-DD") from None
+
+
+def day_to_iso(day: int) -> Optional[str]:
+    if day in (NO_DATE, OPEN_END):
+        return None
+    return str(np.datetime64(int(day), "D"))
+
+
+class EffectivityIndex:
+    """Sorted start/end arrays over the effectivity interval of every BOM line."""
+
+    def __init__(self, graph: BomGraph):
+        self.graph = graph
+        self.start = graph.effective.astype(np.int64)  # NO_DATE sorts first: always in effect
+        self.end = graph.expiration.astype(np.int64)
+        self.end[graph.expiration == NO_DATE] = OPEN_END
+        self.start_order = np.argsort(self.start, kind="stable")
+        self.starts = self.start[self.start_order]
+        self.end_order = np.argsort(self.end, kind="stable")
+        self.ends = self.end[self.end_order]
+        self._lock = threading.Lock()
+        self._masks: "OrderedDict[int, np.ndarray]" = OrderedDict()
+
+    # ------------------------------------------------------------------
+    # Edge masks
+    # ------------------------------------------------------------------
+    def _started_by(self, day: int) -> np.ndarray:
+        return self.start_order[:np.searchsorted(self.starts, day, side="right")]
+
+    def _ended_before(self, day: int) -> np.ndarray:
+        return self.end_order[:np.searchsorted(self.ends, day, side="left")]
+
+    def in_effect(self, as_of: DateLike) -> np.ndarray:
+        """Boolean edge mask of the lines in effect on ``as_of`` (cached per day; do not modify)."""
+        day = to_day(as_of)
+        with self._lock:
+            mask = self._masks.get(day)
+            if mask is not None:
+                self._masks.move_to_end(day)
+                return mask
+        mask = np.zeros(self.graph.num_edges, dtype=bool)
+        mask[self._started_by(day)] = True
+        mask[self._ended_before(day)] = False
+        mask.flags.writeable = False
+        with self._lock:
+            self._masks[day] = mask
+            while len(self._masks) > MASK_CACHE_SIZE:
+                self._masks.popitem(last=False)
+        return mask
+
+    def in_effect_during(self, first: DateLike, last: DateLike) -> np.ndarray:
+        """Lines in effect on at least one day of ``first``..``last`` (inclusive)."""
+        first_day, last_day = sorted((to_day(first), to_day(last)))
+        mask = np.zeros(self.graph.num_edges, dtype=bool)
+        mask[self._started_by(last_day)] = True
+        mask[self._ended_before(first_day)] = False
+        return mask
+
+    def mask(self, as_of: DateLike, active_only: bool = False) -> np.ndarray:
+        """``in_effect`` edge mask, optionally restricted to is_active lines."""
+        mask = self.in_effect(as_of)
+        return mask & self.graph.is_active if active_only else mask
+
+    def changes_between(self, first: DateLike, last: DateLike) -> Tuple[np.ndarray, np.ndarray]:
+        """(edges that took effect, edges that expired) on a day after ``first`` up to ``last``.
+
+        A line expires the day after its expiration_date.
+        """
+        first_day, last_day = sorted((to_day(first), to_day(last)))
+        started = self.start_order[np.searchsorted(self.starts, first_day, side="right"):
+                                   np.searchsorted(self.starts, last_day, side="right")]
+        ended = self.end_order[np.searchsorted(self.ends, first_day, side="left"):
+                               np.searchsorted(self.ends, last_day, side="left")]
+        return started, ended
+
+    def change_dates(self, edges: Optional[np.ndarray] = None) -> List[str]:
+        """Sorted days on which any of ``edges`` (default: all) took effect or expired."""
+        starts = self.start if edges is None else self.start[edges]
+        ends = self.end if edges is None else self.end[edges]
+        days = np.unique(np.concatenate([starts[starts != NO_DATE], ends[ends != OPEN_END]]))
+        return [day_to_iso(d) for d in days]
+
+    # ------------------------------------------------------------------
+    # Point-in-time structure
+    # ------------------------------------------------------------------
+    def explode(self, item_number: str, as_of: DateLike, max_levels: int = MAX_LEVELS,
+                active_only: bool = False) -> Tuple[List[Dict], List[List[str]]]:
+        """BomGraph.explode over the lines in effect on ``as_of``."""
+        return self.graph.explode(item_number, max_levels=max_levels, edge_mask=self.mask(as_of, active_only))
+
+    def where_used(self, component_item_number: str, as_of: DateLike, max_levels: int = MAX_LEVELS,
+                   active_only: bool = False) -> List[Dict]:
+        """BomGraph.where_used over the lines in effect on ``as_of``."""
+        return self.graph.where_used(component_item_number, max_levels=max_levels,
+                                     edge_mask=self.mask(as_of, active_only))
+
+    def changed_lines(self, first: DateLike, last: DateLike, item_number: Optional[str] = None) -> List[Dict]:
+        """BOM lines that took effect or expired after ``first`` up to ``last``.
+
+        With ``item_number``, only lines in its structure on either date.
+        """
+        started, ended = self.changes_between(first, last)
+        if item_number is not None:
+            scope = self._scope(item_number, first, last)
+            started, ended = started[scope[self.graph.parent[started]]], ended[scope[self.graph.parent[ended]]]
+        rows = []
+        for change, edges in (("took_effect", started), ("expired", ended)):
+            for e in edges:
+                row = self.graph._edge_row(int(e))
+                row.update(change=change, effective_date=day_to_iso(self.start[e]),
+                           expiration_date=day_to_iso(self.end[e]))
+                rows.append(row)
+        rows.sort(key=lambda r: (r["effective_date"] if r["change"] == "took_effect" else r["expiration_date"]) or "")
+        return rows
+
+    def _scope(self, item_number: str, first: DateLike, last: DateLike) -> np.ndarray:
+        """Item flags: ``item_number`` and everything below it on either date."""
+        scope = np.zeros(self.graph.num_items, dtype=bool)
+        scope[self.graph.item_id(item_number)] = True
+        for day in (first, last):
+            scope[self.graph.descendants(item_number, self.in_effect(day))] = True
+        return scope
+
+    def diff(self, item_number: str, from_date: DateLike, to_date: DateLike,
+             max_levels: int = MAX_LEVELS) -> List[Dict]:
+        """Multi-level structure changes of ``item_number`` between two dates.
+
+        Lines are matched on (structure_path, component_item_number); rows
+        carry change = added | removed | quantity_changed with the quantity
+        on each date. Returns [] without exploding when no line under the
+        item took effect or expired in between.
+        """
+        started, ended = self.changes_between(from_date, to_date)
+        touched = np.concatenate([started, ended])
+        if not len(touched) or not self._scope(item_number, from_date, to_date)[self.graph.parent[touched]].any():
+            return []
+
+        def lines(day: DateLike) -> Dict[Tuple[str, str], Dict]:
+            out: Dict[Tuple[str, str], Dict] = {}
+            for row in self.explode(item_number, day, max_levels)[0]:
+                key = (row["structure_path"], row["component_item_number"])
+                if key in out:
+                    out[key]["quantity"] += row["quantity"]  # same component on two lines of one parent
+                else:
+                    out[key] = row
+            return out
+
+        before, after = lines(from_date), lines(to_date)
+        rows = []
+        for key in sorted(before.keys() | after.keys()):
+            old, new = before.get(key), after.get(key)
+            if old is not None and new is not None and old["quantity"] == new["quantity"]:
+                continue
+            ref = new or old
+            rows.append({
+                "change": "added" if old is None else "removed" if new is None else "quantity_changed",
+                "level": ref["level"],
+                "parent_item_number": ref["parent_item_number"],
+                "component_item_number": ref["component_item_number"],
+                "structure_path": ref["structure_path"],
+                "quantity_from": old["quantity"] if old else None,
+                "quantity_to": new["quantity"] if new else None,
+                "bom_id": ref["bom_id"],
+            })
+        return rows
@@ -0,0 +1,229 @@
+"""
+Fuzzy entity resolution over item_master item numbers and descriptions.
+
+Replaces the ColumnResolverAgent's ad-hoc token-overlap/regex scans of
+item_master with an in-process index:
+
+  - an inverted token index (token -> item ids) with IDF weights
+  - character trigram postings per token, so misspellings and partial
+    words ('scoter', 'batt') still find candidates
+  - a normalized score in [0, 1]: 0.6 x IDF-weighted share of the query
+    tokens present + 0.4 x trigram Dice similarity; an exact item number
+    scores 1.0
+
+Only items sharing a token or trigram with the query are scored, so a
+lookup touches a handful of postings rather than the whole table. When the
+dataset version changes the index is diffed against the new item_master
+and only added, changed and removed items are re-indexed.
+"""
+
+import math
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+import pandas as pd
+
+from .query_cache import dataset_version
+
+TOKEN_WEIGHT = 0.6
+TRIGRAM_WEIGHT = 0.4
+CANONICAL_MIN_SCORE = 0.6  # same threshold the ColumnResolverAgent prompt used
+AMBIGUITY_MARGIN = 0.1  # candidates closer than this to the best need clarification
+DEFAULT_LIMIT = 3
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_ITEM_NUMBER = re.compile(r"^[A-Za-z]+-\d+$")
+
+
+def normalize_tokens(text: str) -> List[str]:
+    return _TOKEN.findall(str(text).lower())
+
+
+def trigrams(tokens: Iterable[str]) -> Set[str]:
+    grams = set()
+    for token in tokens:
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class EntityIndex:
+    """Token + trigram postings over item numbers and descriptions."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.item_numbers: List[Optional[str]] = []  # doc id -> item number (None once removed)
+        self.descriptions: List[str] = []
+        self._doc_of: Dict[str, int] = {}
+        self._doc_tokens: List[Set[str]] = []
+        self._doc_grams: List[Set[str]] = []
+        self._token_postings: Dict[str, Set[int]] = defaultdict(set)
+        self._gram_postings: Dict[str, Set[int]] = defaultdict(set)
+        self.parents: Set[str] = set()
+        self.version = ""
+
+    @classmethod
+    def build(cls, item_master: pd.DataFrame, bom_details: Optional[pd.DataFrame] = None,
+              version: str = "") -> "EntityIndex":
+        index = cls()
+        index.refresh(item_master, bom_details, version)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._doc_of)
+
+    # -- maintenance ---------------------------------------------------
+    def upsert(self, item_number: str, description: str) -> None:
+        with self._lock:
+            doc = self._doc_of.get(item_number)
+            if doc is not None:
+                if self.descriptions[doc] == description:
+                    return
+                self._unpost(doc)
+            else:
+                doc = len(self.item_numbers)
+                self.item_numbers.append(item_number)
+                self.descriptions.append("")
+                self._doc_tokens.append(set())
+                self._doc_grams.append(set())
+                self._doc_of[item_number] = doc
+            tokens = set(normalize_tokens(description)) | set(normalize_tokens(item_number))
+            grams = trigrams(tokens)
+            self.descriptions[doc] = description
+            self._doc_tokens[doc] = tokens
+            self._doc_grams[doc] = grams
+            for token in tokens:
+                self._token_postings[token].add(doc)
+            for gram in grams:
+                self._gram_postings[gram].add(doc)
+
+    def remove(self, item_number: str) -> None:
+        with self._lock:
+            doc = self._doc_of.pop(item_number, None)
+            if doc is not None:
+                self._unpost(doc)
+                self.item_numbers[doc] = None
+
+    def _unpost(self, doc: int) -> None:
+        for token in self._doc_tokens[doc]:
+            self._token_postings[token].discard(doc)
+        for gram in self._doc_grams[doc]:
+            self._gram_postings[gram].discard(doc)
+
+    def refresh(self, item_master: pd.DataFrame, bom_details: Optional[pd.DataFrame] = None,
+                version: str = "") -> Dict[str, int]:
+        """Re-index only the items whose description changed, appeared or disappeared."""
+        current = dict(zip(item_master["item_number"].astype(str),
+                           item_master["item_description"].fillna("").astype(str)))
+        with self._lock:
+            removed = [item for item in self._doc_of if item not in current]
+            changed = [item for item, desc in current.items()
+                       if item not in self._doc_of or self.descriptions[self._doc_of[item]] != desc]
+            for item in removed:
+                self.remove(item)
+            for item in changed:
+                self.upsert(item, current[item])
+            if bom_details is not None:
+                self.parents = set(bom_details["parent_item_number"].dropna().astype(str))
+            self.version = version
+        return {"upserted": len(changed), "removed": len(removed)}
+
+    # -- lookup --------------------------------------------------------
+    def _idf(self, token: str) -> float:
+        return math.log(1.0 + len(self._doc_of) / (1.0 + len(self._token_postings.get(token, ()))))
+
+    def search(self, text: str, limit: int = DEFAULT_LIMIT, parents_only: bool = False) -> List[Dict]:
+        """Best-matching items for a free-text name or item number, highest score first."""
+        query = text.strip()
+        tokens = set(normalize_tokens(query))
+        if not tokens:
+            return []
+        grams = trigrams(tokens)
+        with self._lock:
+            exact = self._doc_of.get(query.upper()) if _ITEM_NUMBER.match(query) else None
+            overlap: Counter = Counter()
+            for gram in grams:
+                overlap.update(self._gram_postings.get(gram, ()))
+            idf = {t: self._idf(t) for t in tokens}
+            idf_total = sum(idf.values()) or 1.0
+            scored = []
+            for doc, shared in overlap.items():
+                item = self.item_numbers[doc]
+                if parents_only and item not in self.parents:
+                    continue
+                token_score = sum(w for t, w in idf.items() if t in self._doc_tokens[doc]) / idf_total
+                dice = 2.0 * shared / (len(grams) + len(self._doc_grams[doc]))
+                score = 1.0 if doc == exact else TOKEN_WEIGHT * token_score + TRIGRAM_WEIGHT * dice
+                scored.append((score, item, self.descriptions[doc]))
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [
+            {"item_number": item, "name": desc, "score": round(score, 3), "is_parent": item in self.parents}
+            for score, item, desc in scored[:limit]
+        ]
+
+    def resolve(self, text: str, limit: int = DEFAULT_LIMIT) -> Dict:
+        """candidate_parents plus a canonical_parent when the best match is clear.
+
+        Parent items (those with BOM lines) are preferred; all items are
+        searched when no parent matches.
+        """
+        candidates = self.search(text, limit, parents_only=True) or self.search(text, limit)
+        canonical = None
+        if candidates and candidates[0]["score"] >= CANONICAL_MIN_SCORE:
+            close = [c for c in candidates[1:] if candidates[0]["score"] - c["score"] < AMBIGUITY_MARGIN]
+            if not close or candidates[0]["score"] == 1.0:
+                canonical = candidates[0]
+        return {
+            "canonical_parent": canonical["name"] if canonical else None,
+            "canonical_item_number": canonical["item_number"] if canonical else None,
+            "candidate_parents": candidates,
+            "needs_clarification": bool(candidates) and canonical is None
+            and candidates[0]["score"] >= CANONICAL_MIN_SCORE,
+        }
+
+
+_index_lock = threading.Lock()
+_index: Optional[EntityIndex] = None
+
+
+def get_entity_index() -> EntityIndex:
+    """Process-wide index, refreshed incrementally when the dataset version changes."""
+    global _index
+    from .tools import get_dataset
+
+    version = dataset_version()
+    with _index_lock:
+        if _index is None or _index.version != version:
+            frames = get_dataset()
+            if _index is None:
+                _index = EntityIndex.build(frames["item_master"], frames["bom_details"], version)
+            else:
+                _index.refresh(frames["item_master"], frames["bom_details"], version)
+        return _index
+
+
+# -------------------------------------------------------------------
+# ADK integration
+# -------------------------------------------------------------------
+def candidate_parents(name: str, limit: int = DEFAULT_LIMIT) -> dict:
+    """Resolve a product/parent name or item number to scored item_master candidates.
+
+    Use instead of regex/token-overlap SQL over item_description when the
+    question mentions a product, assembly or part by name (e.g. 'electronics
+    assembly 3', 'scooter frame') or by item number.
+
+    Args:
+        name: Free-text product/parent name or item number from the question.
+        limit: Number of candidates to return (default 3).
+
+    Returns:
+        dict with status, canonical_parent (best description or null),
+        canonical_item_number, needs_clarification and candidate_parents
+        ([{item_number, name, score, is_parent}]), plus elapsed_ms.
+    """
+    start = time.perf_counter()
+    result = get_entity_index().resolve(name, limit)
+    return {"status": "SUCCESS", **result, "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
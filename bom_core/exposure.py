@@ -0,0 +1,342 @@
+"""
+Bitmap attribute index: compliance, obsolescence and NPI exposure without warehouse joins.
+
+Patterns 6 (Obsolete Parts), 9 (NPI Impact) and 10 (Compliance) each join
+bom_details to item_master and filter on is_obsolete, is_npi, status or
+compliance_status, one warehouse job per question and only one level deep.
+``ExposureIndex`` answers the multi-level form, "which products
+transitively contain an obsolete or non-compliant part", with word-wise
+AND/OR over bitmaps whose bit ``i`` is BomGraph item id ``i``:
+
+  - one attribute bitmap per value of every low-cardinality item_master
+    column (booleans, status, country_of_origin, ...); compliance_status
+    is indexed per certification token, like the ``LIKE '%ROHS%'`` tests
+    in Pattern 10
+  - one transitive-closure bitmap per assembly: every item below it in the
+    active structure, built once bottom-up by OR-ing the children's
+    closures (cyclic sub-structures are collapsed to one node first)
+
+An exposure check over every assembly is then one AND plus a popcount per
+closure row. Conditions are strings:
+
+    is_obsolete                    boolean column is TRUE
+    status=OBSOLETE|INACTIVE       any of the values
+    not compliance_status=ROHS     negation (also ``compliance_status!=ROHS``)
+    non_compliant                  a named check from CHECKS
+
+and a list of conditions matches when any (default) or all of them do.
+"""
+
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .graph import BomGraph
+
+MAX_VALUES = 64  # Columns with more distinct values are not indexed
+TOKENIZED_COLUMNS = ("compliance_status",)
+SAMPLE_PARTS = 5
+
+# Named checks: (conditions, match_all), after Patterns 6, 9 and 10
+CHECKS: Dict[str, Tuple[Tuple[str, ...], bool]] = {
+    "obsolete": (("is_obsolete", "status=DISCONTINUED"), False),
+    "npi": (("is_npi",), False),
+    "non_compliant": (("not compliance_status=ROHS", "not compliance_status=REACH"), True),
+}
+
+_TOKEN = re.compile(r"[^A-Za-z0-9.]+")
+_CONDITION = re.compile(r"^\s*(?:(not)\s+)?(\w+)\s*(?:(!?=)\s*(.+?))?\s*$", re.IGNORECASE)
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """Set bits per bitmap (along the last axis) of uint64 words."""
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    return _BYTE_POPCOUNT[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def first_set_bits(bitmap: np.ndarray, limit: int) -> List[int]:
+    """The ``limit`` lowest ids set in ``bitmap``, without unpacking all of it."""
+    ids: List[int] = []
+    for w in np.flatnonzero(bitmap).tolist():
+        bits = int(bitmap[w])
+        while bits and len(ids) < limit:
+            low = bits & -bits
+            ids.append(w * 64 + low.bit_length() - 1)
+            bits ^= low
+        if len(ids) >= limit:
+            break
+    return ids
+
+
+class ExposureIndex:
+    """Attribute bitmaps over item_master plus closure bitmaps over a BomGraph."""
+
+    def __init__(self, graph: BomGraph, item_master: pd.DataFrame, edge_mask: Optional[np.ndarray] = None):
+        self.graph = graph
+        self.edge_mask = graph.edge_filter() if edge_mask is None else edge_mask
+        self.num_words = (graph.num_items + 63) // 64
+
+        master = item_master.drop_duplicates("item_number").set_index("item_number").reindex(graph.items)
+        listed = set(item_master["item_number"].astype(str))
+        self.known = self.pack(np.fromiter((i in listed for i in graph.items), dtype=bool, count=graph.num_items))
+        description = master.get("item_description", pd.Series(None, index=master.index, dtype=object))
+        self.description = description.astype(object).where(description.notna(), None).to_numpy()
+        self.bitmaps: Dict[str, Dict[str, np.ndarray]] = {}
+        self.attributes: Dict[str, np.ndarray] = {}
+        for column in master.columns:
+            self._index_column(column, master[column])
+
+        self.top_level, self.closure, self.row_of = self._build_closure()
+
+    # ------------------------------------------------------------------
+    # Bitmaps
+    # ------------------------------------------------------------------
+    def pack(self, flags: np.ndarray) -> np.ndarray:
+        """Bitmap (uint64 words) of a boolean array over item ids."""
+        packed = np.packbits(np.asarray(flags, dtype=bool), bitorder="little")
+        words = np.zeros(self.num_words * 8, dtype=np.uint8)
+        words[:len(packed)] = packed
+        return words.view(np.uint64)
+
+    def unpack(self, bitmap: np.ndarray) -> np.ndarray:
+        """Item ids set in ``bitmap``."""
+        flags = np.unpackbits(bitmap.view(np.uint8), bitorder="little")[:self.graph.num_items]
+        return np.flatnonzero(flags)
+
+    def _index_column(self, column: str, values: pd.Series) -> None:
+        if pd.api.types.is_bool_dtype(values):
+            flags = values.fillna(False).to_numpy(dtype=bool)
+            self.bitmaps[column] = {"TRUE": self.pack(flags), "FALSE": self.pack(~flags & values.notna().to_numpy())}
+            self.attributes[column] = values.astype(object).where(values.notna(), None).to_numpy()
+            return
+        if not (pd.api.types.is_string_dtype(values) or pd.api.types.is_object_dtype(values)):
+            return
+        distinct = values.dropna().unique()
+        tokenized = column in TOKENIZED_COLUMNS
+        if tokenized:
+            distinct = {t for v in distinct for t in _TOKEN.split(str(v)) if t}
+        if len(distinct) > MAX_VALUES:
+            return
+        distinct = sorted({str(v).upper() for v in distinct})
+        upper = values.astype("string").str.upper()
+        if tokenized:
+            # Space-delimited token lists, so "ROHS" matches "CE, ROHS" but not "NON-ROHSX"
+            upper = " " + upper.str.replace(_TOKEN.pattern, " ", regex=True) + " "
+            contains = [upper.str.contains(f" {t} ", regex=False) for t in distinct]
+        else:
+            contains = [upper == v for v in distinct]
+        self.bitmaps[column] = {v: self.pack(flags.fillna(False).to_numpy(dtype=bool))
+                                for v, flags in zip(distinct, contains)}
+        self.attributes[column] = values.astype(object).where(values.notna(), None).to_numpy()
+
+    def condition(self, condition: str) -> np.ndarray:
+        """Bitmap of the items matching one condition string (see module docstring)."""
+        match = _CONDITION.match(condition or "")
+        if not match:
+            raise ValueError(f"Invalid condition {condition!r}; use 'column', 'column=value' or 'not column=value'")
+        negate, name, op, value = match.groups()
+        name = name.lower()
+        if op is None and name in CHECKS:
+            conditions, match_all = CHECKS[name]
+            bitmap = self.select(self._indexed(conditions), match_all)
+        else:
+            values = self.bitmaps.get(name)
+            if values is None:
+                raise ValueError(f"Unknown condition {name!r}; named checks: {', '.join(CHECKS)}; "
+                                 f"indexed columns: {', '.join(sorted(self.bitmaps))}")
+            if op is None:
+                if "TRUE" not in values or len(values) != 2:
+                    raise ValueError(f"{name} is not a boolean column; use {name}=<value>")
+                wanted = ["TRUE"]
+            else:
+                wanted = [v.strip().upper() for v in value.split("|") if v.strip()]
+            bitmap = np.zeros(self.num_words, dtype=np.uint64)
+            for v in wanted:
+                if v in values:  # unknown values match nothing
+                    bitmap |= values[v]
+        if bool(negate) != (op == "!="):
+            bitmap = self.known & ~bitmap  # items without item_master attributes never match
+        return bitmap
+
+    def _indexed(self, conditions: Sequence[str]) -> List[str]:
+        """Conditions of a named check on columns this item_master has."""
+        return [c for c in conditions if _CONDITION.match(c).group(2) in self.bitmaps]
+
+    def available_checks(self) -> List[str]:
+        return [name for name, (conditions, _) in CHECKS.items() if self._indexed(conditions)]
+
+    def select(self, conditions: Sequence[str], match_all: bool = False) -> np.ndarray:
+        """Bitmap of items matching any (or, with ``match_all``, every) condition."""
+        if isinstance(conditions, str):
+            conditions = [conditions]
+        if not conditions:
+            raise ValueError("At least one condition is required")
+        bitmaps = [self.condition(c) for c in conditions]
+        return np.bitwise_and.reduce(bitmaps) if match_all else np.bitwise_or.reduce(bitmaps)
+
+    # ------------------------------------------------------------------
+    # Transitive closure
+    # ------------------------------------------------------------------
+    def _build_closure(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        graph, mask = self.graph, self.edge_mask
+        n = graph.num_items
+        comp = np.arange(n, dtype=np.int64)
+        cyclic = np.zeros(n, dtype=bool)
+        parents, children, offsets, order = _condense(graph, mask, comp)
+        if len(order) < n:
+            # Collapse each cycle to its smallest member id, then order again
+            for cycle in graph.find_cycles(mask):
+                members = np.array([graph.item_id(i) for i in cycle], dtype=np.int64)
+                comp[members] = members.min()
+                cyclic[members] = True
+            parents, children, offsets, order = _condense(graph, mask, comp)
+
+        reps = np.flatnonzero((np.diff(offsets) > 0) | (cyclic & (comp == np.arange(n))))
+        row_of = np.full(n, -1, dtype=np.int64)
+        row_of[reps] = np.arange(len(reps))
+        closure = np.zeros((len(reps), self.num_words), dtype=np.uint64)
+        for rep in order[::-1]:
+            row = row_of[rep]
+            if row < 0:
+                continue
+            words = closure[row]
+            kids = children[offsets[rep]:offsets[rep + 1]]
+            np.bitwise_or.at(words, kids >> 6, np.left_shift(np.uint64(1), (kids & 63).astype(np.uint64)))
+            below = row_of[kids]
+            below = below[below >= 0]
+            if len(below):
+                words |= np.bitwise_or.reduce(closure[below], axis=0)
+            if cyclic[rep]:
+                words |= self.pack(comp == rep)
+        members = np.flatnonzero(row_of[comp] >= 0)
+        row_of[members] = row_of[comp[members]]
+
+        has_parent = np.bincount(graph.child[mask], minlength=n) > 0
+        has_children = np.bincount(graph.parent[mask], minlength=n) > 0
+        return np.flatnonzero(has_children & ~has_parent), closure, row_of
+
+    def closure_of(self, item_number: str) -> np.ndarray:
+        """Bitmap of every item below ``item_number`` (empty for a leaf)."""
+        row = self.row_of[self.graph.item_id(item_number)]
+        return self.closure[row] if row >= 0 else np.zeros(self.num_words, dtype=np.uint64)
+
+    def _assemblies(self, item_numbers: Optional[Sequence[str]], top_level_only: bool) -> np.ndarray:
+        if item_numbers:
+            return np.array([self.graph.item_id(i) for i in item_numbers], dtype=np.int64)
+        return self.top_level if top_level_only else np.flatnonzero(self.row_of >= 0)
+
+    def _counts(self, ids: np.ndarray, bitmap: Optional[np.ndarray]) -> np.ndarray:
+        rows = self.row_of[ids]
+        counts = np.zeros(len(ids), dtype=np.int64)
+        has = rows >= 0
+        closure = self.closure[rows[has]]
+        counts[has] = popcount(closure if bitmap is None else closure & bitmap)
+        return counts
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def exposed_assemblies(self, conditions: Sequence[str], match_all: bool = False,
+                           top_level_only: bool = True,
+                           item_numbers: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Assemblies whose structure contains a matching part, most exposed first.
+
+        Defaults to the top-level products of the active structure;
+        ``item_numbers`` checks a given list of assemblies instead.
+        """
+        bitmap = self.select(conditions, match_all)
+        ids = self._assemblies(item_numbers, top_level_only)
+        exposed = self._counts(ids, bitmap)
+        hit = exposed > 0
+        ids, exposed, total = ids[hit], exposed[hit], self._counts(ids[hit], None)
+        rows = []
+        for i in np.lexsort((ids, -exposed)):
+            item = int(ids[i])
+            sample = first_set_bits(self.closure[self.row_of[item]] & bitmap, SAMPLE_PARTS)
+            rows.append({
+                "item_number": str(self.graph.items[item]),
+                "item_description": self.description[item],
+                "exposed_parts": int(exposed[i]),
+                "total_parts": int(total[i]),
+                "exposed_share": round(float(exposed[i]) / float(total[i]), 4),
+                "sample_parts": ", ".join(str(self.graph.items[p]) for p in sample),
+            })
+        return rows
+
+    def exposed_parts(self, item_number: str, conditions: Sequence[str], match_all: bool = False) -> List[Dict]:
+        """Matching parts anywhere below ``item_number``, with their indexed attributes."""
+        ids = self.unpack(self.closure_of(item_number) & self.select(conditions, match_all))
+        columns = [c for c in ("status", "is_obsolete", "is_npi", "compliance_status", "country_of_origin")
+                   if c in self.attributes]
+        rows = []
+        for item in ids:
+            row = {"component_item_number": str(self.graph.items[item]),
+                   "item_description": self.description[item]}
+            row.update({c: _plain(self.attributes[c][item]) for c in columns})
+            rows.append(row)
+        return rows
+
+    def audit(self, checks: Optional[Dict[str, Sequence[str]]] = None, top_level_only: bool = True,
+              item_numbers: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Exposed-part counts of every assembly for several checks at once.
+
+        ``checks`` maps a column label to its conditions (matched with
+        "any"); the default runs every named check item_master supports.
+        """
+        if checks is None:
+            checks = {name: [name] for name in self.available_checks()}
+        ids = self._assemblies(item_numbers, top_level_only)
+        counts = {name: self._counts(ids, self.select(conditions)) for name, conditions in checks.items()}
+        total = self._counts(ids, None)
+        rows = []
+        for i, item in enumerate(ids):
+            row = {"item_number": str(self.graph.items[item]),
+                   "item_description": self.description[item],
+                   "total_parts": int(total[i])}
+            row.update({f"{name}_parts": int(c[i]) for name, c in counts.items()})
+            rows.append(row)
+        return rows
+
+    def stats(self) -> Dict:
+        return {
+            "items": self.graph.num_items,
+            "closure_rows": len(self.closure),
+            "top_level_assemblies": len(self.top_level),
+            "indexed_columns": sorted(self.bitmaps),
+            "attribute_bitmaps": sum(len(v) for v in self.bitmaps.values()),
+            "closure_bytes": int(self.closure.nbytes),
+        }
+
+
+def _condense(graph: BomGraph, mask: np.ndarray, comp: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Distinct (parent, child) pairs between components, their CSR offsets and a Kahn order.
+
+    The order holds the component ids (``comp[i] == i``) parents first;
+    it is short of them when the condensed structure is still cyclic.
+    """
+    n = len(comp)
+    parents, children = comp[graph.parent[mask]], comp[graph.child[mask]]
+    keep = parents != children
+    pairs = np.unique(np.stack([parents[keep], children[keep]], axis=1), axis=0).reshape(-1, 2)
+    parents, children = pairs[:, 0], pairs[:, 1]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(parents, minlength=n), out=offsets[1:])
+    indegree = np.bincount(children, minlength=n)
+    queue = [int(i) for i in np.flatnonzero((comp == np.arange(n)) & (indegree == 0))]
+    order = []
+    while queue:
+        item = queue.pop()
+        order.append(item)
+        for c in children[offsets[item]:offsets[item + 1]].tolist():
+            indegree[c] -= 1
+            if indegree[c] == 0:
+                queue.append(c)
+    return parents, children, offsets, np.asarray(order, dtype=np.int64)
+
+
+def _plain(value):
+    return value.item() if isinstance(value, np.generic) else value
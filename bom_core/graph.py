@@ -0,0 +1,364 @@
+"""
+In-memory BOM graph: multi-level explosion and where-used without recursive SQL.
+
+bom_details is loaded once into compact arrays:
+  - item numbers are interned to int32 ids (``items[id]`` → item_number)
+  - edges are sorted by parent so children of ``p`` are the CSR slice
+    ``child_offsets[p]:child_offsets[p + 1]`` of the edge arrays
+  - a second CSR (``parent_offsets`` / ``parent_edges``) indexes the same
+    edges by component for where-used traversal
+  - effective/expiration dates are int32 day numbers (NO_DATE for NULL)
+
+Traversals accept an optional boolean ``edge_mask`` (one flag per edge) so
+callers can restrict the structure to active lines, a point in time, etc.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import dataset
+
+NO_DATE = np.iinfo(np.int32).min  # NULL effective/expiration date
+MAX_LEVELS = 10  # Same guard as Pattern 3 in query_patterns_documentation.md
+
+# Everything a BomGraph holds besides ``index``; snapshot.py stores these arrays
+GRAPH_ARRAYS = (
+    "items", "parent", "child", "sequence", "quantity", "effective", "expiration", "is_active",
+    "bom_ids", "bom_code", "row_id", "child_offsets", "parent_edges", "parent_offsets",
+)
+
+
+class BomCycleError(ValueError):
+    """Raised when an operation needs an acyclic structure but finds a cycle."""
+
+    def __init__(self, cycle: List[str]):
+        super().__init__("BOM cycle detected: " + " > ".join(cycle))
+        self.cycle = cycle
+
+
+def _to_days(values: pd.Series) -> np.ndarray:
+    days = values.astype("datetime64[s]").to_numpy().astype("datetime64[D]")
+    out = days.astype(np.int64)
+    out[np.isnat(days)] = NO_DATE
+    return out.astype(np.int32)
+
+
+def _bool_array(values: pd.Series) -> np.ndarray:
+    return values.astype("boolean").fillna(False).to_numpy(dtype=bool)
+
+
+def _csr(keys: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (order, offsets) grouping positions of ``keys`` by key value."""
+    order = np.argsort(keys, kind="stable")
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=offsets[1:])
+    return order, offsets
+
+
+class BomGraph:
+    """Compact adjacency representation of bom_details."""
+
+    def __init__(self, bom_details: pd.DataFrame):
+        parents = bom_details["parent_item_number"].astype(str).to_numpy()
+        children = bom_details["component_item_number"].astype(str).to_numpy()
+        self.items = np.unique(np.concatenate([parents, children]))
+        self.index: Dict[str, int] = {item: i for i, item in enumerate(self.items)}
+        n = len(self.items)
+
+        parent_ids = np.searchsorted(self.items, parents).astype(np.int32)
+        child_ids = np.searchsorted(self.items, children).astype(np.int32)
+        sequence = pd.to_numeric(bom_details["sequence_number"], errors="coerce").fillna(0).to_numpy()
+
+        # Edge order: by parent, then assembly sequence
+        order = np.lexsort((sequence, parent_ids))
+        self.parent = parent_ids[order]
+        self.child = child_ids[order]
+        self.sequence = sequence[order].astype(np.int64)
+        self.quantity = pd.to_numeric(bom_details["quantity"], errors="coerce").fillna(0).to_numpy(dtype=np.float64)[order]
+        self.effective = _to_days(bom_details["effective_date"])[order]
+        self.expiration = _to_days(bom_details["expiration_date"])[order]
+        self.is_active = _bool_array(bom_details["is_active"])[order]
+        self.bom_ids, bom_codes = np.unique(bom_details["bom_id"].astype(str).to_numpy(), return_inverse=True)
+        self.bom_code = bom_codes.astype(np.int32)[order]
+        # Row position of each edge in the source frame (see edge_column)
+        self.row_id = order.astype(np.int64)
+
+        _, self.child_offsets = _csr(self.parent, n)
+        self.parent_edges, self.parent_offsets = _csr(self.child, n)
+
+    # ------------------------------------------------------------------
+    # Construction helpers
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_csv(cls, csv_path: Optional[str] = None) -> "BomGraph":
+        return cls(dataset.load_bom_details(csv_path))
+
+    @classmethod
+    def from_snapshot(cls, snapshot) -> "BomGraph":
+        """Graph over the arrays of a snapshot.BomSnapshot (or its path), without copying them.
+
+        The arrays are read-only views of the memory-mapped file.
+        """
+        if isinstance(snapshot, str):
+            from .snapshot import BomSnapshot
+
+            snapshot = BomSnapshot(snapshot)
+        graph = cls.__new__(cls)
+        for name in GRAPH_ARRAYS:
+            setattr(graph, name, snapshot.graph_array(name))
+        graph.index = {item: i for i, item in enumerate(graph.items.tolist())}
+        return graph
+
+    @property
+    def num_items(self) -> int:
+        return len(self.items)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.parent)
+
+    def item_id(self, item_number: str) -> int:
+        try:
+            return self.index[item_number]
+        except KeyError:
+            raise KeyError(f"Item {item_number!r} does not appear in bom_details") from None
+
+    def edge_column(self, values) -> np.ndarray:
+        """Align a bom_details column (frame row order) to edge order."""
+        return np.asarray(values)[self.row_id]
+
+    def edge_filter(self, active_only: bool = True) -> np.ndarray:
+        """Boolean mask over edges; all True unless active_only."""
+        if active_only:
+            return self.is_active.copy()
+        return np.ones(self.num_edges, dtype=bool)
+
+    def child_edges(self, item: int, edge_mask: Optional[np.ndarray] = None) -> np.ndarray:
+        edges = np.arange(self.child_offsets[item], self.child_offsets[item + 1])
+        return edges if edge_mask is None else edges[edge_mask[edges]]
+
+    def parent_edges_of(self, item: int, edge_mask: Optional[np.ndarray] = None) -> np.ndarray:
+        edges = self.parent_edges[self.parent_offsets[item]:self.parent_offsets[item + 1]]
+        return edges if edge_mask is None else edges[edge_mask[edges]]
+
+    def _edge_row(self, e: int) -> Dict:
+        return {
+            "bom_id": str(self.bom_ids[self.bom_code[e]]),
+            "parent_item_number": str(self.items[self.parent[e]]),
+            "component_item_number": str(self.items[self.child[e]]),
+            "quantity": float(self.quantity[e]),
+            "sequence_number": int(self.sequence[e]),
+            "is_active": bool(self.is_active[e]),
+        }
+
+    # ------------------------------------------------------------------
+    # Explosion (Pattern 3) and where-used (WHERE_USED_001)
+    # ------------------------------------------------------------------
+    def explode(
+        self,
+        item_number: str,
+        max_levels: int = MAX_LEVELS,
+        edge_mask: Optional[np.ndarray] = None,
+    ) -> Tuple[List[Dict], List[List[str]]]:
+        """Indented multi-level BOM under ``item_number``.
+
+        Returns (rows, cycles). Rows are in depth-first order with the same
+        columns as Pattern 3 (level 0 = direct children, quantity extended
+        along the path). A component that re-enters its own path is reported
+        in ``cycles`` and not expanded further.
+        """
+        if edge_mask is None:
+            edge_mask = self.edge_filter()
+        top = self.item_id(item_number)
+        rows: List[Dict] = []
+        cycles: List[List[str]] = []
+        # Stack entries: (edge, level, parent extended qty, path of item ids)
+        stack = [(e, 0, 1.0, (top,)) for e in self.child_edges(top, edge_mask)[::-1]]
+        while stack:
+            e, level, parent_qty, path = stack.pop()
+            child = int(self.child[e])
+            ext_qty = parent_qty * float(self.quantity[e])
+            row = self._edge_row(e)
+            row.update({
+                "level": level,
+                "extended_quantity": ext_qty,
+                "structure_path": " > ".join(str(self.items[i]) for i in path),
+            })
+            rows.append(row)
+            if child in path:
+                cycles.append([str(self.items[i]) for i in path + (child,)])
+                continue
+            if level + 1 >= max_levels:
+                continue
+            next_path = path + (child,)
+            for ce in self.child_edges(child, edge_mask)[::-1]:
+                stack.append((ce, level + 1, ext_qty, next_path))
+        return rows, cycles
+
+    def where_used(
+        self,
+        component_item_number: str,
+        max_levels: int = MAX_LEVELS,
+        edge_mask: Optional[np.ndarray] = None,
+    ) -> List[Dict]:
+        """Implosion: every assembly that uses the component, level by level.
+
+        Each parent is expanded once (breadth-first), so shared
+        sub-assemblies and cycles cannot blow up the traversal. Rows carry
+        ``is_top_level`` when the parent is not itself used anywhere.
+        """
+        if edge_mask is None:
+            edge_mask = self.edge_filter()
+        start = self.item_id(component_item_number)
+        rows: List[Dict] = []
+        seen = {start}
+        frontier = [start]
+        level = 0
+        while frontier and level < max_levels:
+            next_frontier = []
+            for item in frontier:
+                for e in self.parent_edges_of(item, edge_mask):
+                    parent = int(self.parent[e])
+                    row = self._edge_row(e)
+                    row["level"] = level
+                    row["is_top_level"] = len(self.parent_edges_of(parent, edge_mask)) == 0
+                    rows.append(row)
+                    if parent not in seen:
+                        seen.add(parent)
+                        next_frontier.append(parent)
+            frontier = next_frontier
+            level += 1
+        return rows
+
+    def descendants(self, item_number: str, edge_mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Item ids reachable below ``item_number`` (excluding itself unless cyclic)."""
+        return self._reach(self.item_id(item_number), edge_mask, downward=True)
+
+    def ancestors(self, item_number: str, edge_mask: Optional[np.ndarray] = None) -> np.ndarray:
+        """Item ids that transitively use ``item_number``."""
+        return self._reach(self.item_id(item_number), edge_mask, downward=False)
+
+    def _reach(self, start: int, edge_mask: Optional[np.ndarray], downward: bool) -> np.ndarray:
+        if edge_mask is None:
+            edge_mask = self.edge_filter()
+        seen = np.zeros(self.num_items, dtype=bool)
+        frontier = np.array([start], dtype=np.int64)
+        while len(frontier):
+            nxt = []
+            for item in frontier:
+                if downward:
+                    nxt.append(self.child[self.child_edges(item, edge_mask)])
+                else:
+                    nxt.append(self.parent[self.parent_edges_of(item, edge_mask)])
+            frontier = np.unique(np.concatenate(nxt)) if nxt else np.array([], dtype=np.int64)
+            frontier = frontier[~seen[frontier]]
+            seen[frontier] = True
+        return np.flatnonzero(seen)
+
+    # ------------------------------------------------------------------
+    # Quantity-extended flattening
+    # ------------------------------------------------------------------
+    def topological_order(self, edge_mask: Optional[np.ndarray] = None, nodes: Optional[Iterable[int]] = None) -> np.ndarray:
+        """Kahn order (parents before children) of ``nodes`` (default: all).
+
+        Raises BomCycleError if the selected sub-structure is cyclic.
+        """
+        if edge_mask is None:
+            edge_mask = self.edge_filter()
+        in_set = np.ones(self.num_items, dtype=bool)
+        if nodes is not None:
+            in_set[:] = False
+            in_set[np.fromiter(nodes, dtype=np.int64)] = True
+        live = edge_mask & in_set[self.parent] & in_set[self.child]
+        indegree = np.bincount(self.child[live], minlength=self.num_items)
+        queue = [int(i) for i in np.flatnonzero(in_set & (indegree == 0))]
+        order = []
+        while queue:
+            item = queue.pop()
+            order.append(item)
+            for e in self.child_edges(item, live):
+                c = int(self.child[e])
+                indegree[c] -= 1
+                if indegree[c] == 0:
+                    queue.append(c)
+        if len(order) != int(in_set.sum()):
+            cycles = self.find_cycles(live)
+            raise BomCycleError(cycles[0] if cycles else [])
+        return np.asarray(order, dtype=np.int64)
+
+    def flatten(self, item_number: str, edge_mask: Optional[np.ndarray] = None) -> Dict[str, float]:
+        """Total quantity of every descendant needed per one ``item_number``.
+
+        Quantities are summed over all paths (a part used in two
+        sub-assemblies counts twice). Raises BomCycleError on cycles.
+        """
+        if edge_mask is None:
+            edge_mask = self.edge_filter()
+        top = self.item_id(item_number)
+        nodes = np.union1d(self.descendants(item_number, edge_mask), [top])
+        order = self.topological_order(edge_mask, nodes)
+        required = np.zeros(self.num_items, dtype=np.float64)
+        required[top] = 1.0
+        for item in order:
+            edges = self.child_edges(item, edge_mask)
+            if len(edges) and required[item]:
+                np.add.at(required, self.child[edges], required[item] * self.quantity[edges])
+        required[top] = 0.0
+        return {str(self.items[i]): float(required[i]) for i in np.flatnonzero(required)}
+
+    # ------------------------------------------------------------------
+    # Cycle detection
+    # ------------------------------------------------------------------
+    def find_cycles(self, edge_mask: Optional[np.ndarray] = None) -> List[List[str]]:
+        """Strongly connected components that contain a cycle (Tarjan, iterative)."""
+        if edge_mask is None:
+            edge_mask = self.edge_filter()
+        n = self.num_items
+        index = np.full(n, -1, dtype=np.int64)
+        low = np.zeros(n, dtype=np.int64)
+        on_stack = np.zeros(n, dtype=bool)
+        stack: List[int] = []
+        cycles: List[List[str]] = []
+        counter = 0
+        for root in range(n):
+            if index[root] != -1:
+                continue
+            work = [(root, iter(self.child[self.child_edges(root, edge_mask)]))]
+            index[root] = low[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+            while work:
+                node, children = work[-1]
+                advanced = False
+                for c in children:
+                    c = int(c)
+                    if index[c] == -1:
+                        index[c] = low[c] = counter
+                        counter += 1
+                        stack.append(c)
+                        on_stack[c] = True
+                        work.append((c, iter(self.child[self.child_edges(c, edge_mask)])))
+                        advanced = True
+                        break
+                    if on_stack[c]:
+                        low[node] = min(low[node], index[c])
+                if advanced:
+                    continue
+                work.pop()
+                if work:
+                    low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    self_loop = node in self.child[self.child_edges(node, edge_mask)]
+                    if len(component) > 1 or self_loop:
+                        cycles.append(sorted(str(self.items[i]) for i in component))
+        return cycles
@@ -0,0 +1,296 @@
+"""
+Streaming CSV → Parquet → warehouse load pipeline for the BOM extracts.
+
+Each table goes through bounded-memory stages:
+
+  read      pd.read_csv(chunksize=...) as strings
+  validate  header and values checked against create_bom_schema.sql
+  convert   schema-typed Arrow record batches
+  write     appended as row groups to a temporary Parquet file
+  load      handed to a sink (BigQuery load job, or a local directory)
+
+Tables run concurrently; every stage is timed per table. Sinks only need a
+``load(table_name, parquet_path) -> rows`` method, so tests and offline runs
+use LocalSink instead of BigQuery.
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from google.cloud import bigquery
+
+from . import config
+from .dataset import _CSV_FILES, coerce_to_schema
+from .schema import TableSchema, get_table
+
+DEFAULT_CHUNK_ROWS = 100_000
+DEFAULT_MAX_WORKERS = 4
+MAX_REPORTED_ERRORS = 20
+
+# BigQuery reads Parquet DECIMAL(38, 9) as NUMERIC
+_ARROW_TYPES = {
+    "STRING": pa.string(),
+    "INT64": pa.int64(),
+    "NUMERIC": pa.decimal128(38, 9),
+    "FLOAT64": pa.float64(),
+    "BOOL": pa.bool_(),
+    "DATE": pa.date32(),
+}
+
+
+class CsvValidationError(ValueError):
+    """A CSV extract does not match the table schema."""
+
+    def __init__(self, table: str, errors: List[str]):
+        self.table = table
+        self.errors = errors
+        super().__init__(f"{table}: {len(errors)} validation error(s): " + "; ".join(errors[:5]))
+
+
+def arrow_schema(table: TableSchema) -> pa.Schema:
+    return pa.schema([(column, _ARROW_TYPES[bq_type]) for column, bq_type in table.columns])
+
+
+@dataclass
+class LoadReport:
+    table: str
+    source: str
+    rows: int = 0
+    rejected_rows: int = 0
+    chunks: int = 0
+    parquet_bytes: int = 0
+    loaded_rows: Optional[int] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+
+# -------------------------------------------------------------------
+# Stages
+# -------------------------------------------------------------------
+def iter_csv_chunks(path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Raw string frames of at most chunk_rows rows."""
+    yield from pd.read_csv(path, dtype=str, keep_default_na=False, na_values=[""], chunksize=chunk_rows)
+
+
+def check_header(columns: List[str], table: TableSchema) -> List[str]:
+    expected = table.column_names
+    errors = []
+    missing = [c for c in expected if c not in columns]
+    extra = [c for c in columns if c not in expected]
+    if missing:
+        errors.append(f"missing columns {missing}")
+    if extra:
+        errors.append(f"unexpected columns {extra}")
+    return errors
+
+
+def validate_chunk(
+    raw: pd.DataFrame, table: TableSchema, row_offset: int = 0
+) -> Tuple[pd.DataFrame, pd.Series, List[str]]:
+    """Coerce one chunk; returns (typed frame, bad-row mask, error messages).
+
+    A row is bad when a non-empty value fails to parse as its BigQuery type
+    or a natural-key column is empty.
+    """
+    typed = coerce_to_schema(raw, table)
+    bad = pd.Series(False, index=raw.index)
+    errors: List[str] = []
+    for column, bq_type in table.columns:
+        if bq_type == "STRING":
+            failed = pd.Series(False, index=raw.index)
+        else:
+            failed = raw[column].notna() & typed[column].isna()
+        if column in table.natural_key:
+            failed = failed | raw[column].isna()
+        if failed.any():
+            bad |= failed
+            for pos in failed[failed].index[: MAX_REPORTED_ERRORS - len(errors)]:
+                # +2: header line and 1-based line numbers
+                errors.append(f"line {row_offset + pos + 2}: {column}={raw.at[pos, column]!r} is not a valid {bq_type}")
+    return typed, bad, errors
+
+
+def to_record_batch(typed: pd.DataFrame, schema: pa.Schema) -> pa.RecordBatch:
+    arrays = []
+    for f in schema:
+        values = typed[f.name]
+        if pa.types.is_date32(f.type):
+            array = pa.array(values.dt.date, type=f.type, from_pandas=True)
+        else:
+            array = pa.array(values, from_pandas=True).cast(f.type)
+        # Concatenated string columns can come back chunked
+        arrays.append(array.combine_chunks() if isinstance(array, pa.ChunkedArray) else array)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def csv_to_parquet(
+    csv_path: str,
+    table: TableSchema,
+    parquet_path: str,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    on_error: str = "raise",
+    report: Optional[LoadReport] = None,
+) -> LoadReport:
+    """Stream a CSV into a typed Parquet file, one row group per chunk.
+
+    ``on_error="raise"`` fails on the first chunk with invalid values;
+    ``"skip"`` drops invalid rows and counts them in ``rejected_rows``.
+    """
+    report = report or LoadReport(table=table.name, source=csv_path)
+    schema = arrow_schema(table)
+    errors: List[str] = []
+    offset = 0
+    chunks = iter_csv_chunks(csv_path, chunk_rows)
+    with pq.ParquetWriter(parquet_path, schema) as writer:
+        while True:
+            t0 = time.perf_counter()
+            raw = next(chunks, None)
+            report.add_time("read", time.perf_counter() - t0)
+            if raw is None:
+                break
+            t0 = time.perf_counter()
+            if report.chunks == 0:
+                header_errors = check_header(list(raw.columns), table)
+                if header_errors:
+                    raise CsvValidationError(table.name, header_errors)
+            raw = raw.reset_index(drop=True)
+            typed, bad, chunk_errors = validate_chunk(raw, table, offset)
+            report.add_time("validate", time.perf_counter() - t0)
+            if chunk_errors:
+                errors.extend(chunk_errors[: MAX_REPORTED_ERRORS - len(errors)])
+                if on_error == "raise":
+                    raise CsvValidationError(table.name, errors)
+                typed = typed[~bad]
+                report.rejected_rows += int(bad.sum())
+
+            t0 = time.perf_counter()
+            batch = to_record_batch(typed.reset_index(drop=True), schema)
+            report.add_time("convert", time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            writer.write_batch(batch)
+            report.add_time("write", time.perf_counter() - t0)
+
+            offset += len(raw)
+            report.rows += batch.num_rows
+            report.chunks += 1
+    report.parquet_bytes = os.path.getsize(parquet_path)
+    return report
+
+
+# -------------------------------------------------------------------
+# Sinks
+# -------------------------------------------------------------------
+class BigQuerySink:
+    """Loads Parquet files into existing BigQuery tables (schema from the DDL)."""
+
+    def __init__(self, client, project: str, dataset: str, location: Optional[str] = None,
+                 write_disposition: str = "WRITE_TRUNCATE"):
+        self.client = client
+        self.project = project
+        self.dataset = dataset
+        self.location = location or config.bq_location()
+        self.write_disposition = write_disposition
+
+    def table_id(self, table_name: str) -> str:
+        return f"{self.project}.{self.dataset}.{table_name}"
+
+    def load(self, table_name: str, parquet_path: str) -> int:
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=self.write_disposition,
+            create_disposition=bigquery.CreateDisposition.CREATE_NEVER,
+        )
+        with open(parquet_path, "rb") as f:
+            job = self.client.load_table_from_file(
+                f, self.table_id(table_name), job_config=job_config, location=self.location
+            )
+        job.result()
+        return job.output_rows
+
+
+class LocalSink:
+    """Keeps the typed Parquet files in a directory (<table>.parquet)."""
+
+    def __init__(self, out_dir: str):
+        self.out_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+
+    def path(self, table_name: str) -> str:
+        return os.path.join(self.out_dir, f"{table_name}.parquet")
+
+    def load(self, table_name: str, parquet_path: str) -> int:
+        target = self.path(table_name)
+        shutil.copyfile(parquet_path, target)
+        return pq.ParquetFile(target).metadata.num_rows
+
+
+# -------------------------------------------------------------------
+# Pipeline
+# -------------------------------------------------------------------
+def default_sources(data_dir: Optional[str] = None) -> Dict[str, str]:
+    """{table_name: csv_path} for the standard extracts."""
+    base = data_dir or config.data_dir()
+    return {name: os.path.join(base, file_name) for name, file_name in _CSV_FILES.items()}
+
+
+def load_one(
+    table_name: str,
+    csv_path: str,
+    sink,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    on_error: str = "raise",
+    work_dir: Optional[str] = None,
+) -> LoadReport:
+    report = LoadReport(table=table_name, source=csv_path)
+    started = time.perf_counter()
+    tmp_dir = tempfile.mkdtemp(prefix=f"bom_load_{table_name}_", dir=work_dir)
+    try:
+        parquet_path = os.path.join(tmp_dir, f"{table_name}.parquet")
+        csv_to_parquet(csv_path, get_table(table_name), parquet_path, chunk_rows, on_error, report)
+        t0 = time.perf_counter()
+        report.loaded_rows = sink.load(table_name, parquet_path)
+        report.add_time("load", time.perf_counter() - t0)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    report.timings["total"] = time.perf_counter() - started
+    return report
+
+
+def load_tables(
+    sources: Dict[str, str],
+    sink,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    on_error: str = "raise",
+    work_dir: Optional[str] = None,
+) -> List[LoadReport]:
+    """Run load_one for every {table_name: csv_path} concurrently.
+
+    Raises the first table's exception after all loads have finished.
+    """
+    workers = max(1, min(max_workers, len(sources)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bom-load") as pool:
+        futures = {
+            name: pool.submit(load_one, name, path, sink, chunk_rows, on_error, work_dir)
+            for name, path in sources.items()
+        }
+    reports, first_error = [], None
+    for name, future in futures.items():
+        exc = future.exception()
+        if exc is not None:
+            first_error = first_error or exc
+            continue
+        reports.append(future.result())
+    if first_error is not None:
+        raise first_error
+    return reports
@@ -0,0 +1,543 @@
+"""
+Embedded DuckDB mirror of the BOM dataset for low-latency agent queries.
+
+item_master and bom_details are loaded from the CSV extracts (typed per
+create_bom_schema.sql) into an in-process DuckDB database. BigQuery SQL as
+written by the agents and the documented patterns is translated first:
+
+  `project.dataset.table`     → table     (INFORMATION_SCHEMA → information_schema)
+  @param                      → $param
+  x IN UNNEST(@list)          → x IN (SELECT UNNEST($list))
+  REGEXP_CONTAINS(s, r'...')  → regexp_matches(s, '...')
+  STRING_AGG(... LIMIT n)     → array_to_string(list_slice(list(...), 1, n), ',')
+  DATE_DIFF(a, b, DAY)        → date_diff('day', b, a)
+  DATE_SUB(d, INTERVAL n DAY) → CAST(d - INTERVAL n DAY AS DATE)   (DATE_ADD likewise)
+  DATE_TRUNC(d, MONTH)        → CAST(date_trunc('month', d) AS DATE)
+  FORMAT_DATE(fmt, d)         → strftime(d, fmt)
+  "text" / r'raw' literals    → 'text' / 'raw'
+
+WITH RECURSIVE, CURRENT_DATE(), CAST(... AS STRING/INT64) and STRING_AGG
+run natively.
+
+LocalSqlToolset exposes the BigQueryToolset tool names (execute_sql,
+get_table_info, ...) over the mirror. BQ_BACKEND selects what the agents get:
+
+  bigquery  BigQueryToolset only (default)
+  local     everything answered by the mirror
+  hybrid    execute_sql runs locally when every table it reads is mirrored
+            and small (LOCAL_SQL_MAX_TABLE_ROWS); otherwise on BigQuery.
+            Statements the mirror can't parse or bind (BigQuery functions
+            the translator doesn't cover) are sent on to BigQuery as well.
+"""
+
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.tools.bigquery import BigQueryToolset
+from google.adk.tools.function_tool import FunctionTool
+
+from . import config
+from .query_guard import guard_statement
+from .query_runner import MAX_RESULT_ROWS, ReadOnlyViolation, _json_value, run_sql, stream_sql
+from .query_cache import dataset_version
+from .schema import load_schema
+from .tools import get_dataset
+
+DEFAULT_MAX_TABLE_ROWS = 1_000_000
+
+_DUCKDB_TYPES = {
+    "STRING": "VARCHAR",
+    "INT64": "BIGINT",
+    "NUMERIC": "DECIMAL(38, 9)",
+    "FLOAT64": "DOUBLE",
+    "BOOL": "BOOLEAN",
+    "DATE": "DATE",
+}
+
+# BigQuery functions with a direct DuckDB counterpart
+_RENAMES = {
+    "REGEXP_CONTAINS": "regexp_matches",
+    "SAFE_CAST": "TRY_CAST",
+    "COUNTIF": "count_if",
+    "LOGICAL_OR": "bool_or",
+    "LOGICAL_AND": "bool_and",
+}
+_MACROS = (
+    "CREATE MACRO safe_divide(a, b) AS CASE WHEN b = 0 THEN NULL ELSE a / b END",
+)
+
+_LITERALS = re.compile(
+    r"(?P<str>(?P<prefix>[rRbB]{0,2})(?P<body>'''.*?'''|\"\"\".*?\"\"\"|'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"))"
+    r"|(?P<ident>`[^`]*`)"
+    r"|(?P<comment>--[^\n]*|#[^\n]*|/\*.*?\*/)",
+    re.DOTALL,
+)
+_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+
+
+class SqlTranslationError(ValueError):
+    """The statement uses BigQuery syntax the local engine can't run."""
+
+
+# BigQuery SQL the mirror can't run, as opposed to a statement that fails anywhere
+UNSUPPORTED_LOCALLY = (SqlTranslationError, duckdb.ParserException, duckdb.BinderException, duckdb.CatalogException)
+
+
+# -------------------------------------------------------------------
+# Dialect translation
+# -------------------------------------------------------------------
+def _string_literal(prefix: str, body: str) -> str:
+    quote = 3 if body[:3] in ("'''", '"""') else 1
+    text = body[quote:-quote]
+    if "r" not in prefix.lower():
+        text = re.sub(r"\\(.)", lambda m: {"n": "\n", "t": "\t"}.get(m.group(1), m.group(1)), text)
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _identifier(raw: str, tables: List[str]) -> str:
+    parts = [p for p in raw.strip("`").split(".") if p]
+    if len(parts) >= 2 and parts[-2].upper() == "INFORMATION_SCHEMA":
+        return f"information_schema.{parts[-1].lower()}"
+    if len(parts) >= 2:
+        tables.append(parts[-1])
+        if len(parts) >= 3 or parts[0] == config.dataset_id():
+            return f'"{parts[-1]}"'
+        return ".".join(f'"{p}"' for p in parts)
+    return f'"{parts[0]}"' if parts else '""'
+
+
+def _matching_paren(code: str, open_pos: int) -> int:
+    depth = 0
+    for i in range(open_pos, len(code)):
+        if code[i] == "(":
+            depth += 1
+        elif code[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    raise SqlTranslationError("unbalanced parentheses")
+
+
+def _split_args(inner: str) -> List[str]:
+    args, depth, start = [], 0, 0
+    for i, ch in enumerate(inner):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            args.append(inner[start:i].strip())
+            start = i + 1
+    args.append(inner[start:].strip())
+    return args
+
+
+def _rewrite_calls(code: str, pattern: str, rewrite) -> str:
+    """Replace every ``pattern(`` ... ``)`` call with rewrite(inner_text)."""
+    regex = re.compile(pattern + r"\s*\(", re.IGNORECASE)
+    pos = 0
+    while True:
+        m = regex.search(code, pos)
+        if not m:
+            return code
+        close = _matching_paren(code, m.end() - 1)
+        replacement = rewrite(code[m.end():close])
+        code = code[:m.start()] + replacement + code[close + 1:]
+        pos = m.start() + len(replacement)
+
+
+def _string_agg(inner: str) -> str:
+    m = re.match(r"(?is)^(.*?)\s+LIMIT\s+(\d+)\s*$", inner)
+    if not m:
+        return f"string_agg({inner})"
+    body, limit = m.group(1), m.group(2)
+    order = re.search(r"(?is)\s+(ORDER\s+BY\s+.*)$", body)
+    order_by = order.group(1) if order else ""
+    if order:
+        body = body[:order.start()]
+    args = _split_args(body)
+    sep = args[1] if len(args) > 1 else "','"
+    return f"array_to_string(list_slice(list({args[0]} {order_by}), 1, {limit}), {sep})"
+
+
+def _date_diff(inner: str) -> str:
+    args = _split_args(inner)
+    if len(args) != 3:
+        raise SqlTranslationError("DATE_DIFF expects (end, start, part)")
+    return f"date_diff('{args[2].lower()}', {args[1]}, {args[0]})"
+
+
+def _date_arith(operator: str):
+    def rewrite(inner: str) -> str:
+        args = _split_args(inner)
+        if len(args) != 2 or not re.match(r"(?i)^INTERVAL\b", args[1]):
+            raise SqlTranslationError("DATE_ADD/DATE_SUB expect (date, INTERVAL n part)")
+        return f"CAST(({args[0]}) {operator} {args[1]} AS DATE)"
+
+    return rewrite
+
+
+def _date_trunc(inner: str) -> str:
+    args = _split_args(inner)
+    if len(args) != 2:
+        raise SqlTranslationError("DATE_TRUNC expects (date, part)")
+    part = args[1].upper()
+    if part == "WEEK" or part.startswith("WEEK("):
+        # BigQuery weeks start on Sunday, DuckDB's on Monday
+        raise SqlTranslationError("DATE_TRUNC(..., WEEK) is not supported locally")
+    part = {"ISOWEEK": "week", "ISOYEAR": "isoyear"}.get(part, part.lower())
+    return f"CAST(date_trunc('{part}', {args[0]}) AS DATE)"
+
+
+def _format_date(inner: str) -> str:
+    args = _split_args(inner)
+    if len(args) != 2:
+        raise SqlTranslationError("FORMAT_DATE expects (format, date)")
+    return f"strftime({args[1]}, {args[0]})"
+
+
+def translate_sql(sql: str) -> Tuple[str, List[str], List[str]]:
+    """BigQuery SQL → DuckDB SQL; returns (sql, parameter names, tables read)."""
+    sql = re.sub(r"`\s*\.\s*`", ".", sql)  # `p`.`d`.`t` → `p.d.t`
+    literals: List[str] = []
+    tables: List[str] = []
+    code_parts: List[str] = []
+    pos = 0
+    for m in _LITERALS.finditer(sql):
+        code_parts.append(sql[pos:m.start()])
+        if m.lastgroup == "comment":
+            code_parts.append(" ")
+        elif m.group("ident"):
+            code_parts.append(_identifier(m.group("ident"), tables))
+        else:
+            code_parts.append(f"\x00{len(literals)}\x00")
+            literals.append(_string_literal(m.group("prefix"), m.group("body")))
+        pos = m.end()
+    code_parts.append(sql[pos:])
+    code = "".join(code_parts)
+
+    # Unquoted dataset.table / project.dataset.table after FROM or JOIN
+    bare = re.compile(rf"\b(FROM|JOIN)\s+(?:[\w-]+\.)?{re.escape(config.dataset_id())}\.(\w+)\b", re.IGNORECASE)
+    tables.extend(m.group(2) for m in bare.finditer(code))
+    code = bare.sub(r'\1 "\2"', code)
+
+    params = sorted(set(re.findall(r"(?<!@)@(\w+)", code)))
+    code = re.sub(r"(?<!@)@(\w+)", r"$\1", code)
+    code = _rewrite_calls(code, r"\bIN\s+UNNEST", lambda inner: f"IN (SELECT UNNEST({inner}))")
+    code = _rewrite_calls(code, r"\bSTRING_AGG", _string_agg)
+    code = _rewrite_calls(code, r"\bDATE_DIFF", _date_diff)
+    code = _rewrite_calls(code, r"\bDATE_SUB", _date_arith("-"))
+    code = _rewrite_calls(code, r"\bDATE_ADD", _date_arith("+"))
+    code = _rewrite_calls(code, r"\bDATE_TRUNC", _date_trunc)
+    code = _rewrite_calls(code, r"\bFORMAT_DATE", _format_date)
+    for bq_name, duck_name in _RENAMES.items():
+        code = re.sub(rf"\b{bq_name}\s*\(", f"{duck_name}(", code, flags=re.IGNORECASE)
+    code = re.sub(r"\bFLOAT64\b", "DOUBLE", code, flags=re.IGNORECASE)
+    code = re.sub(r"\bNUMERIC\b(?!\s*\()", "DECIMAL(38, 9)", code, flags=re.IGNORECASE)
+
+    translated = _PLACEHOLDER.sub(lambda m: literals[int(m.group(1))], code)
+    return translated.strip().rstrip(";").rstrip(), params, sorted(set(tables))
+
+
+# -------------------------------------------------------------------
+# Engine
+# -------------------------------------------------------------------
+class LocalWarehouse:
+    """DuckDB database holding schema-typed copies of the BOM tables."""
+
+    def __init__(self, frames: Dict[str, pd.DataFrame]):
+        self._conn = duckdb.connect(database=":memory:")
+        self._lock = threading.Lock()
+        self.row_counts: Dict[str, int] = {}
+        schema = load_schema()
+        for name, frame in frames.items():
+            table = schema[name]
+            select = ", ".join(f'CAST("{c}" AS {_DUCKDB_TYPES[t]}) AS "{c}"' for c, t in table.columns)
+            self._conn.register("_frame", frame)
+            self._conn.execute(f'CREATE TABLE "{name}" AS SELECT {select} FROM _frame')
+            self._conn.unregister("_frame")
+            self.row_counts[name] = len(frame)
+        for macro in _MACROS:
+            self._conn.execute(macro)
+
+    def add_table(self, name: str, table: pa.Table) -> None:
+        """Create (or replace) a table from Arrow data, e.g. a summaries.py view."""
+        with self._lock:
+            self._conn.register("_arrow", table)
+            self._conn.execute(f'CREATE OR REPLACE TABLE "{name}" AS SELECT * FROM _arrow')
+            self._conn.unregister("_arrow")
+        self.row_counts[name] = table.num_rows
+
+    def _read_only_cursor(self, translated: str):
+        """A cursor for ``translated``; raises ReadOnlyViolation unless it is a single SELECT/WITH query."""
+        # Cursors share the database but not result state
+        with self._lock:
+            cursor = self._conn.cursor()
+        statements = cursor.extract_statements(translated)
+        if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+            kinds = sorted({s.type.name for s in statements if s.type != duckdb.StatementType.SELECT})
+            raise ReadOnlyViolation(" / ".join(kinds) or "multi-statement")
+        return cursor
+
+    def query(self, sql: str, params: Optional[Dict[str, Any]] = None, max_rows: int = MAX_RESULT_ROWS) -> dict:
+        """Like execute, but raises SqlTranslationError / ReadOnlyViolation / duckdb.Error."""
+        translated, names, _ = translate_sql(sql)
+        missing = [n for n in names if n not in (params or {})]
+        if missing:
+            raise SqlTranslationError(f"missing query parameters: {missing}")
+        bound = {n: params[n] for n in names}
+        cursor = self._read_only_cursor(translated)
+        result = cursor.execute(translated, bound or None)
+        columns = [d[0] for d in result.description] if result.description else []
+        fetched = result.fetchmany(max_rows + 1)
+        rows = [{c: _json_value(v) for c, v in zip(columns, row)} for row in fetched[:max_rows]]
+        out = {"status": "SUCCESS", "rows": rows}
+        if len(fetched) > max_rows:
+            out["result_is_likely_truncated"] = True
+        return out
+
+    def execute(self, sql: str, params: Optional[Dict[str, Any]] = None, max_rows: int = MAX_RESULT_ROWS) -> dict:
+        """Run BigQuery-dialect SQL; returns an execute_sql-shaped dict."""
+        try:
+            return self.query(sql, params, max_rows)
+        except (duckdb.Error, SqlTranslationError, ReadOnlyViolation) as e:
+            return {"status": "ERROR", "error_details": str(e)}
+
+    def stream(self, sql: str, params: Optional[Dict[str, Any]] = None, batch_rows: int = 10_000):
+        """Run BigQuery-dialect SQL; returns a pyarrow RecordBatchReader over every row.
+
+        Raises SqlTranslationError / ReadOnlyViolation / duckdb.Error instead
+        of returning an error dict.
+        """
+        translated, names, _ = translate_sql(sql)
+        missing = [n for n in names if n not in (params or {})]
+        if missing:
+            raise SqlTranslationError(f"missing query parameters: {missing}")
+        bound = {n: params[n] for n in names}
+        cursor = self._read_only_cursor(translated)
+        result = cursor.execute(translated, bound or None)
+        # to_arrow_reader replaced fetch_record_batch in newer DuckDB releases
+        to_reader = getattr(result, "to_arrow_reader", None) or result.fetch_record_batch
+        return to_reader(batch_rows)
+
+    def table_info(self, table_name: str) -> dict:
+        if table_name not in self.row_counts:
+            raise KeyError(f"Table {table_name!r} not found in the local mirror")
+        table = load_schema().get(table_name)
+        if table is None:  # added with add_table
+            with self._lock:
+                described = self._conn.execute(f'DESCRIBE "{table_name}"').fetchall()
+            return {
+                "table_id": table_name,
+                "num_rows": self.row_counts[table_name],
+                "schema": {"fields": [{"name": r[0], "type": r[1]} for r in described]},
+                "time_partitioning": None,
+                "clustering_fields": [],
+            }
+        return {
+            "table_id": table_name,
+            "num_rows": self.row_counts[table_name],
+            "schema": {"fields": [{"name": c, "type": t} for c, t in table.columns]},
+            "time_partitioning": {"field": table.partition_by} if table.partition_by else None,
+            "clustering_fields": list(table.cluster_by),
+        }
+
+
+@lru_cache(maxsize=1)
+def _warehouse_for(data_dir: str, version: str) -> LocalWarehouse:
+    from .summaries import attach_summaries
+
+    warehouse = LocalWarehouse(get_dataset())
+    attach_summaries(warehouse, version)
+    return warehouse
+
+
+def get_local_warehouse() -> LocalWarehouse:
+    """Process-wide mirror, rebuilt when a loader bumps the dataset version."""
+    return _warehouse_for(config.data_dir(), dataset_version())
+
+
+def sql_backend() -> str:
+    return os.getenv("BQ_BACKEND", "bigquery").lower()
+
+
+def runs_locally(sql: str, warehouse: LocalWarehouse) -> bool:
+    """Hybrid routing: every table read is mirrored and under the size cap."""
+    max_rows = int(os.getenv("LOCAL_SQL_MAX_TABLE_ROWS", DEFAULT_MAX_TABLE_ROWS))
+    try:
+        _, _, tables = translate_sql(sql)
+    except SqlTranslationError:
+        return False
+    return all(t in warehouse.row_counts and warehouse.row_counts[t] <= max_rows for t in tables)
+
+
+def uses_warehouse(sql: str) -> bool:
+    """Whether execute_sql will send this statement to BigQuery under BQ_BACKEND."""
+    backend = sql_backend()
+    if backend == "local":
+        return False
+    return backend != "hybrid" or not runs_locally(sql, get_local_warehouse())
+
+
+def local_result(sql: str, params: Optional[Dict[str, Any]] = None, max_rows: int = MAX_RESULT_ROWS) -> Optional[dict]:
+    """The mirror's result when BQ_BACKEND routes ``sql`` locally, else None.
+
+    In hybrid mode a statement the mirror can't parse or bind (a BigQuery
+    function the translator doesn't cover) also returns None, so the caller
+    sends it through the guarded BigQuery path instead of failing.
+    """
+    if not uses_warehouse(sql):
+        try:
+            return get_local_warehouse().query(sql, params, max_rows)
+        except UNSUPPORTED_LOCALLY as e:
+            if sql_backend() != "hybrid":
+                return {"status": "ERROR", "error_details": str(e)}
+        except (duckdb.Error, ReadOnlyViolation) as e:
+            return {"status": "ERROR", "error_details": str(e)}
+    return None
+
+
+def local_stream(sql: str, params: Optional[Dict[str, Any]] = None, batch_rows: int = 10_000):
+    """local_result for streaming: a RecordBatchReader from the mirror, or None for BigQuery."""
+    if not uses_warehouse(sql):
+        try:
+            return get_local_warehouse().stream(sql, params, batch_rows)
+        except UNSUPPORTED_LOCALLY:
+            if sql_backend() != "hybrid":
+                raise
+    return None
+
+
+def run_query(
+    sql: str,
+    params: Optional[Dict[str, Any]] = None,
+    max_rows: int = MAX_RESULT_ROWS,
+    on_job: Optional[Callable] = None,
+) -> dict:
+    """query_runner.run_sql, answered by the mirror when BQ_BACKEND allows it."""
+    result = local_result(sql, params, max_rows)
+    if result is not None:
+        return result
+    return run_sql(sql, params, max_rows, on_job=on_job)
+
+
+def stream_query(
+    sql: str,
+    params: Optional[Dict[str, Any]] = None,
+    batch_rows: int = 10_000,
+    on_job: Optional[Callable] = None,
+) -> Iterable:
+    """Every result row as Arrow record batches, from the mirror or BigQuery like run_query."""
+    reader = local_stream(sql, params, batch_rows)
+    if reader is not None:
+        return reader
+    return stream_sql(sql, params, batch_rows, on_job=on_job)
+
+
+# -------------------------------------------------------------------
+# ADK toolset (same tool names as BigQueryToolset)
+# -------------------------------------------------------------------
+def list_dataset_ids(project_id: str) -> list:
+    """List dataset ids in the project (the local mirror holds one dataset).
+
+    Args:
+        project_id: The Google Cloud project id.
+    """
+    return [config.dataset_id()]
+
+
+def list_table_ids(project_id: str, dataset_id: str) -> list:
+    """List table ids in a dataset.
+
+    Args:
+        project_id: The Google Cloud project id containing the dataset.
+        dataset_id: The dataset id.
+    """
+    return sorted(get_local_warehouse().row_counts)
+
+
+def get_dataset_info(project_id: str, dataset_id: str) -> dict:
+    """Get metadata information about a dataset.
+
+    Args:
+        project_id: The Google Cloud project id containing the dataset.
+        dataset_id: The dataset id.
+    """
+    return {"dataset_id": dataset_id, "project": project_id, "location": config.bq_location(),
+            "tables": list_table_ids(project_id, dataset_id)}
+
+
+def get_table_info(project_id: str, dataset_id: str, table_id: str) -> dict:
+    """Get metadata information about a table: schema, row count, partitioning, clustering.
+
+    Args:
+        project_id: The Google Cloud project id containing the dataset.
+        dataset_id: The dataset id containing the table.
+        table_id: The table id.
+    """
+    try:
+        return get_local_warehouse().table_info(table_id)
+    except KeyError as e:
+        return {"status": "ERROR", "error_details": str(e)}
+
+
+def execute_sql(project_id: str, query: str, dry_run: bool = False) -> dict:
+    """Run a BigQuery SQL query against the BOM dataset and return the result.
+
+    Args:
+        project_id: The GCP project id in which the query should be executed.
+        query: The BigQuery SQL query to be executed.
+        dry_run: If True, only validate the query and report the tables it reads.
+
+    Returns:
+        dict with status and rows. If result_is_likely_truncated is True there
+        may be more matching rows than were returned.
+    """
+    if dry_run:
+        try:
+            translated, _, tables = translate_sql(query)
+        except SqlTranslationError as e:
+            return {"status": "ERROR", "error_details": str(e)}
+        return {"status": "SUCCESS", "dry_run_info": {
+            "backend": "bigquery" if uses_warehouse(query) else "local", "tables": tables,
+            "translated_query": translated}}
+    result = local_result(query)
+    if result is not None:
+        result["backend"] = "local"
+        return result
+    # BigQueryToolset blocks writes by default; statements sent on from here must be SELECTs too
+    query, rejected = guard_statement(query)
+    if rejected is not None:
+        return rejected
+    return run_sql(query)
+
+
+class LocalSqlToolset(BaseToolset):
+    """BigQueryToolset look-alike backed by the embedded DuckDB mirror."""
+
+    def __init__(self, *, tool_filter: Optional[List[str]] = None):
+        super().__init__(tool_filter=tool_filter)
+        self._tools = [
+            FunctionTool(f)
+            for f in (list_dataset_ids, get_dataset_info, list_table_ids, get_table_info, execute_sql)
+        ]
+
+    async def get_tools(self, readonly_context=None):
+        return [t for t in self._tools if self._is_tool_selected(t, readonly_context)]
+
+    async def close(self) -> None:
+        pass
+
+
+def make_sql_toolset(bigquery_tool_config) -> BaseToolset:
+    """BigQueryToolset, or LocalSqlToolset when BQ_BACKEND is local/hybrid."""
+    if sql_backend() in ("local", "hybrid"):
+        return LocalSqlToolset()
+    return BigQueryToolset(bigquery_tool_config=bigquery_tool_config)
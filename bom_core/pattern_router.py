@@ -0,0 +1,346 @@
+"""
+Deterministic fast path for questions that match a validated query pattern.
+
+query_patterns_documentation.md tells the agents to reuse validated SQL when
+similarity is above 0.85, but reaching that decision costs several LLM
+turns. This router indexes the documented patterns (WHERE_USED_001 and
+Patterns 2-12) locally: keywords, example questions and the SQL itself.
+For a confident match whose parameters can be bound from the question
+(e.g. item numbers such as ITEM-057), the validated SQL runs directly. A
+question that also names values no parameter takes (another item, a
+supplier code, a quoted value, a number) goes to the LLM pipeline instead,
+as does one with negation ("do not use", "except") or with words none of
+the pattern's keywords and examples use (a category, a currency, ...):
+the validated SQL would answer a different question.
+
+The router is attached to ODW_BigQuery_Analyst as a before_agent_callback;
+when it returns content the LLM pipeline is skipped entirely.
+"""
+
+import math
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from google.genai import types
+
+from . import config
+from .query_runner import render_sql
+
+PATTERNS_DOC = "query_patterns_documentation.md"
+DEFAULT_MIN_CONFIDENCE = 0.85  # "If similarity score > 0.85: Reuse the validated SQL"
+MIN_MARGIN = 0.05  # best match must beat the runner-up by this much
+ANSWER_PREVIEW_ROWS = 20
+
+_SECTION = re.compile(r"^##\s+(?:Query\s+ID:\s*(?P<qid>\S+)|Pattern\s+(?P<num>\d+):\s*(?P<title>.+))$")
+_ITEM_NUMBER = re.compile(r"\b([A-Za-z]{2,}-\d{2,})\b")
+_ISO_DATE = re.compile(r"\b\d{4}-\d{2}-\d{2}\b")
+# Values a question can filter on besides item numbers: supplier/plant codes, quoted text, numbers
+_CODE = re.compile(r"\b[A-Z]{2,}\d{2,}\b")
+_QUOTED = re.compile(r"(?<!\w)'[^']+'(?!\w)|\"[^\"]+\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+# Words that invert or exclude; only patterns whose own phrases negate ("without REACH") accept them
+_NEGATION = re.compile(
+    r"\b(?:not|no|none|never|without|except|excluding|excludes?|other\s+than|neither|nor|non)\b|n't\b",
+    re.IGNORECASE,
+)
+_STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "is", "are", "me", "show", "what", "which",
+    "find", "list", "all", "this", "that", "with", "and", "or", "do", "does", "get", "give", "s",
+    "by", "from", "there", "it", "we", "our", "i", "you", "be", "have", "has", "still", "should",
+}
+# Parameters that take an item number from the question
+ITEM_PARAMS = ("component_id", "parent_id", "top_item")
+
+
+@dataclass
+class QueryPattern:
+    pattern_id: str
+    title: str
+    sql: str
+    examples: List[str] = field(default_factory=list)
+    keywords: List[str] = field(default_factory=list)
+
+    @property
+    def parameters(self) -> List[str]:
+        return sorted(set(re.findall(r"@(\w+)", self.sql)))
+
+
+@dataclass
+class RouteMatch:
+    pattern: QueryPattern
+    confidence: float
+    params: Dict[str, str]
+    runner_up: Optional[str] = None
+
+
+def parse_patterns(md_text: str) -> List[QueryPattern]:
+    """Extract validated patterns (id, title, SQL, examples, keywords) from the doc."""
+    patterns: List[QueryPattern] = []
+    current: Optional[QueryPattern] = None
+    in_sql = False
+    in_examples = False
+    sql_lines: List[str] = []
+    for line in md_text.splitlines():
+        stripped = line.strip()
+        if in_sql:
+            if stripped.startswith("```"):
+                in_sql = False
+                if current is not None and not current.sql:
+                    current.sql = "\n".join(sql_lines).strip()
+            else:
+                sql_lines.append(line)
+            continue
+        if stripped.startswith("## "):
+            m = _SECTION.match(stripped)
+            current = None
+            if m:
+                if m.group("qid"):
+                    current = QueryPattern(pattern_id=m.group("qid"), title="", sql="")
+                else:
+                    current = QueryPattern(
+                        pattern_id=f"PATTERN_{m.group('num')}", title=m.group("title").strip(), sql=""
+                    )
+                patterns.append(current)
+            in_examples = False
+            continue
+        if current is None:
+            continue
+        if stripped.startswith("```sql"):
+            in_sql, sql_lines = True, []
+        elif stripped.startswith("### ") and not current.title:
+            current.title = stripped[4:].strip()
+        elif stripped.startswith("**Example Questions**"):
+            in_examples = True
+        elif stripped.startswith("**Business Question**"):
+            current.examples.extend(re.findall(r'"([^"]+)"', stripped))
+        elif stripped.startswith("**Keywords**"):
+            current.keywords.extend(k.strip() for k in stripped.split(":", 1)[1].split(",") if k.strip())
+        elif in_examples and stripped.startswith("-"):
+            current.examples.extend(re.findall(r'"([^"]+)"', stripped))
+        elif stripped.startswith("**"):
+            in_examples = False
+    return [p for p in patterns if p.sql]
+
+
+def _stem(token: str) -> str:
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens with item numbers folded to a placeholder."""
+    text = _ITEM_NUMBER.sub(" itemref ", text)
+    text = re.sub(r"\b(?:item|component|product|part)\s+[xy]\b", " itemref ", text, flags=re.IGNORECASE)
+    tokens = re.findall(r"[a-z0-9]+", text.lower().replace("'s", ""))
+    return [_stem(t) for t in tokens if t not in _STOPWORDS]
+
+
+def extract_item_numbers(question: str) -> List[str]:
+    """Item numbers mentioned in the question (bom_id values like BOM-023 excluded)."""
+    found = []
+    for raw in _ITEM_NUMBER.findall(question):
+        item = raw.upper()
+        if not item.startswith("BOM-") and item not in found:
+            found.append(item)
+    return found
+
+
+def extract_literals(question: str) -> List[str]:
+    """Filter values in the question other than item numbers: BOM ids, codes, quoted text, numbers."""
+    bom_ids = [raw for raw in _ITEM_NUMBER.findall(question) if raw.upper().startswith("BOM-")]
+    rest = _ITEM_NUMBER.sub(" ", question)
+    found = bom_ids + _CODE.findall(rest) + _QUOTED.findall(rest)
+    return found + _NUMBER.findall(_QUOTED.sub(" ", _CODE.sub(" ", rest)))
+
+
+class PatternRouter:
+    """TF-IDF + keyword-coverage matcher over the validated query patterns."""
+
+    def __init__(self, patterns: List[QueryPattern]):
+        self.patterns = patterns
+        self._docs = [
+            tokenize(" ".join([p.title, *p.keywords, *p.examples])) for p in patterns
+        ]
+        df = Counter(t for doc in self._docs for t in set(doc))
+        n = len(self._docs)
+        self._idf = {t: math.log((1 + n) / (1 + c)) + 1.0 for t, c in df.items()}
+        self._doc_vecs = [self._vector(doc) for doc in self._docs]
+        self._vocab = [set(doc) | {"itemref"} for doc in self._docs]
+        self._phrases = [
+            [set(tokenize(k)) for k in p.keywords + p.examples if tokenize(k)] for p in patterns
+        ]
+
+    @classmethod
+    def from_markdown(cls, path: Optional[str] = None) -> "PatternRouter":
+        with open(path or config.data_path(PATTERNS_DOC), "r", encoding="utf-8") as f:
+            return cls(parse_patterns(f.read()))
+
+    def _vector(self, tokens: List[str]) -> Dict[str, float]:
+        counts = Counter(tokens)
+        vec = {t: c * self._idf.get(t, 0.0) for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        return {t: v / norm for t, v in vec.items()}
+
+    def score(self, question: str) -> List[Tuple[float, QueryPattern]]:
+        """(confidence, pattern) for every pattern, best first.
+
+        Confidence blends how completely the question covers a documented
+        keyword phrase or example question (weighted by how much of the
+        question that phrase explains) with TF-IDF cosine similarity.
+        """
+        q_tokens = tokenize(question)
+        q_set = set(q_tokens)
+        q_vec = self._vector(q_tokens)
+        scored = []
+        for pattern, doc_vec, phrases in zip(self.patterns, self._doc_vecs, self._phrases):
+            cosine = sum(w * doc_vec.get(t, 0.0) for t, w in q_vec.items())
+            phrase_score = 0.0
+            for phrase in phrases:
+                overlap = len(phrase & q_set)
+                if not overlap:
+                    continue
+                coverage = overlap / len(phrase)
+                explained = overlap / max(len(q_set), 1)
+                phrase_score = max(phrase_score, coverage * (0.7 + 0.3 * explained))
+            scored.append((min(1.0, 0.8 * phrase_score + 0.3 * cosine), pattern))
+        scored.sort(key=lambda s: -s[0])
+        return scored
+
+    def uncovered_terms(self, pattern: QueryPattern, question: str) -> List[str]:
+        """Question words that none of the pattern's title, keywords or examples use."""
+        vocab = self._vocab[self.patterns.index(pattern)]
+        return sorted({t for t in tokenize(question) if t not in vocab})
+
+    def negations(self, pattern: QueryPattern, question: str) -> List[str]:
+        """Negating words in the question that the pattern's own phrases don't use."""
+        vocab = self._vocab[self.patterns.index(pattern)]
+        found = {"not" if m.lower() == "n't" else _stem(re.sub(r"\s+", " ", m.lower()))
+                 for m in _NEGATION.findall(question)}
+        return sorted(w for w in found if w not in vocab)
+
+    def bind_parameters(self, pattern: QueryPattern, question: str) -> Optional[Dict[str, str]]:
+        """Fill the pattern's @params from the question.
+
+        None if any parameter is missing, or if the question says something
+        the validated SQL would silently ignore: a value the parameters don't
+        consume (a second item, a supplier code, a quoted value, a number),
+        a negation the pattern doesn't make, or a word outside the pattern's phrases (a category or
+        currency name, another attribute).
+        """
+        item_params = [name for name in pattern.parameters if name in ITEM_PARAMS]
+        if len(item_params) != len(pattern.parameters) or extract_literals(question):
+            return None
+        if self.negations(pattern, question) or self.uncovered_terms(pattern, question):
+            return None
+        items = extract_item_numbers(question)
+        if len(items) != len(item_params):
+            return None
+        return dict(zip(item_params, items))
+
+    def route(self, question: str, min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> Optional[RouteMatch]:
+        """Best pattern when it is confident, unambiguous and fully bindable."""
+        scored = self.score(question)
+        if not scored:
+            return None
+        best_score, best = scored[0]
+        runner_up = scored[1] if len(scored) > 1 else (0.0, None)
+        if best_score < min_confidence or best_score - runner_up[0] < MIN_MARGIN:
+            return None
+        params = self.bind_parameters(best, question)
+        if params is None:
+            return None
+        return RouteMatch(
+            pattern=best,
+            confidence=best_score,
+            params=params,
+            runner_up=runner_up[1].pattern_id if runner_up[1] else None,
+        )
+
+
+# -------------------------------------------------------------------
+# ADK integration
+# -------------------------------------------------------------------
+_router: Optional[PatternRouter] = None
+
+
+def get_pattern_router() -> PatternRouter:
+    global _router
+    if _router is None:
+        _router = PatternRouter.from_markdown()
+    return _router
+
+
+def format_answer(match: RouteMatch, sql: str, result: dict) -> str:
+    rows = result["rows"]
+    lines = [
+        f"**{match.pattern.title}** ({match.pattern.pattern_id}, validated query; "
+        f"match confidence {match.confidence:.2f})",
+        "",
+    ]
+    if match.params:
+        lines.append("Parameters: " + ", ".join(f"`@{k}` = `{v}`" for k, v in match.params.items()))
+        lines.append("")
+    shown = rows[:ANSWER_PREVIEW_ROWS]
+    columns = list(shown[0].keys())
+    lines.append("| " + " | ".join(columns) + " |")
+    lines.append("|" + "---|" * len(columns))
+    for row in shown:
+        lines.append("| " + " | ".join(str(row.get(c, "")) for c in columns) + " |")
+    more = " or more" if result.get("result_is_likely_truncated") else ""
+    lines.append("")
+    lines.append(f"Showing {len(shown)} of {len(rows)}{more} rows.")
+    lines.extend(["", "SQL used:", "```sql", sql, "```"])
+    return "\n".join(lines)
+
+
+def fast_path_enabled() -> bool:
+    return os.getenv("FAST_PATH_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def make_fast_path_callback(run_sql, state_key: str = "fast_path"):
+    """before_agent_callback that answers confident pattern matches directly.
+
+    ``run_sql(sql, params) -> dict`` executes the validated statement; pass
+    a guarded runner (speculative.guarded_run_query) so it gets the same
+    dry-run check as agent SQL. A ``query_estimate`` in its result is
+    recorded in state. Any miss, error or empty result returns None so the
+    LLM pipeline runs.
+    """
+    def before_agent(callback_context):
+        if not fast_path_enabled():
+            return None
+        content = callback_context.user_content
+        question = " ".join(p.text for p in (content.parts if content else []) if getattr(p, "text", None))
+        if not question or _ISO_DATE.search(question):
+            # Dated questions need the effectivity tools; the validated SQL reads is_active only
+            return None
+        min_conf = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", DEFAULT_MIN_CONFIDENCE))
+        match = get_pattern_router().route(question, min_confidence=min_conf)
+        if match is None:
+            return None
+        from .summaries import summary_sql_for
+
+        # Same rows from the pre-aggregated supplier summary when it is readable
+        sql = summary_sql_for(match.pattern.pattern_id) or render_sql(match.pattern.sql)
+        result = run_sql(sql, match.params)
+        if result.get("status") != "SUCCESS" or not result.get("rows"):
+            return None
+        answer = format_answer(match, sql, result)
+        callback_context.state[state_key] = {
+            "pattern_id": match.pattern.pattern_id,
+            "confidence": match.confidence,
+            "params": match.params,
+            "row_count": len(result["rows"]),
+        }
+        callback_context.state["final_answer"] = answer
+        if "query_estimate" in result:
+            callback_context.state["query_estimate"] = result["query_estimate"]
+        return types.Content(role="model", parts=[types.Part(text=answer)])
+
+    return before_agent
@@ -0,0 +1,294 @@
+"""
+Result cache for agent-issued BigQuery SQL.
+
+Entries are keyed on canonicalized SQL text plus tool arguments/parameters
+and the current dataset version. The cache is bounded by the serialized size
+of its results (LRU eviction) and a TTL. Running data/csv_loader.py or
+data/db_loader.py bumps the dataset version, which drops every entry.
+
+Agents plug it in front of BigQueryToolset through ADK tool callbacks:
+
+    before_cb, after_cb = make_cache_callbacks(get_query_cache())
+    LlmAgent(..., tools=[bq_tools], before_tool_callback=before_cb,
+             after_tool_callback=after_cb)
+"""
+
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from . import config
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL_SECONDS = 3600
+CACHED_TOOLS = ("execute_sql",)
+
+# String literals (incl. raw/bytes prefixes), quoted identifiers, comments
+_SQL_TOKENS = re.compile(
+    r"(?P<str>[rRbB]{0,2}'''.*?'''|[rRbB]{0,2}\"\"\".*?\"\"\"|[rRbB]{0,2}'(?:[^'\\]|\\.)*'|[rRbB]{0,2}\"(?:[^\"\\]|\\.)*\")"
+    r"|(?P<ident>`[^`]*`)"
+    r"|(?P<comment>--[^\n]*|#[^\n]*|/\*.*?\*/)",
+    re.DOTALL,
+)
+
+
+def _squash(text: str) -> str:
+    text = re.sub(r"\s+", " ", text.lower())
+    return re.sub(r"\s*([(),=<>+*/;])\s*", r"\1", text)
+
+
+def canonicalize_sql(sql: str) -> str:
+    """Normalize SQL text so formatting-only differences share a cache entry.
+
+    Comments are removed, whitespace collapsed and everything outside string
+    literals and backtick identifiers lower-cased (BigQuery keywords and
+    column names are case-insensitive; literals are not).
+    """
+    out = []
+    pending = []  # SQL text between literals, comments replaced by a space
+    pos = 0
+    for m in _SQL_TOKENS.finditer(sql):
+        pending.append(sql[pos:m.start()])
+        if m.lastgroup == "comment":
+            pending.append(" ")
+        else:
+            out.append(_squash("".join(pending)))
+            out.append(m.group(0))
+            pending = []
+        pos = m.end()
+    pending.append(sql[pos:])
+    out.append(_squash("".join(pending)))
+    return "".join(out).strip().rstrip(";").strip()
+
+
+def cache_key(sql: str, params: Optional[Dict[str, Any]] = None, version: str = "") -> str:
+    payload = json.dumps(
+        {"sql": canonicalize_sql(sql), "params": params or {}, "version": version},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# -------------------------------------------------------------------
+# Dataset version (bumped by the loaders)
+# -------------------------------------------------------------------
+def dataset_version_path() -> str:
+    return os.getenv("BOM_DATASET_VERSION_FILE", config.data_path(".dataset_version.json"))
+
+
+_version_lock = threading.Lock()
+_version_seen: Dict[str, Tuple[int, str]] = {}
+
+
+def dataset_version() -> str:
+    """Current dataset version ('' until a loader has run).
+
+    The version file is re-read only when its mtime changes, so calling this
+    on every cache lookup costs one stat().
+    """
+    path = dataset_version_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return ""
+    with _version_lock:
+        seen = _version_seen.get(path)
+        if seen and seen[0] == mtime:
+            return seen[1]
+        with open(path, "r", encoding="utf-8") as f:
+            version = json.load(f).get("version", "")
+        _version_seen[path] = (mtime, version)
+        return version
+
+
+def bump_dataset_version(reason: str = "") -> str:
+    """Record that the dataset changed; returns the new version string."""
+    version = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    path = dataset_version_path()
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "reason": reason, "updated_at": time.time()}, f)
+    os.replace(tmp, path)
+    return version
+
+
+# -------------------------------------------------------------------
+# Cache
+# -------------------------------------------------------------------
+class QueryResultCache:
+    """Thread-safe LRU/TTL cache bounded by total result size in bytes."""
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        version_fn: Callable[[], str] = dataset_version,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._version_fn = version_fn
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (value, size_bytes, expires_at)
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._version = None
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self) -> str:
+        version = self._version_fn()
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.bytes_used = 0
+            self._version = version
+        return version
+
+    def get(self, sql: str, params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        with self._lock:
+            key = cache_key(sql, params, self._check_version())
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, size, expires_at = entry
+            if self._clock() >= expires_at:
+                del self._entries[key]
+                self.bytes_used -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(value)
+
+    def put(self, sql: str, params: Optional[Dict[str, Any]], value: Any) -> bool:
+        """Store a result; returns False if it is larger than the whole cache."""
+        size = len(json.dumps(value, default=str).encode("utf-8"))
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            key = cache_key(sql, params, self._check_version())
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes_used -= old[1]
+            self._entries[key] = (copy.deepcopy(value), size, self._clock() + self.ttl_seconds)
+            self.bytes_used += size
+            while self.bytes_used > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.bytes_used -= evicted_size
+                self.evictions += 1
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes_used": self.bytes_used,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "dataset_version": self._version,
+            }
+
+
+_cache_lock = threading.Lock()
+_cache: Optional[QueryResultCache] = None
+
+
+def get_query_cache() -> QueryResultCache:
+    """Process-wide cache sized by QUERY_CACHE_MAX_BYTES / QUERY_CACHE_TTL_SECONDS."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = QueryResultCache(
+                max_bytes=int(os.getenv("QUERY_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                ttl_seconds=float(os.getenv("QUERY_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+            )
+        return _cache
+
+
+# -------------------------------------------------------------------
+# ADK tool callbacks
+# -------------------------------------------------------------------
+def _split_args(args: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    params = {k: v for k, v in args.items() if k != "query"}
+    return args.get("query", ""), params
+
+
+# Session state (temp:, never persisted) mapping function_call_id -> the SQL the agent wrote,
+# for calls whose args["query"] a later before_tool callback rewrote (query_guard's SELECT * narrowing)
+ORIGINAL_SQL_STATE_KEY = "temp:original_sql"
+
+
+def record_original_sql(tool_context, sql: str) -> None:
+    """Remember the statement as written before ``args["query"]`` is rewritten in place."""
+    originals = dict(tool_context.state.get(ORIGINAL_SQL_STATE_KEY) or {})
+    originals[getattr(tool_context, "function_call_id", None) or ""] = sql
+    tool_context.state[ORIGINAL_SQL_STATE_KEY] = originals
+
+
+def _pop_original_sql(tool_context, sql: str) -> str:
+    originals = tool_context.state.get(ORIGINAL_SQL_STATE_KEY) or {}
+    call_id = getattr(tool_context, "function_call_id", None) or ""
+    if call_id not in originals:
+        return sql
+    originals = dict(originals)
+    original = originals.pop(call_id)
+    tool_context.state[ORIGINAL_SQL_STATE_KEY] = originals
+    return original
+
+
+def make_cache_callbacks(cache: QueryResultCache):
+    """Return (before_tool_callback, after_tool_callback) caching execute_sql.
+
+    Results are stored under the SQL the agent wrote, so a statement the
+    guard rewrote (record_original_sql) hits on the next identical call.
+    """
+
+    def before_tool(tool, args, tool_context):
+        if tool.name not in CACHED_TOOLS or args.get("dry_run"):
+            return None
+        sql, params = _split_args(args)
+        cached = cache.get(sql, params)
+        if cached is None:
+            return None
+        cached["cache_hit"] = True
+        return cached
+
+    def after_tool(tool, args, tool_context, tool_response):
+        if tool.name not in CACHED_TOOLS or args.get("dry_run"):
+            return None
+        if not isinstance(tool_response, dict) or tool_response.get("cache_hit"):
+            return None
+        sql, params = _split_args(args)
+        sql = _pop_original_sql(tool_context, sql)
+        if tool_response.get("status") == "SUCCESS":
+            cache.put(sql, params, tool_response)
+        return None
+
+    return before_tool, after_tool
@@ -0,0 +1,315 @@
+"""
+Dry-run cost gate for agent-issued BigQuery SQL.
+
+Every execute_sql call is dry-run first. The estimate records bytes
+processed, the tables read, and which of their partition/cluster columns
+(from create_bom_schema.sql: created_date, effective_date,
+parent_item_number, ...) the statement filters on. Statements whose
+estimate exceeds MAX_BYTES_BILLED are either rejected with an actionable
+error, or, for ``SELECT *`` over a single table, rewritten to project only
+the columns the statement uses and re-checked. DML, DDL and scripts are
+rejected whatever their cost: the dry run's statement_type must be SELECT.
+
+BigQuery also enforces the same limit on the real job
+(BigQueryToolConfig.maximum_bytes_billed / QueryJobConfig), so a bad
+estimate can't turn into a runaway scan.
+
+    guard = get_query_guard()
+    LlmAgent(..., before_tool_callback=[cache_before, make_guard_callback(guard)])
+
+The client is injectable; tests pass a fake whose ``query(sql, job_config)``
+returns an object with ``total_bytes_processed``, ``referenced_tables`` and
+``statement_type``.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from google.adk.tools.tool_context import ToolContext
+from google.cloud import bigquery
+
+from . import config
+from .query_cache import canonicalize_sql, record_original_sql
+from .query_runner import READ_ONLY_STATEMENT_TYPES, ReadOnlyViolation, get_bigquery_client, to_query_parameters
+from .schema import load_schema
+
+GUARDED_TOOLS = ("execute_sql",)
+ESTIMATE_CACHE_SIZE = 256
+
+_PREDICATE_CLAUSE = re.compile(
+    r"\b(?:WHERE|ON|HAVING|QUALIFY)\b(.*?)(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bWINDOW\b|"
+    r"\bUNION\b|\bJOIN\b|\bWHERE\b|\)\s*(?:SELECT|,|$)|\Z)",
+    re.IGNORECASE | re.DOTALL,
+)
+_SELECT_STAR = re.compile(r"^\s*SELECT\s+(?:DISTINCT\s+)?(?:\w+\.)?\*\s+FROM\s+(`[^`]+`|[\w.-]+)(\s+(?:AS\s+)?(?!WHERE\b|GROUP\b|ORDER\b|LIMIT\b|WINDOW\b|QUALIFY\b)\w+)?",
+                          re.IGNORECASE)
+
+
+@dataclass
+class QueryEstimate:
+    bytes_processed: int
+    max_bytes_billed: int
+    tables: List[str] = field(default_factory=list)
+    statement_type: Optional[str] = None
+    partition_columns_filtered: List[str] = field(default_factory=list)
+    cluster_columns_filtered: List[str] = field(default_factory=list)
+    unpruned_tables: List[str] = field(default_factory=list)  # partitioned tables with no partition filter
+    rewritten_sql: Optional[str] = None
+
+    @property
+    def read_only(self) -> bool:
+        return self.statement_type in READ_ONLY_STATEMENT_TYPES
+
+    @property
+    def within_budget(self) -> bool:
+        return self.bytes_processed <= self.max_bytes_billed
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = asdict(self)
+        out["within_budget"] = self.within_budget
+        out["mb_processed"] = round(self.bytes_processed / 1e6, 2)
+        return out
+
+    def advice(self) -> str:
+        hints = []
+        for name in self.unpruned_tables:
+            table = load_schema().get(name)
+            if table and table.partition_by:
+                hints.append(f"filter {name}.{table.partition_by} to prune partitions")
+        hints.append("project only the needed columns instead of SELECT *")
+        return "; ".join(hints)
+
+
+def predicate_columns(sql: str) -> List[str]:
+    """Column names referenced in WHERE/ON/HAVING predicates (comments/literals stripped)."""
+    text = canonicalize_sql(sql)
+    text = re.sub(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"", "''", text)
+    columns = set()
+    for clause in _PREDICATE_CLAUSE.findall(text):
+        columns.update(c.lower() for c in re.findall(r"(?:\b\w+\.)?\b([a-z_][a-z0-9_]*)\b", clause, re.IGNORECASE))
+    return sorted(columns)
+
+
+def _table_name(ref) -> str:
+    return getattr(ref, "table_id", None) or str(ref).split(".")[-1]
+
+
+class QueryGuard:
+    """Dry-runs statements, caches estimates and applies the bytes budget."""
+
+    def __init__(
+        self,
+        client=None,
+        max_bytes: Optional[int] = None,
+        on_over_budget: str = "rewrite",
+        client_factory: Callable[[], Any] = get_bigquery_client,
+    ):
+        self._client = client
+        self._client_factory = client_factory
+        self.max_bytes = max_bytes if max_bytes is not None else config.max_bytes_billed()
+        self.on_over_budget = on_over_budget
+        self._lock = threading.Lock()
+        self._estimates: "OrderedDict[str, QueryEstimate]" = OrderedDict()
+        self.rejected = 0
+        self.rewritten = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self._client_factory()
+        return self._client
+
+    def dry_run(self, sql: str, query_parameters: Optional[List] = None) -> QueryEstimate:
+        key = canonicalize_sql(sql) + repr(query_parameters or [])
+        with self._lock:
+            if key in self._estimates:
+                self._estimates.move_to_end(key)
+                return self._estimates[key]
+        job = self.client.query(
+            sql,
+            job_config=bigquery.QueryJobConfig(
+                dry_run=True, use_query_cache=False, query_parameters=query_parameters or []
+            ),
+        )
+        estimate = self._describe(sql, job)
+        with self._lock:
+            self._estimates[key] = estimate
+            while len(self._estimates) > ESTIMATE_CACHE_SIZE:
+                self._estimates.popitem(last=False)
+        return estimate
+
+    def _describe(self, sql: str, job) -> QueryEstimate:
+        tables = sorted({_table_name(t) for t in (getattr(job, "referenced_tables", None) or [])})
+        used = set(predicate_columns(sql))
+        schema = load_schema()
+        partitions, clusters, unpruned = set(), set(), []
+        for name in tables:
+            table = schema.get(name)
+            if table is None:
+                continue
+            if table.partition_by:
+                if table.partition_by in used:
+                    partitions.add(table.partition_by)
+                else:
+                    unpruned.append(name)
+            clusters.update(c for c in table.cluster_by if c in used)
+        return QueryEstimate(
+            bytes_processed=int(getattr(job, "total_bytes_processed", 0) or 0),
+            max_bytes_billed=self.max_bytes,
+            tables=tables,
+            statement_type=getattr(job, "statement_type", None),
+            partition_columns_filtered=sorted(partitions),
+            cluster_columns_filtered=sorted(clusters),
+            unpruned_tables=unpruned,
+        )
+
+    def rewrite_select_star(self, sql: str) -> Optional[str]:
+        """Narrow a single-table ``SELECT *`` to the columns the statement references."""
+        m = _SELECT_STAR.match(sql)
+        if not m or re.search(r"\bJOIN\b", sql, re.IGNORECASE):
+            return None
+        table = load_schema().get(m.group(1).strip("`").split(".")[-1])
+        if table is None:
+            return None
+        used = set(re.findall(r"\b\w+\b", canonicalize_sql(sql[m.end():])))
+        keep = [c for c in table.column_names if c in used or c in table.natural_key]
+        if not keep or len(keep) == len(table.column_names):
+            return None
+        alias = (m.group(2) or "").split()[-1] + "." if m.group(2) else ""
+        projection = ", ".join(f"{alias}{c}" for c in keep)
+        return re.sub(r"(?:\w+\.)?\*", projection, sql[:m.end()], count=1) + sql[m.end():]
+
+    def check(self, sql: str, query_parameters: Optional[List] = None) -> QueryEstimate:
+        """Estimate; if over budget try the rewrite. Returns the estimate to act on.
+
+        ``estimate.read_only`` or ``estimate.within_budget`` is False when the
+        statement must be rejected; ``estimate.rewritten_sql`` is set when a
+        cheaper equivalent should run.
+        """
+        estimate = self.dry_run(sql, query_parameters)
+        if not estimate.read_only:
+            self.rejected += 1
+            return estimate
+        if estimate.within_budget:
+            return estimate
+        if self.on_over_budget == "rewrite":
+            narrowed = self.rewrite_select_star(sql)
+            if narrowed:
+                retry = self.dry_run(narrowed, query_parameters)
+                if retry.within_budget:
+                    self.rewritten += 1
+                    return replace(retry, rewritten_sql=narrowed)
+        self.rejected += 1
+        return estimate
+
+    def stats(self) -> Dict[str, int]:
+        return {"estimates": len(self._estimates), "rejected": self.rejected, "rewritten": self.rewritten,
+                "max_bytes_billed": self.max_bytes}
+
+
+_guard_lock = threading.Lock()
+_guard: Optional[QueryGuard] = None
+
+
+def get_query_guard() -> QueryGuard:
+    """Process-wide guard using MAX_BYTES_BILLED and QUERY_GUARD_MODE (rewrite|reject)."""
+    global _guard
+    with _guard_lock:
+        if _guard is None:
+            _guard = QueryGuard(on_over_budget=os.getenv("QUERY_GUARD_MODE", "rewrite"))
+        return _guard
+
+
+def rejection(estimate: QueryEstimate) -> Optional[dict]:
+    """The ERROR result for a statement the guard refuses (not a SELECT, or over budget), else None."""
+    if not estimate.read_only:
+        details = str(ReadOnlyViolation(estimate.statement_type))
+    elif not estimate.within_budget and not estimate.rewritten_sql:
+        details = (f"Query rejected by cost guard: estimated {estimate.bytes_processed:,} bytes "
+                   f"exceeds the {estimate.max_bytes_billed:,} byte budget. Try: {estimate.advice()}.")
+    else:
+        return None
+    return {"status": "ERROR", "error_details": details, "query_estimate": estimate.to_dict()}
+
+
+def guard_statement(sql: str, params: Optional[Dict[str, Any]] = None) -> Tuple[str, Optional[dict]]:
+    """Apply the process-wide guard to a statement code is about to run directly.
+
+    Returns ``(sql_to_run, None)``, with the rewritten SQL when the guard
+    narrowed it, or ``(sql, error_result)`` when it must not run.
+    """
+    try:
+        estimate = get_query_guard().check(sql, to_query_parameters(params))
+    except Exception as e:
+        return sql, {"status": "ERROR", "error_details": f"Dry run failed: {e}"}
+    rejected = rejection(estimate)
+    if rejected is not None:
+        return sql, rejected
+    return estimate.rewritten_sql or sql, None
+
+
+# -------------------------------------------------------------------
+# ADK integration
+# -------------------------------------------------------------------
+def make_guard_callback(
+    guard: QueryGuard,
+    state_key: str = "query_estimate",
+    should_check: Optional[Callable[[str], bool]] = None,
+):
+    """before_tool_callback that dry-runs execute_sql and enforces the budget.
+
+    The estimate is written to ``state[state_key]`` for the planner to read.
+    Over-budget statements return an error result instead of running, or run
+    rewritten (the tool args are updated in place, and the original recorded
+    so the result cache keys on it); anything but a SELECT is
+    refused like BigQueryToolset's WriteMode.BLOCKED. ``should_check(sql)``
+    can skip statements that will not reach BigQuery.
+    """
+
+    def before_tool(tool, args, tool_context):
+        if tool.name not in GUARDED_TOOLS or args.get("dry_run"):
+            return None
+        sql = args.get("query", "")
+        if not sql or (should_check is not None and not should_check(sql)):
+            return None
+        try:
+            estimate = guard.check(sql)
+        except Exception as e:
+            # A statement that fails the dry run fails the real run the same way
+            return {"status": "ERROR", "error_details": f"Dry run failed: {e}"}
+        tool_context.state[state_key] = estimate.to_dict()
+        rejected = rejection(estimate)
+        if rejected is None and estimate.rewritten_sql:
+            record_original_sql(tool_context, sql)
+            args["query"] = estimate.rewritten_sql
+        return rejected
+
+    return before_tool
+
+
+def estimate_query_cost(query: str, tool_context: ToolContext) -> dict:
+    """Dry-run a BigQuery statement and report its cost before running it.
+
+    Use while drafting SQL: returns estimated bytes processed, whether it fits
+    the bytes-billed budget, and which partition/cluster columns it filters on.
+
+    Args:
+        query: The BigQuery SQL statement to estimate.
+
+    Returns:
+        dict with status and query_estimate (bytes_processed, within_budget,
+        partition_columns_filtered, cluster_columns_filtered, unpruned_tables).
+    """
+    try:
+        estimate = get_query_guard().dry_run(query)
+    except Exception as e:
+        return {"status": "ERROR", "error_details": str(e)}
+    tool_context.state["query_estimate"] = estimate.to_dict()
+    result = {"status": "SUCCESS", "query_estimate": estimate.to_dict()}
+    if not estimate.within_budget:
+        result["advice"] = estimate.advice()
+    return result
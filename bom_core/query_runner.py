@@ -0,0 +1,141 @@
+"""
+Direct execution of validated, parameterized SQL against BigQuery.
+
+Used by code paths that already know the exact statement to run (e.g. the
+pattern fast path) and therefore don't need an LLM tool call. Results use
+the same shape as the BigQuery execute_sql tool and share its result cache.
+"""
+
+import datetime
+import decimal
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional
+
+from google.cloud import bigquery
+
+from . import config
+from .clients import get_client_factory
+from .query_cache import QueryResultCache, get_query_cache
+
+if TYPE_CHECKING:
+    import pyarrow
+
+MAX_RESULT_ROWS = 100
+READ_ONLY_STATEMENT_TYPES = ("SELECT",)  # BigQuery reports WITH ... SELECT as SELECT
+
+
+class ReadOnlyViolation(ValueError):
+    """Raised for agent SQL that is not a read-only SELECT/WITH query."""
+
+    def __init__(self, statement_type: Optional[str]):
+        super().__init__(
+            f"Only read-only SELECT/WITH queries can run; this is a {statement_type or 'non-query'} statement"
+        )
+        self.statement_type = statement_type
+
+
+def get_bigquery_client() -> bigquery.Client:
+    """Process-wide BigQuery client for GCP_PROJECT_ID / BQ_LOCATION (see clients.py)."""
+    return get_client_factory().bigquery()
+
+
+def render_sql(sql: str) -> str:
+    """Fill the {PROJECT}.{DATASET} placeholders used in the docs."""
+    return sql.replace("{PROJECT}", config.project_id() or "").replace("{DATASET}", config.dataset_id())
+
+
+def to_query_parameters(params: Optional[Dict[str, Any]]) -> List:
+    """Map {name: value} to typed BigQuery query parameters."""
+    out = []
+    for name, value in (params or {}).items():
+        if isinstance(value, (list, tuple)):
+            element = value[0] if value else ""
+            out.append(bigquery.ArrayQueryParameter(name, _bq_type(element), list(value)))
+        else:
+            out.append(bigquery.ScalarQueryParameter(name, _bq_type(value), value))
+    return out
+
+
+def _bq_type(value: Any) -> str:
+    if isinstance(value, bool):
+        return "BOOL"
+    if isinstance(value, int):
+        return "INT64"
+    if isinstance(value, float):
+        return "FLOAT64"
+    if isinstance(value, datetime.date):
+        return "DATE"
+    return "STRING"
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+def run_sql(
+    sql: str,
+    params: Optional[Dict[str, Any]] = None,
+    max_rows: int = MAX_RESULT_ROWS,
+    client: Optional[bigquery.Client] = None,
+    cache: Optional[QueryResultCache] = None,
+    on_job: Optional[Callable[[bigquery.QueryJob], None]] = None,
+) -> dict:
+    """Run one parameterized statement; returns an execute_sql-shaped dict.
+
+    ``on_job`` receives the QueryJob as soon as it is submitted, so callers
+    that may abandon the result can cancel it.
+    """
+    cache = cache or get_query_cache()
+    cache_params = {"params": params or {}, "max_rows": max_rows}
+    cached = cache.get(sql, cache_params)
+    if cached is not None:
+        cached["cache_hit"] = True
+        return cached
+    try:
+        client = client or get_bigquery_client()
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=to_query_parameters(params),
+            maximum_bytes_billed=config.max_bytes_billed(),
+        )
+        job = client.query(sql, job_config=job_config)
+        if on_job is not None:
+            on_job(job)
+        rows_iter = job.result(max_results=max_rows)
+        rows = [{k: _json_value(v) for k, v in row.items()} for row in rows_iter]
+    except Exception as e:
+        return {"status": "ERROR", "error_details": str(e)}
+    result = {"status": "SUCCESS", "rows": rows}
+    total = getattr(rows_iter, "total_rows", None)
+    if total is not None and total > len(rows):
+        result["result_is_likely_truncated"] = True
+    cache.put(sql, cache_params, result)
+    return result
+
+
+def stream_sql(
+    sql: str,
+    params: Optional[Dict[str, Any]] = None,
+    page_size: int = 10_000,
+    client: Optional[bigquery.Client] = None,
+    on_job: Optional[Callable[[bigquery.QueryJob], None]] = None,
+) -> Iterator["pyarrow.RecordBatch"]:
+    """Run one parameterized statement and yield every result row as Arrow batches.
+
+    Unlike run_sql there is no row cap and no result cache; the pages come
+    from the job's destination table, so re-running a statement that
+    run_sql just answered hits BigQuery's own result cache. Nothing here
+    checks the statement type: agent SQL must pass query_guard.guard_statement
+    first (CursorStore.open_query does).
+    """
+    client = client or get_bigquery_client()
+    job_config = bigquery.QueryJobConfig(
+        query_parameters=to_query_parameters(params),
+        maximum_bytes_billed=config.max_bytes_billed(),
+    )
+    job = client.query(sql, job_config=job_config)
+    if on_job is not None:
+        on_job(job)
+    yield from job.result(page_size=page_size).to_arrow_iterable()
@@ -0,0 +1,84 @@
+"""
+Per-process registry of lazily built singletons (agents, toolsets, clients).
+
+Importing an agent module used to load .env, mutate os.environ and build
+the whole agent tree (toolsets, search tools, pandas/DuckDB/BigQuery
+imports) before ADK Web had even decided which agent to open. Agent
+modules now expose ``root_agent`` through a module ``__getattr__`` that
+calls ``get_or_create``, so the first lookup pays for construction and
+every later one gets the same object.
+
+Entries are dropped when the process id changes, so a worker forked after
+the parent built a client or agent builds its own rather than sharing
+sockets across processes.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+_lock = threading.RLock()
+_instances: Dict[str, Any] = {}
+_building: Dict[str, threading.Lock] = {}
+_pid = os.getpid()
+_env_loaded = False
+
+
+def _check_fork() -> None:
+    global _pid, _env_loaded
+    if os.getpid() != _pid:
+        _instances.clear()
+        _building.clear()
+        _pid = os.getpid()
+        _env_loaded = False
+
+
+def get_or_create(key: str, factory: Callable[[], Any]) -> Any:
+    """The instance registered under ``key``, built with ``factory`` on first use.
+
+    Concurrent first calls build once; other keys are not blocked while a
+    slow factory runs. A factory that raises leaves nothing registered.
+    """
+    with _lock:
+        _check_fork()
+        if key in _instances:
+            return _instances[key]
+        build_lock = _building.setdefault(key, threading.Lock())
+    with build_lock:
+        with _lock:
+            if key in _instances:
+                return _instances[key]
+        instance = factory()
+        with _lock:
+            _instances[key] = instance
+            _building.pop(key, None)
+        return instance
+
+
+def peek(key: str) -> Optional[Any]:
+    """The registered instance, or None if it has not been built yet."""
+    with _lock:
+        _check_fork()
+        return _instances.get(key)
+
+
+def reset(key: Optional[str] = None) -> None:
+    """Forget one entry (or all); the next get_or_create rebuilds it."""
+    with _lock:
+        if key is None:
+            _instances.clear()
+        else:
+            _instances.pop(key, None)
+
+
+def load_env() -> None:
+    """load_dotenv() once per process, at build time rather than import time."""
+    global _env_loaded
+    with _lock:
+        _check_fork()
+        if _env_loaded:
+            return
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_loaded = True
@@ -0,0 +1,333 @@
+"""
+Exact result facts computed locally for the ExplainerAgent.
+
+The Explainer used to receive raw ``rows`` in pipeline_state and do the
+arithmetic itself ("ACME Corp: 45 days average") token by token, over
+whatever part of the result fit in the prompt. ``ResultSummarizerAgent``
+runs between the RefinementLoop and the Explainer instead: it loads the
+whole result (from the result cursor when there is one, else the rows),
+computes totals, distributions, group-bys and top-k rows with
+pandas/NumPy, and replaces ``rows`` with a short preview plus
+``result_facts``:
+
+    {"row_count": 412, "shape": "PATTERN_5",
+     "totals": {...}, "measures": {"lead_time_days": {"min", "max", "mean", "median", "histogram"}},
+     "breakdowns": {"risk_level": [{"value": "HIGH", "rows": 97, "share": 0.235,
+                                    "lead_time_days_mean": 48.2}, ...]},
+     "top": {"by": "lead_time_days", "rows": [...]}, "distinct": {...}, "date_ranges": {...}}
+
+What to group and rank by comes from the query pattern when it can be
+told: a BOM graph / cost tool named in chosen_sql, a validated pattern
+from query_patterns_documentation.md whose SQL was reused, or a pattern
+whose result columns the rows carry. Anything else gets generic facts:
+every numeric column is a measure and low-cardinality text columns are
+breakdowns.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from .query_runner import _json_value
+from .speculative import parse_pipeline_state
+
+TOP_K = 5
+HISTOGRAM_BINS = 5
+MAX_BREAKDOWNS = 3
+MAX_MEASURES = 4
+MAX_ORDINAL_GROUPS = 25
+MAX_GROUPS = 200  # text columns with more values than this are identifiers, not breakdowns
+MIN_ROWS_PER_GROUP = 2
+FACTS_PREVIEW_ROWS = 5
+# For results of unknown shape: measures whose column total means something (unit_cost,
+# lead_time_days, ... only average). Counts are not: COUNT(DISTINCT ...) columns overlap between
+# rows. Neither are rolled-up costs and deltas (ancestors already include their descendants),
+# per-row extremes or quantities in mixed units.
+_ADDITIVE = re.compile(r"(?<!unit_)(cost|spend|value|hours)\b|^total_", re.IGNORECASE)
+_NOT_ADDITIVE = re.compile(r"rolled|delta|^(?:min|max|avg|mean|median)_|_(?:share|pct|rate)$", re.IGNORECASE)
+# Numeric keys and ordinals (sequence_number, *_id) are not measures
+_IDENTIFIER = re.compile(r"(_number|_id)$|^id$", re.IGNORECASE)
+_TOOL_CALL = re.compile(r"^\s*(\w+)\s*\(")
+
+
+@dataclass(frozen=True)
+class FactsHint:
+    """What to break a result down by and rank it on, for one query shape."""
+
+    group_by: Tuple[str, ...] = ()
+    rank_by: Optional[str] = None
+    requires: Tuple[str, ...] = field(default=())  # result columns that identify the shape
+    additive: Optional[Tuple[str, ...]] = None  # measures to total; None judges by column name
+
+    def is_additive(self, column: str) -> bool:
+        if self.additive is not None:
+            return column in self.additive
+        return bool(_ADDITIVE.search(column)) and not _NOT_ADDITIVE.search(column)
+
+
+# BOM graph / cost tools, keyed by tool name
+TOOL_HINTS: Dict[str, FactsHint] = {
+    "explode_bom": FactsHint(("level",), "extended_quantity", additive=()),
+    "where_used": FactsHint(("level",), "extended_quantity", additive=()),
+    "flatten_bom": FactsHint((), "total_quantity", additive=()),
+    "rollup_cost": FactsHint((), "extended_cost", additive=("extended_cost",)),
+    "what_if_unit_cost": FactsHint((), "delta", additive=()),
+    "diff_bom": FactsHint(("change", "level"), None, additive=()),
+    "bom_changes": FactsHint(("change",), "quantity", additive=()),
+    "find_exposed_products": FactsHint((), "exposed_parts", additive=()),
+    "exposed_parts": FactsHint(("status", "compliance_status", "country_of_origin"), None, additive=()),
+    "exposure_audit": FactsHint((), "obsolete_parts", additive=()),
+    "phantom_flattened_bom": FactsHint(("item_type", "via_phantom"), "quantity", additive=()),
+    "configuration_options": FactsHint(("parent_item_number",), "max_added_cost", additive=()),
+    "enumerate_configurations": FactsHint(("option_count",), "rolled_cost", additive=()),
+}
+
+# Validated patterns (query_patterns_documentation.md), keyed by pattern id
+PATTERN_HINTS: Dict[str, FactsHint] = {
+    "WHERE_USED_001": FactsHint(("is_active",), "quantity", ("parent_item_number", "parent_description", "bom_id"), ()),
+    "PATTERN_2": FactsHint(("category", "supply_type"), "extended_cost", ("component_item_number", "extended_cost", "supply_type"), ("extended_cost",)),
+    "PATTERN_3": FactsHint(("level", "category"), "quantity", ("level", "structure_path"), ()),
+    "PATTERN_4": FactsHint((), "total_material_cost", ("total_material_cost", "component_count"), ("total_material_cost",)),
+    "PATTERN_5": FactsHint(("risk_level", "country_of_origin", "supplier_code"), "lead_time_days", ("risk_level", "sourcing_type"), ()),
+    "PATTERN_6": FactsHint(("component_status", "parent_item_number"), None, ("component_status", "is_obsolete"), ()),
+    "PATTERN_7": FactsHint((), "total_spend", ("supplier_code", "unique_components", "total_spend"), ("total_spend",)),
+    "PATTERN_8": FactsHint((), "total_value", ("supply_type", "total_value"), ("total_value",)),
+    "PATTERN_9": FactsHint(("status", "parent_item_number"), "extended_cost", ("npi_component",), ("extended_cost",)),
+    "PATTERN_10": FactsHint(("compliance_level", "country_of_origin"), None, ("compliance_level",), ()),
+    "PATTERN_11": FactsHint(("item_type", "supply_type"), "quantity", ("is_phantom",), ()),
+    "PATTERN_12": FactsHint(("category",), "unit_cost", ("is_optional", "option_notes"), ()),
+}
+
+
+def _number(value: Any) -> Any:
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else round(float(value), 4)
+    return _json_value(value.item() if isinstance(value, np.generic) else value)
+
+
+def resolve_hint(chosen_sql: Optional[str], columns: List[str]) -> Tuple[str, FactsHint]:
+    """(shape name, hint) for a result: tool call, reused pattern SQL, matching columns, else generic."""
+    call = _TOOL_CALL.match(chosen_sql or "")
+    if call and call.group(1) in TOOL_HINTS:
+        return call.group(1), TOOL_HINTS[call.group(1)]
+    if chosen_sql:
+        from .pattern_router import get_pattern_router
+        from .query_cache import canonicalize_sql
+        from .query_runner import render_sql
+
+        try:
+            patterns = get_pattern_router().patterns
+        except OSError:
+            patterns = []
+        wanted = canonicalize_sql(chosen_sql)
+        for pattern in patterns:
+            if pattern.pattern_id in PATTERN_HINTS and canonicalize_sql(render_sql(pattern.sql)) == wanted:
+                return pattern.pattern_id, PATTERN_HINTS[pattern.pattern_id]
+    present = set(columns)
+    matches = [(len(h.requires), pid) for pid, h in PATTERN_HINTS.items() if h.requires and present >= set(h.requires)]
+    if matches:
+        pattern_id = max(matches)[1]
+        return pattern_id, PATTERN_HINTS[pattern_id]
+    return "generic", FactsHint()
+
+
+def _measure_facts(series: pd.Series, bins: int, additive: bool) -> Dict[str, Any]:
+    values = series.dropna().to_numpy(dtype=float)
+    out: Dict[str, Any] = {"min": _number(values.min()), "max": _number(values.max()),
+                           "mean": _number(values.mean()), "median": _number(np.median(values))}
+    if additive:
+        out["total"] = _number(values.sum())
+    if len(np.unique(values)) > bins:
+        counts, edges = np.histogram(values, bins=bins)
+        out["histogram"] = [[_number(lo), _number(hi), int(n)] for lo, hi, n in zip(edges[:-1], edges[1:], counts)]
+    return out
+
+
+def _breakdown(
+    frame: pd.DataFrame, column: str, measures: List[str], top_k: int, hint: FactsHint
+) -> List[Dict[str, Any]]:
+    grouped = frame.groupby(column, dropna=False, sort=False)
+    groups = grouped.size().rename("rows").to_frame()
+    if measures:
+        stats = grouped[measures].agg(["mean", "sum"])
+        stats.columns = [f"{m}_{agg}" for m, agg in stats.columns]
+        groups = groups.join(stats)
+    if pd.api.types.is_numeric_dtype(frame[column]) and not pd.api.types.is_bool_dtype(frame[column]):
+        # Ordinal breakdowns (BOM level) read best in order and in full
+        groups, top_k = groups.sort_index(), MAX_ORDINAL_GROUPS
+    else:
+        groups = groups.sort_values("rows", ascending=False, kind="stable")
+    out = []
+    for value, group in groups.head(top_k).iterrows():
+        entry = {"value": None if pd.isna(value) else _number(value), "rows": int(group["rows"]),
+                 "share": round(group["rows"] / len(frame), 4)}
+        for m in measures:
+            entry[f"{m}_mean"] = _number(group[f"{m}_mean"])
+            if hint.is_additive(m):
+                entry[f"{m}_total"] = _number(group[f"{m}_sum"])
+        out.append(entry)
+    if len(groups) > top_k:
+        rest = int(groups["rows"].iloc[top_k:].sum())
+        out.append({"value": f"({len(groups) - top_k} more)", "rows": rest, "share": round(rest / len(frame), 4)})
+    return out
+
+
+def summarize_frame(
+    frame: pd.DataFrame,
+    chosen_sql: Optional[str] = None,
+    top_k: int = TOP_K,
+    bins: int = HISTOGRAM_BINS,
+) -> Dict[str, Any]:
+    """Exact, compact facts about every row of a result."""
+    shape, hint = resolve_hint(chosen_sql, list(frame.columns))
+    facts: Dict[str, Any] = {"row_count": len(frame), "shape": shape, "columns": list(frame.columns)}
+    if frame.empty:
+        return facts
+    frame = frame.copy()
+    for column in frame.columns[frame.dtypes == object]:
+        # Rows copied through pipeline_state may carry numbers as strings
+        converted = pd.to_numeric(frame[column], errors="coerce")
+        if frame[column].notna().any() and converted.notna().sum() == frame[column].notna().sum():
+            frame[column] = converted
+    numeric = [c for c in frame.columns
+               if pd.api.types.is_numeric_dtype(frame[c]) and not pd.api.types.is_bool_dtype(frame[c])
+               and frame[c].notna().any() and not _IDENTIFIER.search(c)]
+    # Hinted group-by columns (e.g. level) are breakdowns even when numeric
+    dimensions = [c for c in hint.group_by if c in frame.columns and frame[c].nunique(dropna=False) > 1]
+    measures = [c for c in numeric if c not in hint.group_by]
+    if hint.rank_by in measures:
+        measures.remove(hint.rank_by)
+        measures.insert(0, hint.rank_by)
+    measures = measures[:MAX_MEASURES]
+
+    # Patterns that aggregate in SQL (supplier spend, make vs buy) are not regrouped
+    auto_dimensions = shape == "generic" or bool(hint.group_by)
+    text = [c for c in frame.columns if c not in numeric and c not in dimensions]
+    distinct: Dict[str, int] = {}
+    date_ranges: Dict[str, List[str]] = {}
+    candidates: List[Tuple[int, str]] = []
+    for column in text:
+        series = frame[column]
+        if series.map(lambda v: isinstance(v, (list, dict))).any():
+            continue  # e.g. detect_bom_cycles' cycle lists
+        n = int(series.nunique(dropna=True))
+        if column.endswith("_date") and n:
+            dates = series.dropna().astype(str)
+            date_ranges[column] = [dates.min(), dates.max()]
+        elif auto_dimensions and 1 < n <= MAX_GROUPS and n * MIN_ROWS_PER_GROUP <= len(frame):
+            candidates.append((n, column))
+        else:
+            distinct[column] = n
+
+    # Fewest values first: supply_type before supplier_code before parent_item_number
+    for n, column in sorted(candidates):
+        if len(dimensions) < MAX_BREAKDOWNS:
+            dimensions.append(column)
+        else:
+            distinct[column] = n
+    facts["measures"] = {m: _measure_facts(frame[m], bins, hint.is_additive(m)) for m in measures}
+    totals = {m: v["total"] for m, v in facts["measures"].items() if "total" in v}
+    if totals:
+        facts["totals"] = totals
+    if len(frame) > 1 and dimensions:
+        facts["breakdowns"] = {d: _breakdown(frame, d, measures[:2], top_k, hint) for d in dimensions[:MAX_BREAKDOWNS]}
+    rank_by = hint.rank_by if hint.rank_by in measures else (measures[0] if measures else None)
+    if rank_by and len(frame) > top_k:
+        labels = [c for c in frame.columns if c in distinct or c in dimensions][:4]
+        top = frame.nlargest(top_k, rank_by)[[*labels, rank_by]]
+        facts["top"] = {"by": rank_by,
+                        "rows": [{k: _number(v) for k, v in row.items()} for row in top.to_dict("records")]}
+    if distinct:
+        facts["distinct"] = distinct
+    if date_ranges:
+        facts["date_ranges"] = date_ranges
+    return facts
+
+
+def _same_sql(a: Optional[str], b: Optional[str]) -> bool:
+    from .query_cache import canonicalize_sql
+
+    return bool(a and b) and canonicalize_sql(a) == canonicalize_sql(b)
+
+
+def result_frame(
+    state: Dict[str, Any], session_cursor: Optional[Dict[str, Any]] = None
+) -> Tuple[Optional[pd.DataFrame], str]:
+    """The full result behind a pipeline_state: the cursor's rows if it is live, else ``rows``.
+
+    ``session_cursor`` is the summary make_cursor_callback / the speculative
+    executor wrote to session state. It is preferred to the copy the model
+    put in pipeline_state (whose cursor_id may be mangled) whenever it
+    belongs to this result: pipeline_state mentions a cursor, or the
+    cursor ran chosen_sql. A cursor left from an earlier turn is not used.
+    """
+    summary = state.get("result_cursor")
+    if isinstance(session_cursor, dict) and session_cursor.get("cursor_id") and (
+        summary or _same_sql(session_cursor.get("sql"), state.get("chosen_sql") or state.get("sql"))
+    ):
+        summary = session_cursor
+    if isinstance(summary, dict) and summary.get("cursor_id"):
+        from .cursors import get_cursor_store
+
+        try:
+            table = get_cursor_store().read_table(summary["cursor_id"])
+        except KeyError:
+            table = None  # expired or mistyped id: fall back to the preview rows
+        if table is not None:
+            # NUMERIC/BIGNUMERIC arrive as decimals; pandas would keep them as objects
+            schema = pa.schema([pa.field(f.name, pa.float64()) if pa.types.is_decimal(f.type) else f
+                                for f in table.schema])
+            return table.cast(schema).to_pandas(), "cursor"
+    rows = state.get("rows")
+    if isinstance(rows, list) and rows and all(isinstance(r, dict) for r in rows):
+        return pd.DataFrame.from_records(rows), "rows"
+    return None, "none"
+
+
+# -------------------------------------------------------------------
+# ADK integration
+# -------------------------------------------------------------------
+class ResultSummarizerAgent(BaseAgent):
+    """Replaces pipeline_state.rows with result_facts and a short preview.
+
+    Runs after the RefinementLoop; passes through when nothing was found.
+    The cursor summary's own preview and column stats are dropped (the
+    facts cover them); its cursor_id and row_count stay for follow-ups.
+    """
+
+    state_key: str = "pipeline_state"
+    preview_rows: int = FACTS_PREVIEW_ROWS
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = parse_pipeline_state(ctx.session.state.get(self.state_key))
+        if not state.get("found_results"):
+            return
+        frame, source = result_frame(state, ctx.session.state.get("result_cursor"))
+        if frame is None:
+            return
+        facts = summarize_frame(frame, state.get("chosen_sql") or state.get("sql"))
+        facts["source"] = source
+        state["result_facts"] = facts
+        state["rows"] = (state.get("rows") or [])[: self.preview_rows]
+        if isinstance(state.get("result_cursor"), dict):
+            cursor = state["result_cursor"]
+            state["result_cursor"] = {"cursor_id": cursor.get("cursor_id"), "row_count": cursor.get("row_count")}
+        text = json.dumps(state, default=str)
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            actions=EventActions(state_delta={self.state_key: text}),
+        )
@@ -0,0 +1,244 @@
+"""
+Local retrieval index over the schema and query-pattern docs.
+
+An offline alternative to the Vertex AI Search data store populated by
+data/index_schema_to_vertex.py, built from the same chunk_markdown output:
+
+  - BM25: the per-(chunk, term) BM25 weights are precomputed into one
+    matrix, so scoring a query is a column gather + row sum
+  - dense: an optional (chunk × dim) matrix of L2-normalized vectors, either
+    feature-hashed from tokens/bigrams (default, no model needed) or
+    precomputed by any embedding model and passed in
+  - top-k with np.argpartition over the blended score
+
+The index persists as .npy matrices plus a JSON manifest and is reopened
+with np.load(mmap_mode="r"), so worker processes share the pages.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from collections import Counter
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from . import config
+from .chunking import chunk_files
+
+DEFAULT_DOCS = ("field_mapping_documentation.md", "query_patterns_documentation.md")
+HASH_DIM = 512
+BM25_K1 = 1.2
+BM25_B = 0.75
+DENSE_WEIGHT = 0.3  # share of the blended score taken by dense similarity
+
+_TOKEN = re.compile(r"[a-z0-9_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _hash_bucket(feature: str, dim: int) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=4).digest(), "little") % dim
+
+
+def hashed_embedding(texts: List[str], dim: int = HASH_DIM) -> np.ndarray:
+    """Feature-hashed unigram+bigram vectors (L2-normalized), float32."""
+    out = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        features = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+        for feature, count in Counter(features).items():
+            bucket = _hash_bucket(feature, dim)
+            sign = 1.0 if _hash_bucket("sign:" + feature, 2) else -1.0
+            out[row, bucket] += sign * (1.0 + math.log(count))
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.where(norms > 0, norms, 1.0)
+
+
+class LocalSearchIndex:
+    """BM25 + optional dense retrieval over doc chunks."""
+
+    def __init__(
+        self,
+        chunks: List[Dict],
+        dense: Optional[np.ndarray] = None,
+        encoder: Optional[Callable[[List[str]], np.ndarray]] = None,
+        use_dense: bool = True,
+    ):
+        self.ids = [c["id"] for c in chunks]
+        self.contents = [c["content"] for c in chunks]
+        self.titles = [c.get("title") or c["id"] for c in chunks]
+        self.sources = [c.get("source", "") for c in chunks]
+        self.encoder = encoder or (hashed_embedding if use_dense else None)
+
+        doc_tokens = [tokenize(c) for c in self.contents]
+        self.vocab: Dict[str, int] = {}
+        for tokens in doc_tokens:
+            for t in tokens:
+                self.vocab.setdefault(t, len(self.vocab))
+        self.bm25 = self._bm25_matrix(doc_tokens)
+        if dense is not None:
+            self.dense = np.asarray(dense, dtype=np.float32)
+        elif self.encoder is not None:
+            self.dense = self.encoder(self.contents)
+        else:
+            self.dense = None
+
+    def _bm25_matrix(self, doc_tokens: List[List[str]]) -> np.ndarray:
+        n_docs, n_terms = len(doc_tokens), len(self.vocab)
+        tf = np.zeros((n_docs, n_terms), dtype=np.float32)
+        for d, tokens in enumerate(doc_tokens):
+            for t, c in Counter(tokens).items():
+                tf[d, self.vocab[t]] = c
+        lengths = tf.sum(axis=1)
+        avg_len = lengths.mean() if n_docs else 1.0
+        df = (tf > 0).sum(axis=0)
+        idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths / max(avg_len, 1e-9))
+        return (idf * tf * (BM25_K1 + 1.0) / (tf + norm[:, None])).astype(np.float32)
+
+    @classmethod
+    def from_files(cls, paths: Optional[List[str]] = None, **kwargs) -> "LocalSearchIndex":
+        paths = paths or [config.data_path(name) for name in DEFAULT_DOCS]
+        return cls(chunk_files(paths), **kwargs)
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+    def scores(self, query: str) -> np.ndarray:
+        terms = [self.vocab[t] for t in tokenize(query) if t in self.vocab]
+        lexical = self.bm25[:, terms].sum(axis=1) if terms else np.zeros(len(self.ids), dtype=np.float32)
+        top = lexical.max() if len(lexical) else 0.0
+        if top > 0:
+            lexical = lexical / top
+        if self.dense is None or self.encoder is None:
+            return lexical
+        q = self.encoder([query])[0]
+        semantic = np.clip(self.dense @ q, 0.0, None)
+        return (1.0 - DENSE_WEIGHT) * lexical + DENSE_WEIGHT * semantic
+
+    def search(self, query: str, k: int = 3) -> List[Dict]:
+        scores = self.scores(query)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "id": self.ids[i],
+                "title": self.titles[i],
+                "source": self.sources[i],
+                "content": self.contents[i],
+                "score": float(scores[i]),
+            }
+            for i in top
+            if scores[i] > 0
+        ]
+
+    # ------------------------------------------------------------------
+    # Persistence (memory-mapped on load)
+    # ------------------------------------------------------------------
+    def save(self, index_dir: str) -> None:
+        os.makedirs(index_dir, exist_ok=True)
+        np.save(os.path.join(index_dir, "bm25.npy"), self.bm25)
+        if self.dense is not None:
+            np.save(os.path.join(index_dir, "dense.npy"), self.dense)
+        manifest = {
+            "ids": self.ids,
+            "titles": self.titles,
+            "sources": self.sources,
+            "contents": self.contents,
+            "vocab": self.vocab,
+            "hashed_dense": self.encoder is hashed_embedding,
+            "hash_dim": int(self.dense.shape[1]) if self.dense is not None else None,
+        }
+        with open(os.path.join(index_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+
+    @classmethod
+    def load(
+        cls,
+        index_dir: str,
+        encoder: Optional[Callable[[List[str]], np.ndarray]] = None,
+        mmap: bool = True,
+    ) -> "LocalSearchIndex":
+        """Open a saved index; matrices are memory-mapped unless mmap=False.
+
+        A precomputed dense matrix needs the ``encoder`` that produced it for
+        queries; without one, search falls back to BM25 only.
+        """
+        with open(os.path.join(index_dir, "manifest.json"), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        mode = "r" if mmap else None
+        index = cls.__new__(cls)
+        index.ids = manifest["ids"]
+        index.titles = manifest["titles"]
+        index.sources = manifest["sources"]
+        index.contents = manifest["contents"]
+        index.vocab = manifest["vocab"]
+        index.bm25 = np.load(os.path.join(index_dir, "bm25.npy"), mmap_mode=mode)
+        dense_path = os.path.join(index_dir, "dense.npy")
+        index.dense = np.load(dense_path, mmap_mode=mode) if os.path.exists(dense_path) else None
+        if encoder is None and manifest.get("hashed_dense"):
+            encoder = partial(hashed_embedding, dim=manifest["hash_dim"])
+        index.encoder = encoder
+        return index
+
+
+# -------------------------------------------------------------------
+# ADK tool
+# -------------------------------------------------------------------
+_index: Optional[LocalSearchIndex] = None
+
+
+def local_index_dir() -> str:
+    return os.getenv("LOCAL_RAG_INDEX_DIR", config.data_path(".rag_index"))
+
+
+def get_local_index() -> LocalSearchIndex:
+    """Load the persisted index, or build one from the docs if none exists."""
+    global _index
+    if _index is None:
+        index_dir = local_index_dir()
+        if os.path.exists(os.path.join(index_dir, "manifest.json")):
+            _index = LocalSearchIndex.load(index_dir)
+        else:
+            _index = LocalSearchIndex.from_files()
+    return _index
+
+
+def use_local_rag() -> bool:
+    """True when RAG_BACKEND=local selects this index over Vertex AI Search."""
+    return os.getenv("RAG_BACKEND", "vertex").lower() == "local"
+
+
+def search_schema_docs(query: str) -> dict:
+    """Search the BOM schema and query-pattern documentation.
+
+    Returns column meanings, terminology mappings, table relationships and
+    validated SQL patterns relevant to the query.
+
+    Args:
+        query: The search query, e.g. 'supplier lead time columns'.
+
+    Returns:
+        dict with status and results (title, url, content) for the top 3
+        chunks, the same shape as the Discovery Engine search tool.
+    """
+    try:
+        hits = get_local_index().search(query, k=3)
+    except Exception as e:
+        return {"status": "error", "error_message": str(e)}
+    return {
+        "status": "success",
+        "results": [
+            {"title": h["title"], "url": f"{h['source']}#{h['id']}", "content": h["content"]}
+            for h in hits
+        ],
+    }
@@ -0,0 +1,172 @@
+"""
+Vectorized multi-level cost rollup with incremental recomputation.
+
+Pattern 4 in query_patterns_documentation.md only sums one level
+(bd.quantity * im.unit_cost). This engine rolls costs through the whole
+hierarchy of a BomGraph:
+
+    rolled_cost[leaf]     = item_master.unit_cost
+    rolled_cost[assembly] = Σ quantity × (1 + scrap_factor) / yield_factor
+                              × rolled_cost[component]
+
+Items are grouped by height (longest distance to a leaf). Processing the
+heights in increasing order is a topological order, and every height is one
+vectorized bincount over the edges whose parent sits at that height.
+
+When a unit_cost changes only the item's ancestors are recomputed, again
+height by height.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .graph import BomGraph
+
+
+def effective_quantity(quantity: np.ndarray, scrap_factor: np.ndarray, yield_factor: np.ndarray) -> np.ndarray:
+    """quantity × (1 + scrap) / yield, treating missing/zero factors as neutral."""
+    scrap = np.nan_to_num(np.asarray(scrap_factor, dtype=np.float64), nan=0.0)
+    yld = np.nan_to_num(np.asarray(yield_factor, dtype=np.float64), nan=1.0)
+    yld = np.where(yld > 0, yld, 1.0)
+    return quantity * (1.0 + scrap) / yld
+
+
+class CostRollup:
+    """Rolled-up cost for every item of a BomGraph."""
+
+    def __init__(
+        self,
+        graph: BomGraph,
+        bom_details: pd.DataFrame,
+        item_master: pd.DataFrame,
+        edge_mask: Optional[np.ndarray] = None,
+    ):
+        self.graph = graph
+        self.edge_mask = graph.edge_filter() if edge_mask is None else edge_mask
+        # Restrict every edge array to the selected structure once
+        self.edges = np.flatnonzero(self.edge_mask)
+        self.parent = graph.parent[self.edges]
+        self.child = graph.child[self.edges]
+        self.eff_qty = effective_quantity(
+            graph.quantity[self.edges],
+            graph.edge_column(bom_details["scrap_factor"])[self.edges],
+            graph.edge_column(bom_details["yield_factor"])[self.edges],
+        )
+
+        costs = item_master.set_index("item_number")["unit_cost"]
+        costs = pd.to_numeric(costs[~costs.index.duplicated()], errors="coerce")
+        self.unit_cost = costs.reindex(graph.items).to_numpy(dtype=np.float64)
+        self.missing_cost = [str(i) for i in graph.items[np.isnan(self.unit_cost)]]
+        self.unit_cost = np.nan_to_num(self.unit_cost, nan=0.0)
+
+        self.height = self._heights()
+        self.is_leaf = np.bincount(self.parent, minlength=graph.num_items) == 0
+        # Edges grouped by the height of their parent
+        self.edge_order = np.argsort(self.height[self.parent], kind="stable")
+        self.level_bounds = np.searchsorted(
+            self.height[self.parent][self.edge_order], np.arange(self.height.max() + 2)
+        )
+        self.rolled_cost = self._full_rollup(self.unit_cost)
+
+    def _heights(self) -> np.ndarray:
+        order = self.graph.topological_order(self.edge_mask)  # raises on cycles
+        height = np.zeros(self.graph.num_items, dtype=np.int64)
+        for item in order[::-1]:
+            edges = self.graph.child_edges(item, self.edge_mask)
+            if len(edges):
+                height[item] = height[self.graph.child[edges]].max() + 1
+        return height
+
+    def _full_rollup(self, unit_cost: np.ndarray) -> np.ndarray:
+        rolled = np.where(self.is_leaf, unit_cost, 0.0)
+        n = self.graph.num_items
+        for h in range(1, len(self.level_bounds) - 1):
+            sel = self.edge_order[self.level_bounds[h]:self.level_bounds[h + 1]]
+            if len(sel):
+                rolled += np.bincount(
+                    self.parent[sel], weights=self.eff_qty[sel] * rolled[self.child[sel]], minlength=n
+                )
+        return rolled
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+    def cost_of(self, item_number: str) -> float:
+        return float(self.rolled_cost[self.graph.item_id(item_number)])
+
+    def breakdown(self, item_number: str) -> List[Dict]:
+        """Per-line contribution of each direct component to the rolled cost."""
+        item = self.graph.item_id(item_number)
+        sel = np.flatnonzero(self.parent == item)
+        rows = []
+        for i in sel:
+            child = self.child[i]
+            rows.append({
+                "component_item_number": str(self.graph.items[child]),
+                "effective_quantity": float(self.eff_qty[i]),
+                "component_rolled_cost": float(self.rolled_cost[child]),
+                "extended_cost": float(self.eff_qty[i] * self.rolled_cost[child]),
+            })
+        return sorted(rows, key=lambda r: -r["extended_cost"])
+
+    # ------------------------------------------------------------------
+    # Incremental recomputation
+    # ------------------------------------------------------------------
+    def _recompute(self, rolled: np.ndarray, unit_cost: np.ndarray, changed: np.ndarray) -> np.ndarray:
+        """Recompute ancestors of ``changed`` item ids in place; return them."""
+        affected = np.zeros(self.graph.num_items, dtype=bool)
+        for item in changed:
+            affected[self.graph.ancestors(str(self.graph.items[item]), self.edge_mask)] = True
+        rolled[changed] = unit_cost[changed]
+        ids = np.flatnonzero(affected)
+        for h in np.unique(self.height[ids]):
+            level_items = ids[self.height[ids] == h]
+            sel = np.flatnonzero(np.isin(self.parent, level_items))
+            sums = np.bincount(
+                self.parent[sel], weights=self.eff_qty[sel] * rolled[self.child[sel]],
+                minlength=self.graph.num_items,
+            )
+            rolled[level_items] = sums[level_items]
+        return ids
+
+    def _changed_leaves(self, new_costs: Dict[str, float]) -> np.ndarray:
+        """Item ids for ``new_costs``; ValueError unless every one is a leaf.
+
+        Assemblies take their rolled cost from their components, so a unit_cost
+        set on one would move nothing.
+        """
+        changed = np.array([self.graph.item_id(i) for i in new_costs], dtype=np.int64)
+        assemblies = [str(self.graph.items[i]) for i in changed[~self.is_leaf[changed]]]
+        if assemblies:
+            raise ValueError(
+                f"Only leaf (purchased) item costs can be changed; {', '.join(assemblies)} "
+                "rolls up its cost from its components"
+            )
+        return changed
+
+    def set_unit_costs(self, new_costs: Dict[str, float]) -> List[str]:
+        """Apply unit_cost changes to leaf items and roll them up; returns affected assemblies."""
+        changed = self._changed_leaves(new_costs)
+        self.unit_cost[changed] = [float(c) for c in new_costs.values()]
+        affected = self._recompute(self.rolled_cost, self.unit_cost, changed)
+        return [str(self.graph.items[i]) for i in affected]
+
+    def what_if(self, new_costs: Dict[str, float]) -> List[Dict]:
+        """Rolled-cost deltas for hypothetical leaf unit_cost changes (state untouched)."""
+        changed = self._changed_leaves(new_costs)
+        unit_cost = self.unit_cost.copy()
+        unit_cost[changed] = [float(c) for c in new_costs.values()]
+        rolled = self.rolled_cost.copy()
+        affected = self._recompute(rolled, unit_cost, changed)
+        rows = [
+            {
+                "item_number": str(self.graph.items[i]),
+                "old_rolled_cost": float(self.rolled_cost[i]),
+                "new_rolled_cost": float(rolled[i]),
+                "delta": float(rolled[i] - self.rolled_cost[i]),
+            }
+            for i in affected
+        ]
+        return sorted(rows, key=lambda r: -abs(r["delta"]))
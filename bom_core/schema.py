@@ -0,0 +1,92 @@
+"""
+Table definitions parsed from data/create_bom_schema.sql.
+
+The SQL file is the single source of truth for column names, BigQuery types,
+partitioning and clustering; everything local (CSV typing, validation,
+catalogs, generators) derives from it instead of repeating column lists.
+"""
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from . import config
+
+_CREATE_TABLE = re.compile(
+    r"CREATE\s+TABLE\s+`[^`]*?\.(?P<table>\w+)`\s*\((?P<body>.*?)\)\s*"
+    r"(?:PARTITION\s+BY\s+(?P<partition>\w+)\s*)?"
+    r"(?:CLUSTER\s+BY\s+(?P<cluster>[\w,\s]+?))?\s*;",
+    re.IGNORECASE | re.DOTALL,
+)
+_COLUMN = re.compile(r"^\s*(\w+)\s+([A-Z0-9_]+)\s*,?\s*$", re.IGNORECASE)
+
+# Natural keys documented in field_mapping_documentation.md ("Relationships")
+NATURAL_KEYS: Dict[str, Tuple[str, ...]] = {
+    "item_master": ("item_number",),
+    "bom_details": ("bom_id", "component_item_number", "sequence_number"),
+}
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    name: str
+    columns: Tuple[Tuple[str, str], ...]
+    partition_by: Optional[str] = None
+    cluster_by: Tuple[str, ...] = field(default_factory=tuple)
+
+    @property
+    def column_names(self) -> List[str]:
+        return [c for c, _ in self.columns]
+
+    def column_type(self, column: str) -> str:
+        for name, bq_type in self.columns:
+            if name == column:
+                return bq_type
+        raise KeyError(f"{self.name} has no column {column!r}")
+
+    def columns_of_type(self, *bq_types: str) -> List[str]:
+        return [c for c, t in self.columns if t in bq_types]
+
+    @property
+    def natural_key(self) -> Tuple[str, ...]:
+        return NATURAL_KEYS.get(self.name, ())
+
+
+def parse_schema_sql(sql: str) -> Dict[str, TableSchema]:
+    """Parse the CREATE TABLE statements of a BigQuery DDL script."""
+    # Strip line comments so notes inside the script don't look like columns
+    sql = re.sub(r"--[^\n]*", "", sql)
+    tables: Dict[str, TableSchema] = {}
+    for m in _CREATE_TABLE.finditer(sql):
+        columns = []
+        for line in m.group("body").splitlines():
+            col = _COLUMN.match(line)
+            if col:
+                columns.append((col.group(1), col.group(2).upper()))
+        cluster = m.group("cluster") or ""
+        tables[m.group("table")] = TableSchema(
+            name=m.group("table"),
+            columns=tuple(columns),
+            partition_by=m.group("partition"),
+            cluster_by=tuple(c.strip() for c in cluster.split(",") if c.strip()),
+        )
+    return tables
+
+
+@lru_cache(maxsize=4)
+def _load_schema(path: str) -> Dict[str, TableSchema]:
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_schema_sql(f.read())
+
+
+def load_schema(path: Optional[str] = None) -> Dict[str, TableSchema]:
+    """Return {table_name: TableSchema} for the BOM dataset."""
+    return _load_schema(path or config.data_path(config.SCHEMA_SQL))
+
+
+def get_table(name: str, path: Optional[str] = None) -> TableSchema:
+    tables = load_schema(path)
+    if name not in tables:
+        raise KeyError(f"Table {name!r} not defined in {config.SCHEMA_SQL}")
+    return tables[name]
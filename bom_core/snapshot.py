@@ -0,0 +1,277 @@
+"""
+Compact binary snapshot of the BOM dataset, opened zero-copy with mmap.
+
+Each worker re-parsed both CSV extracts through pandas and rebuilt the
+BomGraph before it could answer anything. The loaders now also write one
+snapshot file (BOM_SNAPSHOT_FILE, default data/.bom_snapshot) per dataset
+version:
+
+    MAGIC | format version, header length (uint32) | JSON header | arrays
+
+The JSON header carries the dataset version, a CRC-32 of the array region
+and, for every array, its dtype, shape and offset (64-byte aligned).
+Columns are stored by their create_bom_schema.sql type:
+
+  STRING          int32 codes (-1 = NULL) + fixed-width dictionary
+  INT64 / BOOL    values + null mask
+  NUMERIC/FLOAT64 float64 (NaN = NULL)
+  DATE            int64 seconds (NaT = NULL)
+
+The BomGraph's arrays (GRAPH_ARRAYS: interned item numbers, edge arrays and
+both CSR offset arrays) are stored as built. ``BomSnapshot`` maps the file
+read-only and hands out NumPy views, so BomGraph.from_snapshot costs one
+dict of item ids. Processes that map the same file share its pages through
+the OS page cache instead of each holding a private copy. Frames are
+decoded from the same views: numeric, boolean and date columns without
+copying, strings by one gather per column.
+
+A loader replaces the file atomically (write + rename), so processes that
+still map the previous version keep reading it until they reopen. After a
+--partial_extract delta load the loader builds it from the merged target
+tables, since the CSVs then hold only the changed rows.
+"""
+
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .graph import GRAPH_ARRAYS, BomGraph
+from .schema import get_table
+
+MAGIC = b"BOMSNAP\x00"
+FORMAT_VERSION = 1
+ALIGN = 64
+_PREAMBLE = struct.Struct("<II")  # format version, header length
+
+
+class SnapshotError(ValueError):
+    """Raised for a missing, truncated, corrupt or incompatible snapshot file."""
+
+
+def snapshot_path() -> str:
+    return os.getenv("BOM_SNAPSHOT_FILE", config.data_path(".bom_snapshot"))
+
+
+def _aligned(n: int) -> int:
+    return -(-n // ALIGN) * ALIGN
+
+
+def _fixed_width(values) -> np.ndarray:
+    """Fixed-width unicode array (at least <U1, so empty dictionaries stay valid)."""
+    out = np.asarray(values, dtype=str)
+    return out if out.dtype.itemsize else out.astype("<U1")
+
+
+# -------------------------------------------------------------------
+# Column encoding
+# -------------------------------------------------------------------
+def _encode_column(series: pd.Series, bq_type: str) -> Dict[str, np.ndarray]:
+    if bq_type == "STRING":
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        return {"codes": codes.astype(np.int32), "dictionary": _fixed_width(list(uniques))}
+    if bq_type == "INT64":
+        values = pd.array(series, dtype="Int64")
+        return {"values": values.to_numpy(dtype=np.int64, na_value=0), "mask": np.asarray(values.isna())}
+    if bq_type == "BOOL":
+        values = pd.array(series, dtype="boolean")
+        return {"values": values.to_numpy(dtype=bool, na_value=False), "mask": np.asarray(values.isna())}
+    if bq_type in ("NUMERIC", "FLOAT64"):
+        return {"values": pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)}
+    if bq_type == "DATE":
+        return {"values": series.to_numpy(dtype="datetime64[s]").view(np.int64)}
+    raise SnapshotError(f"Unsupported column type {bq_type}")
+
+
+def _decode_column(arrays: Dict[str, np.ndarray], bq_type: str):
+    if bq_type == "STRING":
+        codes, dictionary = arrays["codes"], arrays["dictionary"].astype(object)
+        values = dictionary.take(np.where(codes < 0, 0, codes)) if len(dictionary) else np.empty(len(codes), object)
+        values[codes < 0] = None
+        return pd.array(values, dtype="string")
+    if bq_type == "INT64":
+        return pd.arrays.IntegerArray(arrays["values"], arrays["mask"])
+    if bq_type == "BOOL":
+        return pd.arrays.BooleanArray(arrays["values"], arrays["mask"])
+    if bq_type in ("NUMERIC", "FLOAT64"):
+        return arrays["values"]
+    if bq_type == "DATE":
+        return arrays["values"].view("datetime64[s]")
+    raise SnapshotError(f"Unsupported column type {bq_type}")
+
+
+# -------------------------------------------------------------------
+# Writing
+# -------------------------------------------------------------------
+def write_snapshot(
+    frames: Dict[str, pd.DataFrame],
+    path: Optional[str] = None,
+    version: str = "",
+    graph: Optional[BomGraph] = None,
+) -> Dict[str, Any]:
+    """Write ``frames`` (schema-typed, as dataset.load_dataset returns them) and their BomGraph.
+
+    Returns the header plus ``bytes`` (file size).
+    """
+    path = path or snapshot_path()
+    graph = graph or BomGraph(frames["bom_details"])
+    arrays: Dict[str, np.ndarray] = {}
+    tables: Dict[str, Any] = {}
+    for name, frame in frames.items():
+        columns = []
+        for column, bq_type in get_table(name).columns:
+            if column not in frame.columns:
+                continue
+            for role, values in _encode_column(frame[column], bq_type).items():
+                arrays[f"{name}.{column}.{role}"] = values
+            columns.append([column, bq_type])
+        tables[name] = {"rows": len(frame), "columns": columns}
+    for name in GRAPH_ARRAYS:
+        values = getattr(graph, name)
+        arrays[f"graph.{name}"] = _fixed_width(values) if values.dtype == object else values
+
+    layout: Dict[str, Any] = {}
+    offset = 0
+    for key, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        arrays[key] = values
+        layout[key] = {"dtype": values.dtype.str, "shape": list(values.shape), "offset": offset}
+        offset = _aligned(offset + values.nbytes)
+    body = bytearray(offset)
+    for key, values in arrays.items():
+        start = layout[key]["offset"]
+        body[start:start + values.nbytes] = values.tobytes()
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "dataset_version": version,
+        "created_at": time.time(),
+        "body_bytes": len(body),
+        "checksum": zlib.crc32(body),
+        "tables": tables,
+        "arrays": layout,
+    }
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    preamble = MAGIC + _PREAMBLE.pack(FORMAT_VERSION, len(encoded)) + encoded
+    padded = preamble + b"\x00" * (_aligned(len(preamble)) - len(preamble))
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(padded)
+        f.write(body)
+    os.replace(f"{path}.tmp", path)
+    return {**header, "bytes": len(padded) + len(body)}
+
+
+def refresh_snapshot(data_dir: Optional[str] = None, version: Optional[str] = None,
+                     path: Optional[str] = None,
+                     frames: Optional[Dict[str, pd.DataFrame]] = None) -> Dict[str, Any]:
+    """Build the snapshot from the CSV extracts (or ``frames``) and persist it (run by the loaders)."""
+    from .dataset import load_dataset
+    from .query_cache import dataset_version
+
+    frames = frames if frames is not None else load_dataset(data_dir)
+    return write_snapshot(frames, path, dataset_version() if version is None else version)
+
+
+# -------------------------------------------------------------------
+# Reading
+# -------------------------------------------------------------------
+def read_header(path: Optional[str] = None) -> Dict[str, Any]:
+    """JSON header of a snapshot file, without mapping its arrays."""
+    return _read_header(path or snapshot_path())[0]
+
+
+def _read_header(path: str) -> Tuple[Dict[str, Any], int]:
+    """(header, offset of the array region)."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(len(MAGIC) + _PREAMBLE.size)
+            if len(head) < len(MAGIC) + _PREAMBLE.size or not head.startswith(MAGIC):
+                raise SnapshotError(f"{path} is not a BOM snapshot")
+            format_version, length = _PREAMBLE.unpack_from(head, len(MAGIC))
+            if format_version != FORMAT_VERSION:
+                raise SnapshotError(f"{path} has snapshot format {format_version}; expected {FORMAT_VERSION}")
+            header = json.loads(f.read(length))
+    except ValueError:
+        raise SnapshotError(f"{path} has an unreadable header") from None
+    except OSError as e:
+        raise SnapshotError(f"Cannot read snapshot {path}: {e}") from None
+    return header, _aligned(len(MAGIC) + _PREAMBLE.size + length)
+
+
+class BomSnapshot:
+    """Read-only memory map of a snapshot file with NumPy views of its arrays."""
+
+    def __init__(self, path: Optional[str] = None, verify: bool = False):
+        self.path = path or snapshot_path()
+        self.header, start = _read_header(self.path)
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < start + self.header["body_bytes"]:
+                raise SnapshotError(f"{self.path} is truncated")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._body = memoryview(self._map)[start:start + self.header["body_bytes"]]
+        if verify:
+            self.verify()
+
+    @property
+    def dataset_version(self) -> str:
+        return self.header["dataset_version"]
+
+    def verify(self) -> None:
+        """Raise SnapshotError unless the array region matches the header checksum."""
+        if zlib.crc32(self._body) != self.header["checksum"]:
+            raise SnapshotError(f"{self.path} failed its checksum")
+
+    def array(self, key: str) -> np.ndarray:
+        """Read-only view of one stored array ('graph.parent', 'item_master.unit_cost.values', ...)."""
+        try:
+            spec = self.header["arrays"][key]
+        except KeyError:
+            raise KeyError(f"Snapshot has no array {key!r}") from None
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"], dtype=np.int64))
+        return np.frombuffer(self._body, dtype=dtype, count=count, offset=spec["offset"]).reshape(spec["shape"])
+
+    def graph_array(self, name: str) -> np.ndarray:
+        return self.array(f"graph.{name}")
+
+    def graph(self) -> BomGraph:
+        return BomGraph.from_snapshot(self)
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """One table with the dtypes of dataset.load_table."""
+        try:
+            table = self.header["tables"][name]
+        except KeyError:
+            raise KeyError(f"Snapshot has no table {name!r}") from None
+        data = {}
+        for column, bq_type in table["columns"]:
+            prefix = f"{name}.{column}."
+            arrays = {key[len(prefix):]: self.array(key) for key in self.header["arrays"] if key.startswith(prefix)}
+            data[column] = _decode_column(arrays, bq_type)
+        return pd.DataFrame(data, copy=False)
+
+    def frames(self) -> Dict[str, pd.DataFrame]:
+        return {name: self.frame(name) for name in self.header["tables"]}
+
+
+def open_current(version: str, path: Optional[str] = None) -> Optional[BomSnapshot]:
+    """The snapshot if it exists, is readable and was written for ``version``; else None."""
+    path = path or snapshot_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        if read_header(path).get("dataset_version") != version:
+            return None
+        return BomSnapshot(path)
+    except SnapshotError:
+        return None
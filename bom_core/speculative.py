@@ -0,0 +1,258 @@
+"""
+Speculative execution of the RefinementLoop strategies.
+
+The default RefinementLoop plans and runs one strategy per iteration
+(exact match -> token/regex -> canonical_parent), so a miss costs two LLM
+calls and one query per strategy, in series. With REFINEMENT_MODE=speculative
+a single planner call drafts all strategies up front and
+SpeculativeExecutorAgent runs them concurrently:
+
+  - at most ``max_concurrency`` statements in flight, all within one
+    ``timeout_seconds`` budget; warehouse statements still pass the
+    dry-run bytes guard (query_guard)
+  - the winner is the highest-priority (lowest numbered) strategy that
+    returns rows; it is chosen as soon as every higher-priority strategy
+    has come back empty, and the remaining attempts are cancelled
+    (running BigQuery jobs included)
+  - attempts_log gets one entry per strategy, in strategy order, as if
+    the loop had run them one after another (cancelled and over-budget
+    attempts are marked as such)
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from .cursors import compact_result
+from .local_sql import local_result
+from .query_guard import get_query_guard, guard_statement
+from .query_runner import MAX_RESULT_ROWS, run_sql, to_query_parameters
+from .tracing import get_tracer
+
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_MAX_CONCURRENCY = 3
+
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$")
+
+
+def refinement_mode() -> str:
+    """'sequential' (LoopAgent, default) or 'speculative' (REFINEMENT_MODE)."""
+    return os.getenv("REFINEMENT_MODE", "sequential").lower()
+
+
+def parse_pipeline_state(value: Any) -> Dict[str, Any]:
+    """pipeline_state as a dict; output_key stores the model's JSON text, maybe fenced."""
+    if isinstance(value, dict):
+        return dict(value)
+    if not value:
+        return {}
+    try:
+        parsed = json.loads(_FENCE.sub("", str(value)))
+    except json.JSONDecodeError:
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+@dataclass
+class StrategyPlan:
+    strategy: int
+    sql: str
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Attempt:
+    strategy: int
+    sql: str
+    params: Dict[str, Any]
+    status: str = "pending"  # found | empty | error | rejected | cancelled | timeout | superseded
+    row_count: int = 0
+    elapsed_ms: float = 0.0
+    result: Optional[dict] = None
+
+    def log_entry(self) -> Dict[str, Any]:
+        entry = {"strategy": self.strategy, "sql": self.sql, "params": self.params,
+                 "status": self.status, "row_count": self.row_count, "elapsed_ms": round(self.elapsed_ms, 1)}
+        if self.result and self.result.get("status") == "ERROR":
+            entry["error"] = self.result.get("error_details")
+        return entry
+
+
+def plans_from_state(state: Dict[str, Any]) -> List[StrategyPlan]:
+    plans = []
+    for raw in state.get("strategy_plans") or []:
+        if isinstance(raw, dict) and raw.get("sql"):
+            plans.append(StrategyPlan(int(raw.get("strategy", len(plans) + 1)), raw["sql"], raw.get("params") or {}))
+    return sorted(plans, key=lambda p: p.strategy)
+
+
+def guarded_run_query(sql: str, params: Dict[str, Any], on_job: Optional[Callable] = None) -> dict:
+    """run_query behind the same dry-run guard the execute_sql tool uses.
+
+    BigQuery results carry the guard's estimate as ``query_estimate``, and
+    run the narrowed statement when the guard rewrote a ``SELECT *``. In
+    hybrid mode, SQL the mirror can't run goes to BigQuery through the guard.
+    """
+    local = local_result(sql, params, MAX_RESULT_ROWS)
+    if local is not None:
+        return local
+    sql, rejected = guard_statement(sql, params)
+    if rejected is not None:
+        return rejected
+    estimate = get_query_guard().dry_run(sql, to_query_parameters(params))  # cached by guard_statement
+    result = run_sql(sql, params, MAX_RESULT_ROWS, on_job=on_job)
+    return {**result, "query_estimate": estimate.to_dict()}
+
+
+class SpeculativeRunner:
+    """Runs strategy plans concurrently and picks the highest-priority hit."""
+
+    def __init__(
+        self,
+        run_fn: Callable[..., dict] = guarded_run_query,
+        timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    ):
+        self.run_fn = run_fn
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max_concurrency
+
+    async def run(self, plans: List[StrategyPlan]) -> List[Attempt]:
+        """Returns one Attempt per plan in strategy order; at most one has status 'found'."""
+        attempts = [Attempt(p.strategy, p.sql, p.params) for p in sorted(plans, key=lambda p: p.strategy)]
+        if not attempts:
+            return attempts
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        jobs_lock = threading.Lock()
+        jobs: List[Any] = []
+
+        def on_job(job):
+            with jobs_lock:
+                jobs.append(job)
+
+        async def attempt_one(attempt: Attempt) -> Attempt:
+            async with semaphore:
+                start = time.perf_counter()
+                result = await asyncio.to_thread(self.run_fn, attempt.sql, attempt.params, on_job)
+                attempt.elapsed_ms = (time.perf_counter() - start) * 1000
+            attempt.result = result
+            if result.get("status") == "SUCCESS":
+                attempt.row_count = len(result.get("rows") or [])
+                attempt.status = "found" if attempt.row_count else "empty"
+            else:
+                # The guard's refusals carry its estimate; other errors come from the query itself
+                attempt.status = "rejected" if "query_estimate" in result else "error"
+            return attempt
+
+        tasks = {asyncio.create_task(attempt_one(a)): a for a in attempts}
+        pending = set(tasks)
+        deadline = time.monotonic() + self.timeout_seconds
+        winner = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(
+                pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            winner = self._decided(attempts)
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            for task in pending:
+                if tasks[task].status == "pending":
+                    tasks[task].status = "cancelled" if winner else "timeout"
+            with jobs_lock:
+                for job in jobs:
+                    if getattr(job, "state", "DONE") != "DONE":
+                        try:
+                            job.cancel()
+                        except Exception:
+                            pass  # best effort; the job may have just finished
+        if winner is None:
+            # Budget ran out: settle for the best strategy that did finish with rows
+            winner = next((a for a in attempts if a.status == "found"), None)
+        for a in attempts:
+            if a.status == "found" and a is not winner:
+                a.status = "superseded"
+        return attempts
+
+    @staticmethod
+    def _decided(attempts: List[Attempt]) -> Optional[Attempt]:
+        for a in attempts:
+            if a.status == "pending":
+                return None  # a higher-priority strategy may still return rows
+            if a.status == "found":
+                return a
+        return None
+
+
+# -------------------------------------------------------------------
+# ADK integration
+# -------------------------------------------------------------------
+class SpeculativeExecutorAgent(BaseAgent):
+    """Runs pipeline_state.strategy_plans concurrently and records the outcome.
+
+    Reads the planner's pipeline_state, writes back found_results, rows,
+    chosen_sql, strategy and attempts_log (plus result_cursor when the
+    winner's rows were spilled to a cursor), and emits the updated state as
+    the agent's message so later LLM stages see it. If the planner already
+    answered (found_results=true, e.g. via a BOM graph tool) it passes
+    through.
+    """
+
+    state_key: str = "pipeline_state"
+    timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    run_fn: Optional[Callable[..., dict]] = None
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        state = parse_pipeline_state(ctx.session.state.get(self.state_key))
+        plans = plans_from_state(state)
+        if state.get("found_results") or not plans:
+            return
+        runner = SpeculativeRunner(self.run_fn or guarded_run_query, self.timeout_seconds, self.max_concurrency)
+        started_ns = time.time_ns()
+        attempts = await runner.run(plans)
+        winner = next((a for a in attempts if a.status == "found"), None)
+        tracer = get_tracer()
+        if tracer is not None:
+            for a in attempts:
+                tracer.record(ctx.invocation_id, f"strategy_{a.strategy}", "query", started_ns,
+                              started_ns + int(a.elapsed_ms * 1e6),
+                              status="OK" if a.status in ("found", "empty", "superseded") else a.status.upper(),
+                              **{"bom.row_count": a.row_count, "bom.attempt_status": a.status})
+
+        state["attempts_log"] = list(state.get("attempts_log") or []) + [a.log_entry() for a in attempts]
+        state["found_results"] = winner is not None
+        state_delta = {}
+        if winner:
+            # Large results go to a cursor; later stages see its summary and a preview
+            result = await asyncio.to_thread(compact_result, winner.result, winner.sql, winner.params)
+            state.update(strategy=winner.strategy, sql=winner.sql, params=winner.params,
+                         chosen_sql=winner.sql, rows=result.get("rows", []))
+            if "result_cursor" in result:
+                state["result_cursor"] = state_delta["result_cursor"] = result["result_cursor"]
+            elif result.get("result_is_likely_truncated"):
+                state["result_is_likely_truncated"] = True
+        else:
+            state["strategy"] = attempts[-1].strategy
+        text = json.dumps(state, default=str)
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            actions=EventActions(state_delta={**state_delta, self.state_key: text}),
+        )
@@ -0,0 +1,430 @@
+"""
+Materialized supplier summaries with incremental refresh from the loader's change set.
+
+Patterns 5 (Supply Chain Risk) and 7 (Supplier Consolidation) join every
+active BOM line to item_master and aggregate supplier_code, sourcing_type,
+lead_time_days and minimum_order_quantity on every question. The same
+aggregates are defined once here (SUMMARY_VIEWS, BigQuery SQL) and stored
+as small tables keyed by supplier_code:
+
+  supplier_risk_summary           supplier × country_of_origin × risk_level
+                                  (Pattern 5's risk rules over all active lines)
+  supplier_consolidation_summary  one row per supplier (Pattern 7 without
+                                  its HAVING / LIMIT)
+
+Where they live:
+
+  - locally as Parquet in BOM_SUMMARY_DIR (default data/.summaries),
+    stamped with the dataset version; the DuckDB mirror registers them as
+    tables, or computes them in-process when the stamp is stale
+  - in the warehouse as ``{PROJECT}.{DATASET}.<name>`` tables, written by
+    BigQuerySummaryTarget (loader runs against BigQuery only)
+
+A delta load refreshes only the supplier partitions its change set touches:
+the old and new supplier of every changed item, and the supplier of every
+component on a changed or deleted line. The item → supplier map of the
+previous refresh is kept next to the Parquet files for that. When the stored
+summaries do not belong to the dataset version the delta was computed
+against, the refresh falls back to a full rebuild.
+
+The planners get the available tables in ``{summary_tables?}``
+(make_summary_callback), and the fast path answers Pattern 7 from its
+summary (PATTERN_SUMMARY_SQL).
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from . import config
+from .query_runner import render_sql
+
+UNASSIGNED = "UNASSIGNED"  # partition of items without a supplier_code
+PARTITION_COLUMN = "supplier_code"
+META_FILE = "summaries.json"
+MEMBERSHIP_FILE = "membership.parquet"
+
+# Partial refresh: only the rows of the listed supplier partitions
+REFRESH_FILTER = f"\n  AND COALESCE(im.supplier_code, '{UNASSIGNED}') IN UNNEST(@suppliers)"
+
+
+def summary_dir() -> str:
+    return os.getenv("BOM_SUMMARY_DIR", config.data_path(".summaries"))
+
+
+@dataclass(frozen=True)
+class SummaryView:
+    name: str
+    pattern_id: str
+    grain: str
+    sql: str  # {PROJECT}.{DATASET} placeholders, {refresh_filter} after the WHERE clause
+    key_columns: Tuple[str, ...]
+    columns: Tuple[str, ...]
+    keywords: Tuple[str, ...]
+
+    def select_sql(self, partial: bool = False) -> str:
+        return render_sql(self.sql.replace("{refresh_filter}", REFRESH_FILTER if partial else ""))
+
+    def table_id(self) -> str:
+        return render_sql(f"{{PROJECT}}.{{DATASET}}.{self.name}")
+
+
+SUPPLIER_RISK = SummaryView(
+    name="supplier_risk_summary",
+    pattern_id="PATTERN_5",
+    grain="one row per supplier_code, country_of_origin and risk_level over active BOM lines",
+    sql=f"""SELECT
+  COALESCE(im.supplier_code, '{UNASSIGNED}') AS supplier_code,
+  im.country_of_origin,
+  CASE
+    WHEN bd.sourcing_type = 'SINGLE' AND im.lead_time_days > 30 THEN 'HIGH'
+    WHEN bd.sourcing_type = 'SINGLE' THEN 'MEDIUM'
+    WHEN im.lead_time_days > 60 THEN 'MEDIUM'
+    ELSE 'LOW'
+  END AS risk_level,
+  COUNT(*) AS bom_lines,
+  COUNTIF(bd.sourcing_type = 'SINGLE') AS single_source_lines,
+  COUNT(DISTINCT bd.component_item_number) AS components,
+  COUNT(DISTINCT bd.parent_item_number) AS products,
+  MAX(im.lead_time_days) AS max_lead_time_days,
+  AVG(im.lead_time_days) AS avg_lead_time_days,
+  AVG(im.minimum_order_quantity) AS avg_minimum_order_quantity
+FROM `{{PROJECT}}.{{DATASET}}.bom_details` bd
+JOIN `{{PROJECT}}.{{DATASET}}.item_master` im
+  ON bd.component_item_number = im.item_number
+WHERE bd.is_active = TRUE{{refresh_filter}}
+GROUP BY 1, 2, 3""",
+    key_columns=("supplier_code", "country_of_origin", "risk_level"),
+    columns=("supplier_code", "country_of_origin", "risk_level", "bom_lines", "single_source_lines", "components",
+             "products", "max_lead_time_days", "avg_lead_time_days", "avg_minimum_order_quantity"),
+    keywords=("supply chain risk", "supplier risk", "single source", "lead time", "risk level",
+              "country of origin", "geopolitical risk", "supplier dependency"),
+)
+
+SUPPLIER_CONSOLIDATION = SummaryView(
+    name="supplier_consolidation_summary",
+    pattern_id="PATTERN_7",
+    grain="one row per supplier_code over active BOM lines",
+    sql="""SELECT
+  im.supplier_code,
+  COUNT(DISTINCT bd.component_item_number) AS unique_components,
+  COUNT(DISTINCT bd.parent_item_number) AS products_served,
+  SUM(bd.quantity * im.unit_cost) AS total_spend,
+  STRING_AGG(DISTINCT im.category ORDER BY im.category) AS categories,
+  AVG(im.lead_time_days) AS avg_lead_time,
+  AVG(im.minimum_order_quantity) AS avg_minimum_order_quantity
+FROM `{PROJECT}.{DATASET}.bom_details` bd
+JOIN `{PROJECT}.{DATASET}.item_master` im
+  ON bd.component_item_number = im.item_number
+WHERE bd.is_active = TRUE
+  AND im.supplier_code IS NOT NULL{refresh_filter}
+GROUP BY im.supplier_code""",
+    key_columns=("supplier_code",),
+    columns=("supplier_code", "unique_components", "products_served", "total_spend", "categories",
+             "avg_lead_time", "avg_minimum_order_quantity"),
+    keywords=("supplier consolidation", "vendor analysis", "spend analysis", "supplier usage", "supplier spend",
+              "vendor diversity", "products served", "procurement optimization"),
+)
+
+SUMMARY_VIEWS: Tuple[SummaryView, ...] = (SUPPLIER_RISK, SUPPLIER_CONSOLIDATION)
+
+# Validated patterns answered from a summary with the same result
+PATTERN_SUMMARY_SQL: Dict[str, str] = {
+    "PATTERN_7": """SELECT
+  supplier_code,
+  unique_components,
+  products_served,
+  total_spend,
+  categories,
+  avg_lead_time
+FROM `{PROJECT}.{DATASET}.supplier_consolidation_summary`
+WHERE unique_components >= 3
+ORDER BY total_spend DESC
+LIMIT 20""",
+}
+
+
+# -------------------------------------------------------------------
+# Computing and merging
+# -------------------------------------------------------------------
+def compute_view(warehouse, view: SummaryView, partitions: Optional[Set[str]] = None) -> pa.Table:
+    """Rows of ``view`` from a LocalWarehouse; only ``partitions`` when given."""
+    if partitions is None:
+        reader = warehouse.stream(view.select_sql())
+    else:
+        reader = warehouse.stream(view.select_sql(partial=True), {"suppliers": sorted(partitions)})
+    return reader.read_all().sort_by([(c, "ascending") for c in view.key_columns])
+
+
+def replace_partitions(old: pa.Table, fresh: pa.Table, partitions: Set[str], view: SummaryView) -> pa.Table:
+    """``old`` with the rows of ``partitions`` swapped for ``fresh``."""
+    stale = pc.is_in(old[PARTITION_COLUMN], value_set=pa.array(sorted(partitions), pa.string()))
+    kept = old.filter(pc.invert(pc.fill_null(stale, False)))
+    merged = pa.concat_tables([kept, fresh.select(kept.column_names).cast(kept.schema)])
+    return merged.sort_by([(c, "ascending") for c in view.key_columns])
+
+
+def membership_of(item_master: pd.DataFrame) -> Dict[str, str]:
+    """item_number → supplier partition."""
+    codes = item_master["supplier_code"].astype(object).where(item_master["supplier_code"].notna(), UNASSIGNED)
+    return dict(zip(item_master["item_number"].astype(str), codes.astype(str)))
+
+
+def affected_partitions(deltas: Dict[str, Any], membership: Dict[str, str]) -> Tuple[Set[str], Dict[str, str]]:
+    """(supplier partitions a change set touches, item → supplier map after it).
+
+    ``deltas`` maps table name to the applied delta.DeltaSet.
+    """
+    updated = dict(membership)
+    touched: Set[Optional[str]] = set()
+    items = deltas.get("item_master")
+    if items is not None:
+        for item in items.deletes["item_number"].astype(str):
+            touched.add(updated.pop(item, None))
+        for item, code in membership_of(items.upserts).items():
+            touched.update((updated.get(item), code))
+            updated[item] = code
+    lines = deltas.get("bom_details")
+    if lines is not None:
+        components = pd.concat([lines.upserts["component_item_number"], lines.deletes["component_item_number"]])
+        for item in components.astype(str).unique():
+            touched.update((membership.get(item), updated.get(item)))
+    touched.discard(None)
+    return touched, updated
+
+
+# -------------------------------------------------------------------
+# Local store
+# -------------------------------------------------------------------
+class SummaryStore:
+    """<dir>/<view>.parquet, the item → supplier map and a JSON stamp."""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or summary_dir()
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.parquet")
+
+    def read_meta(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.directory, META_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_meta(self, meta: Dict[str, Any]) -> None:
+        path = os.path.join(self.directory, META_FILE)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def load(self, name: str) -> Optional[pa.Table]:
+        path = self.path(name)
+        return pq.read_table(path) if os.path.exists(path) else None
+
+    def save(self, name: str, table: pa.Table) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(name)
+        pq.write_table(table, f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+        return os.path.getsize(path)
+
+    def load_membership(self) -> Optional[Dict[str, str]]:
+        path = os.path.join(self.directory, MEMBERSHIP_FILE)
+        if not os.path.exists(path):
+            return None
+        data = pq.read_table(path)
+        return dict(zip(data.column("item_number").to_pylist(), data.column(PARTITION_COLUMN).to_pylist()))
+
+    def save_membership(self, membership: Dict[str, str]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, MEMBERSHIP_FILE)
+        pq.write_table(pa.table({"item_number": pa.array(list(membership.keys()), pa.string()),
+                                 PARTITION_COLUMN: pa.array(list(membership.values()), pa.string())}), f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+    def fresh_tables(self, version: str, views: Iterable[SummaryView] = SUMMARY_VIEWS) -> Optional[Dict[str, pa.Table]]:
+        """The stored summaries if they were refreshed for ``version``."""
+        if self.read_meta().get("dataset_version") != version:
+            return None
+        try:
+            tables = {view.name: self.load(view.name) for view in views}
+        except (OSError, pa.ArrowInvalid):
+            return None
+        return tables if all(t is not None for t in tables.values()) else None
+
+
+# -------------------------------------------------------------------
+# Warehouse target
+# -------------------------------------------------------------------
+class BigQuerySummaryTarget:
+    """Keeps the summary tables in the BigQuery dataset current."""
+
+    def __init__(self, client, location: Optional[str] = None):
+        self.client = client
+        self.location = location or config.bq_location()
+
+    def refresh(self, view: SummaryView, partitions: Optional[Set[str]] = None) -> None:
+        """CREATE OR REPLACE the table, or swap only ``partitions`` in one transaction."""
+        from google.cloud import bigquery
+
+        from .query_runner import to_query_parameters
+
+        if partitions is None:
+            sql, params = f"CREATE OR REPLACE TABLE `{view.table_id()}` AS\n{view.select_sql()}", None
+        elif not partitions:
+            return
+        else:
+            sql = (
+                "BEGIN TRANSACTION;\n"
+                f"DELETE FROM `{view.table_id()}` WHERE {PARTITION_COLUMN} IN UNNEST(@suppliers);\n"
+                f"INSERT INTO `{view.table_id()}`\n{view.select_sql(partial=True)};\n"
+                "COMMIT TRANSACTION;"
+            )
+            params = {"suppliers": sorted(partitions)}
+        job_config = bigquery.QueryJobConfig(query_parameters=to_query_parameters(params))
+        self.client.query(sql, job_config=job_config, location=self.location).result()
+
+
+# -------------------------------------------------------------------
+# Refresh (run by the loaders)
+# -------------------------------------------------------------------
+def refresh_summaries(
+    data_dir: Optional[str] = None,
+    version: Optional[str] = None,
+    deltas: Optional[Dict[str, Any]] = None,
+    base_version: Optional[str] = None,
+    store: Optional[SummaryStore] = None,
+    warehouse_target: Optional[BigQuerySummaryTarget] = None,
+    frames: Optional[Dict[str, pd.DataFrame]] = None,
+) -> Dict[str, Any]:
+    """Rebuild the summaries for ``version`` of the CSV extracts, or of ``frames`` (run by the loaders).
+
+    ``deltas`` (table name → applied delta.DeltaSet) is the change set that
+    turned ``base_version`` into ``version``; only the supplier partitions it
+    touches are recomputed. Without it, or when the stored summaries belong to
+    another version, every view is rebuilt. Returns the mode, the refreshed
+    partitions (None: all) and rows / bytes per view.
+    """
+    from .dataset import load_dataset
+    from .local_sql import LocalWarehouse
+    from .query_cache import dataset_version
+
+    version = dataset_version() if version is None else version
+    frames = frames if frames is not None else load_dataset(data_dir)
+
+    store = store or SummaryStore()
+    meta = store.read_meta()
+    membership = store.load_membership()
+    incremental = (
+        deltas is not None and membership is not None and meta.get("dataset_version") == base_version
+        and all(os.path.exists(store.path(view.name)) for view in SUMMARY_VIEWS)
+    )
+    if incremental:
+        partitions, membership = affected_partitions(deltas, membership)
+    else:
+        partitions, membership = None, membership_of(frames["item_master"])
+
+    warehouse = LocalWarehouse(frames)
+    rows: Dict[str, int] = {}
+    sizes: Dict[str, int] = {}
+    for view in SUMMARY_VIEWS:
+        if partitions is None:
+            table = compute_view(warehouse, view)
+        else:
+            table = store.load(view.name)
+            if partitions:
+                table = replace_partitions(table, compute_view(warehouse, view, partitions), partitions, view)
+        sizes[view.name] = store.save(view.name, table)
+        rows[view.name] = table.num_rows
+
+    if warehouse_target is not None:
+        # The warehouse copy can lag the local one (e.g. after --sink local runs)
+        in_step = incremental and meta.get("warehouse_version") == base_version
+        for view in SUMMARY_VIEWS:
+            warehouse_target.refresh(view, partitions if in_step else None)
+        meta["warehouse_version"] = version
+
+    store.save_membership(membership)
+    meta.update(dataset_version=version, refreshed_at=time.time(), rows=rows)
+    store.write_meta(meta)
+    return {
+        "mode": "incremental" if incremental else "full",
+        "partitions": None if partitions is None else sorted(partitions),
+        "rows": rows,
+        "bytes": sizes,
+    }
+
+
+def attach_summaries(warehouse, version: str, store: Optional[SummaryStore] = None) -> None:
+    """Register the summaries as tables of a LocalWarehouse (stored copy if current, else computed)."""
+    tables = (store or SummaryStore()).fresh_tables(version)
+    for view in SUMMARY_VIEWS:
+        table = tables[view.name] if tables else compute_view(warehouse, view)
+        warehouse.add_table(view.name, table)
+
+
+# -------------------------------------------------------------------
+# Agent integration
+# -------------------------------------------------------------------
+def summaries_available() -> bool:
+    """Whether execute_sql can read the summary tables under BQ_BACKEND."""
+    from .local_sql import sql_backend
+    from .query_cache import dataset_version
+
+    if sql_backend() in ("local", "hybrid"):
+        return True  # the mirror always holds them
+    return SummaryStore().read_meta().get("warehouse_version") == dataset_version()
+
+
+def summary_sql_for(pattern_id: str) -> Optional[str]:
+    """Summary-backed SQL for a validated pattern, when the summaries are readable."""
+    sql = PATTERN_SUMMARY_SQL.get(pattern_id)
+    return render_sql(sql) if sql and summaries_available() else None
+
+
+def matching_views(question: str) -> List[SummaryView]:
+    """Views whose keywords appear in ``question`` (none when it names item numbers)."""
+    from .pattern_router import extract_item_numbers, tokenize
+
+    if not question or extract_item_numbers(question):
+        return []  # item-level questions need the BOM lines
+    tokens = set(tokenize(question))
+    return [view for view in SUMMARY_VIEWS
+            if any(set(tokenize(keyword)) <= tokens for keyword in view.keywords)]
+
+
+def describe_summaries(question: str = "") -> str:
+    """Planner text: the available summary tables, and which one fits ``question``."""
+    if not summaries_available():
+        return ""
+    lines = ["Pre-aggregated summary tables (kilobyte-sized, refreshed by the loaders; query them instead of joining",
+             "bom_details and item_master when they answer an aggregate supplier question):"]
+    for view in SUMMARY_VIEWS:
+        lines.append(f"- `{view.table_id()}` ({view.pattern_id}): {view.grain}; columns {', '.join(view.columns)}")
+    matched = matching_views(question)
+    if matched:
+        lines.append("This question matches: " + ", ".join(f"`{view.table_id()}`" for view in matched))
+    return "\n".join(lines)
+
+
+def make_summary_callback(state_key: str = "summary_tables"):
+    """before_agent_callback that puts describe_summaries() for the question into session state.
+
+    Instructions reference it as ``{summary_tables?}``.
+    """
+
+    def before_agent(callback_context):
+        content = callback_context.user_content
+        question = " ".join(p.text for p in (content.parts if content else []) if getattr(p, "text", None))
+        callback_context.state[state_key] = describe_summaries(question)
+        return None
+
+    return before_agent
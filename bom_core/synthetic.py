@@ -0,0 +1,319 @@
+"""
+Synthetic BOM forests at configurable scale.
+
+Produces item_master / bom_details frames with exactly the columns of
+create_bom_schema.sql, shaped like a real product structure:
+
+  - ``depth`` levels: finished goods on top, raw materials at the bottom,
+    level sizes growing by roughly ``fan_out`` per level
+  - every non-leaf item has one BOM of ~``fan_out`` lines (Poisson), whose
+    components sit on the next level or occasionally deeper
+  - ``share_ratio`` of the lines reuse popular parts (skewed choice), which
+    gives the wide where-used fan-in of common fasteners and cells
+  - effective/expiration dates spread over ``spread_days``; a share of
+    ``alternate_rate`` parents also get an alternate BOM that is inactive
+    or effective in a different window
+  - ``cycle_rate`` of the parents close a loop back to themselves through a
+    random descendant path, so cycle detection and the ``level < 10``
+    recursion guard have something to find
+
+Generation is vectorized with numpy; a million BOM lines take a few
+seconds. ``write_dataset`` writes the CSVs in the loaders' format next to
+copies of the schema and docs, so BOM_DATA_DIR can point at the output.
+
+    python -m bom_core.synthetic --out_dir /tmp/bom_large --items 200000 --depth 8
+"""
+
+import argparse
+import csv
+import os
+import shutil
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import config
+from .dataset import _CSV_FILES
+from .schema import load_schema
+
+DOC_FILES = ("field_mapping_documentation.md", "query_patterns_documentation.md")
+
+_CATEGORIES = np.array(["ELECTRONICS", "BATTERIES", "WHEELS", "FRAMES", "BICYCLES", "SCOOTERS"])
+_UOMS = np.array(["EA", "SET", "KG", "M", "L"])
+_COLORS = np.array(["Black", "White", "Silver", "Red", "Blue", "Matte Black"])
+_MATERIALS = np.array(["Aluminum", "Steel", "Titanium", "Plastic", "Carbon Fiber"])
+_MANUFACTURERS = np.array(["Samsung", "LG", "Panasonic", "Trek Bikes", "Xiaomi"])
+_COUNTRIES = np.array(["China", "Germany", "Japan", "Taiwan", "USA"])
+_COMPLIANCE = np.array(["ROHS", "REACH", "CE", "FCC", "UN38.3"])
+_ITEM_STATUS = np.array(["ACTIVE", "INACTIVE", "NPI", "OBSOLETE"])
+_ITEM_STATUS_P = np.array([0.7, 0.1, 0.1, 0.1])
+_SUPPLY = np.array(["MAKE", "BUY", "MAKE_OR_BUY"])
+_SOURCING = np.array(["INTERNAL", "EXTERNAL", "DUAL_SOURCE"])
+_TOOLING = np.array(["NO", "YES", "SPECIAL"])
+_APPROVAL = np.array(["APPROVED", "PENDING", "DRAFT", "REJECTED"])
+_APPROVAL_P = np.array([0.7, 0.1, 0.1, 0.1])
+_REVISIONS = np.array(["R1", "R2", "R3", "R4", "R5"])
+
+
+@dataclass
+class GeneratorConfig:
+    items: int = 10_000
+    depth: int = 6
+    fan_out: float = 4.0
+    share_ratio: float = 0.3
+    spread_days: int = 730
+    alternate_rate: float = 0.05
+    cycle_rate: float = 0.001
+    suppliers: int = 50
+    start_date: str = "2024-01-01"
+    seed: int = 42
+
+
+def _level_sizes(cfg: GeneratorConfig) -> np.ndarray:
+    growth = max(1.2, cfg.fan_out * (1.0 - cfg.share_ratio * 0.5))
+    weights = growth ** np.arange(cfg.depth)
+    sizes = np.maximum(1, np.floor(cfg.items * weights / weights.sum())).astype(np.int64)
+    sizes[-1] += cfg.items - sizes.sum()  # rounding remainder goes to the leaves
+    return sizes
+
+
+def _dates(rng, start: np.datetime64, count: int, spread_days: int) -> np.ndarray:
+    return start + rng.integers(0, max(spread_days, 1), count).astype("timedelta64[D]")
+
+
+def generate_items(cfg: GeneratorConfig, rng, levels: np.ndarray) -> pd.DataFrame:
+    n = len(levels)
+    width = max(3, len(str(n)))
+    numbers = np.char.add("ITEM-", np.char.zfill(np.arange(1, n + 1).astype(str), width))
+    item_type = np.where(rng.random(n) < 0.5, "ASSEMBLY", "COMPONENT").astype(object)
+    item_type[levels == 0] = "FINISHED_GOOD"
+    leaf = levels == cfg.depth - 1
+    item_type[leaf] = np.where(rng.random(leaf.sum()) < 0.85, "RAW_MATERIAL", "TOOL")
+    category = rng.choice(_CATEGORIES, n)
+    status = rng.choice(_ITEM_STATUS, n, p=_ITEM_STATUS_P)
+    start = np.datetime64(cfg.start_date)
+    created = _dates(rng, start, n, cfg.spread_days)
+    suppliers = np.char.add("SUP", np.char.zfill(rng.integers(1, cfg.suppliers + 1, n).astype(str), 3))
+    seq = np.char.zfill(np.arange(1, n + 1).astype(str), 6)
+    return pd.DataFrame({
+        "item_number": numbers,
+        "item_description": pd.Series(item_type).str.cat([pd.Series(category), pd.Series(np.full(n, "Component")),
+                                                          pd.Series(np.arange(1, n + 1).astype(str))], sep=" "),
+        "item_type": item_type,
+        "category": category,
+        "uom": rng.choice(_UOMS, n),
+        "weight": np.round(rng.uniform(0.1, 50.0, n), 1),
+        "dimensions": pd.Series(rng.integers(10, 200, n).astype(str)) + "x" + rng.integers(10, 100, n).astype(str)
+        + "x" + rng.integers(5, 50, n).astype(str) + "cm",
+        "color": rng.choice(_COLORS, n),
+        "material": rng.choice(_MATERIALS, n),
+        "manufacturer": rng.choice(_MANUFACTURERS, n),
+        "manufacturer_part_number": np.char.add("PART-", seq),
+        "supplier_code": suppliers,
+        "supplier_part_number": np.char.add("SUP-PART-", seq),
+        "lead_time_days": rng.integers(1, 91, n),
+        "minimum_order_quantity": rng.integers(1, 101, n),
+        "unit_cost": np.round(rng.lognormal(5.0, 1.2, n), 2),
+        "currency": "USD",
+        "country_of_origin": rng.choice(_COUNTRIES, n),
+        "compliance_status": rng.choice(_COMPLIANCE, n),
+        "is_serialized": rng.random(n) < 0.3,
+        "is_npi": status == "NPI",
+        "is_obsolete": status == "OBSOLETE",
+        "status": status,
+        "created_date": created,
+        "last_modified_date": created + rng.integers(0, 60, n).astype("timedelta64[D]"),
+        "revision": rng.choice(_REVISIONS, n),
+        "notes": np.char.add("Notes for ", numbers),
+    })
+
+
+def _bom_structure(cfg: GeneratorConfig, rng, sizes: np.ndarray):
+    """(parent, component) item indexes of the primary BOM lines."""
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    parents = np.arange(offsets[-2])  # every item above the leaf level
+    parent_level = np.searchsorted(offsets, parents, side="right") - 1
+    lines_per_parent = 1 + rng.poisson(max(cfg.fan_out - 1.0, 0.0), len(parents))
+    line_parent = np.repeat(parents, lines_per_parent)
+    line_level = np.repeat(parent_level, lines_per_parent)
+    # Mostly the next level; some lines skip levels (purchased sub-assemblies, raw stock)
+    skip = rng.geometric(0.85, len(line_parent)) - 1
+    child_level = np.minimum(line_level + 1 + skip, cfg.depth - 1)
+    level_size = sizes[child_level]
+    shared = rng.random(len(line_parent)) < cfg.share_ratio
+    # Shared lines draw from the head of the level (skewed), the rest uniformly
+    position = np.where(shared, np.floor(level_size * rng.random(len(line_parent)) ** 4),
+                        rng.integers(0, np.iinfo(np.int64).max, len(line_parent)) % level_size)
+    line_child = offsets[child_level] + position.astype(np.int64)
+    return line_parent, line_child, lines_per_parent
+
+
+def _close_cycles(cfg: GeneratorConfig, rng, parent: np.ndarray, child: np.ndarray, n_parents: int):
+    """Extra (descendant -> ancestor) lines that close loops of random length."""
+    count = int(round(cfg.cycle_rate * n_parents))
+    if count == 0:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    order = np.argsort(parent, kind="stable")
+    sorted_parent, sorted_child = parent[order], child[order]
+    starts = np.searchsorted(sorted_parent, np.arange(n_parents + 1))
+    back_parent, back_child = [], []
+    for top in rng.choice(n_parents, count, replace=False):
+        node, hops = int(top), int(rng.integers(1, cfg.depth))
+        for _ in range(hops):
+            # Walk down through assemblies only; a leaf cannot close a cycle
+            children = sorted_child[starts[node]:starts[node + 1]]
+            children = children[children < n_parents]
+            if not len(children):
+                break
+            node = int(children[rng.integers(len(children))])
+        if node != top and node < n_parents:
+            back_parent.append(node)
+            back_child.append(int(top))
+    return np.array(back_parent, np.int64), np.array(back_child, np.int64)
+
+
+def generate_bom_lines(cfg: GeneratorConfig, rng, items: pd.DataFrame, sizes: np.ndarray) -> pd.DataFrame:
+    parent, child, per_parent = _bom_structure(cfg, rng, sizes)
+    n_parents = len(per_parent)
+    width = max(3, len(str(n_parents * 2)))
+    bom_of_parent = np.char.add("BOM-", np.char.zfill(np.arange(1, n_parents + 1).astype(str), width))
+    bom_id = bom_of_parent[parent].astype(object)
+    active = np.ones(len(parent), bool)
+
+    back_parent, back_child = _close_cycles(cfg, rng, parent, child, n_parents)
+    if len(back_parent):
+        bom_id = np.concatenate([bom_id, bom_of_parent[back_parent]])
+        parent, child = np.concatenate([parent, back_parent]), np.concatenate([child, back_child])
+        active = np.concatenate([active, np.ones(len(back_parent), bool)])
+
+    start = np.datetime64(cfg.start_date)
+    effective = _dates(rng, start, n_parents, cfg.spread_days)[parent]
+
+    # Alternate BOMs: a copy of the parent's lines under a new bom_id, inactive or in a later window
+    alternates = np.flatnonzero(rng.random(n_parents) < cfg.alternate_rate)
+    if len(alternates):
+        alt_ids = np.char.add("BOM-", np.char.zfill((n_parents + 1 + np.arange(len(alternates))).astype(str), width))
+        alt_of = dict(zip(alternates.tolist(), alt_ids.tolist()))
+        mask = np.isin(parent, alternates)
+        copy_parent, copy_child = parent[mask], child[mask]
+        bom_id = np.concatenate([bom_id, [alt_of[p] for p in copy_parent.tolist()]])
+        parent, child = np.concatenate([parent, copy_parent]), np.concatenate([child, copy_child])
+        active = np.concatenate([active, rng.random(len(copy_parent)) < 0.3])
+        effective = np.concatenate([effective, effective[mask] + rng.integers(
+            30, max(cfg.spread_days, 31), len(copy_parent)).astype("timedelta64[D]")])
+
+    n = len(parent)
+    # sequence_number is the line position inside its BOM, which keeps the natural key unique
+    frame = pd.DataFrame({"bom_id": bom_id})
+    sequence = frame.groupby("bom_id", sort=False).cumcount().to_numpy() + 1
+    expiration = effective + rng.integers(30, max(cfg.spread_days, 31) * 2, n).astype("timedelta64[D]")
+    expiration = np.where(rng.random(n) < 0.3, np.datetime64("NaT"), expiration)
+    created = effective - rng.integers(1, 30, n).astype("timedelta64[D]")
+    components = items["item_number"].to_numpy()[child]
+    users = np.char.add("USER", np.char.zfill(rng.integers(1, 11, n).astype(str), 3))
+    return pd.DataFrame({
+        "bom_id": bom_id,
+        "parent_item_number": items["item_number"].to_numpy()[parent],
+        "component_item_number": components,
+        "quantity": np.round(rng.uniform(0.1, 100.0, n), 2),
+        "quantity_unit": rng.choice(_UOMS[[0, 2, 3, 4]], n),
+        "sequence_number": sequence,
+        "supply_type": rng.choice(_SUPPLY, n),
+        "sourcing_type": rng.choice(_SOURCING, n),
+        "supplier_code": items["supplier_code"].to_numpy()[child],
+        "supplier_part_number": items["supplier_part_number"].to_numpy()[child],
+        "lead_time_days": rng.integers(1, 61, n),
+        "effective_date": effective,
+        "expiration_date": expiration,
+        "is_active": active,
+        "is_optional": rng.random(n) < 0.1,
+        "is_phantom": rng.random(n) < 0.05,
+        "scrap_factor": np.round(rng.uniform(0.0, 0.1, n), 3),
+        "yield_factor": np.round(rng.uniform(0.95, 1.0, n), 3),
+        "setup_time_minutes": rng.integers(5, 121, n),
+        "cycle_time_minutes": rng.integers(1, 61, n),
+        "labor_hours": np.round(rng.uniform(0.1, 8.0, n), 1),
+        "tooling_required": rng.choice(_TOOLING, n),
+        "special_instructions": np.char.add("Instructions for ", components.astype(str)),
+        "quality_requirements": np.char.add("Quality requirements for ", components.astype(str)),
+        "test_requirements": np.char.add("Test requirements for ", components.astype(str)),
+        "packaging_requirements": np.char.add("Packaging requirements for ", components.astype(str)),
+        "created_by": users,
+        "created_date": created,
+        "last_modified_by": users,
+        "last_modified_date": created + rng.integers(0, 30, n).astype("timedelta64[D]"),
+        "revision": rng.choice(_REVISIONS, n),
+        "approval_status": rng.choice(_APPROVAL, n, p=_APPROVAL_P),
+        "notes": pd.Series(bom_id).radd("Notes for BOM ").to_numpy(),
+    })
+
+
+def generate_dataset(cfg: Optional[GeneratorConfig] = None) -> Dict[str, pd.DataFrame]:
+    """Both tables, columns in create_bom_schema.sql order."""
+    cfg = cfg or GeneratorConfig()
+    if cfg.depth < 2:
+        raise ValueError("depth must be at least 2 (parents and leaves)")
+    rng = np.random.default_rng(cfg.seed)
+    sizes = _level_sizes(cfg)
+    levels = np.repeat(np.arange(cfg.depth), sizes)
+    items = generate_items(cfg, rng, levels)
+    lines = generate_bom_lines(cfg, rng, items, sizes)
+    frames = {"item_master": items, "bom_details": lines}
+    for name, table in load_schema().items():
+        missing = set(table.column_names) ^ set(frames[name].columns)
+        if missing:
+            raise AssertionError(f"{name} columns out of sync with the schema: {sorted(missing)}")
+        frames[name] = frames[name][table.column_names]
+    return frames
+
+
+def _csv_frame(df: pd.DataFrame) -> pd.DataFrame:
+    out = df.copy()
+    for column in out.columns:
+        if pd.api.types.is_bool_dtype(out[column]):
+            out[column] = np.where(out[column], "true", "false")
+        elif pd.api.types.is_datetime64_any_dtype(out[column]):
+            out[column] = out[column].dt.strftime("%Y-%m-%d")
+    return out
+
+
+def write_dataset(frames: Dict[str, pd.DataFrame], out_dir: str, cfg: Optional[GeneratorConfig] = None) -> Dict[str, str]:
+    """Write the CSV extracts (loader format) plus the schema/docs they belong to."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {}
+    for name, df in frames.items():
+        path = os.path.join(out_dir, _CSV_FILES[name])
+        _csv_frame(df).to_csv(path, index=False, quoting=csv.QUOTE_ALL)
+        paths[name] = path
+    for file_name in (config.SCHEMA_SQL, *DOC_FILES):
+        source = config.data_path(file_name)
+        if os.path.exists(source) and os.path.abspath(source) != os.path.abspath(os.path.join(out_dir, file_name)):
+            shutil.copyfile(source, os.path.join(out_dir, file_name))
+    if cfg is not None:
+        pd.Series(asdict(cfg)).to_json(os.path.join(out_dir, "generator_config.json"), indent=2)
+    return paths
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    defaults = GeneratorConfig()
+    parser = argparse.ArgumentParser(description="Generate a synthetic BOM dataset")
+    parser.add_argument("--out_dir", required=True, help="Directory for item_master.csv / bom_details.csv")
+    for name, value in asdict(defaults).items():
+        parser.add_argument(f"--{name}", type=type(value), default=value)
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = _parse_args(argv)
+    cfg = GeneratorConfig(**{k: v for k, v in vars(args).items() if k != "out_dir"})
+    frames = generate_dataset(cfg)
+    paths = write_dataset(frames, args.out_dir, cfg)
+    for name, path in paths.items():
+        print(f"✅ {name}: {len(frames[name]):,} rows → {path}")
+    print(f"Use it with: BOM_DATA_DIR={args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
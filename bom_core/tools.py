@@ -0,0 +1,465 @@
+"""
+ADK function tools backed by the in-process BOM engines.
+
+Agents list these next to BigQueryToolset and call them first for the
+structural questions they can answer locally. Return values mirror the
+BigQuery execute_sql tool ({"status": "SUCCESS", "rows": [...]} or
+{"status": "ERROR", "error_details": ...}) so prompts can treat both alike.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from . import config, dataset
+from .configurator import ConfigurationEngine
+from .effectivity import EffectivityIndex
+from .exposure import ExposureIndex
+from .graph import MAX_LEVELS, BomCycleError, BomGraph
+from .query_cache import dataset_version
+from .rollup import CostRollup
+from .snapshot import BomSnapshot, open_current
+
+MAX_TOOL_ROWS = 100  # Same cap as MAX_RESULT_ROWS / max_query_result_rows
+
+
+# Engines are keyed on (data_dir, dataset_version) so a loader run rebuilds them
+@lru_cache(maxsize=1)
+def _snapshot_for(data_dir: str, version: str) -> Optional[BomSnapshot]:
+    return open_current(version)
+
+
+@lru_cache(maxsize=1)
+def _dataset_for(data_dir: str, version: str) -> Dict[str, pd.DataFrame]:
+    snapshot = _snapshot_for(data_dir, version)
+    return snapshot.frames() if snapshot is not None else dataset.load_dataset(data_dir)
+
+
+@lru_cache(maxsize=1)
+def _graph_for(data_dir: str, version: str) -> BomGraph:
+    snapshot = _snapshot_for(data_dir, version)
+    if snapshot is not None:
+        return BomGraph.from_snapshot(snapshot)  # shared, read-only pages of the loader's snapshot
+    return BomGraph(_dataset_for(data_dir, version)["bom_details"])
+
+
+@lru_cache(maxsize=1)
+def _rollup_for(data_dir: str, version: str) -> CostRollup:
+    frames = _dataset_for(data_dir, version)
+    return CostRollup(_graph_for(data_dir, version), frames["bom_details"], frames["item_master"])
+
+
+@lru_cache(maxsize=1)
+def _effectivity_for(data_dir: str, version: str) -> EffectivityIndex:
+    return EffectivityIndex(_graph_for(data_dir, version))
+
+
+@lru_cache(maxsize=1)
+def _exposure_for(data_dir: str, version: str) -> ExposureIndex:
+    return ExposureIndex(_graph_for(data_dir, version), _dataset_for(data_dir, version)["item_master"])
+
+
+@lru_cache(maxsize=1)
+def _configurator_for(data_dir: str, version: str) -> ConfigurationEngine:
+    frames = _dataset_for(data_dir, version)
+    return ConfigurationEngine(_graph_for(data_dir, version), frames["bom_details"], frames["item_master"])
+
+
+def get_dataset() -> Dict[str, pd.DataFrame]:
+    """Process-wide typed frames of both BOM tables, loaded on first use.
+
+    Read from the loaders' binary snapshot (snapshot.py) when it matches the
+    dataset version, else parsed from the CSV extracts.
+    """
+    return _dataset_for(config.data_dir(), dataset_version())
+
+
+def get_bom_graph() -> BomGraph:
+    """Process-wide BomGraph built from bom_details.csv on first use."""
+    return _graph_for(config.data_dir(), dataset_version())
+
+
+def get_cost_rollup() -> CostRollup:
+    """Process-wide CostRollup over the active BOM structure."""
+    return _rollup_for(config.data_dir(), dataset_version())
+
+
+def get_effectivity_index() -> EffectivityIndex:
+    """Process-wide effectivity-date index over the BomGraph's lines."""
+    return _effectivity_for(config.data_dir(), dataset_version())
+
+
+def get_exposure_index() -> ExposureIndex:
+    """Process-wide attribute/closure bitmap index over the active structure."""
+    return _exposure_for(config.data_dir(), dataset_version())
+
+
+def get_configuration_engine() -> ConfigurationEngine:
+    """Process-wide phantom collapse / option configuration engine over the active structure."""
+    return _configurator_for(config.data_dir(), dataset_version())
+
+
+def _rows_result(rows, **extra) -> dict:
+    result = {
+        "status": "SUCCESS",
+        "row_count": len(rows),
+        "rows": rows[:MAX_TOOL_ROWS],
+    }
+    if len(rows) > MAX_TOOL_ROWS:
+        from .cursors import get_cursor_store
+
+        # Keep every row reachable: spill the full list and hand back a cursor
+        try:
+            result["result_cursor"] = get_cursor_store().open_rows(rows, source="bom_graph").summary()
+        except Exception:
+            result["result_is_likely_truncated"] = True
+    result.update(extra)
+    return result
+
+
+def _error(exc: Exception) -> dict:
+    return {"status": "ERROR", "error_details": str(exc)}
+
+
+# -------------------------------------------------------------------
+# BOM graph tools
+# -------------------------------------------------------------------
+def explode_bom(item_number: str, max_levels: int = MAX_LEVELS, as_of_date: Optional[str] = None) -> dict:
+    """Multi-level BOM explosion of an assembly (all levels of its structure).
+
+    Use instead of a WITH RECURSIVE query for "full BOM tree", "all levels"
+    or "indented BOM" questions about a known parent item number. Pass
+    as_of_date for "what did it look like on <date>" questions.
+
+    Args:
+        item_number: Parent/top item number, e.g. 'ITEM-057'.
+        max_levels: Maximum depth to expand (default 10).
+        as_of_date: Optional YYYY-MM-DD. Uses the lines in effect on that
+            date (by effective/expiration date) instead of the active ones.
+
+    Returns:
+        dict with status, row_count, rows (level, parent_item_number,
+        component_item_number, quantity, extended_quantity, structure_path,
+        bom_id) and cycles found under the item.
+    """
+    try:
+        if as_of_date:
+            rows, cycles = get_effectivity_index().explode(item_number, as_of_date, max_levels=max_levels)
+            return _rows_result(rows, cycles=cycles, as_of_date=as_of_date)
+        rows, cycles = get_bom_graph().explode(item_number, max_levels=max_levels)
+    except (KeyError, ValueError) as e:
+        return _error(e)
+    return _rows_result(rows, cycles=cycles)
+
+
+def where_used(component_item_number: str, max_levels: int = MAX_LEVELS, as_of_date: Optional[str] = None) -> dict:
+    """Multi-level where-used (implosion) for a component.
+
+    Use for "which products/assemblies use component X" questions when the
+    component item number is known, optionally as of a past or future date.
+
+    Args:
+        component_item_number: Component item number, e.g. 'ITEM-148'.
+        max_levels: Maximum number of levels to walk upwards (default 10).
+        as_of_date: Optional YYYY-MM-DD. Uses the lines in effect on that
+            date (by effective/expiration date) instead of the active ones.
+
+    Returns:
+        dict with status, row_count and rows (level, parent_item_number,
+        component_item_number, bom_id, quantity, is_top_level).
+    """
+    try:
+        if as_of_date:
+            rows = get_effectivity_index().where_used(component_item_number, as_of_date, max_levels=max_levels)
+            return _rows_result(rows, as_of_date=as_of_date)
+        rows = get_bom_graph().where_used(component_item_number, max_levels=max_levels)
+    except (KeyError, ValueError) as e:
+        return _error(e)
+    return _rows_result(rows)
+
+
+def flatten_bom(item_number: str) -> dict:
+    """Quantity-extended flat parts list: total units of each descendant per one item.
+
+    Args:
+        item_number: Parent/top item number.
+
+    Returns:
+        dict with status, row_count and rows (component_item_number,
+        total_quantity) sorted by total_quantity descending.
+    """
+    try:
+        totals = get_bom_graph().flatten(item_number)
+    except (KeyError, BomCycleError) as e:
+        return _error(e)
+    rows = [
+        {"component_item_number": item, "total_quantity": qty}
+        for item, qty in sorted(totals.items(), key=lambda kv: -kv[1])
+    ]
+    return _rows_result(rows)
+
+
+def detect_bom_cycles() -> dict:
+    """Find circular references in active BOM lines (items that contain themselves).
+
+    Returns:
+        dict with status, row_count and rows (cycle: list of item numbers).
+    """
+    cycles = get_bom_graph().find_cycles()
+    return _rows_result([{"cycle": c} for c in cycles])
+
+
+BOM_GRAPH_TOOLS = [explode_bom, where_used, flatten_bom, detect_bom_cycles]
+
+
+# -------------------------------------------------------------------
+# Cost rollup tools
+# -------------------------------------------------------------------
+def rollup_cost(item_number: str) -> dict:
+    """Fully rolled-up material cost of an item through all BOM levels.
+
+    Applies scrap_factor and yield_factor on every line. Use for "total
+    cost", "BOM costing" and "cost breakdown" questions about one item.
+
+    Args:
+        item_number: Item to cost, e.g. 'ITEM-057'.
+
+    Returns:
+        dict with status, item_number, rolled_cost and rows (per direct
+        component: effective_quantity, component_rolled_cost, extended_cost).
+    """
+    try:
+        engine = get_cost_rollup()
+        cost = engine.cost_of(item_number)
+        rows = engine.breakdown(item_number)
+    except (KeyError, BomCycleError) as e:
+        return _error(e)
+    return _rows_result(rows, item_number=item_number, rolled_cost=cost)
+
+
+def what_if_unit_cost(item_number: str, new_unit_cost: float) -> dict:
+    """What-if: how rolled-up assembly costs change if one item's unit_cost changes.
+
+    Nothing is written; only the affected ancestors are recomputed.
+
+    Args:
+        item_number: Leaf (purchased) item whose unit_cost changes, e.g.
+            'ITEM-148'. Assemblies are refused: their cost rolls up from
+            their components.
+        new_unit_cost: Hypothetical new unit cost.
+
+    Returns:
+        dict with status and rows (item_number, old_rolled_cost,
+        new_rolled_cost, delta) sorted by absolute delta.
+    """
+    try:
+        rows = get_cost_rollup().what_if({item_number: new_unit_cost})
+    except (KeyError, ValueError, BomCycleError) as e:
+        return _error(e)
+    return _rows_result(rows)
+
+
+COST_ROLLUP_TOOLS = [rollup_cost, what_if_unit_cost]
+
+
+# -------------------------------------------------------------------
+# Effectivity (as-of date) tools
+# -------------------------------------------------------------------
+def diff_bom(item_number: str, from_date: str, to_date: str, max_levels: int = MAX_LEVELS) -> dict:
+    """Compare an assembly's multi-level structure on two dates (engineering change review).
+
+    Args:
+        item_number: Parent/top item number, e.g. 'ITEM-057'.
+        from_date: Earlier date, YYYY-MM-DD.
+        to_date: Later date, YYYY-MM-DD.
+        max_levels: Maximum depth to compare (default 10).
+
+    Returns:
+        dict with status, row_count and rows (change: added | removed |
+        quantity_changed, level, parent_item_number, component_item_number,
+        structure_path, quantity_from, quantity_to, bom_id).
+    """
+    try:
+        rows = get_effectivity_index().diff(item_number, from_date, to_date, max_levels=max_levels)
+    except (KeyError, ValueError) as e:
+        return _error(e)
+    return _rows_result(rows, item_number=item_number, from_date=from_date, to_date=to_date)
+
+
+def bom_changes(from_date: str, to_date: str, item_number: Optional[str] = None) -> dict:
+    """BOM lines that took effect or expired between two dates.
+
+    Use for "what changed in <period>" questions, across all BOMs or within
+    one assembly's structure.
+
+    Args:
+        from_date: Start of the window (exclusive), YYYY-MM-DD.
+        to_date: End of the window (inclusive), YYYY-MM-DD.
+        item_number: Optional top item; only lines in its structure count.
+
+    Returns:
+        dict with status, row_count and rows (change: took_effect | expired,
+        parent_item_number, component_item_number, quantity, bom_id,
+        effective_date, expiration_date) in date order.
+    """
+    try:
+        rows = get_effectivity_index().changed_lines(from_date, to_date, item_number)
+    except (KeyError, ValueError) as e:
+        return _error(e)
+    return _rows_result(rows)
+
+
+EFFECTIVITY_TOOLS = [diff_bom, bom_changes]
+
+
+# -------------------------------------------------------------------
+# Exposure (attribute bitmap) tools
+# -------------------------------------------------------------------
+def find_exposed_products(conditions: List[str], match_all: bool = False, top_level_only: bool = True) -> dict:
+    """Products whose multi-level structure contains parts matching item attribute conditions.
+
+    Use for "which products contain obsolete / NPI / non-compliant parts"
+    at any depth (Patterns 6, 9 and 10 only look one level down).
+
+    Args:
+        conditions: Condition strings: a named check ('obsolete', 'npi',
+            'non_compliant' = neither ROHS nor REACH), a boolean column
+            ('is_obsolete'), 'column=value' with '|' between alternatives
+            ('status=OBSOLETE|INACTIVE', 'country_of_origin=China'), or
+            any of these prefixed with 'not '.
+        match_all: Parts must match every condition (default: any).
+        top_level_only: Only top-level products (default); False checks
+            every assembly.
+
+    Returns:
+        dict with status, row_count and rows (item_number, item_description,
+        exposed_parts, total_parts, exposed_share, sample_parts), most
+        exposed first.
+    """
+    try:
+        rows = get_exposure_index().exposed_assemblies(conditions, match_all, top_level_only)
+    except (KeyError, ValueError) as e:
+        return _error(e)
+    return _rows_result(rows, conditions=conditions, match_all=match_all)
+
+
+def exposed_parts(item_number: str, conditions: List[str], match_all: bool = False) -> dict:
+    """Parts anywhere below one assembly that match item attribute conditions.
+
+    Args:
+        item_number: Assembly/product item number, e.g. 'ITEM-001'.
+        conditions: Same condition strings as find_exposed_products.
+        match_all: Parts must match every condition (default: any).
+
+    Returns:
+        dict with status, row_count and rows (component_item_number,
+        item_description, status, is_obsolete, is_npi, compliance_status,
+        country_of_origin).
+    """
+    try:
+        rows = get_exposure_index().exposed_parts(item_number, conditions, match_all)
+    except (KeyError, ValueError) as e:
+        return _error(e)
+    return _rows_result(rows, item_number=item_number, conditions=conditions)
+
+
+def exposure_audit(item_numbers: Optional[List[str]] = None, top_level_only: bool = True) -> dict:
+    """Obsolete, NPI and non-compliant part counts for many assemblies in one call.
+
+    Args:
+        item_numbers: Assemblies to audit; default every top-level product.
+        top_level_only: With no item_numbers, False audits every assembly.
+
+    Returns:
+        dict with status, row_count and rows (item_number, item_description,
+        total_parts, obsolete_parts, npi_parts, non_compliant_parts).
+    """
+    try:
+        rows = get_exposure_index().audit(top_level_only=top_level_only, item_numbers=item_numbers)
+    except (KeyError, ValueError) as e:
+        return _error(e)
+    return _rows_result(rows)
+
+
+EXPOSURE_TOOLS = [find_exposed_products, exposed_parts, exposure_audit]
+
+
+# -------------------------------------------------------------------
+# Phantom collapse and option configuration tools
+# -------------------------------------------------------------------
+def phantom_flattened_bom(item_number: str) -> dict:
+    """Direct components of an assembly with its phantom sub-assemblies blown through.
+
+    Phantom lines are replaced by the phantom's own components, with the
+    quantities multiplied, at any phantom depth (Pattern 11 only lists the
+    phantom lines).
+
+    Args:
+        item_number: Assembly/product item number, e.g. 'ITEM-004'.
+
+    Returns:
+        dict with status, row_count and rows (component_item_number,
+        item_description, item_type, quantity, is_optional, via_phantom,
+        phantom_levels, bom_id).
+    """
+    try:
+        rows = get_configuration_engine().collapsed_bom(item_number)
+    except KeyError as e:
+        return _error(e)
+    return _rows_result(rows, item_number=item_number)
+
+
+def configuration_options(item_number: str) -> dict:
+    """Optional components at every level of a product, plus its configuration count and ranges.
+
+    Use for "what options does product X have", "how many variants" and
+    "cost range across configurations" questions (Pattern 12 only looks
+    one level down). Every optional line is an independent include/exclude
+    choice, so nothing is enumerated.
+
+    Args:
+        item_number: Product item number, e.g. 'ITEM-001'.
+
+    Returns:
+        dict with status, rows (parent_item_number, component_item_number,
+        item_description, quantity, min_added_cost, max_added_cost,
+        lead_time_days, configurations_when_included, bom_id) and
+        configurations, min_cost, max_cost, min_lead_time_days,
+        max_lead_time_days (and cycle_lines_cut if the structure is cyclic).
+    """
+    try:
+        engine = get_configuration_engine()
+        summary = engine.summary(item_number)
+        rows = engine.options(item_number)
+    except KeyError as e:
+        return _error(e)
+    return _rows_result(rows, **summary)
+
+
+def enumerate_configurations(item_number: str, limit: int = 20, order_by: Optional[str] = None) -> dict:
+    """Concrete option configurations of a product with their rolled cost and lead time.
+
+    Args:
+        item_number: Product item number, e.g. 'ITEM-001'.
+        limit: Configurations to return (default 20); the first one has no
+            options selected.
+        order_by: Optional 'cost' or 'lead_time' to return the cheapest /
+            fastest configurations (only for products with up to a million
+            configurations).
+
+    Returns:
+        dict with status, configurations (total count) and rows
+        (configuration, option_count, selected_options as structure paths,
+        rolled_cost, lead_time_days).
+    """
+    try:
+        engine = get_configuration_engine()
+        total = engine.count_configurations(item_number)
+        rows = list(engine.configurations(item_number, limit=limit, order_by=order_by))
+    except (KeyError, ValueError) as e:
+        return _error(e)
+    return _rows_result(rows, item_number=item_number, configurations=total, order_by=order_by)
+
+
+CONFIGURATOR_TOOLS = [phantom_flattened_bom, configuration_options, enumerate_configurations]
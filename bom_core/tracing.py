@@ -0,0 +1,432 @@
+"""
+Per-agent latency/token tracing for the demo agents.
+
+``instrument(agent)`` walks an agent tree and adds ADK callbacks to every
+sub-agent, so each invocation produces one trace made of spans:
+
+  - agent   one per sub-agent run (LoopAgent iterations are numbered)
+  - llm     one per model turn: duration, input/output/cached tokens, and
+            the size of pipeline_state sent along with the prompt
+  - tool    one per tool call: duration, row count, cache hit, backend and
+            the bytes estimate recorded by the query guard
+
+Completed traces go to BOM_TRACE_DIR as
+  spans.jsonl        one flat JSON span per line (easy to grep / load in pandas)
+  traces.otlp.jsonl  one OTLP/JSON ExportTraceServiceRequest per line, the
+                     format read by the OpenTelemetry collector's
+                     ``otlpjsonfile`` receiver and most trace viewers
+
+Tracing is off (``instrument`` is a no-op) unless BOM_TRACE_DIR is set.
+``python -m bom_core.tracing [spans.jsonl]`` prints the latest trace as an
+indented timeline.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+SPANS_FILE = "spans.jsonl"
+OTLP_FILE = "traces.otlp.jsonl"
+PIPELINE_STATE = "pipeline_state"
+CHARS_PER_TOKEN = 4  # rough estimate for pipeline_state growth, not billing
+
+_OTLP_KIND = {"agent": 1, "llm": 3, "tool": 1, "query": 3}  # INTERNAL / CLIENT
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    kind: str  # agent | llm | tool | query
+    start_ns: int
+    end_ns: Optional[int] = None
+    status: str = "OK"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or self.start_ns) - self.start_ns) / 1e6
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = asdict(self)
+        out["duration_ms"] = round(self.duration_ms, 3)
+        return out
+
+
+# -------------------------------------------------------------------
+# Exporters
+# -------------------------------------------------------------------
+class JsonlSpanExporter:
+    """Appends one JSON object per span."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": value if isinstance(value, str) else json.dumps(value, default=str)}
+
+
+def to_otlp(spans: List[Span], service_name: str = "bom-ai-demo") -> Dict[str, Any]:
+    """Spans of one trace as an OTLP/JSON ExportTraceServiceRequest."""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "bom_core.tracing"},
+                "spans": [
+                    {
+                        "traceId": s.trace_id,
+                        "spanId": s.span_id,
+                        "parentSpanId": s.parent_id or "",
+                        "name": s.name,
+                        "kind": _OTLP_KIND.get(s.kind, 1),
+                        "startTimeUnixNano": str(s.start_ns),
+                        "endTimeUnixNano": str(s.end_ns or s.start_ns),
+                        "attributes": [{"key": "bom.span_kind", "value": {"stringValue": s.kind}}]
+                        + [{"key": k, "value": _otlp_value(v)} for k, v in s.attributes.items() if v is not None],
+                        "status": {"code": 1 if s.status == "OK" else 2, "message": "" if s.status == "OK" else s.status},
+                    }
+                    for s in spans
+                ],
+            }],
+        }]
+    }
+
+
+class OtlpJsonFileExporter:
+    """Appends one OTLP/JSON request per trace (otlpjsonfile receiver format)."""
+
+    def __init__(self, path: str, service_name: str = "bom-ai-demo"):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        line = json.dumps(to_otlp(spans, self.service_name)) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+# -------------------------------------------------------------------
+# Tracer
+# -------------------------------------------------------------------
+class _Trace:
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self.agent_stack: List[Span] = []
+        self.open: Dict[Any, Span] = {}
+        self.agent_runs: Dict[str, int] = {}
+
+
+class Tracer:
+    """Collects spans per invocation and exports each trace when its root span ends."""
+
+    def __init__(self, exporters: Optional[List[Any]] = None):
+        self.exporters = exporters or []
+        self._lock = threading.Lock()
+        self._traces: Dict[str, _Trace] = {}
+
+    def _trace(self, invocation_id: str) -> _Trace:
+        trace = self._traces.get(invocation_id)
+        if trace is None:
+            trace = self._traces[invocation_id] = _Trace()
+        return trace
+
+    def _new_span(self, trace: _Trace, name: str, kind: str, parent: Optional[Span],
+                  start_ns: Optional[int] = None, **attributes) -> Span:
+        span = Span(trace.trace_id, uuid.uuid4().hex[:16], parent.span_id if parent else None,
+                    name, kind, start_ns or time.time_ns(), attributes=attributes)
+        trace.spans.append(span)
+        return span
+
+    # -- agents ----------------------------------------------------------
+    def start_agent(self, invocation_id: str, agent_name: str) -> None:
+        with self._lock:
+            trace = self._trace(invocation_id)
+            parent = trace.agent_stack[-1] if trace.agent_stack else None
+            run = trace.agent_runs[agent_name] = trace.agent_runs.get(agent_name, 0) + 1
+            trace.agent_stack.append(self._new_span(trace, agent_name, "agent", parent, **{"bom.iteration": run}))
+
+    def end_agent(self, invocation_id: str, agent_name: str, **attributes) -> None:
+        finished = None
+        with self._lock:
+            trace = self._traces.get(invocation_id)
+            if trace is None:
+                return
+            for i in range(len(trace.agent_stack) - 1, -1, -1):
+                if trace.agent_stack[i].name == agent_name:
+                    span = trace.agent_stack.pop(i)
+                    span.end_ns = time.time_ns()
+                    span.attributes.update(attributes)
+                    break
+            else:
+                return
+            if span.parent_id is None:
+                finished = self._traces.pop(invocation_id)
+        if finished:
+            self._export(finished)
+
+    # -- model turns / tool calls / other timed work ---------------------
+    def start(self, invocation_id: str, key: Any, name: str, kind: str, **attributes) -> None:
+        with self._lock:
+            trace = self._trace(invocation_id)
+            parent = trace.agent_stack[-1] if trace.agent_stack else None
+            trace.open[key] = self._new_span(trace, name, kind, parent, **attributes)
+
+    def end(self, invocation_id: str, key: Any, status: str = "OK", **attributes) -> None:
+        with self._lock:
+            trace = self._traces.get(invocation_id)
+            span = trace.open.pop(key, None) if trace else None
+            if span is None:
+                return
+            span.end_ns = time.time_ns()
+            span.status = status
+            span.attributes.update(attributes)
+
+    def record(self, invocation_id: str, name: str, kind: str, start_ns: int, end_ns: int,
+               status: str = "OK", **attributes) -> None:
+        """Add an already-timed span under the current agent (e.g. a speculative query)."""
+        with self._lock:
+            trace = self._traces.get(invocation_id)
+            if trace is None:
+                return
+            parent = trace.agent_stack[-1] if trace.agent_stack else None
+            span = self._new_span(trace, name, kind, parent, start_ns=start_ns, **attributes)
+            span.end_ns = end_ns
+            span.status = status
+
+    def _export(self, trace: _Trace) -> None:
+        now = time.time_ns()
+        for span in trace.spans:
+            if span.end_ns is None:  # e.g. a tool that was never found
+                span.end_ns, span.status = now, "UNFINISHED"
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace.spans)
+            except OSError as e:
+                print(f"⚠️  Trace export failed: {e}", file=sys.stderr)
+
+
+def trace_dir() -> Optional[str]:
+    return os.getenv("BOM_TRACE_DIR") or None
+
+
+_tracer_lock = threading.Lock()
+_tracer: Optional[Tracer] = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    """Process-wide tracer exporting to BOM_TRACE_DIR; None when tracing is off."""
+    global _tracer
+    directory = trace_dir()
+    if directory is None:
+        return None
+    with _tracer_lock:
+        if _tracer is None:
+            os.makedirs(directory, exist_ok=True)
+            _tracer = Tracer([
+                JsonlSpanExporter(os.path.join(directory, SPANS_FILE)),
+                OtlpJsonFileExporter(os.path.join(directory, OTLP_FILE)),
+            ])
+        return _tracer
+
+
+# -------------------------------------------------------------------
+# ADK integration
+# -------------------------------------------------------------------
+def _as_list(callbacks) -> List[Callable]:
+    if callbacks is None:
+        return []
+    return list(callbacks) if isinstance(callbacks, list) else [callbacks]
+
+
+def _state_size(state) -> int:
+    value = state.get(PIPELINE_STATE) if state is not None else None
+    if value is None:
+        return 0
+    return len(value) if isinstance(value, str) else len(json.dumps(value, default=str))
+
+
+def make_tracing_callbacks(tracer: Tracer) -> Dict[str, Callable]:
+    """ADK callbacks recording agent, model and tool spans on ``tracer``."""
+
+    def before_agent(callback_context):
+        tracer.start_agent(callback_context.invocation_id, callback_context.agent_name)
+        return None
+
+    def after_agent(callback_context):
+        tracer.end_agent(callback_context.invocation_id, callback_context.agent_name,
+                         **{"bom.pipeline_state_chars": _state_size(callback_context.state)})
+        return None
+
+    def before_model(callback_context, llm_request):
+        chars = _state_size(callback_context.state)
+        tracer.start(callback_context.invocation_id, ("llm", callback_context.agent_name),
+                     llm_request.model or "llm", "llm", **{
+            "gen_ai.request.model": llm_request.model,
+            "bom.request_contents": len(llm_request.contents or []),
+            "bom.pipeline_state_chars": chars,
+            "bom.pipeline_state_tokens_est": chars // CHARS_PER_TOKEN,
+        })
+        return None
+
+    def after_model(callback_context, llm_response):
+        if llm_response.partial:
+            return None
+        usage = llm_response.usage_metadata
+        tracer.end(
+            callback_context.invocation_id, ("llm", callback_context.agent_name),
+            status="OK" if not llm_response.error_code else str(llm_response.error_code),
+            **{
+                "gen_ai.usage.input_tokens": getattr(usage, "prompt_token_count", None),
+                "gen_ai.usage.output_tokens": getattr(usage, "candidates_token_count", None),
+                "gen_ai.usage.cached_tokens": getattr(usage, "cached_content_token_count", None),
+                "bom.tool_calls": sum(1 for p in (llm_response.content.parts if llm_response.content else [])
+                                      if getattr(p, "function_call", None)),
+            },
+        )
+        return None
+
+    # query_estimate seen when each tool call started; a new one means the guard dry-ran this call
+    estimates_before: Dict[str, Any] = {}
+
+    def before_tool(tool, args, tool_context):
+        estimates_before[tool_context.function_call_id] = tool_context.state.get("query_estimate")
+        tracer.start(tool_context.invocation_id, ("tool", tool_context.function_call_id), tool.name, "tool",
+                     **{"bom.args": json.dumps(args, default=str)[:500]})
+        return None
+
+    def after_tool(tool, args, tool_context, tool_response):
+        attrs: Dict[str, Any] = {}
+        status = "OK"
+        if isinstance(tool_response, dict):
+            if tool_response.get("status") not in (None, "SUCCESS"):
+                status = str(tool_response.get("status"))
+            rows = tool_response.get("rows")
+            if isinstance(rows, list):
+                attrs["bom.row_count"] = len(rows)
+            attrs["bom.cache_hit"] = bool(tool_response.get("cache_hit"))
+            attrs["bom.backend"] = tool_response.get("backend")
+        estimate = tool_context.state.get("query_estimate")
+        previous = estimates_before.pop(tool_context.function_call_id, None)
+        if isinstance(estimate, dict) and estimate is not previous:
+            attrs["bom.bytes_processed"] = estimate.get("bytes_processed")
+        tracer.end(tool_context.invocation_id, ("tool", tool_context.function_call_id), status=status, **attrs)
+        return None
+
+    return {
+        "before_agent": before_agent, "after_agent": after_agent,
+        "before_model": before_model, "after_model": after_model,
+        "before_tool": before_tool, "after_tool": after_tool,
+    }
+
+
+def _ending_on_short_circuit(callback: Callable, tracer: Tracer) -> Callable:
+    """Wrap a before_agent_callback so an early answer still closes the agent span."""
+
+    def wrapped(callback_context):
+        result = callback(callback_context)
+        if result is not None:
+            tracer.end_agent(callback_context.invocation_id, callback_context.agent_name,
+                             **{"bom.short_circuited": True})
+        return result
+
+    return wrapped
+
+
+def instrument(agent, tracer: Optional[Tracer] = None):
+    """Add tracing callbacks to ``agent`` and all its sub-agents (in place).
+
+    Tracing callbacks run first and never return a value, so existing
+    callbacks (result cache, query guard, fast path) keep their behavior.
+    Returns the agent; does nothing when tracing is off.
+    """
+    tracer = tracer or get_tracer()
+    if tracer is None:
+        return agent
+    cb = make_tracing_callbacks(tracer)
+
+    def visit(node):
+        node.before_agent_callback = [cb["before_agent"]] + [
+            _ending_on_short_circuit(c, tracer) for c in _as_list(node.before_agent_callback)
+        ]
+        node.after_agent_callback = [cb["after_agent"]] + _as_list(node.after_agent_callback)
+        if hasattr(node, "before_model_callback"):
+            node.before_model_callback = [cb["before_model"]] + _as_list(node.before_model_callback)
+            node.after_model_callback = [cb["after_model"]] + _as_list(node.after_model_callback)
+            node.before_tool_callback = [cb["before_tool"]] + _as_list(node.before_tool_callback)
+            node.after_tool_callback = [cb["after_tool"]] + _as_list(node.after_tool_callback)
+        for sub in node.sub_agents:
+            visit(sub)
+
+    visit(agent)
+    return agent
+
+
+# -------------------------------------------------------------------
+# Timeline
+# -------------------------------------------------------------------
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def format_timeline(spans: List[Dict[str, Any]]) -> str:
+    """Indented, start-ordered timeline of one trace's spans."""
+    if not spans:
+        return ""
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for s in sorted(spans, key=lambda s: s["start_ns"]):
+        children.setdefault(s["parent_id"], []).append(s)
+    t0 = min(s["start_ns"] for s in spans)
+    keys = ("gen_ai.usage.input_tokens", "gen_ai.usage.output_tokens", "bom.pipeline_state_tokens_est",
+            "bom.row_count", "bom.cache_hit", "bom.bytes_processed", "bom.iteration", "bom.short_circuited")
+    lines = []
+
+    def walk(parent_id, depth):
+        for s in children.get(parent_id, []):
+            attrs = s.get("attributes", {})
+            extra = ", ".join(f"{k.split('.')[-1]}={attrs[k]}" for k in keys if attrs.get(k) not in (None, False))
+            status = "" if s["status"] == "OK" else f" [{s['status']}]"
+            lines.append(f"{(s['start_ns'] - t0) / 1e6:9.1f} ms {s['duration_ms']:9.1f} ms  "
+                         f"{'  ' * depth}{s['kind']}:{s['name']}{status}{'  (' + extra + ')' if extra else ''}")
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else os.path.join(trace_dir() or ".", SPANS_FILE)
+    spans = load_spans(path)
+    if not spans:
+        print("No spans recorded")
+        return
+    latest = spans[-1]["trace_id"]
+    print(format_timeline([s for s in spans if s["trace_id"] == latest]))
+
+
+if __name__ == "__main__":
+    main()
@@ -5,32 +5,14 @@ Framework: Google ADK Agentic Framework (Sequential + Loop Agents)
 """
 
 import os
-from dotenv import load_dotenv
-from google.adk.agents import LlmAgent, SequentialAgent, LoopAgent
-from google.adk.tools.bigquery import BigQueryToolset
-from google.adk.tools.bigquery.config import BigQueryToolConfig
-from google.adk.tools.vertex_ai_search_tool import VertexAiSearchTool  # Optional fallback
-from google.adk.tools.tool_context import ToolContext
+from typing import TYPE_CHECKING
 
-# -------------------------------------------------------------------
-# Environment setup
-# -------------------------------------------------------------------
-load_dotenv()
-PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-DATASET_ID = os.getenv("BQ_DATASET_ID", "bom_demo")
-BQ_LOCATION = os.getenv("BQ_LOCATION", "us-central1")
-RAG_DATA_STORE_ID = os.getenv("RAG_DATA_STORE_ID")
+from bom_core import config
+from bom_core.registry import get_or_create, load_env
 
-# Force Vertex AI backend: remove API key and set Vertex env vars
-if "GOOGLE_API_KEY" in os.environ:
-    del os.environ["GOOGLE_API_KEY"]
-
-# Set environment variables for ADK to use Vertex AI
-os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "true"
-if PROJECT_ID:
-    os.environ["GOOGLE_CLOUD_PROJECT"] = PROJECT_ID
-if BQ_LOCATION:
-    os.environ["GOOGLE_CLOUD_LOCATION"] = BQ_LOCATION
+if TYPE_CHECKING:
+    from google.adk.agents import SequentialAgent
+    from google.adk.tools.tool_context import ToolContext
 
 # -------------------------------------------------------------------
 # Global constants
@@ -38,44 +20,99 @@ if BQ_LOCATION:
 PIPELINE_STATE = "pipeline_state"
 MAX_RETRIES = 3
 MAX_RESULT_ROWS = 100
-MAX_BYTES_BILLED = 100_000_000  # 100MB safe limit
+
+# -------------------------------------------------------------------
+# Environment setup (at build time, not import time)
+# -------------------------------------------------------------------
+def use_vertex_ai() -> None:
+    """Force the Vertex AI backend: drop the API key and set the Vertex env vars."""
+    os.environ.pop("GOOGLE_API_KEY", None)
+    os.environ["GOOGLE_GENAI_USE_VERTEXAI"] = "true"
+    if config.project_id():
+        os.environ["GOOGLE_CLOUD_PROJECT"] = config.project_id()
+    if config.bq_location():
+        os.environ["GOOGLE_CLOUD_LOCATION"] = config.bq_location()
 
 # -------------------------------------------------------------------
 # Utility to signal loop termination
 # -------------------------------------------------------------------
-def exit_loop(tool_context: ToolContext):
+def exit_loop(tool_context: "ToolContext"):
     tool_context.actions.escalate = True
     return {}
 
 # -------------------------------------------------------------------
 # Factory: get_agent()
 # -------------------------------------------------------------------
-def get_agent() -> SequentialAgent:
-    if not PROJECT_ID:
+def get_agent() -> "SequentialAgent":
+    load_env()
+    project_id = config.project_id()
+    if not project_id:
         raise ValueError("Missing env: GCP_PROJECT_ID")
+    dataset_id = config.dataset_id()
+    bq_location = config.bq_location()
+    rag_data_store_id = os.getenv("RAG_DATA_STORE_ID")
+    max_bytes = config.max_bytes_billed()  # 100MB safe limit unless MAX_BYTES_BILLED is set
+    use_vertex_ai()
+
+    # Heavy imports (ADK, pandas, DuckDB, BigQuery) are paid on first build only
+    from google.adk.agents import LlmAgent, LoopAgent, SequentialAgent
+    from google.adk.tools.bigquery.config import BigQueryToolConfig
+    from google.adk.tools.vertex_ai_search_tool import VertexAiSearchTool  # Optional fallback
+
+    from bom_core.catalog import SCHEMA_CATALOG_TOOLS, make_catalog_callback
+    from bom_core.cursors import RESULT_CURSOR_TOOLS, make_cursor_callback
+    from bom_core.entity_index import candidate_parents
+    from bom_core.local_sql import make_sql_toolset, sql_backend, uses_warehouse
+    from bom_core.pattern_router import make_fast_path_callback
+    from bom_core.query_cache import get_query_cache, make_cache_callbacks
+    from bom_core.query_guard import estimate_query_cost, get_query_guard, make_guard_callback
+    from bom_core.result_facts import ResultSummarizerAgent
+    from bom_core.retrieval import search_schema_docs, use_local_rag
+    from bom_core.speculative import SpeculativeExecutorAgent, guarded_run_query, refinement_mode
+    from bom_core.summaries import make_summary_callback
+    from bom_core.tools import (
+        BOM_GRAPH_TOOLS,
+        CONFIGURATOR_TOOLS,
+        COST_ROLLUP_TOOLS,
+        EFFECTIVITY_TOOLS,
+        EXPOSURE_TOOLS,
+    )
+    from bom_core.tracing import instrument
 
     # ------------------ BigQuery Tool ------------------
     bq_cfg = BigQueryToolConfig(
-        compute_project_id=PROJECT_ID,
-        location=BQ_LOCATION,
+        compute_project_id=project_id,
+        location=bq_location,
         max_query_result_rows=MAX_RESULT_ROWS,
+        maximum_bytes_billed=max_bytes,
     )
-    bq_tools = BigQueryToolset(bigquery_tool_config=bq_cfg)
+    # BQ_BACKEND=local|hybrid serves execute_sql from the embedded DuckDB mirror
+    bq_tools = make_sql_toolset(bq_cfg)
+
+    # Shared result cache in front of every execute_sql call
+    cache_before, cache_after = make_cache_callbacks(get_query_cache())
+    # Dry-run cost gate: over-budget statements are narrowed or rejected before they run
+    guard_before = make_guard_callback(get_query_guard(), should_check=uses_warehouse)
+    # Large results are spilled to a local cursor; the model sees its summary and a preview
+    cursor_after = make_cursor_callback()
 
     # ------------------ Optional Vertex AI Search Tool ------------------
     rag_tool = None
-    if RAG_DATA_STORE_ID:
-        # Expand $GCP_PROJECT_ID if present in RAG_DATA_STORE_ID
-        datastore_id = RAG_DATA_STORE_ID.replace("$GCP_PROJECT_ID", PROJECT_ID)
+    if use_local_rag():
+        # RAG_BACKEND=local: same chunks, searched in-process (see bom_core/retrieval.py)
+        rag_tool = search_schema_docs
+    elif rag_data_store_id:
+        # Expand $GCP_PROJECT_ID if present in rag_data_store_id
+        datastore_id = rag_data_store_id.replace("$GCP_PROJECT_ID", project_id)
         # Only enable if the ID looks valid (contains 'projects/')
-        if "projects/" in datastore_id and PROJECT_ID in datastore_id:
+        if "projects/" in datastore_id and project_id in datastore_id:
             rag_tool = VertexAiSearchTool(
                 data_store_id=datastore_id,
                 max_results=3,
             )
 
     # ===================================================================
-    # 1. Schema Search Agent (Vertex AI Search ONLY - finds schema/query patterns)
+    # 1. Schema Search Agent (Vertex AI Search or local index - finds schema/query patterns)
     # ===================================================================
     schema_search_agent = None
     if rag_tool:
@@ -108,32 +145,38 @@ def get_agent() -> SequentialAgent:
         )
 
     # ===================================================================
-    # 2. Column Resolver (BigQuery ONLY - verifies and discovers columns)
+    # 2. Column Resolver (schema catalog - verifies and discovers columns)
     # ===================================================================
     column_resolver = LlmAgent(
         name="ColumnResolverAgent",
         model="gemini-2.5-flash",
         instruction=(
-            "You identify and verify relevant tables/columns using BigQuery.\n\n"
+            "You identify and verify relevant tables/columns using the schema catalog.\n\n"
             f"**INPUT from pipeline_state (provided by SchemaSearchAgent):**\n"
             "- focus_terms: User's key search terms (e.g., ['supplier', 'lead time'])\n"
             "- schema_hints: RAG-suggested columns (e.g., ['item_master.supplier_code', 'bom_details.lead_time_days'])\n"
             "- domain_terms: Terminology mappings (e.g., {{'vendor': 'supplier_code'}})\n\n"
+            "**SCHEMA CATALOG** (columns, types, partitioning/clustering and the stored values of\n"
+            "low-cardinality columns; kept current with the loaded data):\n"
+            "{schema_catalog?}\n\n"
             "**PROCESS:**\n"
-            f"1. Query INFORMATION_SCHEMA in `{PROJECT_ID}.{DATASET_ID}` to discover columns in item_master and bom_details\n"
+            "1. Discover columns in item_master and bom_details from the catalog above. Do NOT query\n"
+            "   INFORMATION_SCHEMA or run SELECT DISTINCT to sample values; the catalog already has them\n"
             "2. PRIORITIZE schema_hints columns first (these came from documentation search)\n"
-            "3. USE domain_terms to sample DISTINCT values and confirm data matches\n"
-            "   Example: If domain_terms mentions 'high priority', check if values like 'CRITICAL' or 'HIGH' exist\n"
+            "3. Call resolve_terms with focus_terms/domain_terms to map them to columns and exact stored values\n"
+            "   Example: If domain_terms mentions 'high priority', check the catalog values for 'CRITICAL' or 'HIGH';\n"
+            "   use describe_schema for column descriptions\n"
             "4. Build candidate_columns list with verified columns\n"
             "5. Entity normalization (parent/product names): If the user mentions a product/parent name (e.g., a two-token name like 'alpha beta'),\n"
-            "   search `item_master.item_description` and `item_master.item_number` to find close matches using token-overlap\n"
-            "   and case-insensitive regex. Compute a simple score based on token intersection. Choose a canonical_parent when\n"
-            "   score >= 0.6. Keep top 3 candidates with scores for potential clarification.\n\n"
+            "   call candidate_parents with that name. It scores item_master item numbers and descriptions locally and returns\n"
+            "   canonical_parent/canonical_item_number when one match is clear (score >= 0.6) and the top 3 candidate_parents\n"
+            "   with scores; copy them into pipeline_state. Do not search item_description with SQL.\n\n"
             "**OUTPUT to pipeline_state:**\n"
             "- tables: [list of table names to query]\n"
             "- candidate_columns: [verified 'table.column' names]\n"
             "- search_terms: [normalized terms to search for in SQL]\n"
             "- canonical_parent: string | null (best-matched parent/product name)\n"
+            "- canonical_item_number: string | null (item number of canonical_parent)\n"
             "- candidate_parents: [{name, score}] (top matches for clarification)\n"
             "- strategy: 1 (always start with exact match strategy)\n\n"
             "Example output:\n"
@@ -147,51 +190,75 @@ def get_agent() -> SequentialAgent:
             "}\n\n"
             "Return updated pipeline_state as JSON."
         ),
-        tools=[bq_tools],
+        # Catalog + entity index answer everything in-process: no warehouse round-trips
+        tools=[*SCHEMA_CATALOG_TOOLS, candidate_parents],
+        before_agent_callback=make_catalog_callback(),
         output_key=PIPELINE_STATE,
     )
 
     # ===================================================================
     # 3. Query Planner (build + refine SQL)
     # ===================================================================
+    planner_inputs = (
+        "**INPUT from pipeline_state (provided by ColumnResolverAgent):**\n"
+        "- tables: Tables to query (e.g., ['item_master', 'bom_details'])\n"
+        "- candidate_columns: Verified columns (e.g., ['item_master.supplier_code'])\n"
+        "- search_terms: Terms to search for (e.g., ['SUPPLIER', 'VENDOR'])\n"
+        "- canonical_parent: Optional normalized parent/product name\n"
+        "- canonical_item_number: Optional item number of canonical_parent\n"
+        "- candidate_parents: Optional list of {name, score}\n"
+    )
+    strategies = (
+        "Strategy 1: Exact case-insensitive match using LOWER(col) IN UNNEST(@terms_lower); when canonical_item_number\n"
+        "            is set, filter parent_item_number = @parent_item_number instead of matching parent text\n"
+        "Strategy 2: If a parent/product is referenced, use token-contains or regex on parent fields\n"
+        "            (e.g., REGEXP_CONTAINS(LOWER(parent_description), r'\\balpha\\b') AND REGEXP_CONTAINS(LOWER(parent_description), r'\\bbeta\\b')).\n"
+        "            Also apply plural/singular variants where relevant.\n"
+        "Strategy 3: Use canonical_parent from pipeline_state for a direct match or contains on parent fields;\n"
+        "            if multiple candidate_parents exist with similar scores (< 0.1 difference), populate\n"
+        "            `clarify_options` in pipeline_state with the top 3 names and stop for clarification.\n\n"
+        "Always:\n"
+        "- Project only relevant columns (from candidate_columns)\n"
+        "- Add LIMIT 100 for performance\n"
+        "- Use parameterized queries for safety\n"
+        f"- Stay under the {max_bytes:,} byte budget: call estimate_query_cost on the draft SQL. If it is not\n"
+        "  within_budget, filter the unpruned_tables on their partition column (bom_details.effective_date,\n"
+        "  item_master.created_date) and/or drop unneeded columns, then estimate again\n"
+        "- For aggregate supplier risk / lead time / consolidation / spend questions, read a summary table\n"
+        "  below when one covers the question instead of joining bom_details and item_master (no parameters\n"
+        "  needed; filter and order its rows as the question asks)\n\n"
+        "Last cost estimate (may be empty): {query_estimate?}\n\n"
+        "{summary_tables?}\n\n"
+    )
+    # The local mirror has no bytes billed, so there is nothing to estimate
+    planner_tools = [] if sql_backend() == "local" else [estimate_query_cost]
+
     query_planner = LlmAgent(
         name="QueryPlannerAgent",
         model="gemini-2.5-flash",
         instruction=(
-            f"You build safe parameterized BigQuery SQL for `{PROJECT_ID}.{DATASET_ID}`.\n\n"
-            "**INPUT from pipeline_state (provided by ColumnResolverAgent):**\n"
-            "- tables: Tables to query (e.g., ['item_master', 'bom_details'])\n"
-            "- candidate_columns: Verified columns (e.g., ['item_master.supplier_code'])\n"
-            "- search_terms: Terms to search for (e.g., ['SUPPLIER', 'VENDOR'])\n"
-            "- canonical_parent: Optional normalized parent/product name\n"
-            "- candidate_parents: Optional list of {name, score}\n"
-            "- strategy: Current retry level (1, 2, or 3)\n\n"
+            f"You build safe parameterized BigQuery SQL for `{project_id}.{dataset_id}`.\n\n"
+            + planner_inputs
+            + "- strategy: Current retry level (1, 2, or 3)\n\n"
             "**PROCESS - Build SQL based on strategy:**\n"
-            "Strategy 1: Exact case-insensitive match using LOWER(col) IN UNNEST(@terms_lower)\n"
-            "Strategy 2: If a parent/product is referenced, use token-contains or regex on parent fields\n"
-            "            (e.g., REGEXP_CONTAINS(LOWER(parent_description), r'\\balpha\\b') AND REGEXP_CONTAINS(LOWER(parent_description), r'\\bbeta\\b')).\n"
-            "            Also apply plural/singular variants where relevant.\n"
-            "Strategy 3: Use canonical_parent from pipeline_state for a direct match or contains on parent fields;\n"
-            "            if multiple candidate_parents exist with similar scores (< 0.1 difference), populate\n"
-            "            `clarify_options` in pipeline_state with the top 3 names and stop for clarification.\n\n"
-            "Always:\n"
-            "- Project only relevant columns (from candidate_columns)\n"
-            "- Add LIMIT 100 for performance\n"
-            "- Use parameterized queries for safety\n\n"
-            "**OUTPUT to pipeline_state:**\n"
+            + strategies
+            + "**OUTPUT to pipeline_state:**\n"
             "- sql: The generated SQL query string\n"
             "- params: Query parameters (if using @param syntax)\n"
             "- attempts_log: Append current attempt info\n"
             "- clarify_options: Optional [list of strings] when multiple parent candidates need user selection\n\n"
             "Return updated pipeline_state as JSON."
         ),
+        tools=planner_tools,
+        before_agent_callback=make_summary_callback(),
         output_key=PIPELINE_STATE,
     )
 
     # ===================================================================
     # 4. Query Executor (loop until results found)
     # ===================================================================
-    executor_tools = [bq_tools, exit_loop]
+    executor_tools = [*BOM_GRAPH_TOOLS, *COST_ROLLUP_TOOLS, *EFFECTIVITY_TOOLS, *EXPOSURE_TOOLS, *CONFIGURATOR_TOOLS,
+                      bq_tools, *RESULT_CURSOR_TOOLS, exit_loop]
     executor_agent = LlmAgent(
         name="QueryExecutorAgent",
         model="gemini-2.5-flash",
@@ -203,24 +270,39 @@ def get_agent() -> SequentialAgent:
             "- strategy: Current retry level (1, 2, or 3)\n"
             "- attempts_log: History of previous attempts\n\n"
             "**PROCESS:**\n"
-            "1. Execute the SQL query using BigQuery tools\n"
+            "1. Execute the query. For multi-level explosion, where-used, flattened parts list or cycle\n"
+            "   questions about a known item number, call the BOM graph tool (explode_bom, where_used,\n"
+            "   flatten_bom, detect_bom_cycles) instead of running recursive SQL; for multi-level cost rollup or\n"
+            "   what-if unit cost questions call rollup_cost / what_if_unit_cost; for a structure as of a date pass\n"
+            "   as_of_date to explode_bom / where_used, to compare two dates call diff_bom, and for what changed in a\n"
+            "   period call bom_changes (no effective_date/expiration_date SQL needed); for products containing\n"
+            "   obsolete, NPI or non-compliant parts at any depth call find_exposed_products / exposed_parts /\n"
+            "   exposure_audit; for phantom blow-through call phantom_flattened_bom, and for a product's options,\n"
+            "   configuration count, cost / lead-time range or cheapest configurations call configuration_options /\n"
+            "   enumerate_configurations; otherwise use BigQuery tools\n"
             "2. Check result count:\n"
             "   - If rows > 0: SUCCESS\n"
             "     • Set found_results=true\n"
             "     • Log success details\n"
             "     • CALL exit_loop tool to terminate the loop\n"
+            "   - Large results come back as result_cursor (cursor_id, row_count, per-column stats, preview)\n"
+            "     with only a few preview rows; do not page through them. If a result says\n"
+            "     result_is_likely_truncated, call open_result_cursor with the same SQL and params\n"
             "   - If rows = 0: NO RESULTS\n"
             "     • Set found_results=false\n"
             "     • Increment strategy (1→2→3)\n"
             "     • Continue loop (max 3 iterations)\n\n"
             "**OUTPUT to pipeline_state:**\n"
             "- found_results: boolean\n"
-            "- rows: Query results (if found)\n"
-            "- chosen_sql: The successful SQL (if found_results=true)\n"
+            "- rows: Query results (if found); only the preview rows when there is a result_cursor\n"
+            "- result_cursor: The result_cursor summary, unchanged (if the result had one)\n"
+            "- chosen_sql: The successful SQL, or the BOM graph tool call used (if found_results=true)\n"
             "- attempts_log: Updated with current attempt\n\n"
             "Return updated pipeline_state as JSON."
         ),
         tools=executor_tools,
+        before_tool_callback=[cache_before, guard_before],
+        after_tool_callback=[cache_after, cursor_after],
         output_key=PIPELINE_STATE,
     )
 
@@ -230,8 +312,58 @@ def get_agent() -> SequentialAgent:
         max_iterations=MAX_RETRIES,
     )
 
+    if refinement_mode() == "speculative":
+        # REFINEMENT_MODE=speculative: plan every strategy in one LLM call, run them
+        # concurrently and keep the highest-priority one that returns rows
+        strategy_planner = LlmAgent(
+            name="QueryStrategyPlannerAgent",
+            model="gemini-2.5-flash",
+            instruction=(
+                f"You build safe parameterized BigQuery SQL for `{project_id}.{dataset_id}`, drafting ALL\n"
+                f"{MAX_RETRIES} strategies at once; they run concurrently and the lowest-numbered strategy\n"
+                "that returns rows wins.\n\n"
+                + planner_inputs
+                + "\n**PROCESS - Build one SQL statement per strategy:**\n"
+                + strategies
+                + "For multi-level explosion, where-used, flattened parts list or cycle questions about a known\n"
+                "item number, multi-level cost rollup / what-if questions, or as-of-date structure, two-date diff and\n"
+                "change-window questions (explode_bom/where_used with as_of_date, diff_bom, bom_changes), or\n"
+                "multi-level obsolete / NPI / compliance exposure questions (find_exposed_products, exposed_parts,\n"
+                "exposure_audit), or phantom blow-through and product configuration questions (phantom_flattened_bom,\n"
+                "configuration_options, enumerate_configurations), call the BOM graph, cost, effectivity, exposure\n"
+                "or configurator tool instead;\n"
+                "put its rows (and result_cursor, if any) in pipeline_state with found_results=true and chosen_sql\n"
+                "naming the tool call, and\n"
+                "leave strategy_plans empty.\n\n"
+                "**OUTPUT to pipeline_state:**\n"
+                "- strategy_plans: [{strategy: 1|2|3, sql, params}] in priority order\n"
+                "- attempts_log: Previous attempts unchanged (the executor appends one entry per strategy)\n"
+                "- clarify_options: Optional [list of strings] when multiple parent candidates need user selection\n\n"
+                "Return updated pipeline_state as JSON."
+            ),
+            tools=[*planner_tools, *BOM_GRAPH_TOOLS, *COST_ROLLUP_TOOLS, *EFFECTIVITY_TOOLS, *EXPOSURE_TOOLS,
+                   *CONFIGURATOR_TOOLS],
+            before_agent_callback=make_summary_callback(),
+            after_tool_callback=cursor_after,
+            output_key=PIPELINE_STATE,
+        )
+        refinement_loop = SequentialAgent(
+            name="RefinementLoop",
+            sub_agents=[
+                strategy_planner,
+                SpeculativeExecutorAgent(name="SpeculativeExecutorAgent", state_key=PIPELINE_STATE),
+            ],
+        )
+
+    # ===================================================================
+    # 5. Result Summarizer (exact facts computed locally, no LLM)
     # ===================================================================
-    # 4. Explainer Agent
+    # Totals, group-bys, histograms and top-k over every row; the Explainer
+    # gets these facts and a short preview instead of the raw rows
+    result_summarizer = ResultSummarizerAgent(name="ResultSummarizerAgent", state_key=PIPELINE_STATE)
+
+    # ===================================================================
+    # 6. Explainer Agent
     # ===================================================================
     explainer = LlmAgent(
         name="ExplainerAgent",
@@ -240,13 +372,21 @@ def get_agent() -> SequentialAgent:
             "Summarize query results in natural language for the user.\n\n"
             "**INPUT from pipeline_state (provided by RefinementLoop):**\n"
             "- found_results: boolean indicating success\n"
-            "- rows: Query results (if found_results=true)\n"
+            "- result_facts: Exact facts computed over every result row: row_count, measures (min, max,\n"
+            "  mean, median, total, histogram), totals, breakdowns (per-group rows, share, means/totals),\n"
+            "  top (highest rows by a measure), distinct counts and date_ranges\n"
+            "- rows: A few preview rows (if found_results=true)\n"
+            "- result_cursor: Optional {cursor_id, row_count} of the full result\n"
             "- chosen_sql: The SQL that produced results\n"
             "- attempts_log: History of retry attempts\n\n"
             "**PROCESS:**\n"
             "1. If found_results=true:\n"
             "   - Summarize findings in clear, business-friendly language\n"
             "   - Include key insights from the data\n"
+            "   - Take every count, total, average and ranking from result_facts and quote them as given;\n"
+            "     do not recompute them from the preview rows (they are only examples)\n"
+            "   - With a result_cursor, give the cursor_id so the user can ask for more pages\n"
+            "     (fetch_result_page) or a CSV/Parquet export (export_result)\n"
             "2. If found_results=false:\n"
             "   - Explain no results were found after retries\n"
             "   - Suggest alternative search terms or clarifying questions\n"
@@ -276,22 +416,37 @@ def get_agent() -> SequentialAgent:
     # State flows through pipeline_state key in session:
     # 1. SchemaSearchAgent      → pipeline_state: {focus_terms, schema_hints, domain_terms}
     # 2. ColumnResolverAgent    → pipeline_state: {...previous, tables, candidate_columns, search_terms, strategy}
-    # 3. RefinementLoop         → pipeline_state: {...previous, sql, params, found_results, rows, chosen_sql}
+    # 3. RefinementLoop         → pipeline_state: {...previous, sql, params, found_results, rows, chosen_sql,
+    #                                              result_cursor (large results: summary + preview rows)}
     #    ├─ QueryPlannerAgent   → builds SQL based on strategy
     #    └─ QueryExecutorAgent  → executes SQL, calls exit_loop on success
-    # 4. ExplainerAgent         → final_answer: natural language + SQL block
-    
+    #    (REFINEMENT_MODE=speculative: QueryStrategyPlannerAgent drafts all strategies,
+    #     SpeculativeExecutorAgent runs them concurrently and keeps the best hit)
+    # 4. ResultSummarizerAgent  → pipeline_state: {...previous, result_facts, rows (preview only)}
+    # 5. ExplainerAgent         → final_answer: natural language + SQL block
+    #
+    # Fast path: questions that confidently match a validated pattern in
+    # query_patterns_documentation.md (with bindable item numbers) run that SQL
+    # directly in a before_agent_callback and skip the whole pipeline.
+
     sub_agents_list = []
     if schema_search_agent:
         sub_agents_list.append(schema_search_agent)
-    sub_agents_list.extend([column_resolver, refinement_loop, explainer])
+    sub_agents_list.extend([column_resolver, refinement_loop, result_summarizer, explainer])
 
     root = SequentialAgent(
         name="ODW_BigQuery_Analyst",
         sub_agents=sub_agents_list,
+        # Validated SQL still passes the dry-run guard (estimate, SELECT * narrowing, byte budget)
+        before_agent_callback=make_fast_path_callback(guarded_run_query),
     )
 
-    return root
+    # BOM_TRACE_DIR=<dir> records agent/LLM/tool spans (JSONL + OTLP/JSON)
+    return instrument(root)
 
 
-root_agent = get_agent()
+def __getattr__(name: str):
+    # ADK Web looks up root_agent; build it on first access, once per process
+    if name == "root_agent":
+        return get_or_create(f"{__name__}.root_agent", get_agent)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
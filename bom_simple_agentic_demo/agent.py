@@ -5,54 +5,90 @@ This file exposes a factory function get_agent() that ADK Web can discover.
 The agent is named "Ticket_Assignment" and uses DiscoveryEngineSearchTool + BigQueryToolset.
 """
 
-import os
-from dotenv import load_dotenv
-from google.adk.agents import LlmAgent
-from google.adk.tools.bigquery import BigQueryToolset
-from google.adk.tools.bigquery.config import BigQueryToolConfig
+from typing import TYPE_CHECKING
 
+from bom_core import config
+from bom_core.registry import get_or_create, load_env
 
-load_dotenv()
+if TYPE_CHECKING:
+    from google.adk.agents import LlmAgent
 
-PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-DATASET_ID = os.getenv("BQ_DATASET_ID", "bom_demo")
-BQ_LOCATION = os.getenv("BQ_LOCATION", "us-central1")
-RAG_DATA_STORE_ID = os.getenv("RAG_DATA_STORE_ID")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-
-PROMPT = f"""
+PROMPT = """
 You are a BOM data analyst. You need to answers questions about the BOM tables using the item_master and bom_details tables.
-Use the BigQuery tools to answer questions about the `{PROJECT_ID}.{DATASET_ID}` dataset.
+Use the BigQuery tools to answer questions about the `{project_id}.{dataset_id}` dataset.
 Return concise answers in plain English.
+For multi-level BOM explosion, where-used, flattened parts lists and cycle checks on a known item number,
+call the BOM graph tools (explode_bom, where_used, flatten_bom, detect_bom_cycles) first; they answer
+in-process without a BigQuery job. For rolled-up assembly cost and what-if unit cost questions call rollup_cost or
+what_if_unit_cost. For the structure on a given date pass as_of_date to explode_bom / where_used; compare two dates
+with diff_bom and list what changed in a period with bom_changes. For products that contain obsolete, NPI or
+non-compliant parts at any depth call find_exposed_products (exposed_parts lists them for one assembly,
+exposure_audit counts all three checks for many assemblies). For phantom assemblies blown through with multiplied
+quantities call phantom_flattened_bom; for a product's options, configuration count and cost / lead-time range call
+configuration_options, and list concrete configurations (cheapest or fastest with order_by) with
+enumerate_configurations.
+Fall back to BigQuery only if they return an error or the question needs other columns.
+Results over 100 rows are cut off (result_is_likely_truncated) or come back with a result_cursor summary; for
+those call open_result_cursor with the same SQL, then fetch_result_page for more rows or export_result for a file.
 When you run a BigQuery query, append a short 'SQL used' section with a fenced SQL block of the final query.
 """
 
 
-def get_agent() -> LlmAgent:
-    if not PROJECT_ID:
+def get_agent() -> "LlmAgent":
+    load_env()
+    project_id = config.project_id()
+    if not project_id:
         raise ValueError("GCP_PROJECT_ID is required")
 
+    # Heavy imports (ADK, pandas, DuckDB, BigQuery) are paid on first build only
+    from google.adk.agents import LlmAgent
+    from google.adk.tools.bigquery.config import BigQueryToolConfig
+
+    from bom_core.cursors import RESULT_CURSOR_TOOLS, make_cursor_callback
+    from bom_core.local_sql import make_sql_toolset, uses_warehouse
+    from bom_core.query_cache import get_query_cache, make_cache_callbacks
+    from bom_core.query_guard import get_query_guard, make_guard_callback
+    from bom_core.tools import BOM_GRAPH_TOOLS, COST_ROLLUP_TOOLS, CONFIGURATOR_TOOLS, EFFECTIVITY_TOOLS, EXPOSURE_TOOLS
+    from bom_core.tracing import instrument
+
     # BigQuery tool configuration (explicit for readability)
     bq_cfg = BigQueryToolConfig(
-        compute_project_id=PROJECT_ID,
-        location=BQ_LOCATION,
+        compute_project_id=project_id,
+        location=config.bq_location(),
         max_query_result_rows=100,
+        maximum_bytes_billed=config.max_bytes_billed(),
     )
-    bq_tools = BigQueryToolset(bigquery_tool_config=bq_cfg)
+    # BQ_BACKEND=local|hybrid serves execute_sql from the embedded DuckDB mirror
+    bq_tools = make_sql_toolset(bq_cfg)
+
+    # Assemble tools list clearly (local BOM graph first, BigQuery as fallback)
+    tools = [*BOM_GRAPH_TOOLS, *COST_ROLLUP_TOOLS, *EFFECTIVITY_TOOLS, *EXPOSURE_TOOLS, *CONFIGURATOR_TOOLS,
+             bq_tools, *RESULT_CURSOR_TOOLS]
 
-    # Assemble tools list clearly
-    tools = [bq_tools]
+    # Repeat execute_sql calls are answered from the shared result cache
+    cache_before, cache_after = make_cache_callbacks(get_query_cache())
+    # Dry-run cost gate: over-budget statements are narrowed or rejected before they run
+    guard_before = make_guard_callback(get_query_guard(), should_check=uses_warehouse)
+    # Large results are spilled to a local cursor; the model sees its summary and a preview
+    cursor_after = make_cursor_callback()
 
     agent = LlmAgent(
         name="bom_data_agent",
         model="gemini-2.5-flash",
-        instruction=PROMPT,
+        instruction=PROMPT.format(project_id=project_id, dataset_id=config.dataset_id()),
         tools=tools,
+        before_tool_callback=[cache_before, guard_before],
+        after_tool_callback=[cache_after, cursor_after],
     )
-    return agent
+    # BOM_TRACE_DIR=<dir> records agent/LLM/tool spans (JSONL + OTLP/JSON)
+    return instrument(agent)
 
 
-root_agent = get_agent()
+def __getattr__(name: str):
+    # ADK Web looks up root_agent; build it on first access, once per process
+    if name == "root_agent":
+        return get_or_create(f"{__name__}.root_agent", get_agent)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
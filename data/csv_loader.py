@@ -1,102 +1,186 @@
 # CSV Data Loader for BigQuery
-# This script loads CSV files into BigQuery tables
-from google.cloud import bigquery
+# This script streams the CSV extracts through schema validation and typed
+# Parquet conversion, then loads all tables into BigQuery concurrently.
+import argparse
 import os
-from dotenv import load_dotenv
-import pandas as pd
+import sys
 
-# Load environment variables
-load_dotenv()
+# Make the repo-level bom_core package importable when run as `python data/csv_loader.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bom_core import config
+from bom_core.clients import get_client_factory
+from bom_core.loading import (
+    DEFAULT_CHUNK_ROWS,
+    DEFAULT_MAX_WORKERS,
+    BigQuerySink,
+    LocalSink,
+    default_sources,
+    load_tables,
+)
+from bom_core.catalog import refresh_schema_catalog
+from bom_core.delta import BigQueryTarget, DeltaState, SqliteTarget, load_delta, record_full_load
+from bom_core.query_cache import bump_dataset_version, dataset_version
+from bom_core.registry import load_env
+from bom_core.snapshot import refresh_snapshot
+from bom_core.summaries import BigQuerySummaryTarget, refresh_summaries
 
-# Configuration
-PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-DATASET_ID = os.getenv("BQ_DATASET_ID", "bom_demo")
-BQ_LOCATION = os.getenv("BQ_LOCATION", "us-central1")
 
-if not PROJECT_ID:
-    raise ValueError("GCP_PROJECT_ID environment variable is required. Please set it in your .env file.")
+def make_sink(args):
+    """BigQuery sink by default; --sink local writes typed Parquet to --out_dir."""
+    if args.sink == "local":
+        return LocalSink(args.out_dir)
+    project_id = config.project_id()
+    if not project_id:
+        raise ValueError("GCP_PROJECT_ID environment variable is required. Please set it in your .env file.")
+    print(f"🚀 Initializing BigQuery client for project: {project_id}")
+    client = get_client_factory().bigquery(project_id)
+    return BigQuerySink(client, project_id, config.dataset_id(), location=config.bq_location())
 
-print(f"🚀 Initializing BigQuery client for project: {PROJECT_ID}")
-client = bigquery.Client(project=PROJECT_ID)
 
-def load_csv_to_bigquery(csv_file_path, table_id, write_disposition="WRITE_TRUNCATE"):
-    """
-    Load CSV file into BigQuery table
-    
-    Args:
-        csv_file_path (str): Path to CSV file
-        table_id (str): BigQuery table ID (format: project.dataset.table)
-        write_disposition (str): How to handle existing data
+def make_delta_target(args):
+    """MERGE into BigQuery, or --sink local applies the delta to a SQLite file."""
+    if args.sink == "local":
+        os.makedirs(args.out_dir, exist_ok=True)
+        return SqliteTarget(os.path.join(args.out_dir, "bom.sqlite"))
+    project_id = config.project_id()
+    if not project_id:
+        raise ValueError("GCP_PROJECT_ID environment variable is required. Please set it in your .env file.")
+    client = get_client_factory().bigquery(project_id)
+    return BigQueryTarget(client, project_id, config.dataset_id(), location=config.bq_location())
+
+
+def run_delta(args, sources, deltas, target):
+    """Apply only inserted/updated/deleted rows since the last recorded snapshot.
+
+    The applied DeltaSets are collected in ``deltas`` for the summary refresh.
     """
-    try:
-        # Configure the load job
-        job_config = bigquery.LoadJobConfig(
-            source_format=bigquery.SourceFormat.CSV,
-            skip_leading_rows=1,  # Skip header row
-            autodetect=False,  # Use existing table schema
-            write_disposition=write_disposition,
-            create_disposition=bigquery.CreateDisposition.CREATE_NEVER  # Don't create table, use existing
-        )
-        
-        # Load the CSV file
-        with open(csv_file_path, "rb") as source_file:
-            job = client.load_table_from_file(
-                source_file, 
-                table_id, 
-                job_config=job_config,
-                location=BQ_LOCATION
-            )
-        
-        # Wait for job to complete
-        job.result()
-        
-        # Get table info
-        table = client.get_table(table_id)
-        print(f"✅ Successfully loaded {table.num_rows} rows into {table_id}")
-        
-    except Exception as e:
-        print(f"❌ Error loading {csv_file_path} into {table_id}: {str(e)}")
-        raise
+    state = DeltaState()
+    changed = 0
+    for table_name, csv_path in sources.items():
+        print(f"🔍 Computing delta for {table_name}...")
+        summary = load_delta(table_name, csv_path, target, state, chunk_rows=args.chunk_rows,
+                             full_extract=not args.partial_extract,
+                             on_applied=lambda delta: deltas.__setitem__(delta.table, delta))
+        print(f"✅ {table_name}: {summary['inserted']} inserted, {summary['updated']} updated, "
+              f"{summary['deleted']} deleted, {summary['unchanged']} unchanged "
+              f"(watermark {summary['watermark']})")
+        if summary["late_updates"]:
+            print(f"   ⚠️  {summary['late_updates']} changed rows did not advance last_modified_date")
+        changed += summary["inserted"] + summary["updated"] + summary["deleted"]
+    return changed
+
+
+def refresh_catalog(data_dir, version, frames=None):
+    """Rebuild the agents' schema catalog (columns + value dictionaries) for the new version."""
+    catalog = refresh_schema_catalog(data_dir, version, frames)
+    columns = sum(len(t.columns) for t in catalog.tables.values())
+    print(f"📚 Schema catalog refreshed ({len(catalog.tables)} tables, {columns} columns)")
+
+
+def refresh_dataset_snapshot(data_dir, version, frames=None):
+    """Write the binary snapshot that agent processes map instead of parsing the CSVs."""
+    info = refresh_snapshot(data_dir, version, frames=frames)
+    print(f"🗜️  Dataset snapshot written ({info['bytes'] / 1e6:.1f} MB, checksum {info['checksum']:08x})")
+
+
+def refresh_supplier_summaries(args, version, deltas=None, base_version=None, frames=None):
+    """Refresh the supplier summary tables (summaries.py), only the touched suppliers after a delta."""
+    target = None
+    if args.sink == "bigquery":
+        target = BigQuerySummaryTarget(get_client_factory().bigquery(config.project_id()))
+    report = refresh_summaries(args.data_dir, version, deltas=deltas, base_version=base_version,
+                               warehouse_target=target, frames=frames)
+    scope = "all suppliers" if report["partitions"] is None else f"{len(report['partitions'])} suppliers"
+    rows = ", ".join(f"{name} {count}" for name, count in report["rows"].items())
+    print(f"🧮 Supplier summaries refreshed ({report['mode']}, {scope}): {rows} rows")
+
 
 def main():
     """Main function to load all CSV files"""
-    
-    # Define file mappings
-    csv_files = [
-        {
-            "csv_path": "data/item_master.csv",
-            "table_id": f"{PROJECT_ID}.{DATASET_ID}.item_master"
-        },
-        {
-            "csv_path": "data/bom_details.csv", 
-            "table_id": f"{PROJECT_ID}.{DATASET_ID}.bom_details"
-        }
-    ]
-    
-    print("📦 Starting CSV data load process...")
-    
-    for file_info in csv_files:
-        csv_path = file_info["csv_path"]
-        table_id = file_info["table_id"]
-        
+    parser = argparse.ArgumentParser(description="Load the BOM CSV extracts")
+    parser.add_argument("--data_dir", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="Directory containing item_master.csv and bom_details.csv")
+    parser.add_argument("--sink", choices=["bigquery", "local"], default="bigquery")
+    parser.add_argument("--mode", choices=["full", "delta"], default="full",
+                        help="full: truncate and reload; delta: apply changes since the last load")
+    parser.add_argument("--partial_extract", action="store_true",
+                        help="Delta mode: the CSVs hold only modified rows, so missing keys are not deletes; "
+                             "the catalog, snapshot and summaries are rebuilt from the merged target tables")
+    parser.add_argument("--out_dir", default="data/.parquet", help="Output directory for --sink local")
+    parser.add_argument("--chunk_rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Rows per streamed chunk / Parquet row group")
+    parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="Tables loaded concurrently")
+    parser.add_argument("--on_error", choices=["raise", "skip"], default="raise",
+                        help="Fail on invalid rows, or drop them and report the count")
+    args = parser.parse_args()
+    load_env()
+
+    sources = {}
+    for table_name, csv_path in default_sources(args.data_dir).items():
         if not os.path.exists(csv_path):
             print(f"⚠️  CSV file not found: {csv_path}")
             continue
-            
-        print(f"📄 Loading {csv_path} into {table_id}...")
-        load_csv_to_bigquery(csv_path, table_id)
-    
+        sources[table_name] = csv_path
+
+    if args.mode == "delta":
+        base_version = dataset_version()
+        deltas = {}
+        target = make_delta_target(args)
+        if run_delta(args, sources, deltas, target):
+            version = bump_dataset_version("csv_loader:delta")
+            print(f"🔖 Dataset version bumped to {version}")
+            frames = None
+            if args.partial_extract:
+                # The CSVs hold only the changed rows. The agents' local engines read the snapshot
+                # written below, so build it (and the catalog and summaries) from the merged tables
+                frames = target.read_frames(default_sources(args.data_dir))
+                print(f"📥 Read the merged tables back ({', '.join(f'{n} {len(f)}' for n, f in frames.items())} rows)")
+            refresh_catalog(args.data_dir, version, frames)
+            refresh_dataset_snapshot(args.data_dir, version, frames)
+            refresh_supplier_summaries(args, version, deltas, base_version, frames)
+        else:
+            print("💤 No changes; dataset version (and cached results) kept")
+        if args.sink == "bigquery":
+            print(f"🔌 {get_client_factory().summary()}")
+        return
+
+    sink = make_sink(args)
+    # The BigQuery tables are also the delta target: their old snapshot is void once they are reloaded
+    # (--sink local writes Parquet, which leaves the SQLite delta stand-in and its snapshot alone)
+    delta_state = DeltaState() if args.sink == "bigquery" else None
+    if delta_state is not None:
+        delta_state.clear(sources)
+    print(f"📦 Starting CSV data load process ({len(sources)} tables, {args.workers} workers)...")
+    try:
+        reports = load_tables(sources, sink, chunk_rows=args.chunk_rows,
+                              max_workers=args.workers, on_error=args.on_error)
+    except Exception as e:
+        print(f"❌ Error loading CSV files: {str(e)}")
+        raise
+
+    for report in reports:
+        stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in report.timings.items())
+        print(f"✅ Loaded {report.loaded_rows} rows into {report.table} "
+              f"({report.chunks} chunks, {report.parquet_bytes / 1e6:.1f} MB parquet)")
+        if report.rejected_rows:
+            print(f"   ⚠️  {report.rejected_rows} invalid rows skipped")
+        print(f"   ⏱️  {stages}")
+
     print("🎉 All CSV files loaded successfully!")
-    
-    # Display table summary
-    print("\n📊 Table Summary:")
-    for file_info in csv_files:
-        table_id = file_info["table_id"]
-        try:
-            table = client.get_table(table_id)
-            print(f"  {table.table_id}: {table.num_rows} rows, {len(table.schema)} columns")
-        except Exception as e:
-            print(f"  {table_id}: Error getting table info - {str(e)}")
+    if delta_state is not None:
+        for table_name, csv_path in sources.items():
+            snapshot = record_full_load(table_name, csv_path, delta_state, args.chunk_rows, args.on_error)
+            print(f"🧾 Delta snapshot for {table_name} reset to the loaded extract ({len(snapshot.hashes)} keys)")
+    if args.sink == "bigquery":
+        print(f"🔌 {get_client_factory().summary()}")
+
+    # Invalidate cached agent query results and in-process engines
+    version = bump_dataset_version("csv_loader")
+    print(f"🔖 Dataset version bumped to {version}")
+    refresh_catalog(args.data_dir, version)
+    refresh_dataset_snapshot(args.data_dir, version)
+    refresh_supplier_summaries(args, version)
+
 
 if __name__ == "__main__":
     main()
@@ -1,29 +1,57 @@
 # Database loader module
 # This file will contain database loading functionality
-from google.cloud import bigquery
+import argparse
 import os
-from dotenv import load_dotenv
+import re
+import sys
 
-# Load environment variables from .env file
-load_dotenv()
+# Make the repo-level bom_core package importable when run as `python data/db_loader.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bom_core import config
+from bom_core.clients import get_client_factory
+from bom_core.delta import DeltaState
+from bom_core.query_cache import bump_dataset_version
+from bom_core.registry import load_env
 
-# Set your GCP project
-PROJECT_ID = os.getenv("GCP_PROJECT_ID")
-DATASET_ID = os.getenv("BQ_DATASET_ID", "bom_demo")
-BQ_LOCATION = os.getenv("BQ_LOCATION", "us-central1")
 
-if not PROJECT_ID:
-    raise ValueError("GCP_PROJECT_ID environment variable is required. Please set it in your .env file.")
+def schema_script(sql, keep_tables=False):
+    """The DDL script; keep_tables drops the DROP TABLEs and only creates missing tables."""
+    if not keep_tables:
+        return sql
+    sql = re.sub(r"^DROP TABLE[^;]*;\s*$", "", sql, flags=re.MULTILINE | re.IGNORECASE)
+    return re.sub(r"\bCREATE TABLE (?!IF NOT EXISTS)", "CREATE TABLE IF NOT EXISTS ", sql, flags=re.IGNORECASE)
 
-print(f"🚀 Initializing BigQuery client for project: {PROJECT_ID}")
-client = bigquery.Client(project=PROJECT_ID, location=BQ_LOCATION)
 
-# Execute the SQL file
-with open("data/create_bom_schema.sql", "r") as f:
-    query = f.read().replace("<YOUR_PROJECT_ID>", PROJECT_ID)
+def main():
+    parser = argparse.ArgumentParser(description="Create the BOM dataset and tables in BigQuery")
+    parser.add_argument("--keep_tables", action="store_true",
+                        help="Don't drop existing tables (keeps data for csv_loader.py --mode delta)")
+    args = parser.parse_args()
+    load_env()
+    project_id = config.project_id()
 
-print("📦 Executing SQL script to create tables and load sample data...")
-job = client.query(query)
-job.result()
+    if not project_id:
+        raise ValueError("GCP_PROJECT_ID environment variable is required. Please set it in your .env file.")
 
-print("✅ BigQuery tables created successfully under dataset:", DATASET_ID)
+    print(f"🚀 Initializing BigQuery client for project: {project_id}")
+    client = get_client_factory().bigquery(project_id)
+
+    # Execute the SQL file
+    with open("data/create_bom_schema.sql", "r") as f:
+        query = schema_script(f.read().replace("<YOUR_PROJECT_ID>", project_id), args.keep_tables)
+
+    print("📦 Executing SQL script to create tables and load sample data...")
+    job = client.query(query)
+    job.result()
+
+    print("✅ BigQuery tables created successfully under dataset:", config.dataset_id())
+
+    if not args.keep_tables:
+        # Tables were dropped and recreated: cached agent query results are stale, and so are
+        # the delta snapshots (the next csv_loader.py --mode delta run is an initial load)
+        bump_dataset_version("db_loader")
+        DeltaState().clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,46 +10,39 @@ Prereqs:
 Usage:
   python bom_agentic_demo_with_rag/tools/index_schema_to_vertex.py --file data/field_mapping_documentation.md
   python bom_agentic_demo_with_rag/tools/index_schema_to_vertex.py --file data/field_mapping_documentation.md data/query_patterns_documentation.md
+
+  # Offline alternative (no GCP needed), used when RAG_BACKEND=local
+  python data/index_schema_to_vertex.py --file data/field_mapping_documentation.md data/query_patterns_documentation.md --local_index_dir data/.rag_index
 """
 
 import argparse
+import hashlib
+import json
 import os
+import random
+import sys
 import time
-import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Tuple
 
 from google.cloud import discoveryengine_v1beta as discoveryengine
 from google.cloud.discoveryengine_v1beta.types import DataStore as DataStoreType, SolutionType
-from google.api_core.client_options import ClientOptions
-from google.api_core.exceptions import NotFound, AlreadyExists, GoogleAPICallError
+from google.api_core.exceptions import (
+    AlreadyExists,
+    DeadlineExceeded,
+    GoogleAPICallError,
+    InternalServerError,
+    NotFound,
+    ResourceExhausted,
+    ServiceUnavailable,
+)
 from dotenv import load_dotenv
 
-
-def chunk_markdown(md_text: str) -> List[Dict]:
-    """Chunk by table or query ID sections, supporting formats like:
-    - ## Table: item_master
-    - ## Table 1: item_master
-    - ## Query ID: WHERE_USED_001
-    """
-    chunks: List[Dict] = []
-    current_id = None
-    current: List[str] = []
-    # Match either "Table" or "Query ID" patterns
-    pattern = re.compile(r"^##\s*(?:Table(?:\s*\d+)?|Query\s+ID)\s*:?\s*(.+)$", re.IGNORECASE)
-    for line in md_text.splitlines():
-        m = pattern.match(line.strip())
-        if m:
-            if current_id and current:
-                chunks.append({"id": current_id, "content": "\n".join(current)})
-            name = m.group(1).strip()
-            safe_id = re.sub(r"[^a-zA-Z0-9_-]", "_", name)
-            current_id = safe_id
-            current = [line]
-        else:
-            current.append(line)
-    if current_id and current:
-        chunks.append({"id": current_id, "content": "\n".join(current)})
-    return chunks
+# Make the repo-level bom_core package importable when run as `python data/index_schema_to_vertex.py`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from bom_core.chunking import chunk_markdown
+from bom_core.clients import get_client_factory
+from bom_core.retrieval import LocalSearchIndex
 
 
 def _location_from_path(path: str) -> str:
@@ -60,35 +53,144 @@ def _location_from_path(path: str) -> str:
         raise ValueError("Invalid data_store path; expected projects/{project}/locations/{location}/collections/default_collection/dataStores/{id}")
 
 
-def upsert_documents(data_store: str, chunks: List[Dict]) -> None:
-    location = _location_from_path(data_store)
-    # Choose correct endpoint
-    api_endpoint = "discoveryengine.googleapis.com" if location == "global" else f"{location}-discoveryengine.googleapis.com"
-    client = discoveryengine.DocumentServiceClient(client_options=ClientOptions(api_endpoint=api_endpoint))
-    for c in chunks:
-        doc = discoveryengine.Document(
-            id=c["id"],
-            content=discoveryengine.Document.Content(
-                mime_type="text/plain",
-                raw_bytes=c["content"].encode("utf-8"),
-            ),
-            struct_data={}
-        )
-        parent = f"{data_store}/branches/default_branch"
-        request = discoveryengine.CreateDocumentRequest(
-            parent=parent,
-            document=doc,
-            document_id=c["id"],
-        )
+IMPORT_BATCH_SIZE = 100  # Documents per ImportDocuments request (API limit)
+RETRYABLE_ERRORS = (ResourceExhausted, ServiceUnavailable, DeadlineExceeded, InternalServerError)
+
+
+def content_hash(chunk: Dict) -> str:
+    """Stable hash of what gets indexed for a chunk (content + metadata)."""
+    payload = json.dumps(
+        {"content": chunk["content"], "struct_data": chunk.get("struct_data", {})},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _with_retry(fn, max_retries: int = 5, base_delay: float = 0.5, sleep=time.sleep):
+    """Call fn(), backing off exponentially (with jitter) on quota/transient errors."""
+    for attempt in range(max_retries + 1):
         try:
-            client.create_document(request=request)
-            time.sleep(0.1)
-        except Exception:
-            # Try update if exists
-            # Set full resource name for update
-            doc.name = f"{parent}/documents/{c['id']}"
-            update_req = discoveryengine.UpdateDocumentRequest(document=doc)
-            client.update_document(request=update_req)
+            return fn()
+        except RETRYABLE_ERRORS:
+            if attempt == max_retries:
+                raise
+            sleep(base_delay * (2 ** attempt) * (0.5 + random.random()))
+
+
+def _build_document(parent: str, chunk: Dict, digest: str) -> "discoveryengine.Document":
+    struct_data = dict(chunk.get("struct_data", {}))
+    struct_data["content_hash"] = digest
+    return discoveryengine.Document(
+        name=f"{parent}/documents/{chunk['id']}",
+        id=chunk["id"],
+        content=discoveryengine.Document.Content(
+            mime_type="text/plain",
+            raw_bytes=chunk["content"].encode("utf-8"),
+        ),
+        struct_data=struct_data,
+    )
+
+
+def _existing_hashes(client, parent: str) -> Dict[str, str]:
+    """{document_id: content_hash} for every document already in the branch."""
+    existing = {}
+    for doc in client.list_documents(request=discoveryengine.ListDocumentsRequest(parent=parent, page_size=1000)):
+        data = dict(doc.struct_data) if doc.struct_data else {}
+        existing[doc.id or doc.name.rsplit("/", 1)[-1]] = data.get("content_hash", "")
+    return existing
+
+
+def document_service_client(data_store: str):
+    """Shared DocumentServiceClient for the data store's location (one gRPC channel per endpoint)."""
+    return get_client_factory().document_service(_location_from_path(data_store))
+
+
+def upsert_documents(
+    data_store: str,
+    chunks: List[Dict],
+    client=None,
+    mode: str = "threads",
+    max_workers: int = 8,
+    max_retries: int = 5,
+    prune: bool = False,
+    sleep=time.sleep,
+) -> Dict[str, List[str]]:
+    """Idempotently sync chunks into the data store.
+
+    Each document carries a content_hash in struct_data; chunks whose hash
+    matches the stored one are skipped. New and changed chunks are written
+    either via the batch ImportDocuments API (mode="import", INCREMENTAL
+    reconciliation) or one RPC per document on a bounded thread pool
+    (mode="threads"), retrying quota/transient errors with backoff. Stored
+    documents with no matching chunk are reported as stale and deleted only
+    when prune=True.
+
+    ``client`` may be any object with the DocumentServiceClient methods used
+    here (list/create/update/delete/import_documents), e.g. a test fake.
+
+    Returns a summary: {created, updated, unchanged, stale, deleted, failed}.
+    """
+    client = client or document_service_client(data_store)
+    parent = f"{data_store}/branches/default_branch"
+    existing = _with_retry(lambda: _existing_hashes(client, parent), max_retries, sleep=sleep)
+
+    summary: Dict[str, List[str]] = {k: [] for k in ("created", "updated", "unchanged", "stale", "deleted", "failed")}
+    pending = []  # (kind, document)
+    for chunk in chunks:
+        digest = content_hash(chunk)
+        if chunk["id"] not in existing:
+            pending.append(("created", _build_document(parent, chunk, digest)))
+        elif existing[chunk["id"]] != digest:
+            pending.append(("updated", _build_document(parent, chunk, digest)))
+        else:
+            summary["unchanged"].append(chunk["id"])
+    chunk_ids = {c["id"] for c in chunks}
+    summary["stale"] = sorted(doc_id for doc_id in existing if doc_id not in chunk_ids)
+
+    if mode == "import":
+        for start in range(0, len(pending), IMPORT_BATCH_SIZE):
+            batch = pending[start:start + IMPORT_BATCH_SIZE]
+            request = discoveryengine.ImportDocumentsRequest(
+                parent=parent,
+                inline_source=discoveryengine.ImportDocumentsRequest.InlineSource(documents=[d for _, d in batch]),
+                reconciliation_mode=discoveryengine.ImportDocumentsRequest.ReconciliationMode.INCREMENTAL,
+            )
+            try:
+                _with_retry(lambda: client.import_documents(request=request).result(timeout=600), max_retries, sleep=sleep)
+                for kind, doc in batch:
+                    summary[kind].append(doc.id)
+            except GoogleAPICallError:
+                summary["failed"].extend(doc.id for _, doc in batch)
+    else:
+        def write(kind, doc):
+            if kind == "created":
+                req = discoveryengine.CreateDocumentRequest(parent=parent, document=doc, document_id=doc.id)
+                _with_retry(lambda: client.create_document(request=req), max_retries, sleep=sleep)
+            else:
+                req = discoveryengine.UpdateDocumentRequest(document=doc, allow_missing=True)
+                _with_retry(lambda: client.update_document(request=req), max_retries, sleep=sleep)
+            return kind, doc.id
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(write, kind, doc): doc.id for kind, doc in pending}
+            for future in as_completed(futures):
+                try:
+                    kind, doc_id = future.result()
+                    summary[kind].append(doc_id)
+                except GoogleAPICallError:
+                    summary["failed"].append(futures[future])
+
+    if prune:
+        for doc_id in summary["stale"]:
+            try:
+                _with_retry(lambda: client.delete_document(name=f"{parent}/documents/{doc_id}"), max_retries, sleep=sleep)
+                summary["deleted"].append(doc_id)
+            except NotFound:
+                summary["deleted"].append(doc_id)
+            except GoogleAPICallError:
+                summary["failed"].append(doc_id)
+    return summary
 
 
 def _parse_data_store_path(path: str) -> Tuple[str, str, str]:
@@ -115,8 +217,7 @@ def ensure_data_store(project: str, location: str, data_store_id: str, display_n
     parent = f"projects/{project}/locations/{location}/collections/default_collection"
     name = f"{parent}/dataStores/{data_store_id}"
 
-    api_endpoint = "discoveryengine.googleapis.com" if location == "global" else f"{location}-discoveryengine.googleapis.com"
-    client = discoveryengine.DataStoreServiceClient(client_options=ClientOptions(api_endpoint=api_endpoint))
+    client = get_client_factory().data_store_service(location)
 
     # Check existence
     try:
@@ -165,11 +266,21 @@ def main():
     parser.add_argument("--file", nargs="+", required=True, help="Path(s) to markdown schema file(s)")
     parser.add_argument("--location", default="global", help="Discovery Engine location (default: global)")
     parser.add_argument("--data_store_id", help="If RAG_DATA_STORE_ID not set, create/use this data store id")
+    parser.add_argument("--mode", choices=["threads", "import"], default="threads", help="Write changed chunks via a thread pool or the batch import API")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent document writes in threads mode")
+    parser.add_argument("--prune", action="store_true", help="Delete documents that no longer match any chunk")
+    parser.add_argument("--local_index_dir", help="Build the offline local index (RAG_BACKEND=local) here instead of uploading to Vertex AI Search")
     args = parser.parse_args()
 
     # Auto-load .env so users don't need to export vars manually
     load_dotenv()
 
+    if args.local_index_dir:
+        index = LocalSearchIndex.from_files(args.file)
+        index.save(args.local_index_dir)
+        print(f"✅ Indexed {len(index.ids)} total chunks into local index at {args.local_index_dir}")
+        return
+
     project = os.getenv("GCP_PROJECT_ID")
     if not project:
         raise RuntimeError("GCP_PROJECT_ID env var is required")
@@ -214,10 +325,20 @@ def main():
         print(f"  → Found {len(chunks)} chunks")
     
     if not all_chunks:
-        raise RuntimeError("No chunks parsed from any file. Ensure '## Table:' or '## Query ID:' headers exist.")
+        raise RuntimeError("No chunks parsed from any file. Ensure the docs have '## ' section headers.")
 
-    upsert_documents(data_store, all_chunks)
-    print(f"✅ Indexed {len(all_chunks)} total chunks into Vertex AI Search")
+    summary = upsert_documents(data_store, all_chunks, mode=args.mode, max_workers=args.workers, prune=args.prune)
+    print(
+        f"✅ Synced {len(all_chunks)} chunks into Vertex AI Search: "
+        f"{len(summary['created'])} created, {len(summary['updated'])} updated, "
+        f"{len(summary['unchanged'])} unchanged"
+    )
+    print(f"🔌 {get_client_factory().summary()}")
+    if summary["stale"]:
+        action = "deleted" if args.prune else "left in place (use --prune to delete)"
+        print(f"🗑️  {len(summary['stale'])} stale documents {action}: {', '.join(summary['stale'])}")
+    if summary["failed"]:
+        raise RuntimeError(f"Failed to index documents: {', '.join(summary['failed'])}")
 
 
 if __name__ == "__main__":
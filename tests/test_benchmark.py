@@ -0,0 +1,97 @@
+import json
+
+import pandas as pd
+import pytest
+
+from bom_core import benchmark
+from bom_core.benchmark import CaseResult, compare, format_report, run_benchmark, time_case
+from bom_core.dataset import load_dataset
+from bom_core.graph import BomGraph
+from bom_core.schema import load_schema
+from bom_core.synthetic import GeneratorConfig, generate_dataset, write_dataset
+
+SMALL = GeneratorConfig(items=400, depth=4, cycle_rate=0.02)
+
+
+@pytest.fixture(scope="module")
+def small_dir(tmp_path_factory):
+    out = tmp_path_factory.mktemp("bom_small")
+    write_dataset(generate_dataset(SMALL), str(out), SMALL)
+    return str(out)
+
+
+def test_generator_is_seeded_and_matches_the_schema():
+    frames = generate_dataset(SMALL)
+    again = generate_dataset(SMALL)
+    for name, table in load_schema().items():
+        assert list(frames[name].columns) == table.column_names
+        pd.testing.assert_frame_equal(frames[name], again[name])
+    assert len(frames["item_master"]) == SMALL.items
+    assert not frames["item_master"]["item_number"].duplicated().any()
+    # cycle_rate closes loops for cycle detection to find
+    assert BomGraph(frames["bom_details"]).find_cycles()
+    other = generate_dataset(GeneratorConfig(items=400, depth=4, seed=1))
+    assert not frames["bom_details"]["component_item_number"].equals(other["bom_details"]["component_item_number"])
+
+
+def test_written_dataset_loads_back(small_dir):
+    frames = load_dataset(small_dir)
+    expected = generate_dataset(SMALL)
+    assert {n: len(f) for n, f in frames.items()} == {n: len(f) for n, f in expected.items()}
+    assert frames["bom_details"]["quantity"].sum() == pytest.approx(expected["bom_details"]["quantity"].sum())
+
+
+def test_report_covers_every_case_without_errors(small_dir):
+    report = run_benchmark(small_dir, repeat=1, include_startup=False)
+    names = [r["name"] for r in report["results"]]
+    assert {"WHERE_USED_001", "PATTERN_12", "graph_explode", "summary_refresh_one_supplier",
+            "load_delta_noop", "snapshot_open_graph"} <= set(names)
+    assert [r for r in report["results"] if r.get("error")] == []
+    assert report["meta"]["row_counts"]["item_master"] == SMALL.items
+    assert json.loads(json.dumps(report, default=str))["meta"]["parameters"]["top_item"]
+    assert "PATTERN_12" in format_report(report)
+
+
+def test_slower_cases_are_reported_as_regressions():
+    baseline = {"results": [
+        {"name": "fast", "p50_ms": 2.0}, {"name": "jitter", "p50_ms": 0.2}, {"name": "slower", "p50_ms": 10.0},
+        {"name": "broken", "p50_ms": 1.0, "error": "boom"},
+    ]}
+    results = [
+        {"name": "fast", "p50_ms": 2.2},  # +10%: under the threshold
+        {"name": "jitter", "p50_ms": 0.5},  # +150% but under a millisecond
+        {"name": "slower", "p50_ms": 15.0},
+        {"name": "broken", "p50_ms": 50.0},
+        {"name": "new_case", "p50_ms": 99.0},
+    ]
+    assert compare(results, baseline) == [
+        {"name": "slower", "baseline_p50_ms": 10.0, "p50_ms": 15.0, "change": 0.5}
+    ]
+    assert compare(results, baseline, threshold=0.6) == []
+
+
+def test_cases_record_errors_and_budgets():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 3:
+            raise ValueError("no rows")
+        return 7
+
+    result = time_case("flaky", "graph", flaky, repeat=5)
+    assert (len(result.timings_ms), result.rows, result.error) == (1, 7, "ValueError: no rows")
+
+    slow = CaseResult("startup_build_x", "startup", [120.0, 90.0, 150.0], budget_ms=100.0)
+    assert slow.over_budget and slow.to_dict()["p50_ms"] == 120.0
+
+
+def test_main_exits_non_zero_on_a_regression(small_dir, tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"results": [{"name": "local_warehouse_build", "p50_ms": 1e-3}]}))
+    out = tmp_path / "bench.json"
+    with pytest.raises(SystemExit) as exit_info:
+        benchmark.main(["--data_dir", small_dir, "--repeat", "1", "--skip_loaders", "--skip_startup",
+                        "--baseline", str(baseline), "--out", str(out)])
+    assert exit_info.value.code == 1
+    assert [r["name"] for r in json.loads(out.read_text())["regressions"]] == ["local_warehouse_build"]
@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import pytest
+
+from bom_core import catalog
+from bom_core.catalog import SchemaCatalog, parse_column_docs
+from bom_core.tools import get_dataset
+
+
+@pytest.fixture(scope="module")
+def built():
+    return SchemaCatalog.build(get_dataset(), version="v1")
+
+
+@pytest.fixture
+def catalog_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("BOM_SCHEMA_CATALOG_FILE", str(tmp_path / "catalog.json"))
+    catalog._catalog_for.cache_clear()
+    yield tmp_path / "catalog.json"
+    catalog._catalog_for.cache_clear()
+
+
+def test_profiles_match_the_frames(built):
+    item_master = get_dataset()["item_master"]
+    table = built.tables["item_master"]
+    assert table.row_count == len(item_master)
+    assert table.natural_key == ["item_number"]
+
+    item_type = table.columns["item_type"]
+    assert item_type.values == item_master["item_type"].value_counts().to_dict()
+    assert item_type.description
+    # Unique keys and free text get no value dictionary
+    assert table.columns["item_number"].values is None
+    assert table.columns["item_description"].values is None
+
+    unit_cost = table.columns["unit_cost"]
+    assert float(unit_cost.min) == item_master["unit_cost"].min()
+    assert float(unit_cost.max) == item_master["unit_cost"].max()
+    assert unit_cost.null_count == item_master["unit_cost"].isna().sum()
+
+
+def test_terms_resolve_to_columns_and_stored_values(built):
+    resolved = built.resolve(["raw material", "lead time", "electronics"])
+    values = {(v["term"], v["column"], v["value"]) for v in resolved["values"]}
+    assert ("raw material", "item_master.item_type", "RAW_MATERIAL") in values
+    assert ("electronics", "item_master.category", "ELECTRONICS") in values
+    columns = {m["column"] for m in resolved["columns"] if m["term"] == "lead time" and m["score"] == 1.0}
+    assert columns == {"item_master.lead_time_days", "bom_details.lead_time_days"}
+
+
+def test_round_trips_through_json(built, tmp_path):
+    path = str(tmp_path / "catalog.json")
+    built.save(path)
+    loaded = SchemaCatalog.load(path)
+    assert loaded.version == "v1"
+    assert loaded.describe() == built.describe()
+    assert loaded.summary() == built.summary()
+    assert "item_type STRING = " in loaded.summary()
+
+
+def test_stale_catalog_file_is_rebuilt(catalog_file, monkeypatch):
+    SchemaCatalog({}, version="old").save(str(catalog_file))
+    monkeypatch.setattr(catalog, "dataset_version", lambda: "new")
+    rebuilt = catalog.get_schema_catalog()
+    assert rebuilt.version == "new"
+    assert set(rebuilt.tables) == {"item_master", "bom_details"}
+    assert SchemaCatalog.load(str(catalog_file)).version == "new"
+
+
+def test_tools_and_state_callback(catalog_file):
+    assert catalog.describe_schema("bom_details")["tables"].keys() == {"bom_details"}
+    error = catalog.describe_schema("suppliers")
+    assert error["status"] == "ERROR" and "Unknown table 'suppliers'" in error["error_details"]
+
+    context = SimpleNamespace(state={})
+    catalog.make_catalog_callback()(context)
+    assert context.state["schema_catalog"].startswith("item_master (")
+    assert context.state["schema_catalog_version"] == catalog.get_schema_catalog().version
+
+
+def test_column_docs_come_from_the_field_mapping_tables():
+    docs = parse_column_docs(
+        "## Table 1: item_master\n| Column | Type | Description |\n|---|---|---|\n"
+        "| item_number | STRING | Unique item id |\n## Notes\n| ignored | STRING | x |\n"
+    )
+    assert docs == {"item_master": {"item_number": "Unique item id"}}
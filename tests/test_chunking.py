@@ -0,0 +1,83 @@
+from bom_core import config
+from bom_core.chunking import chunk_files, chunk_markdown
+
+DOC = """# BOM Query Patterns
+
+Validated SQL for the BOM tables.
+
+## Query ID: WHERE_USED_001
+
+### Where-used analysis
+
+**Keywords**: where used, parent assemblies
+
+```sql
+-- ## not a heading inside a fence
+SELECT parent_item_number FROM `{PROJECT}.{DATASET}.bom_details`
+WHERE component_item_number = @component_item
+```
+
+## Table 1: item_master
+
+| Column | Type |
+|--------|------|
+| item_number | STRING |
+
+## Relationships
+
+bom_details.component_item_number joins item_master.item_number.
+"""
+
+
+def test_one_chunk_per_level_two_section():
+    chunks = chunk_markdown(DOC)
+    assert [c["id"] for c in chunks] == ["BOM_Query_Patterns", "WHERE_USED_001", "item_master", "Relationships"]
+    where_used = chunks[1]
+    # ### subsections and fenced "headings" stay inside their section
+    assert "### Where-used analysis" in where_used["content"]
+    assert "-- ## not a heading inside a fence" in where_used["content"]
+
+
+def test_sections_carry_struct_data():
+    by_id = {c["id"]: c["struct_data"] for c in chunk_markdown(DOC)}
+    where_used = by_id["WHERE_USED_001"]
+    assert where_used["kind"] == "query_pattern"
+    assert where_used["title"] == "WHERE_USED_001: Where-used analysis"
+    assert where_used["section_path"] == ["BOM Query Patterns", "Query ID: WHERE_USED_001"]
+    assert where_used["tables"] == ["bom_details"]
+    assert where_used["keywords"] == ["where used", "parent assemblies"]
+    assert where_used["parameters"] == ["component_item"]
+
+    assert by_id["item_master"]["kind"] == "table"
+    assert by_id["item_master"]["tables"] == ["item_master"]
+    assert by_id["Relationships"]["tables"] == ["bom_details", "item_master"]
+
+
+def test_long_sections_split_within_the_budget():
+    rows = "\n".join(f"| col_{i} | STRING |" for i in range(200))
+    sql = "```sql\n" + "\n".join(f"SELECT {i} AS c UNION ALL" for i in range(40)) + "\nSELECT 0\n```"
+    doc = f"## Table 2: bom_details\n\n| Column | Type |\n|---|---|\n{rows}\n\n{sql}\n"
+    chunks = chunk_markdown(doc, max_chars=1500)
+
+    assert len(chunks) > 2
+    assert [c["id"] for c in chunks] == [f"bom_details_part{n}" for n in range(1, len(chunks) + 1)]
+    for chunk in chunks:
+        assert len(chunk["content"]) <= 1500
+        assert chunk["content"].startswith("## Table 2: bom_details")
+        assert chunk["struct_data"]["parts"] == len(chunks)
+        # Table pieces repeat the header; the SQL fence is never cut
+        if "| col_" in chunk["content"]:
+            assert "| Column | Type |" in chunk["content"]
+        assert chunk["content"].count("```") in (0, 2)
+
+
+def test_shipped_docs_chunk_with_prefixed_unique_ids():
+    paths = [config.data_path(n) for n in ("field_mapping_documentation.md", "query_patterns_documentation.md")]
+    chunks = chunk_files(paths)
+    ids = [c["id"] for c in chunks]
+    assert len(ids) == len(set(ids))
+    assert all(len(i) <= 63 for i in ids)  # Vertex AI Search document id limit
+    assert "query_patterns_documentation_md_WHERE_USED_001" in ids
+    assert {c["source"] for c in chunks} == {"field_mapping_documentation.md", "query_patterns_documentation.md"}
+    patterns = {c["struct_data"].get("pattern_id") for c in chunks}
+    assert {"PATTERN_3", "PATTERN_4"} <= patterns
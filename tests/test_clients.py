@@ -0,0 +1,150 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import bigquery
+
+from bom_core.clients import (
+    ClientFactory,
+    PoolConfig,
+    discovery_engine_endpoint,
+    get_client_factory,
+    set_client_factory,
+)
+from bom_core.query_runner import get_bigquery_client
+
+
+@pytest.fixture
+def factory():
+    # Anonymous credentials: the real clients are built, nothing is sent to GCP
+    factory = ClientFactory(pool=PoolConfig(pool_size=4, keepalive_seconds=45), credentials=AnonymousCredentials())
+    yield factory
+    factory.close()
+
+
+def test_pool_config_from_env(monkeypatch):
+    monkeypatch.setenv("GCP_HTTP_POOL_SIZE", "16")
+    monkeypatch.setenv("GCP_KEEPALIVE_SECONDS", "60")
+    assert PoolConfig.from_env() == PoolConfig(pool_size=16, keepalive_seconds=60)
+    monkeypatch.delenv("GCP_HTTP_POOL_SIZE")
+    monkeypatch.delenv("GCP_KEEPALIVE_SECONDS")
+    assert PoolConfig.from_env() == PoolConfig()
+
+
+def test_bigquery_client_uses_the_keepalive_pool(factory, monkeypatch):
+    monkeypatch.setenv("GCP_PROJECT_ID", "demo")
+    monkeypatch.setenv("BQ_LOCATION", "EU")
+    client = factory.bigquery()
+    assert isinstance(client, bigquery.Client)
+    assert (client.project, client.location) == ("demo", "EU")
+    assert factory.bigquery(project="demo", location="EU") is client
+    assert factory.bigquery(location="US") is not client
+
+    pool = client._http.get_adapter("https://bigquery.googleapis.com").poolmanager.connection_pool_kw
+    assert pool["maxsize"] == 4
+    options = set(pool["socket_options"])
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in options
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        assert (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 45) in options
+        assert (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 15) in options
+
+
+def test_discovery_engine_clients_share_a_channel_per_endpoint(factory):
+    assert discovery_engine_endpoint("global") == "discoveryengine.googleapis.com"
+    assert discovery_engine_endpoint("eu") == "eu-discoveryengine.googleapis.com"
+
+    documents = factory.document_service()
+    data_stores = factory.data_store_service()
+    regional = factory.document_service("eu")
+    assert documents._transport.grpc_channel is data_stores._transport.grpc_channel
+    assert regional._transport.grpc_channel is not documents._transport.grpc_channel
+    assert regional._transport._host.startswith("eu-discoveryengine.googleapis.com")
+    assert factory.document_service("global") is documents
+
+    metrics = factory.metrics()
+    assert (metrics["channels_created"], metrics["channels_reused"]) == (2, 1)
+    assert (metrics["document_service_created"], metrics["document_service_reused"]) == (2, 1)
+    assert factory.summary() == "clients 3 created / 1 reused; gRPC channels 2 created / 1 reused"
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_http_session_reuses_its_connections(factory):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        session = factory.http_session()
+        session.mount("http://", session.get_adapter("https://example.com"))  # the pooled adapter, without TLS
+        for _ in range(5):
+            assert session.get(f"http://127.0.0.1:{server.server_port}/").status_code == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+    metrics = factory.metrics()
+    assert (metrics["http_requests"], metrics["http_connections_opened"]) == (5, 1)
+    assert metrics["http_connection_reuse_ratio"] == 0.8
+    assert factory.summary().endswith("5 HTTP requests over 1 connections")
+
+
+def test_concurrent_first_calls_build_one_client():
+    built = []
+    start = threading.Barrier(8)
+
+    def slow_bigquery(**kwargs):
+        built.append(kwargs)
+        threading.Event().wait(0.05)
+        return object()
+
+    factory = ClientFactory(credentials=AnonymousCredentials(), builders={"bigquery": slow_bigquery})
+    seen = []
+    threads = [threading.Thread(target=lambda: (start.wait(), seen.append(factory.bigquery("demo", "US"))))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert built == [{"project": "demo", "location": "US"}]
+    assert len({id(client) for client in seen}) == 1
+
+
+def test_override_errors_and_close(factory, monkeypatch):
+    monkeypatch.delenv("GCP_PROJECT_ID", raising=False)
+    with pytest.raises(ValueError, match="GCP_PROJECT_ID"):
+        factory.bigquery()
+    with pytest.raises(KeyError, match="Unknown client kind 'storage'"):
+        factory.get("storage")
+
+    real = factory.document_service()
+    fake = object()
+    factory.override("document_service", lambda location: fake)
+    assert factory.document_service() is fake is not real
+
+    channel = factory.data_store_service()._transport.grpc_channel
+    factory.close()
+    assert factory.metrics()["channels_created"] == 1
+    assert factory.data_store_service()._transport.grpc_channel is not channel
+
+
+def test_process_factory_can_be_swapped(factory, monkeypatch):
+    monkeypatch.setenv("GCP_PROJECT_ID", "demo")
+    set_client_factory(factory)
+    try:
+        assert get_client_factory() is factory
+        assert get_bigquery_client() is factory.bigquery()
+    finally:
+        set_client_factory(None)
+    assert get_client_factory() is not factory
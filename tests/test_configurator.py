@@ -0,0 +1,118 @@
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+from bom_core import tools
+from bom_core.configurator import ConfigurationEngine
+from bom_core.graph import BomGraph
+from bom_core.synthetic import GeneratorConfig, generate_dataset
+
+
+@pytest.fixture(scope="module")
+def synthetic():
+    frames = generate_dataset(GeneratorConfig(items=400, depth=4, cycle_rate=0.0, seed=4))
+    details = frames["bom_details"]
+    return ConfigurationEngine(BomGraph(details), details, frames["item_master"]), details
+
+
+def blown_through(engine, item, factor=1.0):
+    """(component, quantity) lines of ``item`` with phantoms expanded by plain recursion."""
+    g = engine.graph
+    lines = []
+    for e in g.child_edges(item, engine.edge_mask):
+        child, qty = int(g.child[e]), factor * float(g.quantity[e])
+        if engine.is_phantom[e] and len(g.child_edges(child, engine.edge_mask)):
+            lines += blown_through(engine, child, qty)
+        else:
+            lines.append((str(g.items[child]), round(qty, 9)))
+    return lines
+
+
+def test_collapse_matches_a_recursive_expansion(synthetic):
+    engine, details = synthetic
+    assert engine.phantom_stats()["phantom_lines"] > 0
+    for parent in details["parent_item_number"].unique():
+        rows = engine.collapsed_bom(parent)
+        assert Counter((r["component_item_number"], round(r["quantity"], 9)) for r in rows) == \
+            Counter(blown_through(engine, engine.graph.item_id(parent))), parent
+
+
+def test_counts_and_bounds_match_the_enumeration(synthetic):
+    engine, details = synthetic
+    for parent in details["parent_item_number"].unique():
+        summary = engine.summary(parent)
+        configs = list(engine.configurations(parent))
+        assert len(configs) == summary["configurations"], parent
+        assert configs[0]["option_count"] == 0
+        costs = [c["rolled_cost"] for c in configs]
+        leads = [c["lead_time_days"] for c in configs]
+        assert (min(costs), max(costs)) == pytest.approx((summary["min_cost"], summary["max_cost"]))
+        assert (min(leads), max(leads)) == pytest.approx(
+            (summary["min_lead_time_days"], summary["max_lead_time_days"]))
+
+
+def bom(*lines):
+    """bom_details from (parent, component, quantity, optional, phantom) lines."""
+    return pd.DataFrame({
+        "bom_id": [f"BOM-{line[0]}" for line in lines],
+        "parent_item_number": [line[0] for line in lines],
+        "component_item_number": [line[1] for line in lines],
+        "quantity": [float(line[2]) for line in lines],
+        "sequence_number": range(len(lines)),
+        "effective_date": pd.NaT,
+        "expiration_date": pd.NaT,
+        "is_active": True,
+        "is_optional": [line[3] for line in lines],
+        "is_phantom": [line[4] for line in lines],
+        "scrap_factor": 0.0,
+        "yield_factor": 1.0,
+        "lead_time_days": None,
+    })
+
+
+@pytest.fixture
+def product():
+    details = bom(
+        ("TOP", "KIT", 2, False, True),
+        ("KIT", "A", 3, False, False),
+        ("KIT", "SUBKIT", 2, False, True),
+        ("SUBKIT", "B", 5, False, False),
+        ("TOP", "C", 1, False, False),
+        ("TOP", "OPT1", 1, True, False),
+        ("OPT1", "D", 2, False, False),
+        ("OPT1", "OPT2", 1, True, False),
+    )
+    costs = {"TOP": 0, "KIT": 0, "SUBKIT": 0, "A": 1, "B": 2, "C": 10, "OPT1": 0, "D": 4, "OPT2": 100}
+    item_master = pd.DataFrame({
+        "item_number": list(costs), "unit_cost": list(costs.values()), "lead_time_days": 0,
+        "item_description": list(costs), "item_type": "PART",
+    })
+    return ConfigurationEngine(BomGraph(details), details, item_master)
+
+
+def test_phantom_quantities_multiply_through_every_level(product):
+    rows = {r["component_item_number"]: r for r in product.collapsed_bom("TOP")}
+    assert {k: r["quantity"] for k, r in rows.items()} == {"A": 6.0, "B": 20.0, "C": 1.0, "OPT1": 1.0}
+    assert (rows["B"]["via_phantom"], rows["B"]["phantom_levels"]) == ("KIT", 2)
+    assert rows["C"]["via_phantom"] is None and rows["OPT1"]["is_optional"]
+
+
+def test_nested_options_enumerate_base_first(product):
+    assert product.count_configurations("TOP") == 3  # without OPT1, OPT1 alone, OPT1 with OPT2
+    rows = list(product.configurations("TOP"))
+    assert [(r["selected_options"], r["rolled_cost"]) for r in rows] == [
+        ("", 56.0), ("TOP > OPT1", 64.0), ("TOP > OPT1, TOP > OPT1 > OPT2", 164.0),
+    ]
+    cheapest = product.configurations("TOP", limit=2, order_by="cost")
+    assert [r["rolled_cost"] for r in cheapest] == [56.0, 64.0]
+    assert {r["component_item_number"]: r["configurations_when_included"] for r in product.options("TOP")} == {
+        "OPT1": 2, "OPT2": 1}
+    with pytest.raises(ValueError):
+        list(product.configurations("TOP", order_by="weight"))
+
+
+def test_tools_report_bad_requests_as_errors():
+    assert tools.enumerate_configurations("ITEM-001", order_by="weight")["status"] == "ERROR"
+    assert tools.phantom_flattened_bom("NOT-AN-ITEM")["status"] == "ERROR"
+    assert tools.configuration_options("ITEM-001")["status"] == "SUCCESS"
@@ -0,0 +1,115 @@
+import importlib
+from types import SimpleNamespace
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from bom_core import registry
+from bom_core.cursors import CursorStore, get_cursor_store, make_cursor_callback
+from bom_core.local_sql import get_local_warehouse
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("BOM_RESULT_SPILL_DIR", str(tmp_path))
+    registry.reset("bom_core.cursors.store")
+    yield get_cursor_store()
+    registry.reset("bom_core.cursors.store")
+
+
+def batches(n, batch_rows=40):
+    for start in range(0, n, batch_rows):
+        ids = list(range(start, min(n, start + batch_rows)))
+        yield pa.RecordBatch.from_pydict({
+            "level": [i % 4 for i in ids],
+            "item": [f"ITEM-{i:04d}" for i in ids],
+            "status": ["ACTIVE" if i % 3 else "OBSOLETE" for i in ids],
+        })
+
+
+def test_stats_are_collected_across_batches(tmp_path):
+    cursor = CursorStore(str(tmp_path)).open_batches(batches(130))
+    summary = cursor.summary(page_size=50)
+    assert (summary["row_count"], summary["pages"], len(summary["preview"])) == (130, 3, 10)
+    level, _, status = summary["columns"]
+    assert (level["min"], level["max"], level["mean"]) == (0, 3, round(sum(i % 4 for i in range(130)) / 130, 4))
+    assert status["top_values"] == [["ACTIVE", 86], ["OBSOLETE", 44]]
+
+
+def test_pages_span_spilled_batches_and_export_round_trips(tmp_path):
+    store = CursorStore(str(tmp_path))
+    cursor = store.open_batches(batches(130))
+
+    page = store.page(cursor.cursor_id, page=2, page_size=50)
+    assert [r["item"] for r in page["rows"]] == [f"ITEM-{i:04d}" for i in range(50, 100)]
+    assert page["has_more"]
+    assert len(store.page(cursor.cursor_id, page=3, page_size=50)["rows"]) == 30
+    with pytest.raises(ValueError):
+        store.page(cursor.cursor_id, page=4, page_size=50)
+
+    parquet = store.export(cursor.cursor_id, "parquet")
+    assert pq.read_table(parquet["path"]).equals(store.read_table(cursor.cursor_id))
+    csv = store.export(cursor.cursor_id, "csv")
+    assert len(pd.read_csv(csv["path"])) == 130
+
+
+def test_expired_and_evicted_cursors_are_dropped(tmp_path):
+    store = CursorStore(str(tmp_path), max_cursors=2)
+    first = store.open_rows([{"a": 1}])
+    store.open_rows([{"a": 2}])
+    store.open_rows([{"a": 3}])
+    with pytest.raises(KeyError):
+        store.get(first.cursor_id)
+    assert store.stats()["cursors"] == 2
+
+    expiring = CursorStore(str(tmp_path), ttl_seconds=0)
+    gone = expiring.open_rows([{"a": 1}])
+    with pytest.raises(KeyError):
+        expiring.get(gone.cursor_id)
+
+
+def test_open_query_streams_every_row_and_is_reused(store, monkeypatch):
+    monkeypatch.setenv("BQ_BACKEND", "local")
+    sql = "SELECT item_number, unit_cost FROM `demo.bom_demo.item_master` ORDER BY item_number"
+    cursor = store.open_query(sql)
+    assert cursor.row_count == get_local_warehouse().row_counts["item_master"]
+    assert store.open_query(sql) is cursor
+    with pytest.raises(ValueError, match="read-only"):
+        store.open_query("DROP TABLE item_master")
+
+
+def test_truncated_execute_sql_results_become_cursors(store, monkeypatch):
+    monkeypatch.setenv("BQ_BACKEND", "local")
+    sql = "SELECT item_number FROM `demo.bom_demo.item_master`"
+    after_tool = make_cursor_callback()
+    context = SimpleNamespace(state={})
+    tool = SimpleNamespace(name="execute_sql")
+
+    truncated = {"status": "SUCCESS", "rows": [{"item_number": "x"}] * 100, "result_is_likely_truncated": True}
+    compacted = after_tool(tool, {"query": sql}, context, truncated)
+    assert compacted["row_count"] == compacted["result_cursor"]["row_count"] == 500
+    assert len(compacted["rows"]) == 10 and "result_is_likely_truncated" not in compacted
+    assert context.state["result_cursor"]["cursor_id"] == compacted["result_cursor"]["cursor_id"]
+
+    small = {"status": "SUCCESS", "rows": [{"item_number": "x"}] * 3}
+    assert after_tool(tool, {"query": sql}, context, small) is None
+
+
+@pytest.mark.parametrize("module", ["bom_simple_agentic_demo.agent", "bom_agentic_demo_with_rag.agent"])
+def test_single_agents_spill_large_results(module, store, monkeypatch):
+    monkeypatch.setenv("BQ_BACKEND", "local")
+    monkeypatch.setenv("GCP_PROJECT_ID", "demo")
+    agent = importlib.import_module(module).get_agent()
+    tool = SimpleNamespace(name="explode_bom")
+    context = SimpleNamespace(state={})
+    response = {"status": "SUCCESS", "rows": [{"level": i} for i in range(40)]}
+
+    result = None
+    for callback in agent.after_tool_callback:
+        result = callback(tool, {}, context, response)
+        if result is not None:
+            break
+    assert result["result_cursor"]["row_count"] == 40
+    assert "result_cursor" in context.state
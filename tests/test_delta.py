@@ -0,0 +1,213 @@
+import io
+from types import SimpleNamespace
+
+import duckdb
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from google.cloud import bigquery
+
+from bom_core.dataset import coerce_to_schema, load_table
+from bom_core.delta import (
+    CHANGE_COLUMN,
+    BigQueryTarget,
+    DeltaState,
+    SqliteTarget,
+    compute_delta,
+    extract_snapshot,
+    load_delta,
+    merge_sql,
+    record_full_load,
+    stage_frame,
+)
+from bom_core.loading import default_sources
+from bom_core.schema import get_table
+from bom_core.synthetic import GeneratorConfig, generate_dataset
+
+TABLE = "item_master"
+
+
+@pytest.fixture
+def extract(tmp_path):
+    """First 30 rows of the item master, rewritten in place by the tests."""
+    raw = pd.read_csv(default_sources()[TABLE], dtype=str, keep_default_na=False, nrows=30)
+    path = tmp_path / "item_master.csv"
+    raw.to_csv(path, index=False)
+    return str(path), raw
+
+
+@pytest.fixture
+def state(tmp_path):
+    return DeltaState(str(tmp_path / "state"))
+
+
+def target_rows(target):
+    return target.read_frames([TABLE])[TABLE].reset_index(drop=True)
+
+
+def extract_rows(path):
+    return load_table(TABLE, path).sort_values("item_number").reset_index(drop=True)
+
+
+def test_initial_load_then_noop(extract, state):
+    path, _ = extract
+    target = SqliteTarget()
+
+    first = load_delta(TABLE, path, target, state, chunk_rows=8)
+    assert (first["inserted"], first["updated"], first["deleted"]) == (30, 0, 0)
+    pd.testing.assert_frame_equal(target_rows(target), extract_rows(path), check_dtype=False)
+
+    second = load_delta(TABLE, path, target, state, chunk_rows=8)
+    assert (second["inserted"], second["updated"], second["deleted"], second["unchanged"]) == (0, 0, 0, 30)
+    assert second["watermark"] == first["watermark"]
+
+
+def test_insert_update_delete(extract, state):
+    path, raw = extract
+    target = SqliteTarget()
+    load_delta(TABLE, path, target, state)
+
+    changed = raw.copy()
+    changed.loc[2, "unit_cost"] = "999.99"
+    dropped = changed.loc[5, "item_number"]
+    changed = changed.drop(index=5)
+    added = changed.iloc[[0]].assign(item_number="ITEM-99999", last_modified_date="2031-06-30")
+    pd.concat([changed, added]).to_csv(path, index=False)
+
+    summary = load_delta(TABLE, path, target, state)
+    assert (summary["inserted"], summary["updated"], summary["deleted"], summary["unchanged"]) == (1, 1, 1, 28)
+    # The edited row kept its last_modified_date, so the watermark did not see it
+    assert summary["late_updates"] == 1
+    assert summary["watermark"] == "2031-06-30"
+
+    merged = target_rows(target)
+    pd.testing.assert_frame_equal(merged, extract_rows(path), check_dtype=False)
+    assert dropped not in set(merged["item_number"])
+
+
+def test_partial_extract_keeps_missing_rows(extract, state):
+    path, raw = extract
+    target = SqliteTarget()
+    load_delta(TABLE, path, target, state)
+
+    recent = raw.iloc[:3].copy()
+    recent.loc[0, "unit_cost"] = "1.00"
+    recent.to_csv(path, index=False)
+
+    summary = load_delta(TABLE, path, target, state, full_extract=False)
+    assert (summary["updated"], summary["deleted"], summary["unchanged"]) == (1, 0, 2)
+    merged = target_rows(target)
+    assert len(merged) == 30
+    assert float(merged.loc[merged["item_number"] == raw.loc[0, "item_number"], "unit_cost"].iloc[0]) == 1.0
+    assert len(state.load(TABLE).hashes) == 30
+
+
+def test_full_load_resets_and_clear_forgets_the_snapshot(extract, state):
+    path, _ = extract
+    snapshot = record_full_load(TABLE, path, state)
+    assert len(snapshot.hashes) == 30
+
+    # The target was filled by the full load, so the next delta is a no-op
+    summary = load_delta(TABLE, path, SqliteTarget(), state)
+    assert (summary["inserted"], summary["unchanged"]) == (0, 30)
+
+    state.clear([TABLE])
+    assert state.load(TABLE).hashes == {}
+    assert load_delta(TABLE, path, SqliteTarget(), state)["inserted"] == 30
+
+
+def edited(name):
+    """(old, new) frames of ``name``: one row changed, one dropped, one added."""
+    table = get_table(name)
+    old = coerce_to_schema(generate_dataset(GeneratorConfig(items=60, depth=2, seed=1))[name], table)
+    new = old.copy()
+    new.loc[3, "notes"] = "revised"
+    new = new.drop(index=7)
+    added = old.iloc[[0]].assign(**{table.natural_key[0]: "NEW-1"})
+    return old, pd.concat([new, added], ignore_index=True)
+
+
+def delta_between(name, old, new):
+    table = get_table(name)
+    return compute_delta([new], table, extract_snapshot([old], table))
+
+
+@pytest.mark.parametrize("name", ["item_master", "bom_details"])
+def test_merge_turns_the_target_into_the_new_extract(name):
+    table = get_table(name)
+    old, new = edited(name)
+    delta = delta_between(name, old, new)
+    assert (delta.inserted, delta.updated, delta.deleted) == (1, 1, 1)
+
+    con = duckdb.connect()
+    con.register("old", old)
+    con.execute("CREATE TABLE target AS SELECT * FROM old")
+    con.register("stage", stage_frame(delta, table))
+    # DuckDB spells BigQuery's MERGE `t` as MERGE INTO "t"
+    con.execute(merge_sql(table, "target", "stage").replace("`", '"').replace("MERGE ", "MERGE INTO ", 1))
+
+    key = list(table.natural_key)
+    merged = coerce_to_schema(con.execute("SELECT * FROM target").df(), table)
+    pd.testing.assert_frame_equal(merged.sort_values(key).reset_index(drop=True),
+                                  new.sort_values(key).reset_index(drop=True), check_dtype=False)
+
+
+def test_stage_frame_tags_upserts_and_key_only_deletes():
+    table = get_table("bom_details")
+    old, new = edited("bom_details")
+    stage = stage_frame(delta_between("bom_details", old, new), table)
+    assert list(stage.columns) == table.column_names + [CHANGE_COLUMN]
+    deletes = stage[stage[CHANGE_COLUMN] == "delete"]
+    assert len(deletes) == 1 and (stage[CHANGE_COLUMN] == "upsert").sum() == 2
+    key = list(table.natural_key)
+    assert deletes[key].iloc[0].tolist() == old.loc[7, key].tolist()
+    assert deletes.drop(columns=key + [CHANGE_COLUMN]).isna().all(axis=None)
+
+
+class BigQueryJobs:
+    """bigquery.Client stand-in: staging loads, MERGE queries and table deletes, in call order."""
+
+    def __init__(self, merge_error=None):
+        self.calls = []
+        self.merge_error = merge_error
+
+    def load_table_from_file(self, file_obj, destination, job_config=None, location=None):
+        self.calls.append(("load", destination, job_config, pq.read_table(io.BytesIO(file_obj.read()))))
+        return SimpleNamespace(result=lambda: None)
+
+    def query(self, sql, location=None):
+        self.calls.append(("query", sql, location))
+        if self.merge_error:
+            raise self.merge_error
+        return SimpleNamespace(result=lambda: None, num_dml_affected_rows=3)
+
+    def delete_table(self, table_id, not_found_ok=False):
+        self.calls.append(("delete", table_id, not_found_ok))
+
+
+def test_bigquery_target_stages_merges_and_drops_the_stage():
+    old, new = edited("item_master")
+    delta = delta_between("item_master", old, new)
+    client = BigQueryJobs()
+    summary = BigQueryTarget(client, "demo", "bom_demo", location="EU").apply(delta)
+
+    (load, stage_id, job_config, staged), query, delete = client.calls
+    assert (load, stage_id) == ("load", "demo.bom_demo.item_master__delta_stage")
+    assert job_config.write_disposition == bigquery.WriteDisposition.WRITE_TRUNCATE
+    assert job_config.create_disposition == bigquery.CreateDisposition.CREATE_IF_NEEDED
+    assert staged.column(CHANGE_COLUMN).to_pylist().count("delete") == 1 and staged.num_rows == 3
+    assert query == ("query", merge_sql(get_table("item_master"), "demo.bom_demo.item_master", stage_id), "EU")
+    assert delete == ("delete", stage_id, True)
+    assert summary["dml_affected_rows"] == 3 and summary["inserted"] == 1
+
+
+def test_bigquery_target_drops_the_stage_when_the_merge_fails():
+    old, new = edited("item_master")
+    client = BigQueryJobs(merge_error=RuntimeError("quota"))
+    with pytest.raises(RuntimeError):
+        BigQueryTarget(client, "demo", "bom_demo").apply(delta_between("item_master", old, new))
+    assert client.calls[-1][0] == "delete"
+
+    client = BigQueryJobs()
+    assert BigQueryTarget(client, "demo", "bom_demo").apply(delta_between("item_master", old, old))["unchanged"] == 60
+    assert client.calls == []
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bom_core import tools
+from bom_core.effectivity import EffectivityIndex
+from bom_core.graph import BomGraph
+from bom_core.synthetic import GeneratorConfig, generate_dataset
+
+
+@pytest.fixture(scope="module")
+def synthetic():
+    details = generate_dataset(GeneratorConfig(items=500, depth=4, alternate_rate=0.2, seed=3))["bom_details"]
+    graph = BomGraph(details)
+    # Frame columns in the graph's edge order
+    lines = details.iloc[graph.row_id].reset_index(drop=True)
+    return EffectivityIndex(graph), lines
+
+
+def in_effect(lines, day):
+    day = pd.Timestamp(day)
+    started = lines["effective_date"].isna() | (lines["effective_date"] <= day)
+    not_expired = lines["expiration_date"].isna() | (lines["expiration_date"] >= day)
+    return (started & not_expired).to_numpy()
+
+
+def test_as_of_masks_match_the_date_predicate(synthetic):
+    index, lines = synthetic
+    days = pd.concat([lines["effective_date"], lines["expiration_date"]]).dropna()
+    # Every boundary day, the days either side of it, and a few outside the data
+    probes = set(days.dt.strftime("%Y-%m-%d"))
+    probes |= {str((d + pd.Timedelta(days=k)).date()) for d in days[:50] for k in (-1, 1)}
+    probes |= {"1999-01-01", "2099-12-31"}
+    for day in sorted(probes):
+        np.testing.assert_array_equal(index.in_effect(day), in_effect(lines, day), err_msg=day)
+    assert index.in_effect("2099-12-31").sum() == lines["expiration_date"].isna().sum()
+
+
+def test_window_queries_match_interval_overlap(synthetic):
+    index, lines = synthetic
+    for first, last in [("2024-03-01", "2024-09-30"), ("2025-06-01", "2025-06-01"), ("2026-01-01", "2024-01-01")]:
+        lo, hi = sorted((pd.Timestamp(first), pd.Timestamp(last)))
+        overlaps = ((lines["effective_date"].isna() | (lines["effective_date"] <= hi))
+                    & (lines["expiration_date"].isna() | (lines["expiration_date"] >= lo))).to_numpy()
+        np.testing.assert_array_equal(index.in_effect_during(first, last), overlaps)
+
+        started, ended = index.changes_between(first, last)
+        took_effect = ((lines["effective_date"] > lo) & (lines["effective_date"] <= hi)).to_numpy()
+        expired = ((lines["expiration_date"] >= lo) & (lines["expiration_date"] < hi)).to_numpy()
+        assert sorted(started) == list(np.flatnonzero(took_effect))
+        assert sorted(ended) == list(np.flatnonzero(expired))
+
+
+def bom(*lines):
+    """bom_details from (parent, component, quantity, effective, expiration) lines."""
+    return pd.DataFrame({
+        "bom_id": [f"BOM-{line[0]}" for line in lines],
+        "parent_item_number": [line[0] for line in lines],
+        "component_item_number": [line[1] for line in lines],
+        "quantity": [line[2] for line in lines],
+        "sequence_number": range(len(lines)),
+        "effective_date": pd.to_datetime([line[3] for line in lines]),
+        "expiration_date": pd.to_datetime([line[4] for line in lines]),
+        "is_active": True,
+    })
+
+
+@pytest.fixture
+def engineering_change():
+    # On 2025-04-01 the SUB's bolts go from 4 to 6 and a washer replaces the spacer
+    return EffectivityIndex(BomGraph(bom(
+        ("TOP", "SUB", 1, None, None),
+        ("SUB", "BOLT", 4, "2024-01-01", "2025-03-31"),
+        ("SUB", "BOLT", 6, "2025-04-01", None),
+        ("SUB", "SPACER", 2, "2024-01-01", "2025-03-31"),
+        ("SUB", "WASHER", 2, "2025-04-01", None),
+        ("OTHER", "NUT", 1, "2025-04-01", None),
+    )))
+
+
+def test_point_in_time_explosion(engineering_change):
+    def parts(day):
+        return {(r["component_item_number"], r["extended_quantity"]) for r in engineering_change.explode("TOP", day)[0]}
+
+    assert parts("2025-03-31") == {("SUB", 1.0), ("BOLT", 4.0), ("SPACER", 2.0)}
+    assert parts("2025-04-01") == {("SUB", 1.0), ("BOLT", 6.0), ("WASHER", 2.0)}
+    assert parts("2023-12-31") == {("SUB", 1.0)}
+    assert [r["parent_item_number"] for r in engineering_change.where_used("WASHER", "2025-01-01")] == []
+
+
+def test_diff_between_two_dates(engineering_change):
+    changes = {(r["change"], r["component_item_number"]): (r["quantity_from"], r["quantity_to"])
+               for r in engineering_change.diff("TOP", "2025-01-01", "2025-06-01")}
+    assert changes == {
+        ("quantity_changed", "BOLT"): (4.0, 6.0),
+        ("removed", "SPACER"): (2.0, None),
+        ("added", "WASHER"): (None, 2.0),
+    }
+    # Changes elsewhere in the data do not touch TOP's structure
+    assert engineering_change.diff("TOP", "2025-06-01", "2026-01-01") == []
+    assert engineering_change.change_dates() == ["2024-01-01", "2025-03-31", "2025-04-01"]
+
+
+def test_changed_lines_scoped_to_an_item(engineering_change):
+    everything = engineering_change.changed_lines("2025-01-01", "2025-06-01")
+    scoped = engineering_change.changed_lines("2025-01-01", "2025-06-01", "TOP")
+    assert {r["component_item_number"] for r in everything} - {r["component_item_number"] for r in scoped} == {"NUT"}
+    assert [r["change"] for r in scoped] == ["expired", "expired", "took_effect", "took_effect"]
+
+
+def test_tools_report_bad_dates_as_errors():
+    result = tools.bom_changes("2025-13-01", "2025-12-31")
+    assert result["status"] == "ERROR"
+    assert "use YYYY-MM-DD" in result["error_details"]
+    assert tools.diff_bom("ITEM-001", "2024-01-01", "2025-01-01")["status"] == "SUCCESS"
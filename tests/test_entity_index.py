@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from bom_core import entity_index
+from bom_core.entity_index import CANONICAL_MIN_SCORE, EntityIndex
+
+
+def items(**descriptions):
+    return pd.DataFrame({"item_number": list(descriptions), "item_description": list(descriptions.values())})
+
+
+ITEMS = items(**{
+    "ITEM-001": "Electric Scooter Frame",
+    "ITEM-002": "Scooter Battery Pack 36V",
+    "ITEM-003": "Bicycle Wheel 26in",
+    "ITEM-004": "Electronics Assembly 3",
+    "ITEM-005": "Electronics Assembly 4",
+    "ITEM-006": "M4 Bolt",
+})
+BOM = pd.DataFrame({"parent_item_number": ["ITEM-001", "ITEM-002", "ITEM-004", "ITEM-005"],
+                    "component_item_number": ["ITEM-006"] * 4})
+
+
+@pytest.fixture
+def index():
+    return EntityIndex.build(ITEMS, BOM, version="v1")
+
+
+def test_misspellings_and_partial_words_still_match(index):
+    assert index.search("scoter frame")[0]["item_number"] == "ITEM-001"
+    assert index.search("batt")[0]["item_number"] == "ITEM-002"
+    assert index.search("bycicle weel")[0]["item_number"] == "ITEM-003"
+    assert index.search("   ") == []
+
+
+def test_exact_item_number_is_canonical(index):
+    resolved = index.resolve("item-005")
+    assert resolved["canonical_item_number"] == "ITEM-005"
+    assert resolved["candidate_parents"][0]["score"] == 1.0
+    assert index.search("ITEM-006")[0] == {"item_number": "ITEM-006", "name": "M4 Bolt", "score": 1.0, "is_parent": False}
+
+
+def test_close_candidates_need_clarification(index):
+    resolved = index.resolve("electronics assembly")
+    assert resolved["canonical_parent"] is None
+    assert resolved["needs_clarification"] is True
+    assert {c["item_number"] for c in resolved["candidate_parents"][:2]} == {"ITEM-004", "ITEM-005"}
+
+    clear = index.resolve("electronics assembly 3")
+    assert clear["canonical_item_number"] == "ITEM-004"
+    assert clear["candidate_parents"][0]["score"] >= CANONICAL_MIN_SCORE
+
+
+def test_parents_are_preferred(index):
+    # The bolt is a closer trigram match but has no BOM lines of its own
+    assert index.resolve("bolt")["candidate_parents"][0]["is_parent"] is True
+    assert index.search("bolt")[0]["item_number"] == "ITEM-006"
+
+
+def test_refresh_reindexes_only_what_changed(index):
+    changed = pd.concat([ITEMS[ITEMS["item_number"] != "ITEM-003"], items(**{"ITEM-007": "Carbon Road Frame"})])
+    changed.loc[changed["item_number"] == "ITEM-006", "item_description"] = "M5 Hex Bolt"
+
+    assert index.refresh(changed, version="v2") == {"upserted": 2, "removed": 1}
+    assert len(index) == 6
+    assert "ITEM-003" not in {r["item_number"] for r in index.search("bicycle wheel", limit=10)}
+    assert index.search("hex bolt")[0]["item_number"] == "ITEM-006"
+    assert index.search("carbon road")[0]["item_number"] == "ITEM-007"
+    # Matches a fresh build of the same table
+    fresh = EntityIndex.build(changed, BOM)
+    for query in ("frame", "bolt", "electronics assembly 4", "scooter"):
+        assert index.search(query, limit=5) == fresh.search(query, limit=5)
+
+
+def test_candidate_parents_tool_uses_the_demo_items(monkeypatch):
+    monkeypatch.setattr(entity_index, "_index", None)
+    result = entity_index.candidate_parents("ITEM-003")
+    assert result["status"] == "SUCCESS"
+    assert result["canonical_item_number"] == "ITEM-003"
+    assert "elapsed_ms" in result
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bom_core import tools
+from bom_core.exposure import ExposureIndex, first_set_bits, popcount
+from bom_core.graph import BomGraph
+from bom_core.synthetic import GeneratorConfig, generate_dataset
+
+
+@pytest.fixture(scope="module")
+def synthetic():
+    frames = generate_dataset(GeneratorConfig(items=500, depth=4, cycle_rate=0.02, seed=5))
+    graph = BomGraph(frames["bom_details"])
+    assert graph.find_cycles()  # closures must also hold through collapsed cycles
+    return ExposureIndex(graph, frames["item_master"]), frames["item_master"].set_index("item_number")
+
+
+def below(index, item):
+    """Items under ``item`` in the active structure, by plain traversal."""
+    return {str(index.graph.items[i]) for i in index.graph.descendants(item)}
+
+
+@pytest.mark.parametrize("conditions, match_all, matches", [
+    (["is_obsolete"], False, lambda im: im["is_obsolete"]),
+    (["status=OBSOLETE|INACTIVE"], False, lambda im: im["status"].isin(["OBSOLETE", "INACTIVE"])),
+    (["is_npi", "country_of_origin=China"], True, lambda im: im["is_npi"] & (im["country_of_origin"] == "China")),
+    (["not compliance_status=ROHS"], False, lambda im: im["compliance_status"] != "ROHS"),
+    (["non_compliant"], False, lambda im: ~im["compliance_status"].isin(["ROHS", "REACH"])),
+])
+def test_exposure_matches_a_traversal_of_every_assembly(synthetic, conditions, match_all, matches):
+    index, item_master = synthetic
+    matching = set(item_master.index[matches(item_master).to_numpy()])
+    rows = {r["item_number"]: r for r in index.exposed_assemblies(conditions, match_all, top_level_only=False)}
+
+    for rep in np.flatnonzero(index.row_of >= 0):
+        item = str(index.graph.items[rep])
+        parts = below(index, item)
+        exposed = parts & matching
+        if not exposed:
+            assert item not in rows
+            continue
+        assert (rows[item]["exposed_parts"], rows[item]["total_parts"]) == (len(exposed), len(parts)), item
+        assert set(rows[item]["sample_parts"].split(", ")) <= exposed
+    counts = [r["exposed_parts"] for r in rows.values()]
+    assert counts == sorted(counts, reverse=True)
+
+
+def test_audit_counts_every_named_check(synthetic):
+    index, item_master = synthetic
+    rows = index.audit(top_level_only=True)
+    assert len(rows) == len(index.top_level)
+    obsolete = set(item_master.index[item_master["is_obsolete"] | (item_master["status"] == "DISCONTINUED")])
+    npi = set(item_master.index[item_master["is_npi"]])
+    for row in rows[:25]:
+        parts = below(index, row["item_number"])
+        assert row["total_parts"] == len(parts)
+        assert row["obsolete_parts"] == len(parts & obsolete)
+        assert row["npi_parts"] == len(parts & npi)
+
+
+def test_certifications_are_matched_per_token():
+    graph = BomGraph(pd.DataFrame({
+        "bom_id": "BOM-1", "parent_item_number": ["TOP", "TOP", "TOP", "TOP"],
+        "component_item_number": ["A", "B", "C", "UNLISTED"], "quantity": 1.0, "sequence_number": range(4),
+        "effective_date": pd.NaT, "expiration_date": pd.NaT, "is_active": True,
+    }))
+    item_master = pd.DataFrame({
+        "item_number": ["TOP", "A", "B", "C"],
+        "item_description": ["Product", "Cell", "Cable", "Case"],
+        "compliance_status": [None, "CE, ROHS", "NON-ROHSX", "REACH/ROHS"],
+    })
+    index = ExposureIndex(graph, item_master)
+    parts = lambda *c: [r["component_item_number"] for r in index.exposed_parts("TOP", list(c))]  # noqa: E731
+    assert parts("compliance_status=ROHS") == ["A", "C"]
+    # Negation only covers items item_master knows about
+    assert parts("not compliance_status=ROHS") == ["B"]
+    assert parts("compliance_status!=ROHS", "compliance_status=REACH") == ["B", "C"]
+    assert parts("non_compliant") == ["B"]
+
+
+def test_bitmap_helpers():
+    words = np.array([0b1011, 0, 1 << 63], dtype=np.uint64)
+    assert popcount(words) == 4
+    assert first_set_bits(words, 10) == [0, 1, 3, 191]
+    assert first_set_bits(words, 2) == [0, 1]
+
+
+def test_tools_report_bad_conditions_as_errors():
+    result = tools.find_exposed_products(["colour=Red"])
+    assert result["status"] == "ERROR"
+    assert "Unknown condition 'colour'" in result["error_details"]
+    assert tools.find_exposed_products(["obsolete"])["status"] == "SUCCESS"
+    assert tools.exposure_audit()["status"] == "SUCCESS"
@@ -0,0 +1,117 @@
+from collections import Counter
+
+import duckdb
+import pandas as pd
+import pytest
+
+from bom_core import tools
+from bom_core.graph import BomCycleError, BomGraph
+from bom_core.synthetic import GeneratorConfig, generate_dataset
+
+# Pattern 3 (query_patterns_documentation.md) with the level guard as a parameter
+EXPLOSION_SQL = """
+WITH RECURSIVE bom_tree AS (
+  SELECT parent_item_number, component_item_number, quantity, 0 AS level
+  FROM bom_details WHERE parent_item_number = $top AND is_active
+  UNION ALL
+  SELECT bd.parent_item_number, bd.component_item_number, bd.quantity * bt.quantity, bt.level + 1
+  FROM bom_details bd JOIN bom_tree bt ON bd.parent_item_number = bt.component_item_number
+  WHERE bd.is_active AND bt.level < $max_levels - 1
+)
+SELECT level, parent_item_number, component_item_number, quantity FROM bom_tree
+"""
+
+WHERE_USED_SQL = """
+WITH RECURSIVE used AS (
+  SELECT bom_id, sequence_number, parent_item_number, component_item_number, 0 AS level
+  FROM bom_details WHERE component_item_number = $component AND is_active
+  UNION ALL
+  SELECT bd.bom_id, bd.sequence_number, bd.parent_item_number, bd.component_item_number, u.level + 1
+  FROM bom_details bd JOIN used u ON bd.component_item_number = u.parent_item_number
+  WHERE bd.is_active AND u.level < $max_levels - 1
+)
+SELECT bom_id, sequence_number, parent_item_number, component_item_number, MIN(level) AS level FROM used GROUP BY ALL
+"""
+
+
+def bom(*lines, inactive=()):
+    return pd.DataFrame({
+        "bom_id": [f"BOM-{p}" for p, _ in lines],
+        "parent_item_number": [p for p, _ in lines],
+        "component_item_number": [c for _, c in lines],
+        "quantity": [2.0] * len(lines),
+        "sequence_number": range(len(lines)),
+        "effective_date": pd.NaT,
+        "expiration_date": pd.NaT,
+        "is_active": [i not in inactive for i in range(len(lines))],
+    })
+
+
+@pytest.fixture(scope="module")
+def synthetic():
+    details = generate_dataset(GeneratorConfig(items=300, depth=4, cycle_rate=0.0, seed=7))["bom_details"]
+    con = duckdb.connect()
+    con.register("bom_details", details)
+    yield BomGraph(details), con, details
+    con.close()
+
+
+def test_explosion_matches_recursive_sql(synthetic):
+    graph, con, details = synthetic
+    tops = details.loc[~details["parent_item_number"].isin(details["component_item_number"]), "parent_item_number"]
+    for top in tops.unique()[:10]:
+        for max_levels in (2, 10):
+            rows, cycles = graph.explode(top, max_levels=max_levels)
+            expected = con.execute(EXPLOSION_SQL, {"top": top, "max_levels": max_levels}).fetchall()
+            assert cycles == []
+            assert Counter(
+                (r["level"], r["parent_item_number"], r["component_item_number"], round(r["extended_quantity"], 6))
+                for r in rows
+            ) == Counter((lvl, p, c, round(q, 6)) for lvl, p, c, q in expected)
+
+
+def test_where_used_matches_recursive_sql(synthetic):
+    graph, con, details = synthetic
+    # The most shared components have the widest where-used fan-in
+    for component in details["component_item_number"].value_counts().index[:10]:
+        for max_levels in (1, 10):
+            rows = graph.where_used(component, max_levels=max_levels)
+            expected = con.execute(WHERE_USED_SQL, {"component": component, "max_levels": max_levels}).fetchall()
+            # Each line is reported once, at its shortest distance from the component
+            got = [(r["bom_id"], r["sequence_number"], r["parent_item_number"], r["component_item_number"], r["level"]) for r in rows]
+            assert len(got) == len(set(got))
+            assert set(got) == set(expected)
+
+
+def test_inactive_lines_are_left_out():
+    graph = BomGraph(bom(("A", "B"), ("B", "C"), ("A", "D"), inactive=(2,)))
+    rows, _ = graph.explode("A")
+    assert [(r["component_item_number"], r["level"], r["extended_quantity"]) for r in rows] == [("B", 0, 2.0), ("C", 1, 4.0)]
+    assert graph.where_used("D") == []
+    assert len(graph.where_used("D", edge_mask=graph.edge_filter(active_only=False))) == 1
+    assert graph.flatten("A") == {"B": 2.0, "C": 4.0}
+
+
+def test_shared_parts_are_flattened_over_every_path():
+    graph = BomGraph(bom(("A", "B"), ("A", "C"), ("B", "C"), ("C", "D")))
+    assert graph.flatten("A") == {"B": 2.0, "C": 6.0, "D": 12.0}
+    assert [str(graph.items[i]) for i in graph.ancestors("D")] == ["A", "B", "C"]
+    top_rows = [r for r in graph.where_used("D") if r["is_top_level"]]
+    assert {r["parent_item_number"] for r in top_rows} == {"A"}
+
+
+def test_cycles_are_reported_not_followed():
+    graph = BomGraph(bom(("A", "B"), ("B", "C"), ("C", "A"), ("C", "D")))
+    rows, cycles = graph.explode("A")
+    assert cycles == [["A", "B", "C", "A"]]
+    assert len(rows) == 4  # B, C, then A and D under C; A is not expanded again
+    assert [sorted(c) for c in graph.find_cycles()] == [["A", "B", "C"]]
+    with pytest.raises(BomCycleError, match="BOM cycle detected"):
+        graph.flatten("A")
+
+
+def test_graph_tools_report_unknown_items_as_errors():
+    result = tools.explode_bom("ITEM-DOES-NOT-EXIST")
+    assert result["status"] == "ERROR"
+    assert "does not appear in bom_details" in result["error_details"]
+    assert tools.detect_bom_cycles()["status"] == "SUCCESS"
@@ -0,0 +1,162 @@
+import importlib.util
+import os
+
+from google.api_core.exceptions import InvalidArgument, NotFound, ResourceExhausted
+from google.cloud import discoveryengine_v1beta as discoveryengine
+
+from bom_core.chunking import chunk_markdown
+from bom_core.config import REPO_ROOT
+
+_PATH = os.path.join(REPO_ROOT, "data", "index_schema_to_vertex.py")
+_spec = importlib.util.spec_from_file_location("index_schema_to_vertex", _PATH)
+indexer = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(indexer)
+
+DATA_STORE = "projects/demo/locations/global/collections/default_collection/dataStores/bom-schema-store"
+BRANCH = f"{DATA_STORE}/branches/default_branch"
+
+
+class Branch:
+    """DocumentServiceClient over one in-memory branch; keeps every request it was sent.
+
+    ``errors`` maps a method name to exceptions raised by its next calls.
+    """
+
+    def __init__(self, **errors):
+        self.documents = {}
+        self.requests = []
+        self.errors = {name: list(raised) for name, raised in errors.items()}
+
+    def _call(self, method, request):
+        self.requests.append(request)
+        if self.errors.get(method):
+            raise self.errors[method].pop(0)
+
+    def list_documents(self, request):
+        assert isinstance(request, discoveryengine.ListDocumentsRequest) and request.parent == BRANCH
+        return list(self.documents.values())
+
+    def create_document(self, request):
+        self._call("create_document", request)
+        self.documents[request.document_id] = request.document
+
+    def update_document(self, request):
+        self._call("update_document", request)
+        self.documents[request.document.id] = request.document
+
+    def delete_document(self, name):
+        self._call("delete_document", name)
+        doc_id = name.rsplit("/", 1)[-1]
+        if doc_id not in self.documents:
+            raise NotFound(name)
+        del self.documents[doc_id]
+
+    def import_documents(self, request):
+        self._call("import_documents", request)
+        branch = self
+
+        class Operation:
+            def result(self, timeout=None):
+                for doc in request.inline_source.documents:
+                    branch.documents[doc.id] = doc
+
+        return Operation()
+
+    def sent(self, kind):
+        return [r for r in self.requests if isinstance(r, kind)]
+
+
+def schema_chunks():
+    with open(os.path.join(REPO_ROOT, "data", "field_mapping_documentation.md"), encoding="utf-8") as f:
+        return chunk_markdown(f.read())
+
+
+def chunks(*contents):
+    return [{"id": f"doc_{i}", "content": text, "struct_data": {"section": f"s{i}"}} for i, text in enumerate(contents)]
+
+
+def test_documents_are_created_with_their_content_hash_then_skipped():
+    docs = schema_chunks()
+    branch = Branch()
+    first = indexer.upsert_documents(DATA_STORE, docs, client=branch, sleep=None)
+    assert sorted(first["created"]) == sorted(c["id"] for c in docs)
+
+    requests = {r.document_id: r for r in branch.sent(discoveryengine.CreateDocumentRequest)}
+    for chunk in docs:
+        request = requests[chunk["id"]]
+        assert request.parent == BRANCH
+        assert request.document.name == f"{BRANCH}/documents/{chunk['id']}"
+        assert request.document.content.mime_type == "text/plain"
+        assert request.document.content.raw_bytes.decode("utf-8") == chunk["content"]
+        stored = dict(request.document.struct_data)
+        assert stored.pop("content_hash") == indexer.content_hash(chunk)
+        assert stored.keys() == chunk["struct_data"].keys()
+
+    branch.requests.clear()
+    second = indexer.upsert_documents(DATA_STORE, schema_chunks(), client=branch, sleep=None)
+    assert sorted(second["unchanged"]) == sorted(c["id"] for c in docs)
+    assert branch.requests == []
+
+
+def test_content_hash_covers_content_and_metadata_only():
+    chunk = {"id": "a", "content": "text", "struct_data": {"section": "s", "path": ["x", "y"]}}
+    same = {"id": "b", "content": "text", "struct_data": {"path": ["x", "y"], "section": "s"}}
+    assert indexer.content_hash(chunk) == indexer.content_hash(same)
+    assert indexer.content_hash(chunk) != indexer.content_hash({**chunk, "struct_data": {"section": "t"}})
+
+
+def test_changed_chunks_are_updated_in_place():
+    branch = Branch()
+    indexer.upsert_documents(DATA_STORE, chunks("a", "b"), client=branch)
+    branch.requests.clear()
+
+    summary = indexer.upsert_documents(DATA_STORE, chunks("a", "b (edited)", "new"), client=branch)
+    assert (summary["updated"], summary["created"], summary["unchanged"]) == (["doc_1"], ["doc_2"], ["doc_0"])
+    (update,) = branch.sent(discoveryengine.UpdateDocumentRequest)
+    assert update.allow_missing and update.document.id == "doc_1"
+    assert [r.document_id for r in branch.sent(discoveryengine.CreateDocumentRequest)] == ["doc_2"]
+
+
+def test_import_mode_batches_incremental_requests():
+    branch = Branch(import_documents=[InvalidArgument("bad document")])
+    many = [{"id": f"doc_{i}", "content": f"section {i}"} for i in range(2 * indexer.IMPORT_BATCH_SIZE + 50)]
+    summary = indexer.upsert_documents(DATA_STORE, many, client=branch, mode="import")
+
+    imports = branch.sent(discoveryengine.ImportDocumentsRequest)
+    assert [len(r.inline_source.documents) for r in imports] == [100, 100, 50]
+    assert all(r.parent == BRANCH for r in imports)
+    assert {r.reconciliation_mode for r in imports} == {
+        discoveryengine.ImportDocumentsRequest.ReconciliationMode.INCREMENTAL}
+    # A rejected batch fails as a whole; the others still land
+    assert summary["failed"] == [f"doc_{i}" for i in range(100)]
+    assert len(summary["created"]) == 150 and len(branch.documents) == 150
+
+
+def test_stale_documents_are_pruned_only_on_request():
+    branch = Branch()
+    indexer.upsert_documents(DATA_STORE, chunks("a", "b", "c"), client=branch)
+
+    kept = indexer.upsert_documents(DATA_STORE, chunks("a"), client=branch)
+    assert (kept["stale"], kept["deleted"]) == (["doc_1", "doc_2"], [])
+    assert set(branch.documents) == {"doc_0", "doc_1", "doc_2"}
+
+    branch.errors["delete_document"] = [NotFound("already gone")]  # deleted by someone else meanwhile
+    pruned = indexer.upsert_documents(DATA_STORE, chunks("a"), client=branch, prune=True)
+    assert pruned["deleted"] == ["doc_1", "doc_2"] and pruned["failed"] == []
+    assert branch.requests[-2:] == [f"{BRANCH}/documents/doc_1", f"{BRANCH}/documents/doc_2"]
+    assert set(branch.documents) == {"doc_0", "doc_1"}  # doc_1's delete raised NotFound
+
+
+def test_only_quota_and_transient_errors_are_retried():
+    sleeps = []
+    branch = Branch(create_document=[ResourceExhausted("quota"), ResourceExhausted("quota")])
+    summary = indexer.upsert_documents(DATA_STORE, chunks("a"), client=branch, sleep=sleeps.append)
+    assert (summary["created"], summary["failed"], len(sleeps)) == (["doc_0"], [], 2)
+    assert 0.25 <= sleeps[0] <= 0.75 and 0.5 <= sleeps[1] <= 1.5  # 0.5s doubling, ±50% jitter
+
+    sleeps.clear()
+    branch = Branch(create_document=[InvalidArgument("bad")] + [ResourceExhausted("quota")] * 10)
+    summary = indexer.upsert_documents(DATA_STORE, chunks("a", "b"), client=branch, max_workers=1,
+                                       max_retries=2, sleep=sleeps.append)
+    assert sorted(summary["failed"]) == ["doc_0", "doc_1"]
+    assert len(sleeps) == 2  # the InvalidArgument was not retried; the quota errors ran out of retries
@@ -0,0 +1,131 @@
+import io
+import os
+from types import SimpleNamespace
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from google.cloud import bigquery
+
+from bom_core.dataset import load_table
+from bom_core.loading import (
+    BigQuerySink,
+    CsvValidationError,
+    LocalSink,
+    arrow_schema,
+    default_sources,
+    load_one,
+    load_tables,
+)
+from bom_core.schema import get_table
+
+
+@pytest.fixture
+def extracts(tmp_path):
+    """The first 25 rows of each standard extract, as {table_name: csv_path}."""
+    sources = {}
+    for name, path in default_sources().items():
+        out = tmp_path / os.path.basename(path)
+        pd.read_csv(path, dtype=str, keep_default_na=False, nrows=25).to_csv(out, index=False)
+        sources[name] = str(out)
+    return sources
+
+
+def comparable(frame, table_name):
+    # Parquet NUMERIC comes back as Decimal; compare as floats
+    table = get_table(table_name)
+    return frame.astype({c: float for c, t in table.columns if t == "NUMERIC"})
+
+
+def read_back(path, table_name):
+    return comparable(pq.read_table(path).to_pandas(date_as_object=False), table_name)
+
+
+def test_local_sink_round_trip(extracts, tmp_path):
+    sink = LocalSink(str(tmp_path / "out"))
+    reports = load_tables(extracts, sink, chunk_rows=7, max_workers=2)
+
+    assert {r.table for r in reports} == set(extracts)
+    for report in reports:
+        assert report.rows == report.loaded_rows == 25
+        assert report.chunks == 4
+        assert report.rejected_rows == 0
+        got = read_back(sink.path(report.table), report.table)
+        assert list(got.columns) == get_table(report.table).column_names
+        pd.testing.assert_frame_equal(got, comparable(load_table(report.table, extracts[report.table]), report.table), check_dtype=False)
+
+
+def test_invalid_values_raise_or_are_skipped(extracts, tmp_path):
+    csv_path = extracts["item_master"]
+    raw = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    raw.loc[3, "weight"] = "heavy"
+    raw.to_csv(csv_path, index=False)
+    sink = LocalSink(str(tmp_path / "out"))
+
+    with pytest.raises(CsvValidationError, match="line 5: weight='heavy'"):
+        load_one("item_master", csv_path, sink, chunk_rows=10)
+
+    report = load_one("item_master", csv_path, sink, chunk_rows=10, on_error="skip")
+    assert (report.rows, report.rejected_rows, report.loaded_rows) == (24, 1, 24)
+    got = read_back(sink.path("item_master"), "item_master")
+    assert raw.loc[3, "item_number"] not in set(got["item_number"])
+
+
+def test_header_mismatch_is_rejected(extracts, tmp_path):
+    csv_path = extracts["bom_details"]
+    raw = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    raw.drop(columns=[raw.columns[-1]]).to_csv(csv_path, index=False)
+
+    with pytest.raises(CsvValidationError, match="missing columns"):
+        load_one("bom_details", csv_path, LocalSink(str(tmp_path / "out")), on_error="skip")
+
+
+class LoadJobs:
+    """bigquery.Client.load_table_from_file: keeps each job's config and the uploaded Parquet."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def load_table_from_file(self, file_obj, destination, job_config=None, location=None):
+        table = pq.read_table(io.BytesIO(file_obj.read()))
+        self.jobs.append(SimpleNamespace(destination=destination, job_config=job_config, location=location,
+                                         table=table))
+        return SimpleNamespace(result=lambda: None, output_rows=table.num_rows)
+
+
+def test_bigquery_sink_loads_typed_parquet_into_the_existing_table(extracts, tmp_path):
+    client = LoadJobs()
+    sink = BigQuerySink(client, "demo", "bom_demo", location="EU")
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    report = load_one("bom_details", extracts["bom_details"], sink, chunk_rows=10, work_dir=str(work_dir))
+
+    (job,) = client.jobs
+    assert (job.destination, job.location) == ("demo.bom_demo.bom_details", "EU")
+    assert job.job_config.source_format == bigquery.SourceFormat.PARQUET
+    assert job.job_config.write_disposition == "WRITE_TRUNCATE"
+    assert job.job_config.create_disposition == bigquery.CreateDisposition.CREATE_NEVER
+    assert job.table.schema.equals(arrow_schema(get_table("bom_details")))
+    assert report.loaded_rows == job.table.num_rows == 25
+    assert os.listdir(work_dir) == []  # the staged Parquet file is removed
+
+
+def test_reports_time_every_stage(extracts, tmp_path):
+    report = load_one("item_master", extracts["item_master"], LocalSink(str(tmp_path / "out")), chunk_rows=10)
+    stages = {k: v for k, v in report.timings.items() if k != "total"}
+    assert set(stages) == {"read", "validate", "convert", "write", "load"}
+    assert all(v >= 0 for v in stages.values())
+    assert sum(stages.values()) <= report.timings["total"]
+    assert report.parquet_bytes > 0
+
+
+def test_one_failing_table_does_not_stop_the_others(extracts, tmp_path):
+    raw = pd.read_csv(extracts["item_master"], dtype=str, keep_default_na=False)
+    raw.loc[0, "weight"] = "heavy"
+    raw.to_csv(extracts["item_master"], index=False)
+    sink = LocalSink(str(tmp_path / "out"))
+
+    with pytest.raises(CsvValidationError, match="item_master"):
+        load_tables(extracts, sink, max_workers=1)
+    assert os.path.exists(sink.path("bom_details"))
+    assert not os.path.exists(sink.path("item_master"))
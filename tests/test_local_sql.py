@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from bom_core import local_sql
+from bom_core.local_sql import LocalWarehouse, SqlTranslationError, translate_sql
+from bom_core.tools import get_dataset
+
+
+@pytest.fixture(scope="module")
+def warehouse():
+    return LocalWarehouse(get_dataset())
+
+
+@pytest.mark.parametrize(
+    "bigquery, duckdb_sql",
+    [
+        ("SELECT * FROM `proj.bom_demo.item_master` t", 'SELECT * FROM "item_master" t'),
+        ("SELECT * FROM `proj`.`bom_demo`.`item_master`", 'SELECT * FROM "item_master"'),
+        ("SELECT * FROM proj.bom_demo.bom_details", 'SELECT * FROM "bom_details"'),
+        ("SELECT 1 FROM x WHERE a = @item AND b IN UNNEST(@list)",
+         "SELECT 1 FROM x WHERE a = $item AND b IN (SELECT UNNEST($list))"),
+        ("SELECT REGEXP_CONTAINS(s, r'^A\\d+')", "SELECT regexp_matches(s, '^A\\d+')"),
+        ('SELECT "it\'s", SAFE_CAST(x AS FLOAT64)', "SELECT 'it''s', TRY_CAST(x AS DOUBLE)"),
+        ("SELECT STRING_AGG(c, ', ' ORDER BY c LIMIT 3)",
+         "SELECT array_to_string(list_slice(list(c ORDER BY c), 1, 3), ', ')"),
+        ("SELECT DATE_DIFF(end_d, start_d, DAY)", "SELECT date_diff('day', start_d, end_d)"),
+        ("SELECT DATE_SUB(CURRENT_DATE(), INTERVAL 30 DAY)",
+         "SELECT CAST((CURRENT_DATE()) - INTERVAL 30 DAY AS DATE)"),
+        ("SELECT DATE_ADD(d, INTERVAL 1 MONTH)", "SELECT CAST((d) + INTERVAL 1 MONTH AS DATE)"),
+        ("SELECT DATE_TRUNC(d, MONTH)", "SELECT CAST(date_trunc('month', d) AS DATE)"),
+        ("SELECT FORMAT_DATE('%Y-%m', d)", "SELECT strftime(d, '%Y-%m')"),
+        ("SELECT 1 -- trailing @not_a_param\n;", "SELECT 1"),
+    ],
+)
+def test_translate_sql(bigquery, duckdb_sql):
+    assert translate_sql(bigquery)[0] == duckdb_sql
+
+
+def test_translate_reports_params_and_tables():
+    _, params, tables = translate_sql(
+        "SELECT * FROM `p.bom_demo.bom_details` b JOIN `p.bom_demo.item_master` i "
+        "ON i.item_number = b.component_item_number WHERE b.parent_item_number = @parent_id AND '@x' = '@x'"
+    )
+    assert params == ["parent_id"]
+    assert tables == ["bom_details", "item_master"]
+
+
+@pytest.mark.parametrize("sql", ["SELECT DATE_TRUNC(d, WEEK)", "SELECT DATE_SUB(d, 30)", "SELECT DATE_DIFF(a, b)"])
+def test_untranslatable_sql_raises(sql):
+    with pytest.raises(SqlTranslationError):
+        translate_sql(sql)
+
+
+def test_translated_date_functions_match_pandas(warehouse):
+    sql = (
+        "SELECT FORMAT_DATE('%Y-%m', created_date) AS month, COUNT(*) AS n FROM `p.bom_demo.item_master` "
+        "WHERE created_date >= DATE_SUB(DATE '2025-09-30', INTERVAL 90 DAY) GROUP BY 1 ORDER BY 1"
+    )
+    got = {r["month"]: r["n"] for r in warehouse.execute(sql)["rows"]}
+    items = get_dataset()["item_master"]
+    recent = items[items["created_date"] >= pd.Timestamp("2025-07-02")]
+    assert got == recent.groupby(recent["created_date"].dt.strftime("%Y-%m")).size().to_dict()
+
+
+def test_hybrid_sends_sql_the_mirror_cannot_bind_to_bigquery(warehouse, monkeypatch):
+    sent = []
+    monkeypatch.setenv("BQ_BACKEND", "hybrid")
+    monkeypatch.setattr(local_sql, "get_local_warehouse", lambda: warehouse)
+    monkeypatch.setattr(local_sql, "guard_statement", lambda sql, params=None: (sql, None))
+    monkeypatch.setattr(local_sql, "run_sql", lambda sql, *a, **kw: sent.append(sql) or {"status": "SUCCESS", "rows": []})
+
+    ok = local_sql.execute_sql("demo", "SELECT COUNT(*) AS n FROM `p.bom_demo.item_master`")
+    assert ok["backend"] == "local" and ok["rows"] == [{"n": 500}]
+
+    query = "SELECT APPROX_QUANTILES(unit_cost, 4) AS q FROM `p.bom_demo.item_master`"
+    assert local_sql.execute_sql("demo", query) == {"status": "SUCCESS", "rows": []}
+    assert sent == [query]
+
+    # BQ_BACKEND=local has nowhere to send it
+    monkeypatch.setenv("BQ_BACKEND", "local")
+    error = local_sql.execute_sql("demo", query)
+    assert error["status"] == "ERROR" and "approx_quantiles" in error["error_details"].lower()
+    assert sent == [query]
+
+
+def test_mirror_refuses_writes(warehouse):
+    result = warehouse.execute("DELETE FROM `p.bom_demo.item_master` WHERE true")
+    assert result["status"] == "ERROR" and "read-only" in result["error_details"]
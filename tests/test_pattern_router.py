@@ -0,0 +1,80 @@
+import pytest
+
+from bom_core.pattern_router import extract_literals, get_pattern_router
+
+
+@pytest.fixture(scope="module")
+def router():
+    return get_pattern_router()
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        # Filters the validated SQL has no parameter for
+        "Show obsolete parts in ITEM-057",
+        "What is the supply chain risk for supplier SUP003?",
+        "make vs buy analysis for ITEM-057",
+        "Show obsolete parts in BOM-023",
+        'Which suppliers in "Germany" provide the most components?',
+        # More items than item parameters
+        "Which products use component ITEM-148 and ITEM-467?",
+    ],
+)
+def test_unconsumed_values_skip_the_fast_path(router, question):
+    assert router.route(question) is None
+
+
+@pytest.mark.parametrize(
+    "question",
+    [
+        # Negation: the validated SQL answers the opposite question
+        "Which products do not use component ITEM-148?",
+        "Which products don't use component ITEM-148?",
+        "Which products use component ITEM-148 except EB-001?",
+        # Category / currency filters the SQL has no parameter for
+        "What obsolete parts are in active BOMs for the Electronics category?",
+        "total cost for ITEM-057 in EUR",
+    ],
+)
+def test_changed_meaning_skips_the_fast_path(router, question):
+    best = router.score(question)[0][1]
+    assert router.negations(best, question) or router.uncovered_terms(best, question)
+    assert router.route(question) is None
+
+
+def test_negation_in_the_pattern_itself_still_routes(router):
+    match = router.route("Find items without REACH compliance")
+    assert match is not None and match.pattern.pattern_id == "PATTERN_10"
+
+
+@pytest.mark.parametrize(
+    "question, pattern_id, params",
+    [
+        ("Which products use component ITEM-148?", "WHERE_USED_001", {"component_id": "ITEM-148"}),
+        ("What's the total material cost for product EB-001?", "PATTERN_4", {"parent_id": "EB-001"}),
+        ("Are there obsolete parts still in active BOMs?", "PATTERN_6", {}),
+        ("Which suppliers provide the most components?", "PATTERN_7", {}),
+        ("total cost for ITEM-057", "PATTERN_4", {"parent_id": "ITEM-057"}),
+    ],
+)
+def test_bindable_questions_route(router, question, pattern_id, params):
+    match = router.route(question)
+    assert match is not None
+    assert match.pattern.pattern_id == pattern_id
+    assert match.params == params
+
+
+def test_every_documented_example_binds_or_falls_through(router):
+    for pattern in router.patterns:
+        for example in pattern.examples:
+            match = router.route(example)
+            if match is not None:
+                assert set(match.params) == set(match.pattern.parameters)
+
+
+def test_extract_literals():
+    assert extract_literals("risk for SUP003 and 'Acme Corp' over 30 days in BOM-023") == [
+        "BOM-023", "SUP003", "'Acme Corp'", "30",
+    ]
+    assert extract_literals("What's the total cost for product ITEM-057?") == []
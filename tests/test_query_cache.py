@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+from bom_core.query_cache import (
+    QueryResultCache,
+    bump_dataset_version,
+    canonicalize_sql,
+    dataset_version,
+    make_cache_callbacks,
+)
+
+ROWS = {"status": "SUCCESS", "rows": [{"item_number": "ITEM-001", "unit_cost": 12.5}]}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_formatting_differences_share_a_key():
+    a = "SELECT item_number\n  FROM `p.d.item_master`  -- active only\nWHERE status = 'Active';"
+    b = "select ITEM_NUMBER from `p.d.item_master` where status='Active'"
+    assert canonicalize_sql(a) == canonicalize_sql(b)
+    # Literals and backtick identifiers keep their case
+    assert canonicalize_sql(b) != canonicalize_sql(b.replace("'Active'", "'ACTIVE'"))
+    assert canonicalize_sql("SELECT '--x' AS a") == "select '--x' as a"
+
+
+def test_entries_expire_after_the_ttl():
+    clock = Clock()
+    cache = QueryResultCache(ttl_seconds=60, version_fn=lambda: "v1", clock=clock)
+    cache.put("SELECT 1", {}, ROWS)
+    clock.now = 59.9
+    assert cache.get("select 1") == ROWS
+    clock.now = 60.0
+    assert cache.get("select 1") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.bytes_used == 0
+
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    one_entry = len(b'{"status": "SUCCESS", "rows": [0]}')
+    cache = QueryResultCache(max_bytes=2 * one_entry, version_fn=lambda: "v1")
+    for i in range(2):
+        cache.put(f"SELECT {i}", {}, {"status": "SUCCESS", "rows": [i]})
+    cache.get("SELECT 0")  # 0 is now the most recent
+    cache.put("SELECT 2", {}, {"status": "SUCCESS", "rows": [2]})
+
+    assert cache.get("SELECT 1") is None
+    assert cache.get("SELECT 0")["rows"] == [0]
+    assert cache.stats()["evictions"] == 1
+    assert cache.put("SELECT 3", {}, {"status": "SUCCESS", "rows": list(range(100))}) is False
+
+
+def test_a_new_dataset_version_drops_every_entry():
+    version = ["v1"]
+    cache = QueryResultCache(version_fn=lambda: version[0])
+    cache.put("SELECT 1", {"max_rows": 10}, ROWS)
+    assert cache.get("SELECT 1", {"max_rows": 10}) == ROWS
+    assert cache.get("SELECT 1", {"max_rows": 20}) is None
+
+    version[0] = "v2"
+    assert cache.get("SELECT 1", {"max_rows": 10}) is None
+    assert cache.stats()["invalidations"] == 1
+    assert cache.stats()["dataset_version"] == "v2"
+
+
+def test_loader_bumps_are_seen_by_dataset_version(tmp_path, monkeypatch):
+    monkeypatch.setenv("BOM_DATASET_VERSION_FILE", str(tmp_path / "version.json"))
+    assert dataset_version() == ""
+    first = bump_dataset_version("csv_loader")
+    assert dataset_version() == first
+    second = bump_dataset_version("db_loader")
+    assert second != first
+
+
+def test_callbacks_cache_successful_execute_sql_only():
+    cache = QueryResultCache(version_fn=lambda: "v1")
+    before, after = make_cache_callbacks(cache)
+    execute_sql = SimpleNamespace(name="execute_sql")
+    context = SimpleNamespace(state={}, function_call_id="call-1")
+    args = {"project_id": "p", "query": "SELECT * FROM t"}
+
+    assert before(execute_sql, args, context) is None
+    after(execute_sql, args, context, {"status": "ERROR", "error_details": "quota"})
+    assert before(execute_sql, args, context) is None
+
+    after(execute_sql, args, context, dict(ROWS))
+    hit = before(execute_sql, {"project_id": "p", "query": "select *\nfrom t"}, context)
+    assert hit == {**ROWS, "cache_hit": True}
+    # Dry runs and other tools are never answered from the cache
+    assert before(execute_sql, {**args, "dry_run": True}, context) is None
+    assert before(SimpleNamespace(name="get_table_info"), args, context) is None
+    # A hit handed back to the model is not stored again
+    hits = cache.stats()["hits"]
+    after(execute_sql, args, context, hit)
+    assert cache.stats()["entries"] == 1 and cache.stats()["hits"] == hits
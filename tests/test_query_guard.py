@@ -0,0 +1,214 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+from google.cloud import bigquery
+
+from bom_core import query_guard
+from bom_core.dataset import load_dataset
+from bom_core.local_sql import LocalWarehouse
+from bom_core.query_guard import QueryGuard, guard_statement, make_guard_callback, predicate_columns
+from bom_core.schema import load_schema
+
+MB = 1_000_000
+STAR = "SELECT * FROM `demo.bom_demo.item_master` WHERE category = 'FRAMES'"
+STATEMENT_TYPES = {"SELECT": "SELECT", "WITH": "SELECT", "DELETE": "DELETE", "DROP": "DROP_TABLE",
+                   "BEGIN": "SCRIPT"}
+
+
+class DryRuns:
+    """bigquery.Client.query for dry runs, billed like BigQuery: 1 MB per column read of each table."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def query(self, sql, job_config=None):
+        self.jobs.append((sql, job_config))
+        schema = load_schema()
+        tables = [t for t in re.findall(r"`([^`]+)`", sql) if t.split(".")[-1] in schema]
+        billed = 0
+        for table_id in tables:
+            columns = schema[table_id.split(".")[-1]].column_names
+            star = re.search(r"SELECT\s+(?:DISTINCT\s+)?(?:\w+\.)?\*", sql, re.IGNORECASE)
+            billed += len(columns) if star else len(set(columns) & set(re.findall(r"\w+", sql)))
+        return SimpleNamespace(
+            total_bytes_processed=billed * MB,
+            referenced_tables=[bigquery.TableReference.from_string(t) for t in tables],
+            statement_type=STATEMENT_TYPES[sql.split()[0].upper()],
+        )
+
+    @property
+    def statements(self):
+        return [sql for sql, _ in self.jobs]
+
+
+@pytest.fixture
+def client():
+    return DryRuns()
+
+
+@pytest.fixture(scope="module")
+def mirror():
+    return LocalWarehouse(load_dataset())
+
+
+def test_dry_runs_are_uncached_jobs_keyed_by_statement_and_parameters(client):
+    guard = QueryGuard(client=client, max_bytes=100 * MB)
+    params = [bigquery.ScalarQueryParameter("item", "STRING", "ITEM-001")]
+    sql = "SELECT item_number FROM `demo.bom_demo.item_master` WHERE item_number = @item"
+    estimate = guard.check(sql, params)
+
+    _, job_config = client.jobs[0]
+    assert job_config.dry_run and job_config.use_query_cache is False
+    assert job_config.query_parameters == params
+    assert (estimate.bytes_processed, estimate.tables) == (1 * MB, ["item_master"])
+
+    guard.check("select  item_number\nFROM `demo.bom_demo.item_master`  WHERE item_number = @item", params)
+    assert len(client.jobs) == 1
+    guard.check(sql, [bigquery.ScalarQueryParameter("item", "STRING", "ITEM-002")])
+    assert len(client.jobs) == 2
+
+
+def test_least_recently_used_estimates_are_evicted(client, monkeypatch):
+    monkeypatch.setattr(query_guard, "ESTIMATE_CACHE_SIZE", 2)
+    guard = QueryGuard(client=client, max_bytes=100 * MB)
+    for sql in ("SELECT 1", "SELECT 2", "SELECT 1", "SELECT 3", "SELECT 1", "SELECT 2"):
+        guard.check(sql)
+    assert client.statements == ["SELECT 1", "SELECT 2", "SELECT 3", "SELECT 2"]
+
+
+def test_partition_and_cluster_filters_are_reported(client):
+    guard = QueryGuard(client=client, max_bytes=100 * MB)
+    pruned = guard.check("SELECT bd.component_item_number FROM `demo.bom_demo.bom_details` bd "
+                         "WHERE bd.effective_date >= '2024-01-01' AND bd.parent_item_number = 'ITEM-001'")
+    assert pruned.partition_columns_filtered == ["effective_date"]
+    assert pruned.cluster_columns_filtered == ["parent_item_number"]
+    assert pruned.unpruned_tables == []
+
+    full = guard.check("SELECT i.item_number FROM `demo.bom_demo.item_master` i "
+                       "JOIN `demo.bom_demo.bom_details` b ON b.component_item_number = i.item_number "
+                       "WHERE i.category = 'FRAMES'")
+    assert full.unpruned_tables == ["bom_details", "item_master"]
+    assert full.cluster_columns_filtered == ["category"]
+    assert "filter bom_details.effective_date" in full.advice()
+    assert "filter item_master.created_date" in full.advice()
+
+
+def test_predicate_columns_skip_literals_comments_and_projections():
+    sql = ("SELECT unit_cost FROM t WHERE status = 'category' -- lead_time_days\n"
+           "AND t.item_type IN ('A') GROUP BY unit_cost HAVING COUNT(weight) > 1")
+    columns = set(predicate_columns(sql))
+    assert {"status", "item_type", "weight"} <= columns
+    assert not {"category", "lead_time_days", "unit_cost"} & columns
+
+
+@pytest.mark.parametrize("sql", [
+    STAR,
+    "SELECT * FROM `demo.bom_demo.item_master` im WHERE im.lead_time_days > 30 ORDER BY im.item_number LIMIT 5",
+    "SELECT DISTINCT * FROM `demo.bom_demo.bom_details` WHERE parent_item_number = 'ITEM-001'",
+])
+def test_narrowed_select_star_returns_the_same_rows(client, mirror, sql):
+    guard = QueryGuard(client=client, max_bytes=10 * MB)
+    estimate = guard.check(sql)
+    assert estimate.within_budget and estimate.rewritten_sql
+    assert client.statements == [sql, estimate.rewritten_sql]
+
+    original = mirror.execute(sql)["rows"]
+    narrowed = mirror.execute(estimate.rewritten_sql)["rows"]
+    assert original and len(narrowed) == len(original)
+    assert narrowed == [{c: row[c] for c in narrowed[0]} for row in original]
+    assert guard.stats()["rewritten"] == 1
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT * FROM `demo.bom_demo.item_master` im JOIN `demo.bom_demo.bom_details` bd "
+    "ON bd.component_item_number = im.item_number",
+    "SELECT * FROM (SELECT item_number, category FROM `demo.bom_demo.item_master`)",
+])
+def test_statements_that_cannot_be_narrowed_are_rejected(client, sql):
+    guard = QueryGuard(client=client, max_bytes=0)
+    estimate = guard.check(sql)
+    assert estimate.rewritten_sql is None
+    error = query_guard.rejection(estimate)
+    assert "exceeds the 0 byte budget" in error["error_details"]
+    assert error["query_estimate"]["within_budget"] is False
+    assert guard.stats()["rejected"] == 1
+
+
+def test_reject_mode_never_rewrites(client):
+    estimate = QueryGuard(client=client, max_bytes=10 * MB, on_over_budget="reject").check(STAR)
+    assert estimate.rewritten_sql is None and not estimate.within_budget
+    assert client.statements == [STAR]
+
+
+@pytest.mark.parametrize("sql", ["DELETE FROM `demo.bom_demo.item_master` WHERE true",
+                                 "DROP TABLE `demo.bom_demo.item_master`",
+                                 "BEGIN SELECT 1; END"])
+def test_anything_but_a_select_is_refused_whatever_its_cost(client, sql):
+    estimate = QueryGuard(client=client, max_bytes=100 * MB).check(sql)
+    assert estimate.within_budget and not estimate.read_only
+    assert f"this is a {estimate.statement_type} statement" in query_guard.rejection(estimate)["error_details"]
+
+
+def test_guard_callback_records_the_estimate_and_rewrites_in_place(client):
+    tool = SimpleNamespace(name="execute_sql")
+    context = SimpleNamespace(state={})
+    rejecting = make_guard_callback(QueryGuard(client=client, max_bytes=10 * MB, on_over_budget="reject"))
+    assert rejecting(tool, {"query": STAR}, context)["status"] == "ERROR"
+    assert context.state["query_estimate"]["bytes_processed"] == 27 * MB
+
+    args = {"query": STAR}
+    assert make_guard_callback(QueryGuard(client=client, max_bytes=10 * MB))(tool, args, context) is None
+    assert args["query"] == "SELECT item_number, category FROM `demo.bom_demo.item_master` WHERE category = 'FRAMES'"
+
+    # Other tools, explicit dry runs and statements that stay local pass straight through
+    local_only = make_guard_callback(QueryGuard(client=client, max_bytes=0), should_check=lambda sql: False)
+    assert rejecting(SimpleNamespace(name="list_table_ids"), {"query": STAR}, context) is None
+    assert rejecting(tool, {"query": STAR, "dry_run": True}, context) is None
+    assert local_only(tool, {"query": STAR}, context) is None
+
+
+def test_guard_statement_uses_the_process_guard(client, monkeypatch):
+    monkeypatch.setattr(query_guard, "_guard", QueryGuard(client=client, max_bytes=10 * MB))
+    assert guard_statement(STAR)[0].startswith("SELECT item_number, category FROM")
+
+    sql, error = guard_statement("DELETE FROM `demo.bom_demo.item_master` WHERE true")
+    assert sql.startswith("DELETE") and error["status"] == "ERROR"
+
+
+def test_dry_run_failures_are_reported_as_errors(monkeypatch):
+    class BrokenClient:
+        def query(self, sql, job_config=None):
+            raise ValueError("Unrecognized name: foo")
+
+    monkeypatch.setattr(query_guard, "_guard", QueryGuard(client=BrokenClient()))
+    _, error = guard_statement("SELECT foo FROM item_master")
+    assert error == {"status": "ERROR", "error_details": "Dry run failed: Unrecognized name: foo"}
+    callback = make_guard_callback(query_guard._guard)
+    assert callback(SimpleNamespace(name="execute_sql"), {"query": "SELECT foo"}, SimpleNamespace(state={})) == error
+
+
+def test_rewritten_statements_are_cached_under_the_original_sql(client):
+    from bom_core.query_cache import QueryResultCache, make_cache_callbacks
+
+    cache_before, cache_after = make_cache_callbacks(QueryResultCache(version_fn=lambda: "v1"))
+    guard_before = make_guard_callback(QueryGuard(client=client, max_bytes=10 * MB))
+    tool = SimpleNamespace(name="execute_sql")
+
+    def call(call_id):
+        context = SimpleNamespace(state={}, function_call_id=call_id)
+        args = {"project_id": "demo", "query": STAR}
+        for before in (cache_before, guard_before):
+            result = before(tool, args, context)
+            if result is not None:
+                return result, args
+        cache_after(tool, args, context, {"status": "SUCCESS", "rows": [{"item_number": "ITEM-001"}]})
+        return None, args
+
+    result, args = call("call-1")
+    assert result is None and args["query"] != STAR
+    dry_runs = len(client.jobs)
+
+    result, args = call("call-2")
+    assert result["cache_hit"] and args["query"] == STAR
+    assert len(client.jobs) == dry_runs
@@ -0,0 +1,101 @@
+import importlib
+import json
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from bom_core import config, registry
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def test_first_use_builds_once_and_later_calls_share_it():
+    built = []
+    first = registry.get_or_create("k", lambda: built.append(1) or object())
+    assert registry.get_or_create("k", lambda: built.append(1) or object()) is first
+    assert registry.peek("k") is first and built == [1]
+
+    registry.reset("k")
+    assert registry.peek("k") is None
+    assert registry.get_or_create("k", object) is not first
+
+
+def test_concurrent_first_calls_build_once():
+    built = []
+    start = threading.Barrier(8)
+
+    def slow_factory():
+        built.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: (start.wait(), results.append(registry.get_or_create("k", slow_factory))))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(built) == 1
+    assert len({id(r) for r in results}) == 1
+
+
+def test_a_slow_factory_does_not_block_other_keys():
+    release = threading.Event()
+    thread = threading.Thread(target=registry.get_or_create, args=("slow", lambda: release.wait(5) and "slow"))
+    thread.start()
+    try:
+        started = time.perf_counter()
+        assert registry.get_or_create("fast", lambda: "fast") == "fast"
+        assert time.perf_counter() - started < 1.0
+    finally:
+        release.set()
+        thread.join()
+    assert registry.peek("slow") == "slow"
+
+
+def test_a_failing_factory_leaves_nothing_registered():
+    def broken():
+        raise RuntimeError("no credentials")
+
+    with pytest.raises(RuntimeError):
+        registry.get_or_create("client", broken)
+    assert registry.peek("client") is None
+    assert registry.get_or_create("client", lambda: "ok") == "ok"
+
+
+def test_a_forked_worker_builds_its_own(monkeypatch):
+    parent_client = registry.get_or_create("client", object)
+    monkeypatch.setattr(registry, "_pid", -1)  # as seen from a child after fork()
+    assert registry.peek("client") is None
+    assert registry.get_or_create("client", object) is not parent_client
+
+
+def test_importing_an_agent_module_builds_nothing():
+    probe = (
+        "import json, sys; import bom_simple_agentic_demo.agent as m; "
+        "print(json.dumps([k for k in ('google.adk', 'duckdb', 'google.cloud.bigquery', 'pandas') if k in sys.modules]))"
+    )
+    proc = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, cwd=config.REPO_ROOT, check=True)
+    assert json.loads(proc.stdout.strip().splitlines()[-1]) == []
+
+
+def test_root_agent_is_built_on_first_access(monkeypatch):
+    monkeypatch.setenv("GCP_PROJECT_ID", "demo")
+    monkeypatch.setenv("BQ_BACKEND", "local")
+    module = importlib.import_module("bom_simple_agentic_demo.agent")
+    key = "bom_simple_agentic_demo.agent.root_agent"
+    assert registry.peek(key) is None
+    agent = module.root_agent
+    assert registry.peek(key) is agent and module.root_agent is agent
+    assert agent.name == "bom_data_agent"
+    with pytest.raises(AttributeError):
+        module.not_an_agent
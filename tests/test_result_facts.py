@@ -0,0 +1,89 @@
+import pandas as pd
+import pytest
+
+from bom_core import registry
+from bom_core.cursors import get_cursor_store
+from bom_core.result_facts import result_frame, summarize_frame
+
+
+@pytest.fixture
+def cursor_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("BOM_RESULT_SPILL_DIR", str(tmp_path))
+    registry.reset("bom_core.cursors.store")
+    yield get_cursor_store()
+    registry.reset("bom_core.cursors.store")
+
+
+def test_distinct_counts_are_not_totalled():
+    # Pattern 7 shape: products_served / unique_components are COUNT(DISTINCT ...) per supplier
+    frame = pd.DataFrame({
+        "supplier_code": ["SUP001", "SUP002", "SUP003"],
+        "unique_components": [4, 5, 6],
+        "products_served": [10, 12, 9],
+        "total_spend": [100.0, 250.5, 75.25],
+    })
+    facts = summarize_frame(frame)
+    assert facts["totals"] == {"total_spend": 425.75}
+    assert "total" not in facts["measures"]["products_served"]
+
+
+def test_component_count_is_not_totalled():
+    frame = pd.DataFrame({"supply_type": ["MAKE", "BUY"], "component_count": [120, 112], "total_value": [1.5, 2.5]})
+    facts = summarize_frame(frame)
+    assert "component_count" not in facts.get("totals", {})
+    assert facts["totals"]["total_value"] == 4.0
+
+
+def test_session_cursor_beats_a_mangled_cursor_id(cursor_store):
+    rows = [{"item": f"ITEM-{i:03d}", "quantity": i} for i in range(40)]
+    summary = cursor_store.open_rows(rows).summary()
+    state = {"rows": rows[:10], "result_cursor": {"cursor_id": summary["cursor_id"][:-2] + "xx"}}
+
+    frame, source = result_frame(state, summary)
+    assert source == "cursor"
+    assert len(frame) == 40
+
+    # Without the session copy the mangled id falls back to the preview rows
+    frame, source = result_frame(state)
+    assert (source, len(frame)) == ("rows", 10)
+
+
+def test_cursor_from_an_earlier_turn_is_ignored(cursor_store):
+    summary = cursor_store.open_rows([{"quantity": i} for i in range(30)]).summary()
+    state = {"rows": [{"quantity": 1}, {"quantity": 2}], "chosen_sql": "SELECT 1"}
+    frame, source = result_frame(state, summary)
+    assert (source, len(frame)) == ("rows", 2)
+
+
+def test_what_if_deltas_over_nested_ancestors_are_not_totalled():
+    # ITEM-002 is inside ITEM-001, so its delta is already part of ITEM-001's
+    frame = pd.DataFrame({
+        "item_number": ["ITEM-148", "ITEM-002", "ITEM-001"],
+        "old_rolled_cost": [1.0, 11.0, 31.0],
+        "new_rolled_cost": [3.0, 15.0, 39.0],
+        "delta": [2.0, 4.0, 8.0],
+    })
+    for chosen_sql in ("what_if_unit_cost('ITEM-148', 3.0)", None):
+        facts = summarize_frame(frame, chosen_sql)
+        assert "totals" not in facts
+        assert all("total" not in m for m in facts["measures"].values())
+
+
+def test_tool_hints_pick_the_additive_columns():
+    rollup = pd.DataFrame({
+        "component_item_number": ["ITEM-002", "ITEM-003"],
+        "effective_quantity": [2.0, 1.5],
+        "component_rolled_cost": [10.0, 4.0],
+        "extended_cost": [20.0, 6.0],
+    })
+    assert summarize_frame(rollup, "rollup_cost('ITEM-001')")["totals"] == {"extended_cost": 26.0}
+
+    options = pd.DataFrame({
+        "parent_item_number": ["ITEM-001", "ITEM-001", "ITEM-002"],
+        "component_item_number": ["ITEM-010", "ITEM-011", "ITEM-012"],
+        "min_added_cost": [5.0, 1.0, 2.0],
+        "max_added_cost": [9.0, 3.0, 2.5],
+    })
+    facts = summarize_frame(options, "configuration_options('ITEM-001')")
+    assert "totals" not in facts
+    assert all("max_added_cost_total" not in g for g in facts["breakdowns"]["parent_item_number"])
@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pytest
+
+from bom_core import retrieval
+from bom_core.retrieval import BM25_B, BM25_K1, LocalSearchIndex, tokenize
+
+CHUNKS = [
+    {"id": "lead", "content": "supplier lead time days for purchased parts"},
+    {"id": "cost", "content": "unit cost and standard cost of an item, cost rollup over the bom"},
+    {"id": "where", "content": "where used: every assembly that uses a component"},
+    {"id": "long", "content": "supplier " + "filler words about nothing in particular " * 20},
+]
+
+
+def bm25(query, docs):
+    """Reference Okapi BM25 (same idf smoothing as the index)."""
+    tokens = [tokenize(d) for d in docs]
+    avg = sum(map(len, tokens)) / len(tokens)
+    out = []
+    for doc in tokens:
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in d for d in tokens)
+            tf = doc.count(term)
+            idf = math.log(1 + (len(tokens) - df + 0.5) / (df + 0.5))
+            score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / avg))
+        out.append(score)
+    return np.array(out)
+
+
+def test_lexical_scores_are_okapi_bm25():
+    index = LocalSearchIndex(CHUNKS, use_dense=False)
+    for query in ("supplier lead time", "cost", "assembly component unknownword"):
+        expected = bm25(query, [c["content"] for c in CHUNKS])
+        np.testing.assert_allclose(index.scores(query), expected / expected.max(), rtol=1e-5)
+
+
+def test_search_ranks_by_bm25():
+    index = LocalSearchIndex(CHUNKS, use_dense=False)
+    # Both mention "supplier"; the short chunk wins on length normalization
+    assert [h["id"] for h in index.search("supplier", k=4)] == ["lead", "long"]
+    # Chunks without any query term are left out
+    assert [h["id"] for h in index.search("cost", k=4)] == ["cost"]
+    assert index.search("zzz") == []
+    assert index.search("where used component")[0]["score"] == 1.0
+
+
+def test_dense_scores_blend_with_bm25():
+    index = LocalSearchIndex(CHUNKS)
+    lexical = LocalSearchIndex(CHUNKS, use_dense=False).scores("component assembly")
+    blended = index.scores("component assembly")
+    assert blended.argmax() == lexical.argmax() == 2
+    assert np.all(blended <= 1.0 + 1e-6)
+
+
+def test_saved_index_reopens_memory_mapped(tmp_path):
+    index = LocalSearchIndex(CHUNKS)
+    index.save(str(tmp_path))
+    loaded = LocalSearchIndex.load(str(tmp_path))
+    assert isinstance(loaded.bm25, np.memmap)
+    for query in ("supplier lead time", "cost rollup"):
+        np.testing.assert_allclose(loaded.scores(query), index.scores(query), rtol=1e-6)
+        assert [h["id"] for h in loaded.search(query)] == [h["id"] for h in index.search(query)]
+
+
+@pytest.fixture
+def doc_index(monkeypatch, tmp_path):
+    monkeypatch.setenv("LOCAL_RAG_INDEX_DIR", str(tmp_path / "missing"))
+    monkeypatch.setattr(retrieval, "_index", None)
+    yield
+    monkeypatch.setattr(retrieval, "_index", None)
+
+
+def test_search_schema_docs_finds_the_pattern(doc_index):
+    result = retrieval.search_schema_docs("where used parent assemblies of a component")
+    assert result["status"] == "success"
+    assert len(result["results"]) == 3
+    assert "WHERE_USED_001" in result["results"][0]["url"]
+    assert result["results"][0]["url"].startswith("query_patterns_documentation.md#")
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bom_core import tools
+from bom_core.dataset import load_dataset
+from bom_core.graph import BomGraph
+from bom_core.rollup import CostRollup
+
+
+def bom(*lines):
+    """bom_details frame from (parent, component, quantity[, scrap, yield]) lines."""
+    rows = []
+    for seq, (parent, component, quantity, *factors) in enumerate(lines):
+        scrap, yld = (factors + [None, None])[:2]
+        rows.append({
+            "bom_id": f"BOM-{parent}", "parent_item_number": parent, "component_item_number": component,
+            "sequence_number": seq, "quantity": quantity, "scrap_factor": scrap, "yield_factor": yld,
+            "effective_date": pd.NaT, "expiration_date": pd.NaT, "is_active": True,
+        })
+    return pd.DataFrame(rows)
+
+
+def rollup(details, costs):
+    item_master = pd.DataFrame({"item_number": list(costs), "unit_cost": list(costs.values())})
+    return CostRollup(BomGraph(details), details, item_master)
+
+
+@pytest.fixture
+def product():
+    # TOP = 2 × SUB + 1 × BOLT (10% scrap); SUB = 3 × BOLT + 1 × PLATE (80% yield)
+    details = bom(("TOP", "SUB", 2), ("TOP", "BOLT", 1, 0.1, None), ("SUB", "BOLT", 3), ("SUB", "PLATE", 1, None, 0.8))
+    return rollup(details, {"TOP": 999.0, "SUB": 999.0, "BOLT": 1.0, "PLATE": 4.0})
+
+
+def test_assemblies_roll_up_their_components(product):
+    sub = 3 * 1.0 + 4.0 / 0.8
+    assert product.cost_of("SUB") == pytest.approx(sub)
+    assert product.cost_of("TOP") == pytest.approx(2 * sub + 1.1 * 1.0)
+    # Assembly unit_cost in item_master is ignored: it is the components that cost money
+    assert product.cost_of("BOLT") == 1.0
+    assert [r["component_item_number"] for r in product.breakdown("TOP")] == ["SUB", "BOLT"]
+
+
+def test_what_if_on_a_leaf_moves_every_ancestor(product):
+    before = {i: product.cost_of(i) for i in ("TOP", "SUB", "BOLT")}
+    rows = {r["item_number"]: r for r in product.what_if({"BOLT": 2.0})}
+
+    assert rows["SUB"]["delta"] == pytest.approx(3.0)
+    assert rows["TOP"]["delta"] == pytest.approx(2 * 3.0 + 1.1)
+    assert rows["TOP"]["old_rolled_cost"] == pytest.approx(before["TOP"])
+    # Hypothetical only: the rollup itself is unchanged
+    assert {i: product.cost_of(i) for i in before} == before
+
+
+def test_set_unit_costs_matches_a_full_rebuild(product):
+    affected = product.set_unit_costs({"PLATE": 8.0})
+    assert sorted(affected) == ["SUB", "TOP"]
+    rebuilt = rollup(bom(("TOP", "SUB", 2), ("TOP", "BOLT", 1, 0.1, None), ("SUB", "BOLT", 3), ("SUB", "PLATE", 1, None, 0.8)),
+                     {"BOLT": 1.0, "PLATE": 8.0})
+    np.testing.assert_allclose(product.rolled_cost, rebuilt.rolled_cost)
+
+
+def test_assembly_costs_cannot_be_changed(product):
+    with pytest.raises(ValueError, match="Only leaf .*SUB"):
+        product.what_if({"SUB": 1.0})
+    with pytest.raises(ValueError, match="Only leaf"):
+        product.set_unit_costs({"BOLT": 2.0, "TOP": 1.0})
+    assert product.unit_cost[product.graph.item_id("BOLT")] == 1.0
+
+
+def test_what_if_tool_reports_assemblies_as_errors():
+    rollup_engine = tools.get_cost_rollup()
+    assembly = str(rollup_engine.graph.items[np.flatnonzero(~rollup_engine.is_leaf)[0]])
+    leaf = str(rollup_engine.graph.items[np.flatnonzero(rollup_engine.is_leaf)[0]])
+
+    result = tools.what_if_unit_cost(assembly, 1.0)
+    assert result["status"] == "ERROR"
+    assert "Only leaf (purchased) item costs can be changed" in result["error_details"]
+    assert tools.what_if_unit_cost(leaf, 1.0)["status"] == "SUCCESS"
+
+
+def test_rollup_matches_a_recursive_walk_of_the_demo_data():
+    frames = load_dataset()
+    details = frames["bom_details"][frames["bom_details"]["is_active"].astype("boolean").fillna(False)]
+    engine = tools.get_cost_rollup()
+    costs = frames["item_master"].drop_duplicates("item_number").set_index("item_number")["unit_cost"]
+
+    lines = details.assign(
+        eff=details["quantity"].astype(float)
+        * (1 + details["scrap_factor"].astype(float).fillna(0))
+        / details["yield_factor"].astype(float).fillna(1).where(lambda y: y > 0, 1.0)
+    ).groupby("parent_item_number")
+
+    memo = {}
+
+    def rolled(item):
+        if item not in memo:
+            if item in lines.groups:
+                group = lines.get_group(item)
+                memo[item] = sum(e * rolled(c) for c, e in zip(group["component_item_number"], group["eff"]))
+            else:
+                memo[item] = float(np.nan_to_num(costs.get(item, 0.0)))
+        return memo[item]
+
+    for item in details["parent_item_number"].unique()[:50]:
+        assert engine.cost_of(item) == pytest.approx(rolled(item))
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from bom_core.dataset import load_dataset
+from bom_core.graph import GRAPH_ARRAYS, BomGraph
+from bom_core.snapshot import BomSnapshot, SnapshotError, open_current, read_header, write_snapshot
+from bom_core.synthetic import GeneratorConfig, generate_dataset, write_dataset
+
+CONFIG = GeneratorConfig(items=300, depth=4, cycle_rate=0.02, seed=6)
+
+
+@pytest.fixture(scope="module")
+def frames(tmp_path_factory):
+    out = tmp_path_factory.mktemp("bom_snapshot_data")
+    write_dataset(generate_dataset(CONFIG), str(out), CONFIG)
+    return load_dataset(str(out))
+
+
+@pytest.fixture
+def written(frames, tmp_path):
+    path = str(tmp_path / "bom.snap")
+    info = write_snapshot(frames, path, version="v1")
+    return path, info
+
+
+def test_frames_round_trip_with_load_dataset_dtypes(frames, written):
+    path, info = written
+    snapshot = BomSnapshot(path, verify=True)
+    assert snapshot.dataset_version == "v1"
+    for name, frame in frames.items():
+        pd.testing.assert_frame_equal(snapshot.frame(name), frame, check_index_type=False)
+    assert info["bytes"] == len(open(path, "rb").read())
+
+
+def test_graph_from_the_snapshot_matches_a_fresh_build(frames, written):
+    fresh = BomGraph(frames["bom_details"])
+    snapshot = BomSnapshot(written[0])
+    mapped = snapshot.graph()
+    for name in GRAPH_ARRAYS:
+        np.testing.assert_array_equal(getattr(mapped, name), getattr(fresh, name), err_msg=name)
+    assert not snapshot.graph_array("parent").flags.writeable  # a view of the map, not a copy
+
+    top = frames["bom_details"]["parent_item_number"].iloc[0]
+    assert mapped.find_cycles() == fresh.find_cycles()
+    assert mapped.explode(top) == fresh.explode(top)
+    assert mapped.where_used(frames["bom_details"]["component_item_number"].iloc[-1]) == \
+        fresh.where_used(frames["bom_details"]["component_item_number"].iloc[-1])
+
+
+def test_open_current_only_serves_the_matching_version(written, tmp_path):
+    path, _ = written
+    assert open_current("v1", path).dataset_version == "v1"
+    assert open_current("v2", path) is None
+    assert open_current("v1", str(tmp_path / "missing.snap")) is None
+    assert read_header(path)["dataset_version"] == "v1"
+
+
+def test_damaged_files_are_refused(written, tmp_path):
+    path, info = written
+    data = bytearray(open(path, "rb").read())
+
+    flipped = tmp_path / "flipped.snap"
+    data[-1] ^= 0xFF
+    flipped.write_bytes(bytes(data))
+    with pytest.raises(SnapshotError, match="checksum"):
+        BomSnapshot(str(flipped), verify=True)
+
+    truncated = tmp_path / "truncated.snap"
+    truncated.write_bytes(bytes(data[:-100]))
+    with pytest.raises(SnapshotError, match="truncated"):
+        BomSnapshot(str(truncated))
+    assert open_current("v1", str(truncated)) is None
+
+    garbage = tmp_path / "garbage.snap"
+    garbage.write_bytes(b"not a snapshot at all")
+    with pytest.raises(SnapshotError):
+        read_header(str(garbage))
@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+from bom_core.speculative import (
+    SpeculativeRunner,
+    StrategyPlan,
+    guarded_run_query,
+    parse_pipeline_state,
+    plans_from_state,
+)
+
+
+class FakeWarehouse:
+    """run_fn stand-in: per-SQL delay and rows; slow statements block until released."""
+
+    def __init__(self, **outcomes):
+        self.outcomes = outcomes  # sql -> (seconds, rows | result dict)
+        self.release = threading.Event()
+        self.in_flight = 0
+        self.peak = 0
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, sql, params, on_job=None):
+        seconds, rows = self.outcomes[sql]
+        job = Job()
+        self.jobs[sql] = job
+        on_job(job)
+        with self._lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            if seconds is None:
+                self.release.wait(5)
+            else:
+                time.sleep(seconds)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        job.state = "DONE"
+        return rows if isinstance(rows, dict) else {"status": "SUCCESS", "rows": rows}
+
+
+class Job:
+    state = "RUNNING"
+    cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+def run(warehouse, *sqls, **kwargs):
+    async def go():
+        try:
+            return await SpeculativeRunner(warehouse, **kwargs).run(
+                [StrategyPlan(n, sql) for n, sql in enumerate(sqls, start=1)]
+            )
+        finally:
+            warehouse.release.set()
+
+    attempts = asyncio.run(go())
+    return [a.status for a in attempts], attempts
+
+
+def test_highest_priority_hit_wins_once_earlier_strategies_are_empty():
+    warehouse = FakeWarehouse(exact=(0.2, []), token=(0.0, [{"item": 1}]), parent=(0.0, [{"item": 2}]))
+    statuses, attempts = run(warehouse, "exact", "token", "parent")
+    assert statuses == ["empty", "found", "superseded"]
+    assert attempts[1].row_count == 1
+    assert [e["strategy"] for e in (a.log_entry() for a in attempts)] == [1, 2, 3]
+
+
+def test_a_first_strategy_hit_cancels_the_rest():
+    # exact answers once the other statements are running
+    warehouse = FakeWarehouse(exact=(0.1, [{"item": 1}]), token=(None, []), parent=(None, []))
+    statuses, _ = run(warehouse, "exact", "token", "parent")
+    assert statuses == ["found", "cancelled", "cancelled"]
+    # BigQuery jobs still running are cancelled too
+    assert {sql: job.cancelled for sql, job in warehouse.jobs.items()} == {"exact": False, "token": True, "parent": True}
+
+
+def test_budget_settles_for_the_best_finished_strategy():
+    warehouse = FakeWarehouse(exact=(None, []), token=(0.0, [{"item": 1}]))
+    statuses, _ = run(warehouse, "exact", "token", timeout_seconds=0.2)
+    assert statuses == ["timeout", "found"]
+
+    warehouse = FakeWarehouse(exact=(None, []), token=(0.0, []))
+    statuses, _ = run(warehouse, "exact", "token", timeout_seconds=0.2)
+    assert statuses == ["timeout", "empty"]
+
+
+def test_concurrency_is_bounded():
+    warehouse = FakeWarehouse(**{f"s{i}": (0.05, []) for i in range(6)})
+    statuses, _ = run(warehouse, *[f"s{i}" for i in range(6)], max_concurrency=2)
+    assert statuses == ["empty"] * 6
+    assert warehouse.peak == 2
+
+
+def test_guard_refusals_and_query_errors_are_told_apart():
+    warehouse = FakeWarehouse(
+        big=(0.0, {"status": "ERROR", "error_details": "over budget", "query_estimate": {"bytes": 1}}),
+        bad=(0.0, {"status": "ERROR", "error_details": "Unrecognized name: foo"}),
+    )
+    statuses, attempts = run(warehouse, "big", "bad")
+    assert statuses == ["rejected", "error"]
+    assert attempts[1].log_entry()["error"] == "Unrecognized name: foo"
+
+
+def test_plans_come_from_fenced_pipeline_state():
+    state = parse_pipeline_state(
+        '```json\n{"strategy_plans": [{"strategy": 3, "sql": "C"}, {"sql": ""}, {"strategy": 1, "sql": "A", '
+        '"params": {"item": "ITEM-001"}}]}\n```'
+    )
+    plans = plans_from_state(state)
+    assert [(p.strategy, p.sql, p.params) for p in plans] == [(1, "A", {"item": "ITEM-001"}), (3, "C", {})]
+    assert parse_pipeline_state("not json") == {}
+
+
+def test_guarded_run_query_answers_from_the_mirror(monkeypatch):
+    monkeypatch.setenv("BQ_BACKEND", "local")
+    result = guarded_run_query(
+        "SELECT item_number FROM `p.bom_demo.item_master` WHERE item_number = @item", {"item": "ITEM-001"}
+    )
+    assert result["status"] == "SUCCESS"
+    assert result["rows"] == [{"item_number": "ITEM-001"}]
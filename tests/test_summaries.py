@@ -0,0 +1,131 @@
+from types import SimpleNamespace
+
+import pyarrow as pa
+import pytest
+
+from bom_core.dataset import coerce_to_schema
+from bom_core.delta import compute_delta, extract_snapshot
+from bom_core.local_sql import LocalWarehouse
+from bom_core.pattern_router import get_pattern_router
+from bom_core.query_runner import render_sql
+from bom_core.schema import get_table
+from bom_core.summaries import (
+    PATTERN_SUMMARY_SQL,
+    SUMMARY_VIEWS,
+    SUPPLIER_CONSOLIDATION,
+    SummaryStore,
+    affected_partitions,
+    attach_summaries,
+    compute_view,
+    matching_views,
+    membership_of,
+    refresh_summaries,
+    replace_partitions,
+)
+from bom_core.synthetic import GeneratorConfig, generate_dataset
+
+
+def typed(frames):
+    return {name: coerce_to_schema(df, get_table(name)) for name, df in frames.items()}
+
+
+@pytest.fixture
+def before():
+    return typed(generate_dataset(GeneratorConfig(items=300, depth=3, seed=2)))
+
+
+def change(frames):
+    """A new extract: one item changes supplier, one line's quantity changes, one line is dropped."""
+    items = frames["item_master"].copy()
+    lines = frames["bom_details"].copy()
+    moved = lines["component_item_number"].iloc[0]
+    old_supplier = items.loc[items["item_number"] == moved, "supplier_code"].iloc[0]
+    new_supplier = next(s for s in items["supplier_code"].dropna().unique() if s != old_supplier)
+    items.loc[items["item_number"] == moved, "supplier_code"] = new_supplier
+    lines.loc[lines.index[5], "quantity"] = lines["quantity"].iloc[5] + 3
+    dropped = lines["component_item_number"].iloc[9]
+    lines = lines.drop(lines.index[9]).reset_index(drop=True)
+    touched = {old_supplier, new_supplier}
+    for item in (lines["component_item_number"].iloc[5], dropped):
+        code = items.loc[items["item_number"] == item, "supplier_code"]
+        touched.add(code.iloc[0] if code.notna().all() else "UNASSIGNED")
+    return {"item_master": items, "bom_details": lines}, touched
+
+
+def deltas_between(before, after):
+    return {name: compute_delta([after[name]], get_table(name), extract_snapshot([before[name]], get_table(name)))
+            for name in after}
+
+
+def test_incremental_refresh_matches_a_full_rebuild(before, tmp_path):
+    store = SummaryStore(str(tmp_path / "summaries"))
+    first = refresh_summaries(version="v1", store=store, frames=before)
+    assert first["mode"] == "full" and first["partitions"] is None
+
+    after, touched = change(before)
+    report = refresh_summaries(version="v2", deltas=deltas_between(before, after), base_version="v1",
+                               store=store, frames=after)
+    assert report["mode"] == "incremental"
+    assert set(report["partitions"]) == touched
+
+    rebuilt = LocalWarehouse(after)
+    tables = store.fresh_tables("v2")
+    for view in SUMMARY_VIEWS:
+        expected = compute_view(rebuilt, view).sort_by([(c, "ascending") for c in view.key_columns])
+        assert tables[view.name].to_pylist() == pytest.approx(expected.to_pylist()), view.name
+        assert report["rows"][view.name] == expected.num_rows
+    assert store.fresh_tables("v1") is None
+    assert store.load_membership() == membership_of(after["item_master"])
+
+
+def test_a_stale_store_falls_back_to_a_full_rebuild(before, tmp_path):
+    store = SummaryStore(str(tmp_path / "summaries"))
+    refresh_summaries(version="v1", store=store, frames=before)
+    after, _ = change(before)
+    report = refresh_summaries(version="v3", deltas=deltas_between(before, after), base_version="v2",
+                               store=store, frames=after)
+    assert report["mode"] == "full" and report["partitions"] is None
+
+
+def test_affected_partitions_follow_moved_and_deleted_items(before):
+    membership = membership_of(before["item_master"])
+    item = before["item_master"]["item_number"].iloc[0]
+    items = before["item_master"].iloc[[0]].assign(supplier_code="SUP999")
+    empty_lines = before["bom_details"].iloc[:0]
+    deltas = {
+        "item_master": SimpleNamespace(upserts=items, deletes=before["item_master"].iloc[[1]][["item_number"]]),
+        "bom_details": SimpleNamespace(upserts=empty_lines, deletes=empty_lines),
+    }
+    touched, updated = affected_partitions(deltas, membership)
+    gone = before["item_master"]["item_number"].iloc[1]
+    assert touched == {membership[item], "SUP999", membership[gone]}
+    assert updated[item] == "SUP999" and gone not in updated
+
+
+def test_replace_partitions_swaps_only_the_named_suppliers():
+    old = pa.table({"supplier_code": ["A", "B", None], "n": [1, 2, 3]})
+    fresh = pa.table({"n": [20, 21], "supplier_code": ["B", "B"]})
+    merged = replace_partitions(old, fresh, {"B"}, SUPPLIER_CONSOLIDATION)
+    assert merged.to_pylist() == [
+        {"supplier_code": "A", "n": 1}, {"supplier_code": "B", "n": 20}, {"supplier_code": "B", "n": 21},
+        {"supplier_code": None, "n": 3},
+    ]
+
+
+def test_pattern_7_from_the_summary_matches_the_pattern(before, tmp_path):
+    warehouse = LocalWarehouse(before)
+    attach_summaries(warehouse, "v1", SummaryStore(str(tmp_path / "empty")))
+    pattern = next(p for p in get_pattern_router().patterns if p.pattern_id == "PATTERN_7")
+    direct = warehouse.execute(render_sql(pattern.sql))
+    summary = warehouse.execute(render_sql(PATTERN_SUMMARY_SQL["PATTERN_7"]))
+    assert direct["status"] == summary["status"] == "SUCCESS"
+    assert len(summary["rows"]) > 0
+    assert summary["rows"] == pytest.approx(direct["rows"])
+
+
+def test_matching_views_by_keyword():
+    assert matching_views("Which suppliers have the highest supplier spend?") == [SUPPLIER_CONSOLIDATION]
+    assert [v.name for v in matching_views("single source lead time risk by country of origin")] == [
+        "supplier_risk_summary"]
+    assert matching_views("What is the supplier spend for ITEM-001?") == []
+    assert matching_views("") == []
@@ -0,0 +1,125 @@
+from types import SimpleNamespace
+
+from google.adk.agents import LlmAgent, LoopAgent, SequentialAgent
+
+from bom_core.tracing import (
+    JsonlSpanExporter,
+    Tracer,
+    format_timeline,
+    instrument,
+    load_spans,
+    make_tracing_callbacks,
+    to_otlp,
+)
+
+
+class Collect:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(spans)
+
+
+def agent_ctx(name, state=None):
+    return SimpleNamespace(invocation_id="inv-1", agent_name=name, state=state or {})
+
+
+def tool_ctx(call_id, state):
+    return SimpleNamespace(invocation_id="inv-1", function_call_id=call_id, state=state)
+
+
+def test_spans_nest_under_their_agent_and_export_with_the_root():
+    exporter = Collect()
+    tracer = Tracer([exporter])
+    cb = make_tracing_callbacks(tracer)
+    state = {"pipeline_state": '{"rows": []}'}
+    execute_sql = SimpleNamespace(name="execute_sql")
+
+    cb["before_agent"](agent_ctx("pipeline"))
+    for _ in range(2):  # LoopAgent iterations
+        cb["before_agent"](agent_ctx("refine", state))
+        cb["before_model"](agent_ctx("refine", state), SimpleNamespace(model="gemini-2.5-flash", contents=[1, 2]))
+        cb["after_model"](agent_ctx("refine", state), SimpleNamespace(
+            partial=False, error_code=None, content=None,
+            usage_metadata=SimpleNamespace(prompt_token_count=120, candidates_token_count=30, cached_content_token_count=0),
+        ))
+        cb["after_agent"](agent_ctx("refine", state))
+    cb["before_tool"](execute_sql, {"query": "SELECT 1"}, tool_ctx("call-1", state))
+    state["query_estimate"] = {"bytes_processed": 2048}
+    cb["after_tool"](execute_sql, {"query": "SELECT 1"}, tool_ctx("call-1", state),
+                     {"status": "SUCCESS", "rows": [{"a": 1}], "cache_hit": True})
+    assert exporter.traces == []  # nothing leaves until the root agent ends
+    cb["after_agent"](agent_ctx("pipeline"))
+
+    (spans,) = exporter.traces
+    by_kind = {}
+    for s in spans:
+        by_kind.setdefault(s.kind, []).append(s)
+    root = by_kind["agent"][0]
+    refine = by_kind["agent"][1:]
+    assert [s.attributes["bom.iteration"] for s in refine] == [1, 2]
+    assert all(s.parent_id == root.span_id for s in refine + by_kind["tool"])
+    assert [s.parent_id for s in by_kind["llm"]] == [s.span_id for s in refine]
+    llm = by_kind["llm"][0].attributes
+    assert (llm["gen_ai.usage.input_tokens"], llm["bom.pipeline_state_tokens_est"]) == (120, 3)
+    tool = by_kind["tool"][0].attributes
+    assert (tool["bom.row_count"], tool["bom.cache_hit"], tool["bom.bytes_processed"]) == (1, True, 2048)
+    assert all(s.end_ns >= s.start_ns and s.trace_id == root.trace_id for s in spans)
+
+
+def test_unfinished_spans_are_flagged_on_export():
+    exporter = Collect()
+    tracer = Tracer([exporter])
+    tracer.start_agent("inv-2", "root")
+    tracer.start("inv-2", "k", "lost_tool", "tool")
+    tracer.record("inv-2", "strategy_1", "query", 10, 20, status="CANCELLED")
+    tracer.end_agent("inv-2", "root")
+    statuses = {s.name: s.status for s in exporter.traces[0]}
+    assert statuses == {"root": "OK", "lost_tool": "UNFINISHED", "strategy_1": "CANCELLED"}
+
+
+def test_otlp_and_jsonl_exports(tmp_path):
+    tracer = Tracer([JsonlSpanExporter(str(tmp_path / "spans.jsonl"))])
+    tracer.start_agent("inv-3", "root")
+    tracer.record("inv-3", "strategy_2", "query", 1_000_000, 6_000_000, **{"bom.row_count": 4})
+    tracer.end_agent("inv-3", "root")
+
+    spans = load_spans(str(tmp_path / "spans.jsonl"))
+    assert [s["name"] for s in spans] == ["root", "strategy_2"]
+    assert spans[1]["duration_ms"] == 5.0
+    assert "query:strategy_2  (row_count=4)" in format_timeline(spans)
+
+    tracer = Tracer()
+    tracer.start_agent("inv-4", "root")
+    tracer.record("inv-4", "q", "query", 1, 2, status="TIMEOUT", **{"bom.row_count": 0, "bom.cache_hit": False})
+    otlp_span = to_otlp(tracer._traces["inv-4"].spans)["resourceSpans"][0]["scopeSpans"][0]["spans"][1]
+    assert otlp_span["kind"] == 3 and otlp_span["status"] == {"code": 2, "message": "TIMEOUT"}
+    assert {"key": "bom.row_count", "value": {"intValue": "0"}} in otlp_span["attributes"]
+    assert {"key": "bom.cache_hit", "value": {"boolValue": False}} in otlp_span["attributes"]
+
+
+def test_instrument_wraps_every_sub_agent(monkeypatch):
+    monkeypatch.delenv("BOM_TRACE_DIR", raising=False)
+    keep = lambda **kwargs: None  # noqa: E731
+    answer = lambda ctx: "cached answer"  # noqa: E731
+    worker = LlmAgent(name="worker", model="gemini-2.5-flash", before_tool_callback=keep)
+    fast = LlmAgent(name="fast", model="gemini-2.5-flash", before_agent_callback=answer)
+    root = SequentialAgent(name="root", sub_agents=[fast, LoopAgent(name="loop", sub_agents=[worker])])
+
+    assert instrument(root) is root and root.before_agent_callback is None  # tracing off
+
+    exporter = Collect()
+    instrument(root, Tracer([exporter]))
+    assert len(worker.before_tool_callback) == 2 and worker.before_tool_callback[1] is keep
+    assert len(root.sub_agents[1].before_agent_callback) == 1
+
+    # A before_agent callback that answers early still closes the agent's span
+    ctx = agent_ctx("root")
+    root.before_agent_callback[0](ctx)
+    fast_ctx = agent_ctx("fast")
+    assert [cb(fast_ctx) for cb in fast.before_agent_callback] == [None, "cached answer"]
+    root.after_agent_callback[0](ctx)
+    spans = {s.name: s for s in exporter.traces[0]}
+    assert spans["fast"].attributes["bom.short_circuited"] is True
+    assert spans["fast"].status == "OK"